@@ -1,14 +1,27 @@
 """数据库连接配置。
 
 负责创建和管理数据库连接。
+
+设计原因：
+1. 同步引擎（SessionLocal / get_db）供定时任务、脚本与线程池中的同步路由使用。
+2. 异步引擎（get_async_db）供高并发的 async 路由使用：查询期间让出事件循环，
+   并发能力取决于连接池大小而不是单个事件循环线程。异步驱动由 DATABASE_URL 推导
+   （postgresql → asyncpg，sqlite → aiosqlite），也可用 ASYNC_DATABASE_URL 显式指定；
+   引擎在首次使用时创建，未安装异步驱动时不影响同步部分。
 """
 
 import os
+import threading
+from typing import TYPE_CHECKING, AsyncIterator
+
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 # 数据库连接配置
 # 从环境变量读取，如果没有则使用默认值
 DATABASE_URL = os.getenv(
@@ -49,6 +62,76 @@ def get_db():
         db.close()
 
 
+def _async_database_url(url: str) -> str:
+    """把同步连接串转换为异步驱动连接串。
+
+    Args:
+        url: 同步连接串，如 postgresql://... 或 postgresql+psycopg2://...。
+
+    Returns:
+        str: 异步连接串；ASYNC_DATABASE_URL 已设置时直接返回它。
+    """
+    explicit = os.getenv("ASYNC_DATABASE_URL", "").strip()
+    if explicit:
+        return explicit
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    dialect = scheme.split("+", 1)[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+_async_engine = None
+_async_session_factory = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """返回进程级异步引擎（首次调用时创建）。
+
+    Returns:
+        AsyncEngine: SQLAlchemy 异步引擎。
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+                url = _async_database_url(DATABASE_URL)
+                kwargs = {"pool_pre_ping": True, "echo": False}
+                if not url.startswith("sqlite"):
+                    kwargs.update(pool_size=10, max_overflow=20)
+                _async_engine = create_async_engine(url, **kwargs)
+                # expire_on_commit=False：提交后仍可读取已加载的属性，避免异步上下文中的隐式刷新
+                _async_session_factory = async_sessionmaker(
+                    _async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+
+def get_async_session_factory():
+    """返回异步会话工厂。"""
+    get_async_engine()
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncIterator["AsyncSession"]:
+    """获取异步数据库会话。
+
+    FastAPI 依赖注入函数，用于 async 路由。
+
+    Yields:
+        AsyncSession: SQLAlchemy 异步会话。
+    """
+    async with get_async_session_factory()() as session:
+        yield session
+
+
 def init_db():
     """初始化数据库。
 
@@ -16,6 +16,14 @@ from sqlalchemy import (
     ForeignKey,
     SmallInteger,
     Index,
+    and_,
+    case,
+    literal_column,
+    cast,
+    extract,
+    event,
+    Computed,
+    DDL,
 )
 from sqlalchemy.dialects.postgresql import UUID, INET
 from sqlalchemy.orm import relationship
@@ -129,7 +137,7 @@ class FuturesContract(Base):
     sector_id = Column(Integer, ForeignKey("sectors.sector_id"), index=True)
     is_active = Column(Boolean, default=True)
     listed_date = Column(Date)
-    expiry_date = Column(Date)
+    expiry_date = Column(Date, index=True)  # 到期清理按此列下架帖子
     created_at = Column(DateTime, server_default=func.now())
 
     # 关系
@@ -175,6 +183,25 @@ class MarketData(Base):
         return f"<MarketData(data_id={self.data_id}, contract_id={self.contract_id}, trade_date={self.trade_date})>"
 
 
+class IngestCursor(Base):
+    """增量入库游标表模型。
+
+    对应数据库表：ingest_cursors
+
+    记录每个入库任务已完整处理到的交易日。market_data 还会被 K 线按需回写单个合约，
+    不能用 MAX(trade_date) 充当全市场入库的游标。
+    """
+
+    __tablename__ = "ingest_cursors"
+
+    name = Column(String(50), primary_key=True)  # 如：market_data_daily
+    trade_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<IngestCursor(name={self.name}, trade_date={self.trade_date})>"
+
+
 class PredictionTask(Base):
     """预测任务表模型。
 
@@ -279,6 +306,35 @@ class DataSource(Base):
         return f"<DataSource(source_id={self.source_id}, source_name={self.source_name}, source_type={self.source_type})>"
 
 
+# 有效建议标记位于排序键的高位：任何有建议的帖子都排在没有建议的帖子之前
+FEED_RANK_SUGGESTION_WEIGHT = 10 ** 13
+
+
+def _feed_rank_expression(suggestion, updated_at, publish_time):
+    """帖子流排序键的生成表达式。
+
+    有效建议（非空且不是「待管理员编辑建议」）记 1、否则记 0，乘以 FEED_RANK_SUGGESTION_WEIGHT，
+    再加上 coalesce(updated_at, publish_time) 的毫秒时间戳。常量以字面量渲染，保证 DDL 可复现
+    （与 database/migrations/003_post_feed_rank.sql 一致）。
+    """
+    has_suggestion = case(
+        (
+            and_(
+                suggestion.isnot(None),
+                suggestion != literal_column("''"),
+                suggestion != literal_column("'待管理员编辑建议'")
+            ),
+            literal_column("1")
+        ),
+        else_=literal_column("0")
+    )
+    feed_millis = cast(
+        extract("epoch", func.coalesce(updated_at, publish_time)) * literal_column("1000"),
+        BigInteger,
+    )
+    return cast(has_suggestion * literal_column(str(FEED_RANK_SUGGESTION_WEIGHT)) + feed_millis, BigInteger)
+
+
 class Post(Base):
     """帖子表模型。
 
@@ -307,6 +363,8 @@ class Post(Base):
     publish_time = Column(DateTime, server_default=func.now(), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # 帖子流排序键（数据库生成列），随 suggestion/updated_at 的任何写入自动更新
+    feed_rank = Column(BigInteger, Computed(_feed_rank_expression(suggestion, updated_at, publish_time), persisted=True))
 
     # 关系
     author = relationship("User", back_populates="posts", foreign_keys=[author_id])
@@ -319,6 +377,43 @@ class Post(Base):
         return f"<Post(post_id={self.post_id}, title={self.title}, author_id={self.author_id})>"
 
 
+# 帖子搜索索引（PostgreSQL pg_trgm）：ILIKE '%kw%' 可走 GIN 索引而不是顺序扫描。
+# 三元组至少需要 3 个字符，更短的关键词仍会回表过滤，但候选集由别名解析后的名称进一步收窄。
+event.listen(
+    Post.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+Index(
+    "idx_posts_title_trgm",
+    Post.title,
+    postgresql_using="gin",
+    postgresql_ops={"title": "gin_trgm_ops"},
+)
+Index(
+    "idx_posts_contract_code_trgm",
+    Post.contract_code,
+    postgresql_using="gin",
+    postgresql_ops={"contract_code": "gin_trgm_ops"},
+)
+
+
+# 同一合约只保留一条已发布帖子（部分唯一索引），合约同步据此用 INSERT ... ON CONFLICT 批量写入。
+# 只在 PostgreSQL 上创建；存量库见 database/migrations/004_posts_active_contract_unique.sql。
+ACTIVE_CONTRACT_POST_INDEX = "uq_posts_active_contract_code"
+event.listen(
+    Post.__table__,
+    "after_create",
+    DDL(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {ACTIVE_CONTRACT_POST_INDEX} ON posts (contract_code) WHERE status = 1"
+    ).execute_if(dialect="postgresql"),
+)
+
+# 帖子流索引：列表按 (feed_rank desc, post_id desc) 排序，筛选已发布（及板块）后即为索引范围扫描
+Index("idx_posts_feed_rank", Post.status, Post.feed_rank.desc(), Post.post_id.desc())
+Index("idx_posts_sector_feed_rank", Post.status, Post.sector_id, Post.feed_rank.desc(), Post.post_id.desc())
+
+
 class Draft(Base):
     """草稿表模型。
 
@@ -373,6 +468,10 @@ class Collection(Base):
         return f"<Collection(collection_id={self.collection_id}, user_id={self.user_id}, post_id={self.post_id})>"
 
 
+# 收藏列表游标分页索引：按用户、收藏时间倒序
+Index("idx_collections_user_keyset", Collection.user_id, Collection.created_at.desc(), Collection.collection_id.desc())
+
+
 class BrowseHistory(Base):
     """浏览历史表模型。
 
@@ -395,6 +494,10 @@ class BrowseHistory(Base):
         return f"<BrowseHistory(history_id={self.history_id}, user_id={self.user_id}, post_id={self.post_id})>"
 
 
+# 浏览历史游标分页索引：按用户、浏览时间倒序
+Index("idx_browse_histories_user_keyset", BrowseHistory.user_id, BrowseHistory.browse_time.desc(), BrowseHistory.history_id.desc())
+
+
 class Like(Base):
     """点赞表模型。
 
@@ -132,14 +132,30 @@ async def startup_event():
             # 启动调度器
             scheduler_service.start()
             
-            # 添加价格更新任务
+            # 添加价格更新任务：默认按交易时段调度，PRICE_UPDATE_SCHEDULE_MODE=interval 时退回全天固定间隔
             try:
+                schedule_mode = os.getenv("PRICE_UPDATE_SCHEDULE_MODE", "session").strip().lower()
+                trigger = None
+                if schedule_mode != "interval":
+                    from app.services.scheduler_service import TradingSessionTrigger
+                    from app.services.trading_calendar import refresh_trading_calendar
+
+                    try:
+                        refresh_trading_calendar()
+                    except Exception as e:
+                        logger.warning(f"刷新交易日历失败，使用内置休市表: {str(e)}")
+                    trigger = TradingSessionTrigger.from_env()
+
                 scheduler_service.add_price_update_job(
                     update_func=update_prices_job,
                     interval_minutes=update_interval,
-                    job_id="price_update_job"
+                    job_id="price_update_job",
+                    trigger=trigger,
                 )
-                logger.info(f"已启动价格更新定时任务，更新间隔: {update_interval} 分钟（现价同步到 DB，主页/详情/K 线图通过接口获取）")
+                if trigger is None:
+                    logger.info(f"已启动价格更新定时任务，更新间隔: {update_interval} 分钟（现价同步到 DB，主页/详情/K 线图通过接口获取）")
+                else:
+                    logger.info(f"已启动价格更新定时任务，按交易时段调度: {trigger}")
                 
                 # 启动后立即执行一次价格更新（异步执行，不阻塞启动）
                 logger.info("启动后立即执行首次价格更新（异步执行）...")
@@ -201,6 +217,11 @@ async def startup_event():
                                 f"失败={result['failed']}, "
                                 f"耗时={duration:.2f}秒"
                             )
+                            for source, item in result.get('sources', {}).items():
+                                logger.info(
+                                    f"[定时任务] 合约来源 {source}: 状态={item['status']}, "
+                                    f"耗时={item['seconds']}秒, 行数={item['rows']}"
+                                )
                         finally:
                             db.close()
                     except Exception as e:
@@ -222,7 +243,7 @@ async def startup_event():
             
             # 添加合约到期汰换任务（每天执行一次，在凌晨 3 点）
             try:
-                from app.services.contract_expiry_service import ContractExpiryService
+                from app.services.contract_expiry_service import ContractExpiryService, get_expiry_stats
                 from apscheduler.triggers.cron import CronTrigger
                 
                 def cleanup_expired_contracts_job():
@@ -243,13 +264,17 @@ async def startup_event():
                             end_time = datetime.datetime.now()
                             duration = (end_time - start_time).total_seconds()
                             
+                            stats = get_expiry_stats()
                             logger.info(
                                 f"[定时任务] 合约到期汰换完成: "
                                 f"检查总数={result['total_checked']}, "
                                 f"到期数量={result['expired_count']}, "
                                 f"删除数量={result['deleted_count']}, "
+                                f"新登记合约={result['contracts_created']}, "
+                                f"补算到期日={result['expiry_backfilled']}, "
                                 f"错误数量={result.get('error_count', 0)}, "
-                                f"耗时={duration:.2f}秒"
+                                f"耗时={duration:.2f}秒, "
+                                f"累计运行={stats['runs']}次/下架={stats['deleted_total']}"
                             )
                         finally:
                             db.close()
@@ -269,6 +294,37 @@ async def startup_event():
                 logger.info("已启动合约到期汰换定时任务，每天凌晨 3 点执行")
             except Exception as e:
                 logger.error(f"启动合约到期汰换定时任务失败: {str(e)}", exc_info=True)
+
+            # 交易日收盘结算后把当日全市场日线增量写入 market_data（K 线优先读本表）
+            try:
+                from apscheduler.triggers.cron import CronTrigger
+                from app.services.daily_bar_store import ingest_daily_bars
+
+                scheduler_service.scheduler.add_job(
+                    func=ingest_daily_bars,
+                    trigger=CronTrigger(day_of_week="mon-fri", hour=17, minute=40),
+                    id="market_data_ingest_job",
+                    name="日线入库任务",
+                    replace_existing=True,
+                )
+                logger.info("已启动日线入库定时任务，交易日 17:40 执行")
+            except Exception as e:
+                logger.error(f"启动日线入库任务失败: {str(e)}", exc_info=True)
+
+            # 每周一凌晨 1 点刷新交易日历缓存（Tushare trade_cal，缓存未过期时不重复拉取）
+            try:
+                from apscheduler.triggers.cron import CronTrigger
+                from app.services.trading_calendar import refresh_trading_calendar
+
+                scheduler_service.scheduler.add_job(
+                    func=refresh_trading_calendar,
+                    trigger=CronTrigger(day_of_week="mon", hour=1, minute=0),
+                    id="trading_calendar_refresh_job",
+                    name="交易日历刷新任务",
+                    replace_existing=True,
+                )
+            except Exception as e:
+                logger.error(f"启动交易日历刷新任务失败: {str(e)}", exc_info=True)
         except Exception as e:
             logger.error(f"初始化定时任务时发生错误: {str(e)}", exc_info=True)
         
@@ -1,43 +1,35 @@
 """认证中间件。
 
 提供认证相关的依赖注入和权限验证。
+
+get_current_user / get_optional_user 使用同步会话（get_db），供同步路由以及在线程池中使用 get_db 的路由；
+get_current_user_async / get_optional_user_async 使用异步会话（get_async_db），供 async 路由。
+认证与路由处理共用同一个依赖会话（FastAPI 在一次请求内缓存依赖），每个请求只占用一个数据库连接。
 """
 
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database.connection import get_db
+from app.database.connection import get_async_db, get_db
 from app.database.models import User
 from app.utils.jwt import verify_token
 
 # HTTP Bearer Token 安全方案
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    """获取当前登录用户。
-
-    这是一个依赖注入函数，用于需要认证的路由中。
-
-    Args:
-        credentials: HTTP Bearer Token 凭证。
-        db: 数据库会话。
-
-    Returns:
-        User: 当前用户对象。
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> int:
+    """校验 Token 并取出用户 ID。
 
     Raises:
-        HTTPException: 当 Token 无效或用户不存在时抛出 401 错误。
+        HTTPException: Token 无效或缺少用户信息时抛出 401 错误。
     """
-    token = credentials.credentials
-
-    # 验证 Token
-    payload = verify_token(token)
+    payload = verify_token(credentials.credentials)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,7 +37,6 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 获取用户 ID
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(
@@ -53,28 +44,74 @@ def get_current_user(
             detail="Token 中缺少用户信息",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_id
+
+
+def _ensure_active(user: Optional[User]) -> User:
+    """检查用户存在且已激活。
 
-    # 从数据库获取用户
-    user = db.query(User).filter(User.user_id == user_id).first()
+    Raises:
+        HTTPException: 用户不存在时抛出 401 错误，账户被禁用时抛出 403 错误。
+    """
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户不存在",
             headers={"WWW-Authenticate": "Bearer"},
         )
-
-    # 检查用户是否激活
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="用户账户已被禁用",
         )
-
     return user
 
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    """获取当前登录用户。
+
+    这是一个依赖注入函数，用于需要认证的同步路由中。
+
+    Args:
+        credentials: HTTP Bearer Token 凭证。
+        db: 数据库会话。
+
+    Returns:
+        User: 当前用户对象。
+
+    Raises:
+        HTTPException: 当 Token 无效或用户不存在时抛出 401 错误。
+    """
+    user_id = _user_id_from_credentials(credentials)
+    return _ensure_active(db.execute(select(User).where(User.user_id == user_id)).scalars().first())
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """获取当前登录用户（异步版本），行为同 get_current_user，用于 async 路由。
+
+    Args:
+        credentials: HTTP Bearer Token 凭证。
+        db: 异步数据库会话。
+
+    Returns:
+        User: 当前用户对象。
+
+    Raises:
+        HTTPException: 当 Token 无效或用户不存在时抛出 401 错误。
+    """
+    user_id = _user_id_from_credentials(credentials)
+    result = await db.execute(select(User).where(User.user_id == user_id))
+    return _ensure_active(result.scalars().first())
+
+
 def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db),
 ) -> Optional[User]:
     """获取当前用户（可选）。
@@ -97,3 +134,24 @@ def get_optional_user(
     except HTTPException:
         return None
 
+
+async def get_optional_user_async(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Optional[User]:
+    """获取当前用户（可选，异步版本），行为同 get_optional_user。
+
+    Args:
+        credentials: HTTP Bearer Token 凭证（可选）。
+        db: 异步数据库会话。
+
+    Returns:
+        Optional[User]: 用户对象，如果未登录则返回 None。
+    """
+    if not credentials:
+        return None
+
+    try:
+        return await get_current_user_async(credentials, db)
+    except HTTPException:
+        return None
@@ -12,6 +12,7 @@ from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.database.models import User
 from app.middleware.auth import get_current_user
+from app.services.count_cache import USERS_NAMESPACE, get_count_cache
 from app.utils.password import hash_password
 
 router = APIRouter(prefix="/admin/users", tags=["管理 - 用户"])
@@ -91,7 +92,9 @@ def list_users(
             | (User.nickname.ilike(kw))
         )
 
-    total = query.count()
+    # 总数按关键词缓存，用户增删改时失效
+    cache = get_count_cache()
+    total = cache.get_or_compute(cache.make_key(USERS_NAMESPACE, keyword=keyword), query.count)
     users = (
         query.order_by(User.created_at.desc())
         .offset((page - 1) * page_size)
@@ -130,6 +133,7 @@ def create_user(
     )
     db.add(new_user)
     db.commit()
+    get_count_cache().invalidate(USERS_NAMESPACE)
     db.refresh(new_user)
     return serialize_user(new_user)
 
@@ -177,6 +181,7 @@ def update_user(
         user.daily_prediction_limit = payload.daily_prediction_limit
 
     db.commit()
+    get_count_cache().invalidate(USERS_NAMESPACE)
     db.refresh(user)
     return serialize_user(user)
 
@@ -194,5 +199,6 @@ def delete_user(
         raise HTTPException(status_code=400, detail="不能删除自身账户")
     db.delete(user)
     db.commit()
+    get_count_cache().invalidate(USERS_NAMESPACE)
     return {"status": "deleted"}
 
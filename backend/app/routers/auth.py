@@ -1,6 +1,6 @@
 """用户认证路由模块。
 
-处理用户注册、登录、登出等认证相关请求。
+处理用户注册、登录、登出等认证相关请求。数据库访问使用异步会话。
 """
 
 from typing import Optional
@@ -9,11 +9,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr, validator
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.connection import get_db
-from app.services.auth_service import AuthService
-from app.middleware.auth import get_current_user, security
+from app.database.connection import get_async_db
+from app.services.auth_service import AsyncAuthService
+from app.middleware.auth import get_current_user_async, security
 from app.database.models import User
 
 router = APIRouter()
@@ -112,7 +112,7 @@ class LoginRequest(BaseModel):
 
 
 @router.post("/register")
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """用户注册接口。
 
     注册成功后自动创建会话并返回 Token，用户可以直接使用。
@@ -128,11 +128,11 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
         HTTPException: 当注册失败时抛出。
     """
     try:
-        auth_service = AuthService(db)
+        auth_service = AsyncAuthService(db)
         
         # 注册新用户（包含数据验证和事务处理）
         # register_user 现在直接返回 User 对象，避免额外的数据库查询
-        user = auth_service.register_user(
+        user = await auth_service.register_user(
             phone_number=request.phone_number,
             password=request.password,
             email=request.email,
@@ -141,7 +141,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
         # 创建会话（自动登录）
         try:
-            session_data = auth_service.create_session(user)
+            session_data = await auth_service.create_session(user)
         except Exception as e:
             # 如果创建会话失败，用户已创建但无法自动登录
             # 这种情况应该很少见，但需要记录
@@ -189,7 +189,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """用户登录接口。
 
     Args:
@@ -210,10 +210,10 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
         )
 
     try:
-        auth_service = AuthService(db)
+        auth_service = AsyncAuthService(db)
         
         # 验证用户身份
-        user = auth_service.authenticate_user(
+        user = await auth_service.authenticate_user(
             phone_number=request.phone_number,
             email=request.email,
             password=request.password,
@@ -227,7 +227,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
         # 创建会话
         try:
-            session_data = auth_service.create_session(user)
+            session_data = await auth_service.create_session(user)
         except Exception as e:
             # 如果创建会话失败，记录错误但不影响登录
             print(f"[Login] 创建会话失败: {str(e)}")
@@ -265,7 +265,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 @router.post("/logout")
 async def logout(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """用户登出接口。
 
@@ -279,13 +279,13 @@ async def logout(
         JSONResponse: 登出成功响应。
     """
     try:
-        auth_service = AuthService(db)
+        auth_service = AsyncAuthService(db)
         
         # 如果有 Token，尝试使会话失效
         if credentials:
             token = credentials.credentials
             try:
-                auth_service.invalidate_session(token)
+                await auth_service.invalidate_session(token)
             except Exception:
                 # Token 无效或会话不存在，忽略错误继续执行
                 pass
@@ -302,7 +302,7 @@ async def logout(
 
 
 @router.get("/me")
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_async)):
     """获取当前用户信息。
 
     Args:
@@ -327,8 +327,8 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 @router.get("/prediction-limit")
 async def get_prediction_limit(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """获取用户的预测次数限制信息。
 
@@ -339,8 +339,8 @@ async def get_prediction_limit(
     Returns:
         dict: 预测限制信息。
     """
-    auth_service = AuthService(db)
-    limit_info = auth_service.check_prediction_limit(current_user.user_id)
+    auth_service = AsyncAuthService(db)
+    limit_info = await auth_service.check_prediction_limit(current_user.user_id)
 
     return {
         "allowed": limit_info["allowed"],
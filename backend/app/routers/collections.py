@@ -3,13 +3,15 @@
 处理收藏相关的API请求。
 """
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.database.connection import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_async_db
 from app.database.models import User
-from app.middleware.auth import get_current_user
-from app.services.collection_service import CollectionService
+from app.middleware.auth import get_current_user_async
+from app.services.collection_service import AsyncCollectionService
 
 router = APIRouter()
 
@@ -18,26 +20,35 @@ router = APIRouter()
 async def get_user_collections(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """获取用户的收藏列表。
 
     Args:
         page: 页码。
         page_size: 每页数量。
+        cursor: 游标（可选），深翻页时代替 page。
         current_user: 当前登录用户。
         db: 数据库会话。
 
     Returns:
         dict: 收藏的帖子列表。
     """
-    collection_service = CollectionService(db)
-    posts = collection_service.get_user_collections(
-        user_id=current_user.user_id,
-        page=page,
-        page_size=page_size,
-    )
+    collection_service = AsyncCollectionService(db)
+    try:
+        result = await collection_service.get_user_collections(
+            user_id=current_user.user_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标",
+        )
 
     return {
         "posts": [
@@ -50,7 +61,8 @@ async def get_user_collections(
                 "suggestion": p.suggestion,
                 "publish_time": p.publish_time.isoformat(),
             }
-            for p in posts
-        ]
+            for p in result["posts"]
+        ],
+        "next_cursor": result["next_cursor"],
     }
 
@@ -1,6 +1,9 @@
 """草稿路由模块。
 
 处理草稿相关的API请求。
+
+设计原因：DraftService 使用同步 Session，处理函数声明为普通 def，
+由 FastAPI 放到线程池执行，查询期间不阻塞事件循环。
 """
 
 from typing import Optional
@@ -39,7 +42,7 @@ class DraftUpdateRequest(BaseModel):
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-async def create_draft(
+def create_draft(
     request: DraftCreateRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -73,7 +76,7 @@ async def create_draft(
 
 
 @router.get("")
-async def get_user_drafts(
+def get_user_drafts(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -103,7 +106,7 @@ async def get_user_drafts(
 
 
 @router.get("/{draft_id}")
-async def get_draft(
+def get_draft(
     draft_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -140,7 +143,7 @@ async def get_draft(
 
 
 @router.put("/{draft_id}")
-async def update_draft(
+def update_draft(
     draft_id: int,
     request: DraftUpdateRequest,
     current_user: User = Depends(get_current_user),
@@ -183,7 +186,7 @@ async def update_draft(
 
 
 @router.delete("/{draft_id}")
-async def delete_draft(
+def delete_draft(
     draft_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -3,16 +3,19 @@
 提供期货合约同步相关的 API 接口。
 
 设计原因：FuturesSyncService 会同步调用 akshare 等网络 IO，在 async 路由中会阻塞事件循环。
-故在独立线程中执行，并在线程内新建数据库会话。
+故在线程池中执行，使用认证依赖取得的同一个请求会话（get_db）：依赖与工作线程先后使用、不并发，
+每个请求只占用一个数据库连接。
 """
 
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
-from app.database.connection import SessionLocal
+from app.database.connection import get_db
 from app.database.models import User
 from app.middleware.auth import get_current_user
+from app.services.contract_expiry_service import ContractExpiryService, get_expiry_stats
 from app.services.futures_sync_service import FuturesSyncService
 
 router = APIRouter()
@@ -20,31 +23,29 @@ logger = logging.getLogger(__name__)
 
 
 def _sync_futures_sync(
+    db: Session,
     author_id: int,
     update_existing: bool,
     include_continuous: bool,
 ) -> dict:
     """在线程内执行合约同步。"""
-    db = SessionLocal()
-    try:
-        return FuturesSyncService(db).sync_futures_to_posts(
-            author_id=author_id,
-            update_existing=update_existing,
-            include_continuous=include_continuous,
-        )
-    finally:
-        db.close()
+    return FuturesSyncService(db).sync_futures_to_posts(
+        author_id=author_id,
+        update_existing=update_existing,
+        include_continuous=include_continuous,
+    )
+
+
+def _cleanup_expired_sync(db: Session, dry_run: bool) -> dict:
+    """在线程内执行合约到期清理。"""
+    return ContractExpiryService(db).cleanup_expired_contracts(dry_run=dry_run)
 
 
-def _get_contracts_sync(include_continuous: bool) -> list:
+def _get_contracts_sync(db: Session, include_continuous: bool) -> list:
     """在线程内拉取合约列表。"""
-    db = SessionLocal()
-    try:
-        return FuturesSyncService(db).get_all_futures_contracts(
-            include_continuous=include_continuous,
-        )
-    finally:
-        db.close()
+    return FuturesSyncService(db).get_all_futures_contracts(
+        include_continuous=include_continuous,
+    )
 
 
 @router.post("/sync", status_code=status.HTTP_200_OK)
@@ -52,6 +53,7 @@ async def sync_futures_contracts(
     update_existing: bool = Query(False, description="是否更新已存在的帖子"),
     include_continuous: bool = Query(False, description="是否包含加权连续合约"),
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """同步期货合约到帖子。
 
@@ -62,6 +64,7 @@ async def sync_futures_contracts(
         update_existing: 是否更新已存在的帖子（默认 False，只创建新帖子）。
         include_continuous: 是否包含加权连续合约（默认 False，只同步主力合约）。
         current_user: 当前登录用户。
+        db: 数据库会话。
 
     Returns:
         dict: 同步结果统计信息。
@@ -78,6 +81,7 @@ async def sync_futures_contracts(
 
     result = await run_in_threadpool(
         _sync_futures_sync,
+        db,
         current_user.user_id,
         update_existing,
         include_continuous,
@@ -96,6 +100,7 @@ async def sync_futures_contracts(
         "updated": result["updated"],
         "skipped": result["skipped"],
         "failed": result["failed"],
+        "sources": result.get("sources", {}),
     }
 
 
@@ -103,6 +108,7 @@ async def sync_futures_contracts(
 async def get_futures_contracts(
     include_continuous: bool = Query(False, description="是否包含加权连续合约"),
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """获取所有可用的期货合约列表（不创建帖子）。
 
@@ -111,6 +117,7 @@ async def get_futures_contracts(
     Args:
         include_continuous: 是否包含加权连续合约（默认 False，只返回主力合约）。
         current_user: 当前登录用户。
+        db: 数据库会话。
 
     Returns:
         dict: 期货合约列表。
@@ -127,6 +134,7 @@ async def get_futures_contracts(
 
     contracts = await run_in_threadpool(
         _get_contracts_sync,
+        db,
         include_continuous,
     )
 
@@ -136,3 +144,43 @@ async def get_futures_contracts(
         "contracts": contracts,
     }
 
+
+@router.post("/expiry-cleanup", status_code=status.HTTP_200_OK)
+async def cleanup_expired_contracts(
+    dry_run: bool = Query(True, description="只预览将被下架的帖子，不修改数据"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """按 futures_contracts.expiry_date 下架已到期合约的帖子（与每日 3 点的定时任务相同）。
+
+    只有管理员（user_role >= 3）可以调用此接口。
+
+    Args:
+        dry_run: 是否只预览（默认 True）；预览时返回 expired 清单，所有改动回滚。
+        current_user: 当前登录用户。
+        db: 数据库会话。
+
+    Returns:
+        dict: 本次清理结果，以及 stats（进程内累计的运行次数、下架帖子数与最近一次运行的计数）。
+
+    Raises:
+        HTTPException: 如果用户不是管理员则返回 403 错误。
+    """
+    if current_user.user_role < 3:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以清理到期合约",
+        )
+
+    result = await run_in_threadpool(_cleanup_expired_sync, db, dry_run)
+    if "error" in result:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"到期清理失败: {result['error']}",
+        )
+
+    return {
+        "message": "到期合约预览完成" if dry_run else "到期合约清理完成",
+        **result,
+        "stats": get_expiry_stats(),
+    }
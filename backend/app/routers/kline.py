@@ -3,14 +3,18 @@
 提供获取期货合约历史 K 线数据的 API 接口。
 数据来自 Tushare 或本地 JSON（MARKET_DATA_SOURCE）。
 
-设计原因：读文件与 pandas 处理为同步阻塞，用 run_in_threadpool 避免阻塞事件循环。
+设计原因：
+1. 读文件与 pandas 处理为同步阻塞，用 run_in_threadpool 避免阻塞事件循环。
+2. 响应经 KlineResponseCache 缓存并带强 ETag；前端轮询带 If-None-Match 时命中即返回 304，
+   不再重复查库、拉行情与序列化。
 """
 
 import logging
 from typing import Optional
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, Header, Response, status, Query
 from starlette.concurrency import run_in_threadpool
 
+from app.services.kline_cache import KlineResponseCache, etag_matches, get_kline_cache
 from app.services.kline_service import KlineService
 
 router = APIRouter()
@@ -23,6 +27,7 @@ async def get_kline_data(
     period: int = Query(365, ge=1, le=3650, description="获取最近多少天的数据，默认 365 天"),
     start_date: Optional[str] = Query(None, description="开始日期，格式 YYYYMMDD"),
     end_date: Optional[str] = Query(None, description="结束日期，格式 YYYYMMDD"),
+    if_none_match: Optional[str] = Header(None),
 ):
     """获取指定合约的历史 K 线数据。
 
@@ -33,32 +38,44 @@ async def get_kline_data(
         period: 获取最近多少天的数据（当未指定日期范围时使用）。
         start_date: 开始日期，格式 "YYYYMMDD"。
         end_date: 结束日期，格式 "YYYYMMDD"。
+        if_none_match: 客户端缓存的 ETag；与当前一致时返回 304。
     Returns:
-        dict: 包含 K 线数据的字典。
+        Response: K 线数据 JSON（带 ETag），或 304 空响应。
     """
-    kline_service = KlineService()
+    cache = get_kline_cache()
+    key = KlineResponseCache.make_key(contract_code, period, start_date, end_date)
 
-    try:
-        # 阻塞 IO 与 pandas 处理放到线程池，避免阻塞事件循环
-        result = await run_in_threadpool(
-            kline_service.get_futures_kline_for_chart,
-            contract_code,
-            period,
+    def build():
+        return KlineService().get_futures_kline_for_chart(
+            contract_code, period, start_date=start_date, end_date=end_date
         )
-        logger.info(
-            "[K线API] contract=%s period=%s count=%s",
-            contract_code,
-            period,
-            result.get("count"),
-        )
-        
-        if result["count"] == 0:
+
+    try:
+        # 阻塞 IO 与 pandas 处理放到线程池，避免阻塞事件循环；命中缓存时只做一次字典查找
+        entry = cache.get_local(key)
+        if entry is None:
+            entry = await run_in_threadpool(
+                cache.get_or_build, key, build, lambda result: result.get("count", 0) > 0
+            )
+        if entry is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"未找到合约 {contract_code} 的 K 线数据（Tushare 无数据或未在 JSON 的 klines 配置）",
             )
-        
-        return result
+
+        # no-cache：允许浏览器缓存但每次都带 If-None-Match 回源校验
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, entry.etag):
+            logger.debug("[K线API] contract=%s period=%s 304", contract_code, period)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        logger.info(
+            "[K线API] contract=%s period=%s bytes=%s",
+            contract_code,
+            period,
+            len(entry.body),
+        )
+        return Response(content=entry.body, media_type="application/json", headers=headers)
         
     except HTTPException:
         raise
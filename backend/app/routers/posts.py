@@ -1,19 +1,21 @@
 """帖子路由模块。
 
-处理帖子相关的API请求。
+处理帖子相关的API请求。数据库访问使用异步会话，查询期间不阻塞事件循环。
 """
 
 from typing import Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.connection import get_db
+from app.database.connection import get_async_db
 from app.database.models import User
-from app.middleware.auth import get_current_user, get_optional_user
-from app.services.post_service import PostService
-from app.services.browse_history_service import BrowseHistoryService
-from app.services.collection_service import CollectionService
+from app.middleware.auth import get_current_user_async, get_optional_user_async
+from app.services.post_service import AsyncPostService
+from app.services.browse_history_service import AsyncBrowseHistoryService
+from app.services.collection_service import AsyncCollectionService
+from app.services.search_index import get_symbol_index_async
+from app.utils.futures_naming import format_post_title
 
 router = APIRouter()
 
@@ -53,8 +55,8 @@ class PostUpdateRequest(BaseModel):
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_post(
     request: PostCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """创建新帖子。
 
@@ -69,7 +71,7 @@ async def create_post(
         dict: 创建的帖子信息。
 
     Raises:
-        HTTPException: 如果用户不是管理员则返回 403 错误。
+        HTTPException: 如果用户不是管理员则返回 403 错误；该合约已有已发布的帖子时返回 409。
     """
     # 权限检查：只有管理员可以发布帖子
     if current_user.user_role < 3:
@@ -78,21 +80,25 @@ async def create_post(
             detail="只有管理员可以发布帖子",
         )
     
-    post_service = PostService(db)
-    post = post_service.create_post(
-        author_id=current_user.user_id,
-        title=request.title,
-        contract_code=request.contract_code,
-        stop_loss=request.stop_loss,
-        content=request.content,
-        take_profit=request.take_profit,
-        strike_price=request.strike_price,
-        current_price=request.current_price,
-        direction=request.direction or 'buy',
-        suggestion=request.suggestion,
-        k_line_image=request.k_line_image,
-        sector_id=request.sector_id,
-    )
+    post_service = AsyncPostService(db)
+    try:
+        post = await post_service.create_post(
+            author_id=current_user.user_id,
+            title=request.title,
+            contract_code=request.contract_code,
+            stop_loss=request.stop_loss,
+            content=request.content,
+            take_profit=request.take_profit,
+            strike_price=request.strike_price,
+            current_price=request.current_price,
+            direction=request.direction or 'buy',
+            suggestion=request.suggestion,
+            k_line_image=request.k_line_image,
+            sector_id=request.sector_id,
+        )
+    except ValueError as e:
+        # 同一合约已有已发布的帖子
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
     return {
         "post_id": post.post_id,
@@ -109,8 +115,11 @@ async def get_posts(
     sector_id: Optional[int] = Query(None),
     author_id: Optional[Union[int, str]] = Query(None),
     search: Optional[str] = Query(None, description="搜索关键词，用于搜索合约代码或标题"),
-    current_user: Optional[User] = Depends(get_optional_user),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    include_total: bool = Query(True, description="是否返回总数；无限滚动可传 false 省去 COUNT"),
+    approximate_total: bool = Query(False, description="为 true 时返回数据库估算的总数（不精确，但不扫描数据）"),
+    current_user: Optional[User] = Depends(get_optional_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """获取帖子列表。
 
@@ -120,6 +129,9 @@ async def get_posts(
         sector_id: 板块ID筛选。
         author_id: 作者ID筛选。如果传入 'current' 字符串，则筛选当前用户的帖子。
         search: 搜索关键词，用于搜索合约代码或标题。
+        cursor: 游标（可选），深翻页时代替 page，翻页代价与第一页相同。
+        include_total: 是否统计总数；为 false 时 total/total_pages 为 null。
+        approximate_total: 是否接受估算总数；实际返回估算值时 total_estimated 为 true。
         current_user: 当前登录用户（可选，用于author_id='current'的情况）。
         db: 数据库会话。
 
@@ -144,14 +156,23 @@ async def get_posts(
     elif author_id is not None:
         actual_author_id = author_id
 
-    post_service = PostService(db)
-    result = post_service.get_posts(
-        page=page,
-        page_size=page_size,
-        sector_id=sector_id,
-        author_id=actual_author_id,
-        search=search,
-    )
+    post_service = AsyncPostService(db)
+    try:
+        result = await post_service.get_posts(
+            page=page,
+            page_size=page_size,
+            sector_id=sector_id,
+            author_id=actual_author_id,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+            approximate_total=approximate_total,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标",
+        )
 
     return {
         "posts": [
@@ -166,7 +187,7 @@ async def get_posts(
                 "direction": p.direction or 'buy',
                 "suggestion": p.suggestion,
                 "author_id": p.author_id,
-                "author_nickname": p.author.nickname if p.author else None,
+                "author_nickname": p.author_nickname,
                 "collect_count": p.collect_count,
                 "publish_time": p.publish_time.isoformat(),
             }
@@ -176,14 +197,43 @@ async def get_posts(
         "page": result["page"],
         "page_size": result["page_size"],
         "total_pages": result["total_pages"],
+        "total_estimated": result["total_estimated"],
+        "next_cursor": result["next_cursor"],
+    }
+
+
+@router.get("/suggest")
+async def suggest_contracts(
+    q: str = Query(..., min_length=1, max_length=20, description="输入前缀：合约代码、品类中文名或拼音"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """搜索框输入联想。
+
+    由进程内排序索引按前缀匹配已发布帖子的合约代码，不对帖子表做模糊查询。
+
+    Args:
+        q: 输入前缀，如 cu、铜、tong。
+        limit: 最多返回条数。
+        db: 数据库会话（仅在索引过期时用于重建）。
+
+    Returns:
+        dict: 联想结果，每项含合约代码与三段式名称。
+    """
+    index = await get_symbol_index_async(db)
+    return {
+        "suggestions": [
+            {"contract_code": code, "label": format_post_title(code)}
+            for code in index.suggest(q, limit)
+        ]
     }
 
 
 @router.get("/{post_id}")
 async def get_post_detail(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """获取帖子详情。
 
@@ -195,8 +245,8 @@ async def get_post_detail(
     Returns:
         dict: 帖子详细信息。
     """
-    post_service = PostService(db)
-    post = post_service.get_post_by_id(post_id)
+    post_service = AsyncPostService(db)
+    post = await post_service.get_post_by_id(post_id)
 
     if not post:
         raise HTTPException(
@@ -205,12 +255,12 @@ async def get_post_detail(
         )
 
     # 记录浏览历史
-    browse_service = BrowseHistoryService(db)
-    browse_service.record_browse(current_user.user_id, post_id)
+    browse_service = AsyncBrowseHistoryService(db)
+    await browse_service.record_browse(current_user.user_id, post_id)
 
     # 检查是否已收藏
-    collection_service = CollectionService(db)
-    is_collected = collection_service.is_collected(current_user.user_id, post_id)
+    collection_service = AsyncCollectionService(db)
+    is_collected = await collection_service.is_collected(current_user.user_id, post_id)
 
     return {
         "post_id": post.post_id,
@@ -236,8 +286,8 @@ async def get_post_detail(
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """删除帖子（软删除）。
 
@@ -249,8 +299,8 @@ async def delete_post(
     Returns:
         dict: 操作结果。
     """
-    post_service = PostService(db)
-    success = post_service.delete_post(post_id, current_user.user_id)
+    post_service = AsyncPostService(db)
+    success = await post_service.delete_post(post_id, current_user.user_id)
 
     if not success:
         raise HTTPException(
@@ -265,8 +315,8 @@ async def delete_post(
 async def update_post(
     post_id: int,
     request: PostUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """更新帖子。
 
@@ -278,22 +328,26 @@ async def update_post(
             detail="只有管理员可以编辑帖子",
         )
 
-    post_service = PostService(db)
-    updated = post_service.update_post(
-        post_id=post_id,
-        user_id=current_user.user_id,
-        title=request.title,
-        contract_code=request.contract_code,
-        stop_loss=request.stop_loss,
-        take_profit=request.take_profit,
-        strike_price=request.strike_price,
-        current_price=request.current_price,
-        direction=request.direction,
-        suggestion=request.suggestion,
-        content=request.content,
-        k_line_image=request.k_line_image,
-        sector_id=request.sector_id,
-    )
+    post_service = AsyncPostService(db)
+    try:
+        updated = await post_service.update_post(
+            post_id=post_id,
+            user_id=current_user.user_id,
+            title=request.title,
+            contract_code=request.contract_code,
+            stop_loss=request.stop_loss,
+            take_profit=request.take_profit,
+            strike_price=request.strike_price,
+            current_price=request.current_price,
+            direction=request.direction,
+            suggestion=request.suggestion,
+            content=request.content,
+            k_line_image=request.k_line_image,
+            sector_id=request.sector_id,
+        )
+    except ValueError as e:
+        # 改成的合约已有已发布的帖子
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
     if not updated:
         raise HTTPException(
@@ -318,8 +372,8 @@ async def update_post(
 @router.post("/{post_id}/collect")
 async def collect_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """收藏帖子。
 
@@ -331,8 +385,8 @@ async def collect_post(
     Returns:
         dict: 操作结果。
     """
-    post_service = PostService(db)
-    post = post_service.get_post_by_id(post_id)
+    post_service = AsyncPostService(db)
+    post = await post_service.get_post_by_id(post_id)
 
     if not post:
         raise HTTPException(
@@ -340,16 +394,16 @@ async def collect_post(
             detail="帖子不存在",
         )
 
-    collection_service = CollectionService(db)
-    collection = collection_service.add_collection(current_user.user_id, post_id)
+    collection_service = AsyncCollectionService(db)
+    collection = await collection_service.add_collection(current_user.user_id, post_id)
 
     if collection:
-        post_service.increment_collect_count(post_id)
+        await post_service.increment_collect_count(post_id)
         return {"message": "收藏成功", "collected": True}
     else:
         # 取消收藏
-        if collection_service.remove_collection(current_user.user_id, post_id):
-            post_service.decrement_collect_count(post_id)
+        if await collection_service.remove_collection(current_user.user_id, post_id):
+            await post_service.decrement_collect_count(post_id)
             return {"message": "取消收藏成功", "collected": False}
         return {"message": "操作失败", "collected": False}
 
@@ -3,16 +3,23 @@
 提供价格更新相关的 API 接口。
 
 设计原因：PriceUpdateService 内部会同步读 JSON/数据库，若在 async 路由中直接执行会阻塞事件循环，
-导致其它 API 超时。故在独立线程中执行，并在该线程内新建数据库会话（Session 非线程安全）。
+导致其它 API 超时。故在线程池中执行，使用认证依赖取得的同一个请求会话（get_db）：
+依赖与工作线程先后使用、不并发（Session 非线程安全），每个请求只占用一个数据库连接。
 """
 
 import logging
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
-from app.database.connection import SessionLocal
+from app.database.connection import get_db
 from app.database.models import User
 from app.middleware.auth import get_current_user
+from app.services.market_backend import get_backend_registry
+from app.services.negative_cache import get_negative_cache
+from app.services.price_events import get_last_prices_changed
 from app.services.price_update_service import PriceUpdateService
 from app.services.scheduler_service import scheduler_service
 
@@ -20,36 +27,37 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def _update_all_posts_price_sync() -> dict:
-    """在线程内执行批量更新现价（独立 DB 会话）。"""
-    db = SessionLocal()
-    try:
-        return PriceUpdateService(db).update_all_posts_price()
-    finally:
-        db.close()
+def _last_price_change() -> Optional[dict]:
+    """最近一次价格变化事件的摘要（进程启动后尚无变化时为 None）。"""
+    event = get_last_prices_changed()
+    if event is None:
+        return None
+    return {
+        "occurred_at": event.occurred_at.isoformat(),
+        "changed_contracts": len(event.changes),
+        "updated_posts": event.updated_posts,
+    }
+
+
+def _update_all_posts_price_sync(db: Session) -> dict:
+    """在线程内执行批量更新现价。"""
+    return PriceUpdateService(db).update_all_posts_price()
 
 
-def _update_by_contract_sync(contract_code: str) -> dict:
+def _update_by_contract_sync(db: Session, contract_code: str) -> dict:
     """在线程内按合约更新现价。"""
-    db = SessionLocal()
-    try:
-        return PriceUpdateService(db).update_posts_by_contract_code(contract_code)
-    finally:
-        db.close()
+    return PriceUpdateService(db).update_posts_by_contract_code(contract_code)
 
 
-def _update_single_post_sync(post_id: int) -> bool:
+def _update_single_post_sync(db: Session, post_id: int) -> bool:
     """在线程内更新单帖现价。"""
-    db = SessionLocal()
-    try:
-        return PriceUpdateService(db).update_post_price(post_id)
-    finally:
-        db.close()
+    return PriceUpdateService(db).update_post_price(post_id)
 
 
 @router.post("/update-all", status_code=status.HTTP_200_OK)
 async def update_all_posts_price(
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """批量更新所有帖子的现价。
 
@@ -57,6 +65,7 @@ async def update_all_posts_price(
 
     Args:
         current_user: 当前登录用户。
+        db: 数据库会话。
 
     Returns:
         dict: 更新结果统计信息。
@@ -71,7 +80,7 @@ async def update_all_posts_price(
             detail="只有管理员可以更新价格",
         )
 
-    result = await run_in_threadpool(_update_all_posts_price_sync)
+    result = await run_in_threadpool(_update_all_posts_price_sync, db)
     logger.info(
         "[价格更新API] update-all total=%s success=%s failed=%s",
         result.get("total"),
@@ -91,6 +100,7 @@ async def update_all_posts_price(
 async def update_posts_by_contract(
     contract_code: str = Query(..., description="合约代码，如 IF2312"),
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """按合约代码更新所有相关帖子的现价。
 
@@ -99,6 +109,7 @@ async def update_posts_by_contract(
     Args:
         contract_code: 合约代码。
         current_user: 当前登录用户。
+        db: 数据库会话。
 
     Returns:
         dict: 更新结果统计信息。
@@ -113,7 +124,7 @@ async def update_posts_by_contract(
             detail="只有管理员可以更新价格",
         )
 
-    result = await run_in_threadpool(_update_by_contract_sync, contract_code)
+    result = await run_in_threadpool(_update_by_contract_sync, db, contract_code)
 
     return {
         "message": f"合约 {contract_code} 的价格更新完成",
@@ -128,6 +139,7 @@ async def update_posts_by_contract(
 async def update_single_post_price(
     post_id: int,
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """更新单个帖子的现价。
 
@@ -136,6 +148,7 @@ async def update_single_post_price(
     Args:
         post_id: 帖子ID。
         current_user: 当前登录用户。
+        db: 数据库会话。
 
     Returns:
         dict: 更新结果。
@@ -150,7 +163,7 @@ async def update_single_post_price(
             detail="只有管理员可以更新价格",
         )
 
-    success = await run_in_threadpool(_update_single_post_sync, post_id)
+    success = await run_in_threadpool(_update_single_post_sync, db, post_id)
 
     if not success:
         raise HTTPException(
@@ -176,7 +189,9 @@ async def get_price_update_status(
         current_user: 当前登录用户。
 
     Returns:
-        dict: 定时任务状态信息。
+        dict: 定时任务状态信息，schedule 字段为按交易日历推算的接下来执行计划，
+            market_backend 字段为行情后端的当前数据源、健康状态与调用指标，
+            last_price_change 字段为最近一次价格变化（时间、变化合约数、写入帖子数）。
     """
     # 权限检查：只有管理员可以查看状态
     if current_user.user_role < 3:
@@ -200,10 +215,46 @@ async def get_price_update_status(
             "name": price_job.name,
             "next_run_time": price_job.next_run_time.isoformat() if price_job.next_run_time else None,
             "trigger": str(price_job.trigger),
+            # 调度模式、当前交易阶段（day/night/closed）与接下来的执行时间
+            "schedule": scheduler_service.get_price_update_schedule(price_job.id),
+            "market_backend": get_backend_registry().status(),
+            "last_price_change": _last_price_change(),
         }
     else:
         return {
             "status": "not_found",
             "message": "价格更新定时任务未找到",
+            "market_backend": get_backend_registry().status(),
+            "last_price_change": _last_price_change(),
         }
 
+
+@router.get("/no-data-contracts", status_code=status.HTTP_200_OK)
+async def get_no_data_contracts(
+    min_misses: int = Query(1, ge=1, description="只列出连续无数据至少这么多次的合约"),
+    current_user: User = Depends(get_current_user),
+):
+    """列出近期确认没有行情数据的合约（负结果缓存），便于清理无效合约与帖子。
+
+    只有管理员（user_role >= 3）可以调用此接口。
+
+    Args:
+        min_misses: 连续无数据次数下限。
+        current_user: 当前登录用户。
+
+    Returns:
+        dict: total、items（按连续无数据次数降序）与缓存命中统计 stats。
+    """
+    if current_user.user_role < 3:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以查看无行情合约报告",
+        )
+
+    cache = get_negative_cache()
+    items = cache.report(min_misses=min_misses)
+    return {
+        "total": len(items),
+        "items": items,
+        "stats": dict(cache.stats),
+    }
@@ -1,104 +1,95 @@
 """浏览历史服务。
 
-负责记录和查询用户浏览帖子的历史。
+负责记录和查询用户浏览帖子的历史。浏览历史相关路由都是 async 路由，
+只提供基于 AsyncSession 的 AsyncBrowseHistoryService。
 """
 
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, select, tuple_
 
 from app.database.models import BrowseHistory, Post
+from app.utils.pagination import decode_cursor, encode_cursor
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-class BrowseHistoryService:
-    """浏览历史服务类。
 
-    提供浏览历史的记录和查询功能。
+class AsyncBrowseHistoryService:
+    """浏览历史服务（异步版本）。
+
+    提供浏览历史的记录和查询功能，用于 async 路由。
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: "AsyncSession"):
         """初始化浏览历史服务。
 
         Args:
-            db: 数据库会话。
+            db: 异步数据库会话。
         """
         self.db = db
 
-    def record_browse(self, user_id: int, post_id: int) -> BrowseHistory:
-        """记录浏览历史。
-
-        如果用户已浏览过该帖子，则更新浏览时间；否则创建新记录。
-
-        Args:
-            user_id: 用户ID。
-            post_id: 帖子ID。
-
-        Returns:
-            BrowseHistory: 浏览历史对象。
-        """
-        # 检查是否已有记录
-        history = (
-            self.db.query(BrowseHistory)
-            .filter(
+    async def record_browse(self, user_id: int, post_id: int) -> BrowseHistory:
+        """记录浏览历史：已有记录则更新浏览时间，否则新建。"""
+        result = await self.db.execute(
+            select(BrowseHistory)
+            .where(
                 BrowseHistory.user_id == user_id,
                 BrowseHistory.post_id == post_id,
             )
-            .first()
+            .limit(1)
         )
+        history = result.scalars().first()
 
         if history:
-            # 更新浏览时间
             history.browse_time = datetime.utcnow()
         else:
-            # 创建新记录
-            history = BrowseHistory(
-                user_id=user_id,
-                post_id=post_id,
-            )
+            history = BrowseHistory(user_id=user_id, post_id=post_id)
             self.db.add(history)
 
-        self.db.commit()
-        self.db.refresh(history)
-
+        await self.db.commit()
+        await self.db.refresh(history)
         return history
 
-    def get_user_browse_history(
+    async def get_user_browse_history(
         self,
         user_id: int,
         page: int = 1,
         page_size: int = 20,
-    ) -> List[Post]:
-        """获取用户的浏览历史。
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """获取用户的浏览历史（已发布帖子，按浏览时间倒序）。
 
         Args:
             user_id: 用户ID。
-            page: 页码，从1开始。
+            page: 页码，从1开始（传 cursor 时忽略）。
             page_size: 每页数量。
+            cursor: 上一页返回的 next_cursor，传入时按 (browse_time, history_id) 游标定位。
 
         Returns:
-            List[Post]: 浏览过的帖子列表，按浏览时间倒序排列。
-        """
-        histories = (
-            self.db.query(BrowseHistory)
-            .filter(BrowseHistory.user_id == user_id)
-            .order_by(desc(BrowseHistory.browse_time))
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
-        )
+            dict: posts 为 Post 列表，next_cursor 为 None 表示没有下一页。
 
-        # 提取帖子ID列表
-        post_ids = [h.post_id for h in histories]
-
-        # 查询对应的帖子
-        posts = (
-            self.db.query(Post)
-            .filter(Post.post_id.in_(post_ids), Post.status == 1)
-            .all()
+        Raises:
+            ValueError: 游标无效。
+        """
+        stmt = (
+            select(Post, BrowseHistory.browse_time, BrowseHistory.history_id)
+            .join(BrowseHistory, BrowseHistory.post_id == Post.post_id)
+            .where(BrowseHistory.user_id == user_id, Post.status == 1)
+            .order_by(desc(BrowseHistory.browse_time), desc(BrowseHistory.history_id))
         )
-
-        # 按浏览时间排序
-        post_dict = {p.post_id: p for p in posts}
-        return [post_dict[pid] for pid in post_ids if pid in post_dict]
-
+        if cursor:
+            browse_time, history_id = decode_cursor("browse_history", cursor, (datetime, int))
+            stmt = stmt.where(
+                tuple_(BrowseHistory.browse_time, BrowseHistory.history_id) < tuple_(browse_time, history_id)
+            )
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        rows = (await self.db.execute(stmt.limit(page_size + 1))).all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            _, browse_time, history_id = rows[-1]
+            next_cursor = encode_cursor("browse_history", (browse_time, history_id))
+        return {"posts": [row[0] for row in rows], "next_cursor": next_cursor}
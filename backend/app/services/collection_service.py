@@ -1,134 +1,106 @@
 """收藏服务。
 
-负责用户收藏帖子的业务逻辑。
+负责用户收藏帖子的业务逻辑。收藏相关路由都是 async 路由，只提供基于 AsyncSession 的 AsyncCollectionService。
 """
 
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from datetime import datetime
+from sqlalchemy import desc, select, delete, exists, tuple_
 
 from app.database.models import Collection, Post
+from app.utils.pagination import decode_cursor, encode_cursor
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-class CollectionService:
-    """收藏服务类。
 
-    提供收藏的增删查功能。
+class AsyncCollectionService:
+    """收藏服务（异步版本）。
+
+    提供收藏的增删查功能，用于 async 路由。
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: "AsyncSession"):
         """初始化收藏服务。
 
         Args:
-            db: 数据库会话。
+            db: 异步数据库会话。
         """
         self.db = db
 
-    def add_collection(self, user_id: int, post_id: int) -> Optional[Collection]:
-        """添加收藏。
-
-        Args:
-            user_id: 用户ID。
-            post_id: 帖子ID。
-
-        Returns:
-            Optional[Collection]: 收藏对象，如果已存在则返回None。
-        """
-        # 检查是否已收藏
-        existing = self.db.query(Collection).filter(
-            Collection.user_id == user_id,
-            Collection.post_id == post_id,
-        ).first()
-
-        if existing:
+    async def add_collection(self, user_id: int, post_id: int) -> Optional[Collection]:
+        """添加收藏；已收藏时返回 None。"""
+        if await self.is_collected(user_id, post_id):
             return None  # 已收藏，不重复添加
 
-        collection = Collection(
-            user_id=user_id,
-            post_id=post_id,
-        )
-
+        collection = Collection(user_id=user_id, post_id=post_id)
         self.db.add(collection)
-        self.db.commit()
-        self.db.refresh(collection)
-
+        await self.db.commit()
+        await self.db.refresh(collection)
         return collection
 
-    def remove_collection(self, user_id: int, post_id: int) -> bool:
-        """取消收藏。
-
-        Args:
-            user_id: 用户ID。
-            post_id: 帖子ID。
-
-        Returns:
-            bool: 如果成功取消收藏返回True。
-        """
-        collection = self.db.query(Collection).filter(
-            Collection.user_id == user_id,
-            Collection.post_id == post_id,
-        ).first()
-
-        if not collection:
-            return False
-
-        self.db.delete(collection)
-        self.db.commit()
-        return True
-
-    def is_collected(self, user_id: int, post_id: int) -> bool:
-        """检查用户是否已收藏该帖子。
-
-        Args:
-            user_id: 用户ID。
-            post_id: 帖子ID。
-
-        Returns:
-            bool: 如果已收藏返回True。
-        """
-        collection = self.db.query(Collection).filter(
-            Collection.user_id == user_id,
-            Collection.post_id == post_id,
-        ).first()
-
-        return collection is not None
+    async def remove_collection(self, user_id: int, post_id: int) -> bool:
+        """取消收藏；不存在时返回 False。"""
+        result = await self.db.execute(
+            delete(Collection).where(
+                Collection.user_id == user_id,
+                Collection.post_id == post_id,
+            )
+        )
+        await self.db.commit()
+        return (result.rowcount or 0) > 0
+
+    async def is_collected(self, user_id: int, post_id: int) -> bool:
+        """检查用户是否已收藏该帖子。"""
+        result = await self.db.execute(
+            select(
+                exists().where(
+                    Collection.user_id == user_id,
+                    Collection.post_id == post_id,
+                )
+            )
+        )
+        return bool(result.scalar())
 
-    def get_user_collections(
+    async def get_user_collections(
         self,
         user_id: int,
         page: int = 1,
         page_size: int = 20,
-    ) -> List[Post]:
-        """获取用户的收藏列表。
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """获取用户的收藏列表（已发布帖子，按收藏时间倒序）。
 
         Args:
             user_id: 用户ID。
-            page: 页码，从1开始。
+            page: 页码，从1开始（传 cursor 时忽略）。
             page_size: 每页数量。
+            cursor: 上一页返回的 next_cursor，传入时按 (created_at, collection_id) 游标定位。
 
         Returns:
-            List[Post]: 收藏的帖子列表，按收藏时间倒序排列。
-        """
-        collections = (
-            self.db.query(Collection)
-            .filter(Collection.user_id == user_id)
-            .order_by(desc(Collection.created_at))
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
-        )
+            dict: posts 为 Post 列表，next_cursor 为 None 表示没有下一页。
 
-        # 提取帖子ID列表
-        post_ids = [c.post_id for c in collections]
-
-        # 查询对应的帖子
-        posts = (
-            self.db.query(Post)
-            .filter(Post.post_id.in_(post_ids), Post.status == 1)
-            .all()
+        Raises:
+            ValueError: 游标无效。
+        """
+        stmt = (
+            select(Post, Collection.created_at, Collection.collection_id)
+            .join(Collection, Collection.post_id == Post.post_id)
+            .where(Collection.user_id == user_id, Post.status == 1)
+            .order_by(desc(Collection.created_at), desc(Collection.collection_id))
         )
-
-        # 按收藏时间排序
-        post_dict = {p.post_id: p for p in posts}
-        return [post_dict[pid] for pid in post_ids if pid in post_dict]
-
+        if cursor:
+            created_at, collection_id = decode_cursor("collections", cursor, (datetime, int))
+            stmt = stmt.where(
+                tuple_(Collection.created_at, Collection.collection_id) < tuple_(created_at, collection_id)
+            )
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        rows = (await self.db.execute(stmt.limit(page_size + 1))).all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            _, created_at, collection_id = rows[-1]
+            next_cursor = encode_cursor("collections", (created_at, collection_id))
+        return {"posts": [row[0] for row in rows], "next_cursor": next_cursor}
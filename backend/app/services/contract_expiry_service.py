@@ -1,19 +1,63 @@
 """期货合约到期汰换服务。
 
 负责检查已到期的期货合约，并自动软删除对应的帖子。
+
+设计原因：
+1. 原实现把所有已发布帖子加载到内存，逐个用 FuturesSyncService.is_contract_active 解析合约代码、
+   推算到期日；而构造 FuturesSyncService 还会连带构造 PostService、PriceUpdateService（即行情后端）。
+2. 到期日现在存放在 futures_contracts.expiry_date（Tushare 同步取退市日/最后交割日，
+   akshare 同步在登记合约时按代码算一次），清理只需一条
+   UPDATE posts SET status = 0 FROM futures_contracts WHERE expiry_date < 今天，由数据库按集合完成。
+3. 清理前先补齐两类缺口：futures_contracts 中 expiry_date 为空的合约按代码补算；帖子有而
+   futures_contracts 没有的合约登记进去（is_active=False，不进入日线入库）。两者通常为空，
+   只在首次运行或有手工发帖时才有数据。
+4. dry_run 走同样的语句后回滚，返回将被下架的帖子清单；每次运行的计数累计在进程级统计中
+   （get_expiry_stats），供定时任务日志与管理接口查看。
 """
 
 import logging
-from typing import Dict
-from datetime import datetime, timezone, date
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import and_, func, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
-from app.database.models import Post
-from app.services.futures_sync_service import FuturesSyncService
+from app.database.models import FuturesContract, Post
+from app.services.count_cache import invalidate_post_counts
+from app.services.futures_sync_service import contract_expiry_dates, insert_missing_contracts
 
 logger = logging.getLogger(__name__)
 
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {"runs": 0, "dry_runs": 0, "deleted_total": 0, "errors": 0, "last_run": None}
+
+
+def get_expiry_stats() -> Dict[str, Any]:
+    """到期清理的累计统计：运行次数、下架帖子总数、失败次数与最近一次运行的计数。"""
+    with _stats_lock:
+        return {**_stats, "last_run": dict(_stats["last_run"]) if _stats["last_run"] else None}
+
+
+def reset_expiry_stats() -> None:
+    """清空累计统计（测试用）。"""
+    with _stats_lock:
+        _stats.update(runs=0, dry_runs=0, deleted_total=0, errors=0, last_run=None)
+
+
+def _record_run(result: Dict[str, Any], seconds: float) -> None:
+    with _stats_lock:
+        _stats["dry_runs" if result["dry_run"] else "runs"] += 1
+        _stats["deleted_total"] += result["deleted_count"]
+        _stats["errors"] += int("error" in result)
+        _stats["last_run"] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(seconds, 3),
+            **{k: v for k, v in result.items() if k != "expired"},
+        }
+
 
 class ContractExpiryService:
     """期货合约到期汰换服务类。
@@ -28,82 +72,119 @@ class ContractExpiryService:
             db: 数据库会话。
         """
         self.db = db
-        self.futures_sync_service = FuturesSyncService(db)
 
-    def cleanup_expired_contracts(self) -> Dict[str, int]:
+    def backfill_contracts(self, today: Optional[date] = None) -> Dict[str, int]:
+        """补齐到期清理依赖的合约数据（不提交事务）。
+
+        Args:
+            today: 推断两位年份的参考日期，默认今天。
+
+        Returns:
+            dict: contracts_created（为已发布帖子新登记的合约数）、expiry_backfilled（补算到期日的合约数）。
+        """
+        orphan_codes = self.db.execute(
+            select(func.upper(Post.contract_code)).distinct().where(
+                Post.status == 1,
+                Post.contract_code.isnot(None),
+                ~select(FuturesContract.contract_id).where(
+                    FuturesContract.contract_code == func.upper(Post.contract_code)
+                ).exists(),
+            )
+        ).scalars().all()
+        # 只被帖子引用、未经行情或交易所确认的代码：登记为 is_active=False，只供到期清理使用
+        created = insert_missing_contracts(
+            self.db, [{"contract_code": code} for code in orphan_codes], today, confirmed=False
+        )
+
+        missing = self.db.execute(
+            select(FuturesContract.contract_id, FuturesContract.contract_code).where(FuturesContract.expiry_date.is_(None))
+        ).all()
+        backfilled = 0
+        if missing:
+            frame = pd.DataFrame(missing, columns=["contract_id", "contract_code"])
+            frame["expiry_date"] = contract_expiry_dates(frame["contract_code"], today).dt.date
+            rows = frame.dropna(subset=["expiry_date"])[["contract_id", "expiry_date"]].to_dict("records")
+            if rows:
+                self.db.execute(update(FuturesContract), rows)
+            backfilled = len(rows)
+        return {"contracts_created": created, "expiry_backfilled": backfilled}
+
+    def cleanup_expired_contracts(self, dry_run: bool = False, today: Optional[date] = None) -> Dict[str, Any]:
         """清理已到期的期货合约帖子。
 
-        检查所有活跃的帖子，如果对应的合约已到期，则软删除（status=0）该帖子。
+        以 futures_contracts.expiry_date < 今天 为准，一条 UPDATE 软删除（status=0）对应的已发布帖子；
+        没有登记合约或代码中没有年月（到期日为空）的帖子不受影响。
+
+        Args:
+            dry_run: 为 True 时只报告将被下架的帖子，所有改动回滚。
+            today: 参考日期，默认今天。
 
         Returns:
-            dict: 包含清理统计信息的字典。
+            dict: 包含清理统计信息的字典：total_checked（已发布且有合约代码的帖子数）、
+                expired_count、deleted_count（dry_run 时为 0）、error_count、contracts_created、
+                expiry_backfilled、dry_run；dry_run 时另含 expired（post_id、contract_code、expiry_date 列表）。
         """
-        result = {
+        today = today or date.today()
+        started = time.perf_counter()
+        result: Dict[str, Any] = {
             'total_checked': 0,
             'expired_count': 0,
             'deleted_count': 0,
             'error_count': 0,
+            'contracts_created': 0,
+            'expiry_backfilled': 0,
+            'dry_run': dry_run,
         }
+        active = and_(Post.status == 1, Post.contract_code.isnot(None))
+        expired = and_(
+            active,
+            FuturesContract.contract_code == func.upper(Post.contract_code),
+            FuturesContract.expiry_date < today,
+        )
 
         try:
-            # 获取所有活跃的帖子（status=1）
-            active_posts = self.db.query(Post).filter(
-                and_(
-                    Post.status == 1,
-                    Post.contract_code.isnot(None)
-                )
-            ).all()
-
-            result['total_checked'] = len(active_posts)
-            logger.info(f"开始检查 {result['total_checked']} 个活跃帖子的合约到期情况...")
-
-            for post in active_posts:
-                try:
-                    contract_code = post.contract_code
-                    if not contract_code:
-                        continue
-
-                    # 检查合约是否已到期
-                    is_active, expiry_date = self.futures_sync_service.is_contract_active(contract_code)
-
-                    if not is_active:
-                        result['expired_count'] += 1
-                        logger.info(
-                            f"发现已到期合约: {contract_code} "
-                            f"(到期日期: {expiry_date}, 帖子ID: {post.post_id})"
-                        )
-
-                        # 软删除帖子
-                        post.status = 0
-                        result['deleted_count'] += 1
-                        logger.debug(f"已软删除帖子: post_id={post.post_id}, contract_code={contract_code}")
-
-                except Exception as e:
-                    result['error_count'] += 1
-                    logger.error(
-                        f"处理帖子 {post.post_id} (合约代码: {post.contract_code}) 时出错: {str(e)}",
-                        exc_info=True
-                    )
-                    continue
-
-            # 提交所有更改
-            if result['deleted_count'] > 0:
+            result.update(self.backfill_contracts(today))
+            result['total_checked'] = self.db.execute(select(func.count()).select_from(Post).where(active)).scalar()
+
+            if dry_run:
+                rows = self.db.execute(
+                    select(Post.post_id, Post.contract_code, FuturesContract.expiry_date)
+                    .where(expired)
+                    .order_by(FuturesContract.expiry_date, Post.post_id)
+                ).all()
+                result['expired'] = [
+                    {'post_id': post_id, 'contract_code': code, 'expiry_date': expiry.isoformat()}
+                    for post_id, code, expiry in rows
+                ]
+                result['expired_count'] = len(rows)
+                self.db.rollback()
+            else:
+                deleted = self.db.execute(
+                    update(Post)
+                    .where(expired)
+                    .values(status=0, updated_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                result['expired_count'] = result['deleted_count'] = deleted
                 self.db.commit()
-                logger.info(f"已提交 {result['deleted_count']} 个帖子的软删除操作")
+                if deleted:
+                    invalidate_post_counts()
 
             logger.info(
-                f"合约到期清理完成: "
+                f"合约到期清理完成{'（预览）' if dry_run else ''}: "
                 f"检查总数={result['total_checked']}, "
                 f"到期数量={result['expired_count']}, "
                 f"删除数量={result['deleted_count']}, "
-                f"错误数量={result['error_count']}"
+                f"新登记合约={result['contracts_created']}, "
+                f"补算到期日={result['expiry_backfilled']}"
             )
 
         except Exception as e:
             logger.error(f"清理到期合约时发生错误: {str(e)}", exc_info=True)
             result['error'] = str(e)
+            result['error_count'] += 1
             # 发生错误时回滚
             self.db.rollback()
 
+        _record_run(result, time.perf_counter() - started)
         return result
-
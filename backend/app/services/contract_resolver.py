@@ -0,0 +1,243 @@
+"""合约代码 -> 交易所 / Tushare ts_code 解析索引（进程内）。
+
+设计原因：
+1. K 线接口每个请求都要新开一个 SessionLocal() 查 futures_contracts.exchange_code，
+   再调用行情后端的 convert_contract_code_to_ts_code（每次重建 70 项的品种表并跑正则）；
+   Tushare 与 JSON 两个后端各自维护一份相同的品种后缀表。
+2. 品种 -> 后缀表只在这里定义一份（不可变映射），两个后端的 convert_contract_code_to_ts_code 都委托给 to_ts_code。
+3. futures_contracts 中的合约交易所一次性载入为不可变的 ContractIndex，整体替换；合约同步
+   （sync_tushare_futures_to_db、FuturesSyncService）完成后调用 invalidate_contract_index()，
+   独立脚本进程改库的情况由 CONTRACT_INDEX_TTL_SECONDS 兜底。
+4. K 线会按「库交易所 → 品种映射 → PT 强制广期所」依次尝试；成功的备选 ts_code 记在索引里，
+   同一合约后续请求直接先用它，不必再经历前面 1～2 次空查询。记忆随索引重建一起清空。
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.models import FuturesContract
+
+logger = logging.getLogger(__name__)
+
+# 交易所代码 -> Tushare ts_code 后缀
+EXCHANGE_TS_SUFFIX: Mapping[str, str] = MappingProxyType({
+    'SHFE': 'SHF',
+    'DCE': 'DCE',
+    'CZCE': 'ZCE',
+    'CFFEX': 'CFX',
+    'INE': 'INE',
+    'GFEX': 'GFE',
+})
+
+# 品种 -> Tushare 交易所后缀（SHF/DCE/ZCE/CFX/INE/GFE）
+# 单字母品种：C/A/M/Y/P/L/V/I/J/T 等易被 contract_code[:2] 误判，必须显式映射
+SYMBOL_TS_SUFFIX: Mapping[str, str] = MappingProxyType({
+    # 中金所 CFFEX -> CFX
+    'IF': 'CFX', 'IH': 'CFX', 'IC': 'CFX', 'IM': 'CFX',
+    'T': 'CFX', 'TF': 'CFX', 'TS': 'CFX', 'TL': 'CFX',
+    # 大商所 DCE -> DCE
+    'C': 'DCE', 'A': 'DCE', 'M': 'DCE', 'Y': 'DCE', 'P': 'DCE', 'JD': 'DCE',
+    'L': 'DCE', 'V': 'DCE', 'PP': 'DCE', 'EB': 'DCE', 'EG': 'DCE',
+    'I': 'DCE', 'J': 'DCE', 'JM': 'DCE', 'FB': 'DCE', 'BB': 'DCE', 'LG': 'DCE',
+    # 郑商所 CZCE -> ZCE
+    'CF': 'ZCE', 'SR': 'ZCE', 'TA': 'ZCE', 'OI': 'ZCE', 'MA': 'ZCE', 'FG': 'ZCE',
+    'RM': 'ZCE', 'ZC': 'ZCE', 'SF': 'ZCE', 'SM': 'ZCE', 'AP': 'ZCE', 'CJ': 'ZCE',
+    'UR': 'ZCE', 'SA': 'ZCE', 'PF': 'ZCE', 'PK': 'ZCE', 'LH': 'ZCE', 'RI': 'ZCE',
+    'LR': 'ZCE', 'JR': 'ZCE', 'PM': 'ZCE', 'WH': 'ZCE', 'CY': 'ZCE', 'PL': 'ZCE',
+    'SH': 'ZCE',
+    'PR': 'ZCE',  # 郑商所瓶级切片（勿与广期所铂 PT 混淆）
+    # 上期所 SHFE -> SHF
+    'CU': 'SHF', 'AL': 'SHF', 'ZN': 'SHF', 'PB': 'SHF', 'NI': 'SHF', 'SN': 'SHF',
+    'AU': 'SHF', 'AG': 'SHF', 'RB': 'SHF', 'HC': 'SHF', 'SS': 'SHF', 'BU': 'SHF',
+    'RU': 'SHF', 'FU': 'SHF', 'WR': 'SHF', 'SP': 'SHF', 'AO': 'SHF', 'BC': 'SHF', 'BR': 'SHF',
+    # 上期能源 INE -> INE
+    'SC': 'INE', 'LU': 'INE', 'NR': 'INE', 'EC': 'INE',
+    # 广期所 GFEX -> GFE（铂 PT、钯 PD 等）
+    'SI': 'GFE', 'LC': 'GFE', 'PT': 'GFE', 'PD': 'GFE',
+})
+
+_SYMBOL_RE = re.compile(r'^([A-Za-z]+)')
+_PT_RE = re.compile(r'^PT\d+')
+
+
+@lru_cache(maxsize=4096)
+def _symbol_ts_code(contract_code: str) -> str:
+    symbol_match = _SYMBOL_RE.match(contract_code)
+    symbol = symbol_match.group(1).upper() if symbol_match else contract_code[:1].upper()
+    # 未匹配时默认 SHFE（历史兼容）
+    return f"{contract_code}.{SYMBOL_TS_SUFFIX.get(symbol, 'SHF')}"
+
+
+def to_ts_code(contract_code: str, exchange: Optional[str] = None) -> str:
+    """将标准合约代码转换为 Tushare 合约代码。
+
+    例如：I2603 -> I2603.DCE（铁矿石），CU2601 -> CU2601.SHF。
+    已带后缀的代码原样返回；给出已知交易所时直接按交易所拼后缀，否则按品种映射，未知品种默认 SHF。
+
+    Args:
+        contract_code: 标准合约代码。
+        exchange: 交易所代码（可选），如 SHFE、GFEX。
+
+    Returns:
+        str: Tushare 合约代码。
+    """
+    if '.' in contract_code:
+        return contract_code
+    if exchange and exchange in EXCHANGE_TS_SUFFIX:
+        return f"{contract_code}.{EXCHANGE_TS_SUFFIX[exchange]}"
+    return _symbol_ts_code(contract_code)
+
+
+class ContractRow(NamedTuple):
+    """futures_contracts 中与行情读取相关的字段。"""
+
+    contract_id: int
+    exchange_code: str
+    listed_date: Optional[date] = None
+    expiry_date: Optional[date] = None
+
+
+class ContractIndex:
+    """不可变的合约交易所索引，附带「已验证可用的 ts_code」记忆。"""
+
+    def __init__(self, exchanges: Mapping[str, str], contracts: Optional[Mapping[str, ContractRow]] = None) -> None:
+        """由 合约代码 -> 交易所代码 构建索引。
+
+        Args:
+            exchanges: 合约代码（大写）-> 交易所代码（大写）。
+            contracts: 合约代码（大写）-> 库中的合约行（contract_id、上市/到期日），可选。
+        """
+        self._exchanges: Mapping[str, str] = MappingProxyType(dict(exchanges))
+        self._contracts: Mapping[str, ContractRow] = MappingProxyType(dict(contracts or {}))
+        # 写时复制：读方拿到的始终是一个完整的 dict
+        self._learned: Mapping[str, str] = MappingProxyType({})
+        self._learn_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._exchanges)
+
+    def exchange_hint(self, contract_code: str) -> Optional[str]:
+        """futures_contracts 中记录的交易所，没有记录时返回 None。"""
+        return self._exchanges.get(contract_code)
+
+    def contract(self, contract_code: str) -> Optional[ContractRow]:
+        """futures_contracts 中的合约行，没有记录时返回 None。"""
+        return self._contracts.get(contract_code)
+
+    def candidates(self, contract_code: str) -> List[str]:
+        """按尝试顺序返回 ts_code：已记住的可用代码 → 库交易所 → 品种映射 → PT 强制广期所（去重）。"""
+        ordered = []
+        learned = self._learned.get(contract_code)
+        if learned:
+            ordered.append(learned)
+        hint = self._exchanges.get(contract_code)
+        if hint:
+            ordered.append(to_ts_code(contract_code, hint))
+        ordered.append(to_ts_code(contract_code))
+        if _PT_RE.match(contract_code):
+            # 广期所铂 PT 曾易被误判为郑商所/上期所
+            ordered.append(f"{contract_code}.GFE")
+        return list(dict.fromkeys(ordered))
+
+    def remember(self, contract_code: str, ts_code: str) -> None:
+        """记住某合约实际取到数据的 ts_code（与首选不同时才需要调用）。"""
+        if self._learned.get(contract_code) == ts_code:
+            return
+        with self._learn_lock:
+            learned = dict(self._learned)
+            learned[contract_code] = ts_code
+            self._learned = MappingProxyType(learned)
+        logger.info("[合约解析] 记住可用 ts_code: %s -> %s", contract_code, ts_code)
+
+    @property
+    def learned(self) -> Mapping[str, str]:
+        """已记住的 合约代码 -> ts_code。"""
+        return self._learned
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+_CONTRACT_ROWS = select(
+    FuturesContract.contract_code,
+    FuturesContract.exchange_code,
+    FuturesContract.contract_id,
+    FuturesContract.listed_date,
+    FuturesContract.expiry_date,
+)
+
+# (索引, 构建时间)
+_state: Optional[Tuple[ContractIndex, float]] = None
+_state_lock = threading.Lock()
+
+
+def load_contract_index(db: Any) -> ContractIndex:
+    """用同步会话从 futures_contracts 构建索引。"""
+    exchanges: Dict[str, str] = {}
+    contracts: Dict[str, ContractRow] = {}
+    for code, exchange, contract_id, listed_date, expiry_date in db.execute(_CONTRACT_ROWS).all():
+        code = (code or "").strip().upper()
+        exchange = (exchange or "").strip().upper()
+        if not code:
+            continue
+        if exchange:
+            exchanges[code] = exchange
+        contracts[code] = ContractRow(contract_id, exchange, listed_date, expiry_date)
+    return ContractIndex(exchanges, contracts)
+
+
+def _load() -> ContractIndex:
+    from app.database.connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return load_contract_index(db)
+    except Exception as e:
+        # 库不可用时退化为纯品种映射，TTL 到期后再重试
+        logger.warning("[合约解析] 读取 futures_contracts 失败，仅使用品种映射: %s", e)
+        return ContractIndex({})
+    finally:
+        db.close()
+
+
+def get_contract_index() -> ContractIndex:
+    """返回当前合约解析索引，未构建或过期（CONTRACT_INDEX_TTL_SECONDS，默认 600）时重建。"""
+    global _state
+    state = _state
+    now = time.monotonic()
+    if state is not None and now - state[1] <= _env_int("CONTRACT_INDEX_TTL_SECONDS", 600):
+        return state[0]
+    with _state_lock:
+        state = _state
+        if state is not None and now - state[1] <= _env_int("CONTRACT_INDEX_TTL_SECONDS", 600):
+            return state[0]
+        index = _load()
+        _state = (index, time.monotonic())
+    logger.info("[合约解析] 索引已重建: %s 个合约", len(index))
+    return index
+
+
+def set_contract_index(index: Optional[ContractIndex]) -> None:
+    """直接安装索引（测试用）；传 None 等同 invalidate_contract_index。"""
+    global _state
+    with _state_lock:
+        _state = (index, time.monotonic()) if index is not None else None
+
+
+def invalidate_contract_index() -> None:
+    """丢弃当前索引（合约同步完成后调用），下次访问时重新载入。"""
+    set_contract_index(None)
@@ -0,0 +1,238 @@
+"""分页列表总数缓存。
+
+设计原因：
+1. 帖子列表每次请求（含看板每 5 分钟的刷新）都要对 posts WHERE status=1 加筛选条件做一次 COUNT，
+   管理员用户列表同理；而总数只在发帖、改帖、删帖、到期下架等写操作后才会变化。
+2. 以「命名空间 + 规范化后的筛选条件」为键缓存总数：None/空串视为未筛选，搜索词去空白并转小写
+   （ILIKE 本就不区分大小写），避免同义请求各自占一个条目。
+3. 写路径调用 invalidate(namespace) 清空对应命名空间；同时带 TTL（COUNT_CACHE_TTL_SECONDS）兜底，
+   覆盖脚本、其他进程等未经过服务层的写入。
+4. 失效使用代际计数：计算 COUNT 期间若发生失效，结果不写回，避免把旧值缓存下来。
+5. 不需要精确总数时可用 PostgreSQL 规划器估算（EXPLAIN 的 Plan Rows），不扫描数据；
+   非 PostgreSQL 或估算失败时返回 None，由调用方退回精确计数。EXPLAIN 与原查询一样走绑定参数，
+   用户输入的搜索词不内联进 SQL 文本。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+logger = logging.getLogger(__name__)
+
+POSTS_NAMESPACE = "posts"
+USERS_NAMESPACE = "users"
+
+CountKey = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _normalize(value: Any) -> Optional[Hashable]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip().lower()
+        return value or None
+    return value
+
+
+class CountCache:
+    """线程安全的总数缓存（LRU + TTL）。"""
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初始化缓存。
+
+        Args:
+            ttl_seconds: 条目存活秒数，<=0 表示禁用缓存。
+            max_entries: 最多保留的条目数，超出按 LRU 淘汰。
+            clock: 时间函数（测试可注入）。
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CountKey, Tuple[int, float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(namespace: str, **filters: Any) -> CountKey:
+        """规范化缓存键：丢弃空筛选、字符串去空白并小写、按名称排序。"""
+        items = []
+        for name, value in filters.items():
+            value = _normalize(value)
+            if value is not None:
+                items.append((name, value))
+        return namespace, tuple(sorted(items))
+
+    def generation(self, namespace: str) -> int:
+        """当前命名空间的失效代数，计算前取得，写回时传给 put。"""
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def get(self, key: CountKey) -> Optional[int]:
+        """读取缓存的总数，未命中或已过期返回 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key: CountKey, value: int, generation: int) -> None:
+        """写入总数；若计算期间命名空间已失效则丢弃。"""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (int(value), self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: CountKey, compute: Callable[[], int]) -> int:
+        """同步调用方使用：命中直接返回，否则计算并写回。"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        generation = self.generation(key[0])
+        value = compute()
+        self.put(key, value, generation)
+        return value
+
+    async def get_or_compute_async(self, key: CountKey, compute: Callable[[], Awaitable[int]]) -> int:
+        """异步调用方使用，语义同 get_or_compute；compute 返回 awaitable（如 AsyncSession 上的 COUNT）。"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        generation = self.generation(key[0])
+        value = await compute()
+        self.put(key, value, generation)
+        return value
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """失效指定命名空间（默认全部），返回清除的条目数。"""
+        with self._lock:
+            if namespace is None:
+                keys = list(self._entries)
+                for ns in {k[0] for k in keys} | set(self._generations):
+                    self._generations[ns] = self._generations.get(ns, 0) + 1
+            else:
+                keys = [k for k in self._entries if k[0] == namespace]
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for k in keys:
+                del self._entries[k]
+            self._stats["invalidations"] += 1
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计。"""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+
+class _ExplainJson(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <stmt>。
+
+    内部语句按正常方式编译，搜索词等取值仍作为绑定参数交给驱动，不内联进 SQL。
+    """
+
+    inherit_cache = False
+
+    def __init__(self, stmt: Any):
+        self.stmt = stmt
+
+
+@compiles(_ExplainJson, "postgresql")
+def _compile_explain_json(element: _ExplainJson, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+def _explain(stmt: Any, dialect: Any) -> Optional[_ExplainJson]:
+    return _ExplainJson(stmt) if dialect.name == "postgresql" else None
+
+
+def _plan_rows(raw: Any) -> Optional[int]:
+    try:
+        plan = json.loads(raw) if isinstance(raw, str) else raw
+        return max(0, int(plan[0]["Plan"]["Plan Rows"]))
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        logger.debug("[总数缓存] 解析执行计划失败: %s", e)
+        return None
+
+
+def estimate_row_count(db: Any, stmt: Any) -> Optional[int]:
+    """用 PostgreSQL 规划器估算 stmt 的返回行数（同步 Session）。
+
+    Args:
+        db: 同步数据库会话。
+        stmt: 待估算的 SELECT（不含 COUNT）。
+
+    Returns:
+        Optional[int]: 估算行数；非 PostgreSQL 或失败时返回 None。
+    """
+    explain = _explain(stmt, db.get_bind().dialect)
+    if explain is None:
+        return None
+    try:
+        return _plan_rows(db.execute(explain).scalar())
+    except Exception as e:
+        logger.warning("[总数缓存] 规划器估算失败，退回精确计数: %s", e)
+        return None
+
+
+async def estimate_row_count_async(db: Any, stmt: Any) -> Optional[int]:
+    """estimate_row_count 的 AsyncSession 版本。"""
+    explain = _explain(stmt, db.get_bind().dialect)
+    if explain is None:
+        return None
+    try:
+        return _plan_rows((await db.execute(explain)).scalar())
+    except Exception as e:
+        logger.warning("[总数缓存] 规划器估算失败，退回精确计数: %s", e)
+        return None
+
+
+_cache: Optional[CountCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_count_cache() -> CountCache:
+    """返回进程级总数缓存。"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CountCache(
+                    ttl_seconds=_env_int("COUNT_CACHE_TTL_SECONDS", 300),
+                    max_entries=_env_int("COUNT_CACHE_MAX_ENTRIES", 1024),
+                )
+    return _cache
+
+
+def invalidate_post_counts() -> None:
+    """帖子集合发生变化（新增、修改、删除、价格刷新）后调用。"""
+    get_count_cache().invalidate(POSTS_NAMESPACE)
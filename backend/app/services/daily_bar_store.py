@@ -0,0 +1,362 @@
+"""日线行情入库（market_data 表）与按区间读取。
+
+设计原因：
+1. models.MarketData 已定义按合约的日线 OHLCV/结算价/持仓量与 (contract_id, trade_date) 唯一索引，
+   但此前没有任何写入，每次 K 线请求都要去 Tushare 或 JSON 文件取整段历史。
+2. 入库任务按交易日增量进行：从入库游标（ingest_cursors 表，而不是 market_data 的 MAX(trade_date)，
+   K 线按需回写的单个合约日线不能推进全市场游标）的下一天起，每个交易日只调用一次
+   fut_daily(trade_date=...) 全市场接口，只保留 futures_contracts 中在交易（is_active）的合约，
+   PostgreSQL / SQLite 上用 INSERT ... ON CONFLICT (contract_id, trade_date) DO UPDATE 分块批量写入，
+   其他数据库退回「查已存在键 + executemany」。某日接口报错即停止，下次从该日继续，游标不会跳过。
+3. K 线读取（KlineService）先查本表，只对按交易日历算出的缺失交易日向远端补取，补到的数据回写本表；
+   本地命中时 K 线延迟是一次 (contract_id, trade_date) 索引上的区间扫描。
+4. 当日日线在结算后（DAILY_BAR_READY_TIME，默认 17:00）才视为应当存在，盘中不会把「今天」当作缺口反复补取。
+"""
+
+import logging
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, update
+
+from app.database.models import FuturesContract, IngestCursor, MarketData
+from app.services.contract_resolver import to_ts_code
+from app.services.trading_calendar import TZ, get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+# fut_daily 列 -> market_data 列
+BAR_COLUMNS = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "close": "close_price",
+    "settle": "settlement_price",
+    "vol": "volume",
+    "oi": "open_interest",
+    "amount": "turnover",
+}
+_INT_COLUMNS = ("volume", "open_interest")
+# INSERT ... ON CONFLICT 每块的行数（每行 10 个绑定参数）
+_UPSERT_CHUNK_SIZE = 1000
+# ingest_cursors 中全市场日线入库的游标名
+INGEST_CURSOR = "market_data_daily"
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _ready_time() -> dtime:
+    raw = (os.getenv("DAILY_BAR_READY_TIME") or "17:00").strip()
+    try:
+        hour, minute = raw.split(":")
+        return dtime(int(hour), int(minute))
+    except ValueError:
+        return dtime(17, 0)
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip().replace("-", "")[:8]
+    try:
+        return datetime.strptime(text, "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def last_complete_trading_day(now: Optional[datetime] = None, exchange: Optional[str] = None) -> date:
+    """最近一个「日线已发布」的交易日：当天开市且已过 DAILY_BAR_READY_TIME 时为当天，否则为之前最近的交易日。"""
+    now = now or datetime.now(TZ)
+    calendar = get_trading_calendar()
+    day = now.date()
+    if calendar.is_trading_day(day, exchange) and now.time() >= _ready_time():
+        return day
+    day -= timedelta(days=1)
+    for _ in range(40):
+        if calendar.is_trading_day(day, exchange):
+            return day
+        day -= timedelta(days=1)
+    return day
+
+
+def trading_days(start: date, end: date, exchange: Optional[str] = None) -> List[date]:
+    """[start, end] 内的交易日（按交易日历）。"""
+    calendar = get_trading_calendar()
+    days = []
+    day = start
+    while day <= end:
+        if calendar.is_trading_day(day, exchange):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def bars_from_frame(
+    df: Optional[pd.DataFrame],
+    contract_ids: Dict[str, int],
+    trade_date: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """把 fut_daily 结果整理为 market_data 行。
+
+    Args:
+        df: 含 ts_code（或由 trade_date 参数指定单日）与 OHLC 等列的日线。
+        contract_ids: ts_code -> contract_id，只保留其中的合约。
+        trade_date: 整表同一交易日时传入；否则使用 df 的 trade_date 列。
+
+    Returns:
+        List[Dict[str, Any]]: 可直接用于批量写入的行（缺失值为 None）。
+    """
+    if df is None or df.empty or "ts_code" not in df.columns:
+        return []
+    frame = df[df["ts_code"].astype(str).isin(contract_ids.keys())]
+    if frame.empty:
+        return []
+    out = pd.DataFrame({"contract_id": frame["ts_code"].astype(str).map(contract_ids).to_numpy()})
+    if trade_date is not None:
+        out["trade_date"] = trade_date
+    elif "trade_date" in frame.columns:
+        out["trade_date"] = [_parse_date(v) for v in frame["trade_date"]]
+    else:
+        return []
+    for source, target in BAR_COLUMNS.items():
+        if source in frame.columns:
+            out[target] = pd.to_numeric(frame[source], errors="coerce").to_numpy()
+        else:
+            out[target] = np.nan
+    out = out[out["trade_date"].notna()].drop_duplicates(["contract_id", "trade_date"], keep="last")
+    rows = out.astype(object).where(out.notna(), None).to_dict("records")
+    for row in rows:
+        row["contract_id"] = int(row["contract_id"])
+        for column in _INT_COLUMNS:
+            if row[column] is not None:
+                row[column] = int(row[column])
+    return rows
+
+
+def upsert_bars(db: Any, rows: List[Dict[str, Any]]) -> int:
+    """批量写入日线（同一合约同一交易日覆盖旧值），不提交事务。
+
+    Args:
+        db: 同步会话。
+        rows: bars_from_frame 的结果。
+
+    Returns:
+        int: 写入的行数。
+    """
+    if not rows:
+        return 0
+    dialect = db.get_bind().dialect.name
+    value_columns = list(BAR_COLUMNS.values())
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        for start in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+            stmt = dialect_insert(MarketData).values(rows[start:start + _UPSERT_CHUNK_SIZE])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["contract_id", "trade_date"],
+                set_={column: stmt.excluded[column] for column in value_columns},
+            ))
+        return len(rows)
+
+    keys = {(row["contract_id"], row["trade_date"]) for row in rows}
+    existing = {
+        (contract_id, trade_date): data_id
+        for data_id, contract_id, trade_date in db.execute(
+            select(MarketData.data_id, MarketData.contract_id, MarketData.trade_date).where(
+                MarketData.contract_id.in_({key[0] for key in keys}),
+                MarketData.trade_date.in_({key[1] for key in keys}),
+            )
+        )
+    }
+    updates = [
+        dict(row, data_id=existing[(row["contract_id"], row["trade_date"])])
+        for row in rows if (row["contract_id"], row["trade_date"]) in existing
+    ]
+    inserts = [row for row in rows if (row["contract_id"], row["trade_date"]) not in existing]
+    if updates:
+        db.execute(update(MarketData), updates)
+    if inserts:
+        db.execute(insert(MarketData), inserts)
+    return len(rows)
+
+
+class DailyBarStore:
+    """market_data 表的日线入库与读取。"""
+
+    def __init__(self, db: Any) -> None:
+        """初始化。
+
+        Args:
+            db: 同步数据库会话。
+        """
+        self.db = db
+
+    def active_contract_ids(self) -> Dict[str, int]:
+        """在交易的合约：ts_code -> contract_id。"""
+        rows = self.db.execute(
+            select(FuturesContract.contract_code, FuturesContract.exchange_code, FuturesContract.contract_id)
+            .where(FuturesContract.is_active.is_(True))
+        ).all()
+        ids = {}
+        for code, exchange, contract_id in rows:
+            code = (code or "").strip().upper()
+            if code:
+                ids[to_ts_code(code, (exchange or "").strip().upper() or None)] = contract_id
+        return ids
+
+    def latest_trade_date(self) -> Optional[date]:
+        """全市场入库已完整处理到的交易日（入库游标），尚未入库过时为 None。"""
+        cursor = self.db.get(IngestCursor, INGEST_CURSOR)
+        return _parse_date(cursor.trade_date) if cursor is not None else None
+
+    def ingest(
+        self,
+        source: Any,
+        until: Optional[date] = None,
+        backfill_days: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """从入库游标之后，逐个交易日拉取全市场日线并写入。
+
+        Args:
+            source: 提供 get_futures_daily(trade_date=...) 的行情服务（TushareService）。
+            until: 截止交易日，默认 last_complete_trading_day()。
+            backfill_days: 尚未入库过（没有游标）时回补的自然日数，默认读取 MARKET_DATA_BACKFILL_DAYS（30）。
+
+        Returns:
+            Dict[str, Any]: days（处理的交易日数）、rows（写入行数）、errors、latest（入库后的最新交易日）。
+        """
+        result = {"days": 0, "rows": 0, "errors": 0, "latest": None}
+        until = until or last_complete_trading_day()
+        latest = self.latest_trade_date()
+        if latest is not None:
+            start = latest + timedelta(days=1)
+        else:
+            days_back = backfill_days if backfill_days is not None else _env_int("MARKET_DATA_BACKFILL_DAYS", 30)
+            start = until - timedelta(days=max(days_back, 0))
+        days = trading_days(start, until)
+        if not days:
+            result["latest"] = latest
+            return result
+
+        contract_ids = self.active_contract_ids()
+        if not contract_ids:
+            logger.warning("[日线入库] futures_contracts 中没有在交易的合约，跳过")
+            result["latest"] = latest
+            return result
+
+        for day in days:
+            df = source.get_futures_daily(trade_date=day.strftime("%Y%m%d"))
+            if df is None:
+                # 接口异常：停在这里，下次从该日继续
+                logger.error("[日线入库] %s 拉取失败，本轮停止", day)
+                result["errors"] += 1
+                break
+            rows = bars_from_frame(df, contract_ids, trade_date=day)
+            upsert_bars(self.db, rows)
+            # 游标与当日日线同一事务提交
+            self.db.merge(IngestCursor(name=INGEST_CURSOR, trade_date=day))
+            self.db.commit()
+            result["days"] += 1
+            result["rows"] += len(rows)
+            latest = day
+            logger.info("[日线入库] %s 写入 %s 条", day, len(rows))
+        result["latest"] = latest
+        return result
+
+    def read_bars(self, contract_id: int, start: date, end: date) -> pd.DataFrame:
+        """读取某合约 [start, end] 的日线，列名与 fut_daily 一致（trade_date 为 YYYYMMDD 字符串）。"""
+        columns = [MarketData.trade_date] + [getattr(MarketData, column) for column in BAR_COLUMNS.values()]
+        rows = self.db.execute(
+            select(*columns)
+            .where(MarketData.contract_id == contract_id, MarketData.trade_date.between(start, end))
+            .order_by(MarketData.trade_date)
+        ).all()
+        df = pd.DataFrame(rows, columns=["trade_date", *BAR_COLUMNS.keys()])
+        if df.empty:
+            return df
+        df["trade_date"] = [_parse_date(v).strftime("%Y%m%d") for v in df["trade_date"]]
+        for column in BAR_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(float)
+        return df
+
+
+def missing_trading_days(
+    have: Iterable[str],
+    start: date,
+    end: date,
+    exchange: Optional[str] = None,
+    listed_date: Optional[date] = None,
+    expiry_date: Optional[date] = None,
+    now: Optional[datetime] = None,
+) -> List[date]:
+    """合约在 [start, end] 内应有日线但本地没有的交易日。
+
+    区间会收窄到合约上市日与到期日之间，并截止到 last_complete_trading_day。
+
+    Args:
+        have: 本地已有的交易日（YYYYMMDD）。
+        start: 请求起始日。
+        end: 请求截止日。
+        exchange: 交易所代码（用于交易日历）。
+        listed_date: 上市日，可选。
+        expiry_date: 到期日，可选。
+        now: 当前时间（测试可注入）。
+
+    Returns:
+        List[date]: 升序的缺失交易日。
+    """
+    lo = max(start, listed_date) if listed_date else start
+    hi = min(end, last_complete_trading_day(now, exchange))
+    if expiry_date:
+        hi = min(hi, expiry_date)
+    if lo > hi:
+        return []
+    have = set(have)
+    return [day for day in trading_days(lo, hi, exchange) if day.strftime("%Y%m%d") not in have]
+
+
+def ingest_daily_bars(backfill_days: Optional[int] = None) -> Dict[str, Any]:
+    """定时任务入口：用 Tushare 把未入库的交易日日线写入 market_data。
+
+    Args:
+        backfill_days: 尚未入库过时回补的自然日数，默认读取 MARKET_DATA_BACKFILL_DAYS。
+
+    Returns:
+        Dict[str, Any]: DailyBarStore.ingest 的统计；Tushare 不可用时 errors=1。
+    """
+    from app.database.connection import SessionLocal
+    from app.services.tushare_service import TushareService
+
+    try:
+        source = TushareService()
+    except Exception as e:
+        logger.warning("[日线入库] Tushare 不可用，跳过: %s", e)
+        return {"days": 0, "rows": 0, "errors": 1, "latest": None}
+
+    db = SessionLocal()
+    try:
+        result = DailyBarStore(db).ingest(source, backfill_days=backfill_days)
+        logger.info(
+            "[日线入库] 完成: 交易日=%s, 行数=%s, 错误=%s, 最新=%s",
+            result["days"], result["rows"], result["errors"], result["latest"],
+        )
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.error("[日线入库] 失败: %s", e, exc_info=True)
+        return {"days": 0, "rows": 0, "errors": 1, "latest": None}
+    finally:
+        db.close()
@@ -0,0 +1,138 @@
+"""外部行情接口的并发抓取与限流。
+
+设计原因：
+1. 批量取价时，全量日线未命中的合约原先逐个顺序查询，每个合约最多 2–3 次网络往返，
+   几十个未命中就要数分钟；这些请求彼此独立，适合用有界线程池并发执行。
+2. Tushare 按「每分钟调用次数」限额，超额会直接报错。令牌桶（TUSHARE_CALLS_PER_MINUTE，
+   允许 TUSHARE_BURST 次突发）放在每次 pro.* 调用之前，并发线程共享同一个桶，
+   因此提高并发只会让请求更早排队，不会突破配额。
+3. 并发上限（TUSHARE_MAX_IN_FLIGHT）与限流相互独立：前者限制同时占用的连接，后者限制速率。
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器。"""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """初始化令牌桶。
+
+        Args:
+            rate_per_minute: 每分钟补充的令牌数，<=0 表示不限流。
+            burst: 桶容量（允许的突发次数），默认等于每秒速率且至少为 1。
+            clock: 时间函数（测试可注入）。
+            sleep: 等待函数（测试可注入）。
+        """
+        self.rate = max(0.0, float(rate_per_minute)) / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate)))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """取走一个令牌，返回需要等待的秒数（令牌不足时预支，等待到补足为止）。"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """阻塞直到拿到一个令牌，返回实际等待的秒数。"""
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+def fan_out(
+    func: Callable[[K], V],
+    items: Iterable[K],
+    max_in_flight: int,
+    label: str = "fan_out",
+) -> Dict[K, Optional[V]]:
+    """以有界并发对每个元素调用 func。
+
+    单个元素抛出的异常只记日志，结果记为 None，不影响其他元素。
+
+    Args:
+        func: 处理单个元素的函数。
+        items: 待处理元素（重复元素只处理一次）。
+        max_in_flight: 最大并发数，<=1 时在当前线程顺序执行。
+        label: 日志前缀。
+
+    Returns:
+        Dict[K, Optional[V]]: 元素 -> 结果。
+    """
+    unique = list(dict.fromkeys(items))
+
+    def run(item: K) -> Optional[V]:
+        try:
+            return func(item)
+        except Exception as e:
+            logger.warning(f"[{label}] 处理失败: {item}, 错误: {e}")
+            return None
+
+    if max_in_flight <= 1 or len(unique) <= 1:
+        return {item: run(item) for item in unique}
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(unique)), thread_name_prefix=label) as pool:
+        return dict(zip(unique, pool.map(run, unique)))
+
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def get_tushare_limiter() -> TokenBucket:
+    """返回进程级 Tushare 限流器（所有 pro.* 调用共享）。"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                rate = _env_int("TUSHARE_CALLS_PER_MINUTE", 200)
+                _limiter = TokenBucket(rate, burst=_env_int("TUSHARE_BURST", 10))
+    return _limiter
+
+
+def set_tushare_limiter(limiter: Optional[TokenBucket]) -> None:
+    """替换进程级限流器；传 None 则下次按环境变量重建（测试、基准用）。"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+
+
+def tushare_max_in_flight() -> int:
+    """Tushare 并发查询上限。"""
+    return max(1, _env_int("TUSHARE_MAX_IN_FLIGHT", 8))
@@ -3,25 +3,108 @@
 负责从 akshare 获取可用期货合约，并自动创建对应的帖子卡片。
 
 注意：行情现价/K 线已改为本地 JSON（MarketDataService），与合约列表来源独立。
+
+设计原因：
+1. 合约列表来自实时行情、四个交易所合约表、现货价格表（以及可选的连续合约表），
+   彼此独立；原先依次请求，一次同步要付出所有上游延迟之和。现在并发拉取，
+   每个来源受 FUTURES_SYNC_SOURCE_TIMEOUT_SECONDS 限制，个别来源卡住不拖垮整个同步。
+2. 各来源只负责解析成候选合约，最后经过唯一一个去重阶段合并（按来源优先级保留第一条）；
+   现货价格表只下载一次，同时用于生成 2026 年合约与补充主力合约。
+3. 每个来源的状态、耗时与行数记在 last_source_report，并随同步结果返回，便于定位慢来源。
+4. 候选合约先枚举、后取价：原先每个交易所合约、生成合约、主力合约各调用一次 get_futures_spot_price
+   （Tushare 下每次最多 3 次网络请求，仅「生成 2026 年合约」就是品种数 × 7 个月）；
+   现在合并去重后用一次 batch_get_futures_prices 对同一份快照匹配。
+5. 写帖子默认批量进行：原先每个新合约调用一次 create_post（各自提交并 refresh），更新也在循环内逐条提交，
+   同步几百个合约就是几百个事务；现在在内存中构造所有新增/变更行，分块写入后一次提交。
+   PostgreSQL 上借助「已发布帖子按 contract_code 唯一」的部分唯一索引用 INSERT ... ON CONFLICT 写入。
+6. 各来源按列整理成同一结构的候选表（CANDIDATE_COLUMNS）：一次 str.extract 拆出品种与年月，
+   到期日按列计算，价格列用 bfill 取第一个有效值；合并去重也是表操作，不再逐行 iterrows。
+7. 同步时把 futures_contracts 中还没有的合约登记进去，到期日在插入时按合约代码算一次，
+   到期清理（ContractExpiryService）据此用一条集合 UPDATE 下架帖子，不再逐帖解析代码。
 """
 
 import logging
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timezone, date, timedelta
+import numpy as np
 import pandas as pd
 import akshare as ak
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert, select, text, update
 
-from app.database.models import Post, User
+from app.database.models import ACTIVE_CONTRACT_POST_INDEX, FuturesContract, Post, User
+from app.services.contract_resolver import invalidate_contract_index
+from app.services.count_cache import invalidate_post_counts
 from app.services.post_service import PostService
 from app.services.price_update_service import PriceUpdateService
+from app.utils.futures_naming import infer_exchange_code
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 合约列表来源名（同一合约代码按此顺序保留第一条）
+SOURCE_REALTIME = 'realtime'
+SOURCE_EXCHANGE_PREFIX = 'exchange_'
+SOURCE_GENERATED = 'generated'
+SOURCE_SPOT = 'spot'
+SOURCE_CONTINUOUS = 'continuous'
+
+# 提供合约信息表的交易所（akshare 函数 futures_contract_info_{code}）
+EXCHANGE_LISTINGS = {
+    'shfe': '上海期货交易所',
+    'czce': '郑州商品交易所',
+    'cffex': '中国金融期货交易所',
+    'ine': '上海国际能源交易中心',
+}
+
+
+# 批量写入帖子（及登记合约）时每块的行数
+_POST_UPSERT_CHUNK_SIZE = 500
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _post_title(contract_code: str, contract_name: str) -> str:
+    """帖子标题：名称已包含合约代码时直接使用，否则追加「(合约代码)」。"""
+    if contract_code.upper() in contract_name.upper():
+        return contract_name
+    return f"{contract_name} ({contract_code})"
+
+
+def _post_content(contract_code: str, contract: Dict[str, any], current_price: Optional[float]) -> str:
+    """同步创建的帖子的默认正文（管理员可以后续编辑）。"""
+    content = f"期货合约 {contract_code} 的交易建议。\n\n"
+    content += f"品种代码: {contract['symbol']}\n"
+    if current_price is not None:
+        content += f"当前价格: {current_price}\n"
+    if contract.get('spot_price') is not None:
+        content += f"现货价格: {contract['spot_price']}\n"
+    content += "\n请管理员编辑此帖子的交易建议、止损价、止盈价等信息。"
+    return content
+
+
+def _has_active_contract_index(db: Session, dialect: str) -> bool:
+    """是否已建「同一合约只有一条已发布帖子」的部分唯一索引（ON CONFLICT 依赖它）。"""
+    if dialect == 'postgresql':
+        sql = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    elif dialect == 'sqlite':
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    else:
+        return False
+    return db.execute(text(sql), {"name": ACTIVE_CONTRACT_POST_INDEX}).first() is not None
+
+
 # 期货品种代码到中文名称的映射表
 FUTURES_SYMBOL_NAMES = {
     # 农产品
@@ -48,6 +131,204 @@ FUTURES_SYMBOL_NAMES = {
 }
 
 
+# 候选合约表的列（各来源整理成同一结构后合并）
+CANDIDATE_COLUMNS = ['symbol', 'contract_code', 'contract_name', 'current_price', 'spot_price', 'is_continuous', 'source']
+# 实时行情中按优先级取价的列
+REALTIME_PRICE_COLUMNS = ['trade', 'close', 'settlement', 'current_price', '最新价', '现价']
+# 生成 2026 年合约时使用的主要交易月份
+GENERATED_MONTHS = ['01', '03', '05', '07', '09', '11', '12']
+
+
+# 合约代码拆分：开头字母（品种）与末 4 位年月（年份后两位 + 月份），一次正则匹配
+_CODE_PATTERN = r'^(?P<symbol>[A-Z]{1,3})?.*?(?P<year_month>(?P<year>\d{2})(?P<month>\d{2}))?$'
+
+
+def _code_parts(codes: pd.Series) -> pd.DataFrame:
+    """拆出 symbol、year_month、year、month 四列（匹配不到为 NaN）。"""
+    return codes.str.extract(_CODE_PATTERN)
+
+
+def _expiry_dates(parts: pd.DataFrame, today: Optional[date] = None) -> pd.Series:
+    """由 _code_parts 的年、月列计算到期日（合约月份的最后一天），无法解析或月份不在 1～12 时为 NaT。"""
+    current_year = (today or date.today()).year
+    year_suffix = pd.to_numeric(parts['year'], errors='coerce').to_numpy()
+    month = pd.to_numeric(parts['month'], errors='coerce').to_numpy()
+    # 两位年份取落在 [今年 - 89, 今年 + 10] 内的完整年份
+    full_year = current_year // 100 * 100 + year_suffix
+    full_year = np.where(full_year > current_year + 10, full_year - 100, full_year)
+    full_year = np.where(full_year < current_year - 89, full_year + 100, full_year)
+    valid = ~np.isnan(year_suffix) & (month >= 1) & (month <= 12)
+    expiry = np.full(len(parts), np.datetime64('NaT'), dtype='datetime64[D]')
+    # 月份序号 -> 下个月第一天 -> 前一天
+    months = ((full_year[valid] - 1970) * 12 + month[valid] - 1).astype('int64').astype('datetime64[M]')
+    expiry[valid] = (months + 1).astype('datetime64[D]') - 1
+    return pd.Series(expiry, index=parts.index)
+
+
+def contract_expiry_dates(codes: pd.Series, today: Optional[date] = None) -> pd.Series:
+    """按合约代码末 4 位（年份后两位 + 月份）批量计算到期日（合约月份的最后一天）。
+
+    年份推断规则与 FuturesSyncService.is_contract_active 相同；无法解析或月份不在 1～12 时为 NaT。
+
+    Args:
+        codes: 合约代码列。
+        today: 参考日期，默认今天。
+
+    Returns:
+        pd.Series: 与 codes 同索引的到期日（datetime64）。
+    """
+    return _expiry_dates(_code_parts(codes.astype(str)), today)
+
+
+def _active(parts: pd.DataFrame) -> pd.Series:
+    """合约是否未过期（今天不晚于到期日）。"""
+    today = date.today()
+    return _expiry_dates(parts, today) >= pd.Timestamp(today)
+
+
+def _codes(values: pd.Series) -> pd.Series:
+    """去空白、转大写的代码列（缺失值为空串）。"""
+    return values.fillna('').astype(str).str.strip().str.upper()
+
+
+def _symbols(codes: pd.Series, parts: pd.DataFrame) -> pd.Series:
+    """合约代码开头的字母（最多 3 位）作为品种代码，没有字母时取前 2 位。"""
+    return parts['symbol'].fillna(codes.str[:2])
+
+
+def _year_month(codes: pd.Series, parts: pd.DataFrame) -> pd.Series:
+    """合约代码末 4 位年月（如 2607）；没有时用整个代码。"""
+    return parts['year_month'].fillna(codes)
+
+
+def _variety_names(symbols: pd.Series) -> pd.Series:
+    """品种中文名称，映射表中没有时用品种代码。"""
+    return symbols.map(FUTURES_SYMBOL_NAMES).fillna(symbols)
+
+
+def _numeric_column(frame: pd.DataFrame, column: str) -> pd.Series:
+    """数值列（非法值为 NaN）；列不存在时整列为 NaN。"""
+    if column not in frame.columns:
+        return pd.Series(np.nan, index=frame.index)
+    return pd.to_numeric(frame[column], errors='coerce')
+
+
+def _candidate_frame(
+    symbol: Optional[pd.Series] = None,
+    contract_code: Optional[pd.Series] = None,
+    contract_name: Optional[pd.Series] = None,
+    current_price: Optional[pd.Series] = None,
+    spot_price: Optional[pd.Series] = None,
+    source: Optional[str] = None,
+) -> pd.DataFrame:
+    """构造候选合约表；不传参数时返回空表。"""
+    if contract_code is None:
+        return pd.DataFrame({
+            'symbol': pd.Series(dtype=object),
+            'contract_code': pd.Series(dtype=object),
+            'contract_name': pd.Series(dtype=object),
+            'current_price': pd.Series(dtype=float),
+            'spot_price': pd.Series(dtype=float),
+            'is_continuous': pd.Series(dtype=bool),
+            'source': pd.Series(dtype=object),
+        })
+    frame = pd.DataFrame({'symbol': symbol, 'contract_code': contract_code, 'contract_name': contract_name})
+    frame['current_price'] = np.nan if current_price is None else current_price
+    frame['spot_price'] = np.nan if spot_price is None else spot_price
+    frame['is_continuous'] = False
+    frame['source'] = source
+    return frame.reset_index(drop=True)
+
+
+def _merge_candidates(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """按来源优先级拼接候选表，同一合约代码只保留第一条（唯一的去重阶段）。"""
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return _candidate_frame()
+    merged = pd.concat(parts, ignore_index=True).drop_duplicates('contract_code', keep='first')
+    merged['is_continuous'] = merged['is_continuous'].astype(bool)
+    return merged.reset_index(drop=True)
+
+
+def _listed_contracts(contracts: List[Dict[str, any]], posted: set) -> List[Dict[str, any]]:
+    """同步后值得登记到 futures_contracts 的合约。
+
+    只登记本次真正建了/更新了帖子的合约，以及来自实时行情、交易所合约表的合约；
+    按「品种 + 26 + 月份」猜出来的生成合约没有取到价格时不登记，避免把不存在的代码
+    当成在交易的合约交给日线入库、合约解析索引与 K 线回写。
+    """
+    listed = []
+    for contract in contracts:
+        if not isinstance(contract, dict) or not contract.get('contract_code'):
+            continue
+        source = contract.get('source') or ''
+        if source == SOURCE_GENERATED and contract.get('current_price') is None:
+            continue
+        if (
+            contract['contract_code'].upper() in posted
+            or source == SOURCE_REALTIME
+            or source.startswith(SOURCE_EXCHANGE_PREFIX)
+        ):
+            listed.append(contract)
+    return listed
+
+
+def insert_missing_contracts(
+    db: Session,
+    contracts: List[Dict[str, any]],
+    today: Optional[date] = None,
+    confirmed: bool = True,
+) -> int:
+    """把 futures_contracts 中还没有的合约登记进去（不提交事务），到期日在插入时按合约代码算一次。
+
+    帖子到期清理按 futures_contracts.expiry_date 做一条集合 UPDATE，每个帖子的合约都要在表中有一行。
+    交易所优先取交易所合约表来源，其次按品种推断，都没有时为空串；代码中没有年月（如连续合约）时到期日为空。
+
+    Args:
+        db: 数据库会话。
+        contracts: 合约字典列表（contract_code、contract_name、symbol、source，缺失的键按空处理）。
+        today: 推断两位年份的参考日期，默认今天。
+        confirmed: 合约是否经行情或交易所确认；为 False（如只有帖子引用的代码）时登记为 is_active=False，
+            只用于到期清理，不进入日线入库。
+
+    Returns:
+        int: 新登记的合约数。
+    """
+    frame = pd.DataFrame(
+        [c for c in contracts if isinstance(c, dict)], columns=['symbol', 'contract_code', 'contract_name', 'source']
+    )
+    frame['contract_code'] = _codes(frame['contract_code'])
+    existing = {code.upper() for code in db.execute(select(FuturesContract.contract_code)).scalars()}
+    frame = frame[(frame['contract_code'] != '') & ~frame['contract_code'].isin(existing)]
+    frame = frame.drop_duplicates('contract_code')
+    if frame.empty:
+        return 0
+
+    codes = frame['contract_code']
+    parts = _code_parts(codes)
+    symbols = _codes(frame['symbol'])
+    symbols = symbols.where(symbols != '', _symbols(codes, parts))
+    sources = frame['source'].fillna('').astype(str)
+    exchanges = sources.str[len(SOURCE_EXCHANGE_PREFIX):].str.upper().where(
+        sources.str.startswith(SOURCE_EXCHANGE_PREFIX), symbols.map(infer_exchange_code)
+    )
+    names = frame['contract_name'].fillna('').astype(str).str.strip()
+    expiry = _expiry_dates(parts, today)
+    rows = pd.DataFrame({
+        'contract_code': codes,
+        'contract_name': names.where(names != '', codes),
+        'exchange_code': exchanges.fillna(''),
+        'expiry_date': expiry.dt.date,
+        'is_active': confirmed & (expiry.isna() | (expiry >= pd.Timestamp(today or date.today()))),
+    })
+    rows = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    # render_nulls：到期日为空的行不单独成组，整块仍是一条 executemany
+    stmt = insert(FuturesContract).execution_options(render_nulls=True)
+    for start in range(0, len(rows), _POST_UPSERT_CHUNK_SIZE):
+        db.execute(stmt, rows[start:start + _POST_UPSERT_CHUNK_SIZE])
+    return len(rows)
+
+
 class FuturesSyncService:
     """期货合约同步服务类。
 
@@ -63,6 +344,8 @@ class FuturesSyncService:
         self.db = db
         self.post_service = PostService(db)
         self.price_service = PriceUpdateService(db)
+        # 最近一次 fetch_contract_sources 的来源报告：来源名 -> {status, seconds, rows}
+        self.last_source_report: Dict[str, Dict[str, any]] = {}
 
     def parse_contract_date(self, contract_code: str) -> Tuple[Optional[int], Optional[int]]:
         """解析合约代码中的年份和月份。
@@ -95,31 +378,14 @@ class FuturesSyncService:
         if year_suffix is None or month is None:
             return False, None
 
-        # 获取当前日期
-        now = datetime.now()
-        current_year = now.year % 100  # 年份后两位
-        current_month = now.month
-        current_full_year = now.year
-
-        # 计算完整年份
-        # 期货合约年份通常在当前年份的前后几年范围内
-        # 如果年份后两位小于等于当前年份后两位，可能是当前年份或未来年份
-        # 如果年份后两位大于当前年份后两位，可能是过去年份
-        if year_suffix <= current_year:
-            # 可能是当前年份或未来年份
-            full_year = 2000 + year_suffix
-            # 如果年份后两位明显小于当前年份（差距超过5年），可能是未来年份
-            if year_suffix < current_year - 5:
-                full_year = 2000 + year_suffix + 100
-        else:
-            # 年份后两位大于当前年份，可能是过去年份
-            # 例如：现在是2026年（26），如果看到40，可能是2040年（未来）或2040-100=1940年（过去，不合理）
-            # 所以如果差距不大（小于50），可能是过去年份
-            if year_suffix - current_year < 50:
-                full_year = 2000 + year_suffix - 100
-            else:
-                # 差距太大，可能是未来年份
-                full_year = 2000 + year_suffix
+        # 计算完整年份：期货合约年份在当前年份前后，两位年份取落在 [今年 - 89, 今年 + 10] 内的那个
+        # 例如：现在是 2026 年，27 是 2027 年（明年的合约），99 是 1999 年
+        current_full_year = datetime.now().year
+        full_year = current_full_year // 100 * 100 + year_suffix
+        if full_year > current_full_year + 10:
+            full_year -= 100
+        elif full_year < current_full_year - 89:
+            full_year += 100
 
         # 合约到期日期通常是合约月份的最后一天
         # 但实际交割日期可能更早，我们使用月份的最后一天作为参考
@@ -157,9 +423,14 @@ class FuturesSyncService:
         except Exception:
             return False
 
-    def get_weighted_continuous_contracts(self) -> List[Dict[str, any]]:
+    def get_weighted_continuous_contracts(
+        self, continuous_list: Optional[pd.DataFrame] = None
+    ) -> List[Dict[str, any]]:
         """从 akshare 获取所有加权连续合约信息。
 
+        Args:
+            continuous_list: 已拉取的连续合约列表（futures_display_main_sina），为 None 时自行拉取。
+
         Returns:
             List[Dict]: 加权连续合约信息列表，每个字典包含：
                 - symbol: 品种代码（如 'V0', 'P0'）
@@ -172,7 +443,8 @@ class FuturesSyncService:
         
         try:
             # 获取所有连续合约列表
-            continuous_list = ak.futures_display_main_sina()
+            if continuous_list is None:
+                continuous_list = ak.futures_display_main_sina()
             
             if continuous_list.empty:
                 logger.warning("从 akshare 获取的连续合约列表为空")
@@ -228,6 +500,7 @@ class FuturesSyncService:
                         'current_price': current_price,
                         'exchange': exchange,
                         'is_continuous': True,  # 标记为连续合约
+                        'source': SOURCE_CONTINUOUS,
                     }
                     
                     contracts.append(contract_info)
@@ -243,9 +516,194 @@ class FuturesSyncService:
             logger.error(f"从 akshare 获取连续合约列表失败: {str(e)}", exc_info=True)
             return contracts
 
+    def fetch_contract_sources(self, include_continuous: bool = False) -> Dict[str, Optional[pd.DataFrame]]:
+        """并发拉取所有合约列表来源。
+
+        每个来源在独立线程中执行，超过 FUTURES_SYNC_SOURCE_TIMEOUT_SECONDS（默认 60 秒）
+        仍未返回的来源记为超时并放弃，不再阻塞本次同步。各来源的状态、耗时与行数写入
+        self.last_source_report。
+
+        Args:
+            include_continuous: 是否同时拉取连续合约列表。
+
+        Returns:
+            Dict[str, Optional[pd.DataFrame]]: 来源名 -> 数据；失败、超时或为空时为 None。
+        """
+        fetchers = {SOURCE_REALTIME: ak.futures_zh_realtime}
+        for exchange_code in EXCHANGE_LISTINGS:
+            func = getattr(ak, f'futures_contract_info_{exchange_code}', None)
+            if func is not None:
+                fetchers[f'{SOURCE_EXCHANGE_PREFIX}{exchange_code}'] = func
+        fetchers[SOURCE_SPOT] = ak.futures_spot_price
+        if include_continuous:
+            fetchers[SOURCE_CONTINUOUS] = ak.futures_display_main_sina
+
+        def run(name: str, fetch) -> Tuple[Optional[pd.DataFrame], Dict[str, any]]:
+            started = time.perf_counter()
+            try:
+                frame = fetch()
+            except Exception as e:
+                logger.warning(f"[合约来源] {name} 拉取失败: {str(e)[:100]}")
+                return None, {'status': 'error', 'seconds': round(time.perf_counter() - started, 3), 'rows': 0}
+            seconds = round(time.perf_counter() - started, 3)
+            if frame is None or frame.empty:
+                return None, {'status': 'empty', 'seconds': seconds, 'rows': 0}
+            return frame, {'status': 'ok', 'seconds': seconds, 'rows': len(frame)}
+
+        timeout = _env_int("FUTURES_SYNC_SOURCE_TIMEOUT_SECONDS", 60)
+        frames: Dict[str, Optional[pd.DataFrame]] = {}
+        report: Dict[str, Dict[str, any]] = {}
+        pool = ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix="futures_source")
+        try:
+            pending = {name: pool.submit(run, name, fetch) for name, fetch in fetchers.items()}
+            done, _ = wait(pending.values(), timeout=timeout)
+        finally:
+            # 超时的来源留在后台线程中自行结束，不等待
+            pool.shutdown(wait=False, cancel_futures=True)
+        for name, future in pending.items():
+            if future in done:
+                frames[name], report[name] = future.result()
+            else:
+                logger.warning(f"[合约来源] {name} 超过 {timeout} 秒未返回，本次忽略")
+                frames[name], report[name] = None, {'status': 'timeout', 'seconds': float(timeout), 'rows': 0}
+
+        self.last_source_report = report
+        logger.info(
+            "[合约来源] " + ", ".join(f"{name}={item['status']}/{item['seconds']}s/{item['rows']}行" for name, item in report.items())
+        )
+        return frames
+
+    def _contracts_from_realtime(self, realtime_data: pd.DataFrame) -> pd.DataFrame:
+        """从实时行情解析活跃合约（自带价格，没有价格的行丢弃）。"""
+        if 'symbol' not in realtime_data.columns:
+            return _candidate_frame()
+        codes = _codes(realtime_data['symbol'])
+
+        # 价格：按列优先级取第一个非空且非 0 的值
+        price_columns = [c for c in REALTIME_PRICE_COLUMNS if c in realtime_data.columns]
+        if not price_columns:
+            return _candidate_frame()
+        prices = realtime_data[price_columns].apply(pd.to_numeric, errors='coerce')
+        current_price = prices.where(prices != 0).bfill(axis=1).iloc[:, 0]
+
+        # 跳过连续合约等短代码（正常合约如 TA2610）与无价格的行，再跳过已过期合约
+        codes = codes[(codes.str.len() >= 4) & current_price.notna()]
+        parts = _code_parts(codes)
+        keep = _active(parts)
+        codes, parts = codes[keep], parts[keep]
+        symbols = _symbols(codes, parts)
+        year_month = _year_month(codes, parts)
+
+        # 名称：优先用行情中的 name；「XX连续」这类名称改为「XX + 年月」，没有名称时按品种映射表生成
+        contract_name = _variety_names(symbols) + year_month
+        if 'name' in realtime_data.columns:
+            names = realtime_data.loc[codes.index, 'name'].fillna('').astype(str).str.strip()
+            continuous_names = names.str.contains('连续', regex=False)
+            named = names.where(~continuous_names, names.str.replace('连续', '', regex=False).str.strip() + year_month)
+            contract_name = named.where(names != '', contract_name)
+
+        return _candidate_frame(
+            symbol=symbols,
+            contract_code=codes,
+            contract_name=contract_name,
+            current_price=current_price[codes.index],
+            source=SOURCE_REALTIME,
+        )
+
+    def _contracts_from_exchange_listing(self, listing: pd.DataFrame, source: str) -> pd.DataFrame:
+        """从交易所合约信息表解析 2026 年的活跃合约（不含价格）。"""
+        # 查找合约代码列
+        code_col = None
+        for col in listing.columns:
+            if '合约代码' in str(col) or '代码' in str(col) or 'contract' in str(col).lower():
+                code_col = col
+                break
+        if not code_col:
+            return _candidate_frame()
+
+        codes = _codes(listing[code_col])
+        keep = (
+            (codes.str.len() >= 4)
+            # 跳过列名行与期权合约（包含-C-或-P-的）
+            & ~codes.isin(['合约代码', '代码', 'CONTRACT_CODE', 'CODE'])
+            & ~codes.str.contains('-C-', regex=False)
+            & ~codes.str.contains('-P-', regex=False)
+            # 标准格式：字母+26+月份（如C2607, SC2603）
+            & codes.str.contains(r'26\d{2}$')
+        )
+        codes = codes[keep].drop_duplicates()
+        parts = _code_parts(codes)
+        active = _active(parts)
+        codes, parts = codes[active], parts[active]
+        symbols = _symbols(codes, parts)
+        return _candidate_frame(
+            symbol=symbols,
+            contract_code=codes,
+            contract_name=_variety_names(symbols) + _year_month(codes, parts),
+            source=source,
+        )
+
+    def _generated_contracts(self, spot_data: pd.DataFrame) -> pd.DataFrame:
+        """为现货表中的每个品种生成 2026 年主要月份合约（不含价格）。"""
+        if 'symbol' not in spot_data.columns:
+            return _candidate_frame()
+        grid = pd.MultiIndex.from_product(
+            [spot_data['symbol'].dropna().astype(str).unique(), GENERATED_MONTHS], names=['symbol', 'month']
+        ).to_frame(index=False)
+        codes = (grid['symbol'] + '26' + grid['month']).str.upper()
+        keep = _active(_code_parts(codes))
+        return _candidate_frame(
+            symbol=grid['symbol'][keep],
+            contract_code=codes[keep],
+            contract_name=(_variety_names(grid['symbol']) + '26' + grid['month'])[keep],
+            source=SOURCE_GENERATED,
+        )
+
+    def _dominant_contracts(self, spot_data: pd.DataFrame) -> pd.DataFrame:
+        """从现货价格表解析各品种主力合约（current_price 先取主力合约价，取到实时价后覆盖）。"""
+        if 'symbol' not in spot_data.columns or 'dominant_contract' not in spot_data.columns:
+            return _candidate_frame()
+        symbols = _codes(spot_data['symbol'])
+        codes = _codes(spot_data['dominant_contract'])
+        # 没有价格也保留：合约可能是新上市的，价格可以在后续更新
+        keep = (symbols != '') & (codes != '') & _active(_code_parts(codes))
+        return _candidate_frame(
+            symbol=symbols[keep],
+            contract_code=codes[keep],
+            # 格式：品种名称 + 合约代码（如：玉米C2607）
+            contract_name=(_variety_names(symbols) + codes)[keep],
+            current_price=_numeric_column(spot_data, 'dominant_contract_price')[keep],
+            spot_price=_numeric_column(spot_data, 'spot_price')[keep],
+            source=SOURCE_SPOT,
+        )
+
+    def _price_candidates(self, contracts: pd.DataFrame) -> pd.DataFrame:
+        """为非实时行情来源的候选合约统一取价（取到则覆盖 current_price）。
+
+        所有候选合约在一次 batch_get_futures_prices(snapshot_only=True) 中对同一份全市场快照匹配，
+        上游取价请求数与候选合约数无关；快照中没有的合约保持原值，由价格更新任务补齐。
+        """
+        pending = contracts['source'].ne(SOURCE_REALTIME) & ~contracts['is_continuous']
+        codes = contracts.loc[pending, 'contract_code']
+        if codes.empty:
+            return contracts
+        try:
+            price_map = self.price_service.market_data_service.batch_get_futures_prices(codes.tolist(), snapshot_only=True)
+        except Exception as e:
+            logger.warning(f"批量获取候选合约价格失败: {e}")
+            return contracts
+        prices = pd.to_numeric(codes.map(lambda code: price_map.get(code)), errors='coerce')
+        contracts.loc[pending, 'current_price'] = prices.fillna(contracts.loc[pending, 'current_price'])
+        logger.info(f"候选合约取价: 请求 {len(codes)} 个，命中 {int(prices.notna().sum())} 个")
+        return contracts
+
     def get_all_futures_contracts(self, include_continuous: bool = False) -> List[Dict[str, any]]:
         """从 akshare 获取所有期货合约信息。
 
+        各来源并发拉取（fetch_contract_sources），分别整理成同一列结构的候选表，按优先级
+        「实时行情 → 交易所合约表 → 生成的 2026 年合约 → 现货表主力合约 → 连续合约」拼接，
+        同一合约代码只保留第一条。
+
         Args:
             include_continuous: 是否包含加权连续合约（默认 False）。
 
@@ -256,371 +714,58 @@ class FuturesSyncService:
                 - contract_name: 合约名称
                 - current_price: 当前价格
                 - spot_price: 现货价格
+                - source: 来源名（realtime / exchange_* / generated / spot / continuous）
         """
         contracts = []
-        
+
         try:
-            # 方法1: 优先从实时行情获取所有活跃合约
-            realtime_contracts = set()  # 记录从实时行情获取的合约代码，避免重复
-            try:
-                logger.info("尝试从实时行情获取所有活跃合约...")
-                realtime_data = ak.futures_zh_realtime()
-                
-                if realtime_data is not None and not realtime_data.empty and 'symbol' in realtime_data.columns:
-                    logger.info(f"从实时行情获取到 {len(realtime_data)} 个合约数据")
-                    
-                    # 处理实时行情数据
-                    for _, row in realtime_data.iterrows():
-                        try:
-                            contract_code = str(row.get('symbol', '')).strip().upper()
-                            
-                            # 跳过连续合约代码（格式：1-2个字母 + 0，如 V0, P0, TA0）
-                            # 正常合约代码格式：字母 + 数字 + 数字 + 数字 + 数字（如 TA2610）
-                            # 判断：如果代码长度 <= 3 且以 0 结尾，则是连续合约
-                            if not contract_code or len(contract_code) < 4:
-                                continue
-                            # 只跳过真正的连续合约（长度 <= 3 且以 0 结尾）
-                            if len(contract_code) <= 3 and contract_code.endswith('0'):
-                                continue
-                            
-                            # 检查合约是否活跃（未过期）
-                            is_active, expiry_date = self.is_contract_active(contract_code)
-                            if not is_active:
-                                logger.debug(f"跳过已过期合约: {contract_code} (到期日期: {expiry_date})")
-                                continue
-                            
-                            # 获取价格
-                            current_price = None
-                            for price_col in ['trade', 'close', 'settlement', 'current_price', '最新价', '现价']:
-                                if price_col in row.index:
-                                    price_value = row.get(price_col)
-                                    if pd.notna(price_value) and price_value != 0:
-                                        try:
-                                            current_price = float(price_value)
-                                            break
-                                        except (ValueError, TypeError):
-                                            continue
-                            
-                            # 如果没有价格，跳过
-                            if current_price is None:
-                                logger.debug(f"无法获取合约 {contract_code} 的价格，跳过")
-                                continue
-                            
-                            # 提取品种代码（合约代码的前1-2个字符）
-                            symbol = contract_code[:2] if len(contract_code) >= 2 and contract_code[1].isdigit() else contract_code[:1]
-                            
-                            # 获取合约名称（优先使用实时行情中的name字段）
-                            contract_name = None
-                            if 'name' in row.index:
-                                name_value = row.get('name')
-                                if pd.notna(name_value) and name_value:
-                                    name_str = str(name_value).strip()
-                                    # 如果名称包含"连续"，说明这是连续合约的名称，需要根据合约代码生成
-                                    if '连续' in name_str:
-                                        # 提取品种名称（去掉"连续"）
-                                        variety_name = name_str.replace('连续', '').strip()
-                                        # 从合约代码中提取年份月份部分（最后4位数字）
-                                        import re
-                                        year_month_match = re.search(r'(\d{4})$', contract_code)
-                                        if year_month_match:
-                                            year_month = year_month_match.group(1)
-                                            contract_name = f"{variety_name}{year_month}"
-                                        else:
-                                            # 如果无法提取年份月份，直接拼接
-                                            contract_name = f"{variety_name}{contract_code}"
-                                    else:
-                                        # 如果名称已经是完整合约名称（如 PTA2605），直接使用
-                                        contract_name = name_str
-                            
-                            # 如果没有从实时行情获取到名称，使用映射表生成
-                            if not contract_name:
-                                # 获取品种中文名称
-                                variety_name = FUTURES_SYMBOL_NAMES.get(symbol, symbol)
-                                # 从合约代码中提取年份月份部分（最后4位数字）
-                                import re
-                                year_month_match = re.search(r'(\d{4})$', contract_code)
-                                if year_month_match:
-                                    year_month = year_month_match.group(1)
-                                    contract_name = f"{variety_name}{year_month}"
-                                else:
-                                    # 如果无法提取年份月份，直接拼接
-                                    contract_name = f"{variety_name}{contract_code}"
-                            
-                            # 构建合约信息
-                            contract_info = {
-                                'symbol': symbol,
-                                'contract_code': contract_code,
-                                'contract_name': contract_name,
-                                'current_price': current_price,
-                                'spot_price': None,  # 实时行情没有现货价格
-                                'is_continuous': False,
-                            }
-                            
-                            contracts.append(contract_info)
-                            realtime_contracts.add(contract_code)
-                            
-                        except Exception as e:
-                            logger.debug(f"处理实时行情合约数据时出错: {e}")
-                            continue
-                    
-                    if contracts and len(contracts) > 0:
-                        logger.info(f"从实时行情成功获取 {len(contracts)} 个活跃合约")
-            except Exception as e:
-                logger.warning(f"从实时行情获取合约失败，尝试备用方法: {str(e)[:100]}")
-            
-            # 方法2: 从各交易所获取2026年的合约信息
-            try:
-                logger.info("尝试从各交易所获取2026年合约信息...")
-                exchanges = {
-                    'shfe': '上海期货交易所',
-                    'czce': '郑州商品交易所',
-                    'cffex': '中国金融期货交易所',
-                    'ine': '上海国际能源交易中心'
-                }
-                
-                exchange_contracts = []
-                for exchange_code, exchange_name in exchanges.items():
-                    try:
-                        func_name = f'futures_contract_info_{exchange_code}'
-                        if hasattr(ak, func_name):
-                            func = getattr(ak, func_name)
-                            contracts = func()
-                            
-                            if not contracts.empty:
-                                # 查找合约代码列
-                                code_col = None
-                                for col in contracts.columns:
-                                    if '合约代码' in str(col) or '代码' in str(col) or 'contract' in str(col).lower():
-                                        code_col = col
-                                        break
-                                
-                                if code_col:
-                                    # 筛选2026年的合约
-                                    processed_contracts = set()  # 用于去重
-                                    for _, row in contracts.iterrows():
-                                        contract_code = str(row[code_col]).upper().strip()
-                                        
-                                        # 跳过无效的合约代码（如列名、空值等）
-                                        if not contract_code or len(contract_code) < 4:
-                                            continue
-                                        if contract_code in ['合约代码', '代码', 'CONTRACT_CODE', 'CODE']:
-                                            continue
-                                        
-                                        # 去重
-                                        if contract_code in processed_contracts:
-                                            continue
-                                        processed_contracts.add(contract_code)
-                                        
-                                        # 跳过期权合约（包含-C-或-P-的）
-                                        if '-C-' in contract_code or '-P-' in contract_code:
-                                            continue
-                                        
-                                        # 检查是否是2026年的合约
-                                        # 标准格式：字母+26+月份（如C2607, SC2603）
-                                        if re.search(r'26\d{2}$', contract_code):
-                                            # 检查合约是否活跃
-                                            is_active, expiry_date = self.is_contract_active(contract_code)
-                                            if is_active:
-                                                # 提取品种代码
-                                                symbol_match = re.match(r'^([A-Z]{1,3})', contract_code)
-                                                symbol = symbol_match.group(1) if symbol_match else contract_code[:2]
-                                                
-                                                # 获取品种中文名称
-                                                variety_name = FUTURES_SYMBOL_NAMES.get(symbol, symbol)
-                                                
-                                                # 生成合约名称
-                                                year_month_match = re.search(r'(\d{4})$', contract_code)
-                                                if year_month_match:
-                                                    year_month = year_month_match.group(1)
-                                                    contract_name = f"{variety_name}{year_month}"
-                                                else:
-                                                    contract_name = f"{variety_name}{contract_code}"
-                                                
-                                                # 尝试获取价格（但不强制要求）
-                                                price = None
-                                                try:
-                                                    price = self.price_service.get_futures_spot_price(contract_code)
-                                                except Exception as e:
-                                                    logger.debug(f"无法获取合约 {contract_code} 的价格: {e}")
-                                                
-                                                # 即使无法获取价格，如果合约是活跃的，也添加（价格可以为None）
-                                                exchange_contracts.append({
-                                                    'symbol': symbol,
-                                                    'contract_code': contract_code,
-                                                    'contract_name': contract_name,
-                                                    'current_price': price,  # 可能为None，后续价格更新任务会填充
-                                                    'spot_price': None,
-                                                    'is_continuous': False,
-                                                })
-                                                realtime_contracts.add(contract_code)
-                    except Exception as e:
-                        logger.debug(f"获取 {exchange_name} 合约信息失败: {e}")
-                
-                if exchange_contracts and len(exchange_contracts) > 0:
-                    logger.info(f"从各交易所获取到 {len(exchange_contracts)} 个活跃合约")
-                    # 确保contracts是列表
-                    if not isinstance(contracts, list):
-                        contracts = list(contracts) if contracts is not None else []
-                    contracts.extend(exchange_contracts)
-            except Exception as e:
-                logger.warning(f"从各交易所获取合约失败: {str(e)[:100]}")
-            
-            # 方法3: 为所有品种生成2026年的主要合约月份，并验证是否活跃
-            try:
-                logger.info("尝试为所有品种生成2026年合约...")
-                spot_data = ak.futures_spot_price()
-                
-                if not spot_data.empty:
-                    all_symbols = spot_data['symbol'].unique().tolist()
-                    # 主要交易月份
-                    main_months = ['01', '03', '05', '07', '09', '11', '12']
-                    
-                    generated_contracts = []
-                    for symbol in all_symbols:
-                        for month in main_months:
-                            contract_code = f"{symbol}26{month}".upper()
-                            
-                            # 跳过已经在实时行情或交易所数据中出现的合约
-                            if contract_code in realtime_contracts:
-                                continue
-                            
-                            # 检查合约是否活跃（未过期）
-                            is_active, expiry_date = self.is_contract_active(contract_code)
-                            if not is_active:
-                                continue
-                            
-                            # 尝试获取价格验证合约是否真的活跃
-                            price = None
-                            try:
-                                price = self.price_service.get_futures_spot_price(contract_code)
-                            except Exception as e:
-                                logger.debug(f"无法获取合约 {contract_code} 的价格: {e}")
-                            
-                            # 即使无法获取价格，如果合约是活跃的，也添加
-                            # 获取品种中文名称
-                            variety_name = FUTURES_SYMBOL_NAMES.get(symbol, symbol)
-                            contract_name = f"{variety_name}26{month}"
-                            
-                            generated_contracts.append({
-                                'symbol': symbol,
-                                'contract_code': contract_code,
-                                'contract_name': contract_name,
-                                'current_price': price,
-                                'spot_price': None,
-                                'is_continuous': False,
-                            })
-                            realtime_contracts.add(contract_code)
-                    
-                    if generated_contracts:
-                        logger.info(f"为所有品种生成了 {len(generated_contracts)} 个2026年合约")
-                        if not isinstance(contracts, list):
-                            contracts = list(contracts) if contracts is not None else []
-                        contracts.extend(generated_contracts)
-            except Exception as e:
-                logger.warning(f"生成2026年合约失败: {str(e)[:100]}")
-            
-            # 方法4: 备用方法 - 从期货现货价格数据获取，但只添加未在实时行情中出现的品种
-            spot_data = ak.futures_spot_price()
-            
-            if not spot_data.empty:
-                logger.info(f"从期货现货价格数据获取到 {len(spot_data)} 个期货品种数据，补充实时行情未覆盖的品种")
-                
-                for _, row in spot_data.iterrows():
-                    try:
-                        symbol = str(row.get('symbol', '')).strip().upper()
-                        dominant_contract = str(row.get('dominant_contract', '')).strip()
-                        dominant_price = row.get('dominant_contract_price')
-                        spot_price = row.get('spot_price')
-                        
-                        if not symbol or not dominant_contract:
-                            continue
-                        
-                        # 确保合约代码是大写格式（如 C2407）
-                        contract_code = dominant_contract.upper()
-                        
-                        # 如果这个合约已经在实时行情中出现，跳过
-                        if contract_code in realtime_contracts:
-                            continue
-                        
-                        # 检查合约是否活跃（未过期）
-                        is_active, expiry_date = self.is_contract_active(contract_code)
-                        if not is_active:
-                            logger.debug(f"跳过已过期合约: {contract_code} (到期日期: {expiry_date})")
-                            continue
-                        
-                        # 尝试通过价格验证合约是否真的活跃
-                        # 如果能获取到实时价格，说明合约活跃
-                        current_price = None
-                        try:
-                            # 尝试获取实时价格
-                            realtime_price = self.price_service.get_futures_spot_price(contract_code)
-                            if realtime_price is not None:
-                                current_price = realtime_price
-                        except Exception as e:
-                            logger.debug(f"无法获取合约 {contract_code} 的实时价格: {e}")
-                        
-                        # 如果无法获取实时价格，使用主力合约价格（但需要再次验证）
-                        if current_price is None:
-                            if pd.notna(dominant_price):
-                                try:
-                                    current_price = float(dominant_price)
-                                except (ValueError, TypeError):
-                                    pass
-                        
-                        # 如果仍然没有价格，不强制要求（合约可能是新上市的，暂时没有价格数据）
-                        # 只要合约是活跃的（未过期），就创建帖子，价格可以在后续更新
-                        # 注释掉价格验证，允许创建没有价格的活跃合约
-                        # if current_price is None:
-                        #     # 尝试通过价格验证
-                        #     if not self.verify_contract_active_by_price(contract_code):
-                        #         logger.debug(f"无法获取合约 {contract_code} 的价格，可能已不活跃，跳过")
-                        #         continue
-                        
-                        # 获取品种中文名称
-                        variety_name = FUTURES_SYMBOL_NAMES.get(symbol, symbol)
-                        # 生成合约名称，格式：品种名称 + 合约代码（如：玉米C2607）
-                        contract_name = f"{variety_name}{contract_code}"
-                        
-                        # 构建合约信息
-                        contract_info = {
-                            'symbol': symbol,
-                            'contract_code': contract_code,
-                            'contract_name': contract_name,
-                            'current_price': current_price,
-                            'spot_price': float(spot_price) if pd.notna(spot_price) else None,
-                            'is_continuous': False,  # 标记为主力合约
-                        }
-                        
-                        contracts.append(contract_info)
-                        
-                    except Exception as e:
-                        logger.warning(f"处理期货合约数据时出错: {e}, 行数据: {row.to_dict()}")
-                        continue
-            
-            # 如果包含连续合约，添加连续合约
-            continuous_count = 0
-            if include_continuous:
-                continuous_contracts = self.get_weighted_continuous_contracts()
-                continuous_count = len(continuous_contracts)
-                contracts.extend(continuous_contracts)
-            
-            # 确保contracts是列表
-            if not isinstance(contracts, list):
-                contracts = list(contracts) if contracts is not None else []
-            
+            frames = self.fetch_contract_sources(include_continuous=include_continuous)
+            candidates = self.extract_candidates(frames)
+            if frames.get(SOURCE_CONTINUOUS) is not None:
+                continuous = self.get_weighted_continuous_contracts(continuous_list=frames[SOURCE_CONTINUOUS])
+                candidates = _merge_candidates([candidates, pd.DataFrame(continuous, columns=CANDIDATE_COLUMNS)])
+
+            candidates = self._price_candidates(candidates)
+            # NaN 转为 None，保持原来的字典结构
+            contracts = candidates.astype(object).where(candidates.notna(), None).to_dict('records')
+
+            continuous_count = int(candidates['is_continuous'].sum())
             dominant_count = len(contracts) - continuous_count
             logger.info(f"成功解析 {len(contracts)} 个期货合约（主力合约: {dominant_count}, 连续合约: {continuous_count}）")
             return contracts
-            
+
         except Exception as e:
             logger.error(f"从 akshare 获取期货合约列表失败: {str(e)}", exc_info=True)
             return contracts
 
+    def extract_candidates(self, frames: Dict[str, Optional[pd.DataFrame]]) -> pd.DataFrame:
+        """把各来源数据整理成候选合约表并合并去重（不含连续合约与取价）。
+
+        Args:
+            frames: fetch_contract_sources 的结果。
+
+        Returns:
+            pd.DataFrame: 列为 CANDIDATE_COLUMNS，同一合约代码只保留优先级最高的来源。
+        """
+        parts = []
+        if frames.get(SOURCE_REALTIME) is not None:
+            parts.append(self._contracts_from_realtime(frames[SOURCE_REALTIME]))
+        for exchange_code in EXCHANGE_LISTINGS:
+            source = f'{SOURCE_EXCHANGE_PREFIX}{exchange_code}'
+            if frames.get(source) is not None:
+                parts.append(self._contracts_from_exchange_listing(frames[source], source))
+        spot_data = frames.get(SOURCE_SPOT)
+        if spot_data is not None:
+            parts.append(self._generated_contracts(spot_data))
+            parts.append(self._dominant_contracts(spot_data))
+        return _merge_candidates(parts)
+
     def sync_futures_to_posts(
         self,
         author_id: int,
         update_existing: bool = False,
-        include_continuous: bool = False
+        include_continuous: bool = False,
+        bulk: bool = True,
     ) -> Dict[str, int]:
         """同步期货合约到帖子。
 
@@ -630,6 +775,9 @@ class FuturesSyncService:
         Args:
             author_id: 作者用户ID（通常是系统管理员）。
             update_existing: 是否更新已存在的帖子（默认 False，只创建新帖子）。
+            include_continuous: 是否包含加权连续合约。
+            bulk: 是否批量写入（默认 True）：所有新增/变更行在内存中构造后分块写入、一次提交；
+                为 False 时逐个合约创建/更新并提交。
 
         Returns:
             Dict: 同步结果统计：
@@ -638,6 +786,9 @@ class FuturesSyncService:
                 - updated: 更新的帖子数
                 - skipped: 跳过的帖子数（已存在且不更新）
                 - failed: 失败的帖子数
+                - contracts_created: 新登记到 futures_contracts 的合约数（带到期日；只登记建了/更新了帖子
+                  或来自实时行情、交易所合约表的合约，未取到价格的生成合约不登记）
+                - sources: 各合约列表来源的状态、耗时（秒）与行数
         """
         result = {
             'total': 0,
@@ -645,19 +796,22 @@ class FuturesSyncService:
             'updated': 0,
             'skipped': 0,
             'failed': 0,
+            'contracts_created': 0,
+            'sources': {},
         }
-        
+
         try:
             # 获取所有期货合约（可选择是否包含连续合约）
             contracts = self.get_all_futures_contracts(include_continuous=include_continuous)
             result['total'] = len(contracts)
-            
+            result['sources'] = self.last_source_report
+
             if not contracts:
                 logger.warning("没有获取到任何期货合约，同步终止")
                 return result
-            
+
             logger.info(f"开始同步 {len(contracts)} 个期货合约到帖子...")
-            
+
             # 获取所有已存在的帖子（按合约代码）
             existing_posts = {
                 post.contract_code.upper(): post
@@ -665,115 +819,221 @@ class FuturesSyncService:
                     and_(Post.status == 1, Post.contract_code.isnot(None))
                 ).all()
             }
-            
-            # 遍历每个合约，创建或更新帖子
-            for contract in contracts:
-                # 确保contract是字典
-                if not isinstance(contract, dict):
-                    logger.warning(f"跳过非字典类型的合约数据: {contract}")
-                    result['failed'] += 1
-                    continue
-                
-                contract_code = contract.get('contract_code')
-                if not contract_code:
-                    logger.warning(f"跳过无合约代码的合约: {contract}")
-                    result['failed'] += 1
-                    continue
-                
-                try:
-                    # 检查是否已存在
-                    if contract_code in existing_posts:
-                        if update_existing:
-                            # 更新现有帖子
-                            post = existing_posts[contract_code]
-                            
-                            # 更新价格
-                            if contract.get('current_price') is not None:
-                                post.current_price = contract['current_price']
-                            
-                            # 更新标题和名称（使用新的合约名称）
-                            contract_name = contract.get('contract_name', contract_code)
-                            if contract_code.upper() in contract_name.upper():
-                                post.title = contract_name
-                            else:
-                                post.title = f"{contract_name} ({contract_code})"
-                            
-                            post.updated_at = datetime.now(timezone.utc)
-                            self.db.commit()
-                            result['updated'] += 1
-                            logger.debug(f"已更新帖子: {contract_code}, 新标题: {post.title}")
-                        else:
-                            # 跳过已存在的帖子
-                            result['skipped'] += 1
-                            logger.debug(f"跳过已存在的帖子: {contract_code}")
-                        continue
-                    
-                    # 创建新帖子
-                    current_price = contract.get('current_price')
-                    
-                    # 如果没有价格，设置一个默认的止损价（价格的 95%）
-                    stop_loss = None
-                    if current_price is not None:
-                        stop_loss = current_price * 0.95
-                    else:
-                        # 如果没有价格，使用一个默认值（后续管理员可以修改）
-                        stop_loss = 0.0
-                    
-                    # 创建帖子标题（使用合约名称）
-                    contract_name = contract.get('contract_name', contract_code)
-                    # 如果名称已经包含合约代码，直接使用；否则添加合约代码
-                    if contract_code.upper() in contract_name.upper():
-                        title = contract_name
-                    else:
-                        title = f"{contract_name} ({contract_code})"
-                    
-                    # 创建帖子内容（默认内容，管理员可以后续编辑）
-                    content = f"期货合约 {contract_code} 的交易建议。\n\n"
-                    content += f"品种代码: {contract['symbol']}\n"
-                    if current_price is not None:
-                        content += f"当前价格: {current_price}\n"
-                    if contract.get('spot_price') is not None:
-                        content += f"现货价格: {contract['spot_price']}\n"
-                    content += "\n请管理员编辑此帖子的交易建议、止损价、止盈价等信息。"
-                    
-                    # 创建帖子
-                    post = self.post_service.create_post(
-                        author_id=author_id,
-                        title=title,
-                        contract_code=contract_code,
-                        stop_loss=stop_loss,
-                        content=content,
-                        current_price=current_price,
-                        direction='buy',  # 默认做多
-                        suggestion="待管理员编辑建议",
-                    )
-                    
-                    result['created'] += 1
-                    logger.info(f"已创建新帖子: {contract_code} (post_id: {post.post_id})")
-                    
-                except Exception as e:
-                    result['failed'] += 1
-                    logger.error(f"处理合约 {contract_code} 时出错: {str(e)}", exc_info=True)
-                    continue
-            
+
+            if bulk:
+                posted = self._bulk_sync_posts(contracts, author_id, update_existing, existing_posts, result)
+            else:
+                posted = self._sync_posts_one_by_one(contracts, author_id, update_existing, existing_posts, result)
+            result['contracts_created'] = insert_missing_contracts(self.db, _listed_contracts(contracts, posted))
+
             self.db.commit()
-            
+            invalidate_post_counts()
+            invalidate_contract_index()
+
             logger.info(
                 f"期货合约同步完成: "
                 f"总数={result['total']}, "
                 f"创建={result['created']}, "
                 f"更新={result['updated']}, "
                 f"跳过={result['skipped']}, "
-                f"失败={result['failed']}"
+                f"失败={result['failed']}, "
+                f"新登记合约={result['contracts_created']}"
             )
-            
+
             return result
-            
+
         except Exception as e:
             logger.error(f"同步期货合约到帖子失败: {str(e)}", exc_info=True)
+            self.db.rollback()
             result['failed'] = result['total']  # 标记为全部失败
             return result
 
+    def _bulk_sync_posts(
+        self,
+        contracts: List[Dict[str, any]],
+        author_id: int,
+        update_existing: bool,
+        existing_posts: Dict[str, Post],
+        result: Dict[str, int],
+    ) -> set:
+        """在内存中构造所有新增/变更行，分块写入（不提交事务），返回建了或更新了帖子的合约代码。
+
+        PostgreSQL / SQLite 上已建 uq_posts_active_contract_code 部分唯一索引时用
+        INSERT ... ON CONFLICT (contract_code) WHERE status = 1 DO UPDATE / DO NOTHING ... RETURNING，
+        与管理员同时手动发帖也不会产生重复，计数按实际返回的行（并发插入而被跳过的行计入 skipped）；
+        否则按已加载的帖子区分新增与更新，分别 executemany。
+        """
+        now = datetime.now(timezone.utc)
+        rows: List[Dict[str, any]] = []
+        inserts: List[Dict[str, any]] = []
+        updates: List[Dict[str, any]] = []
+        updated_codes = set()
+        seen = set()
+        for contract in contracts:
+            contract_code = contract.get('contract_code') if isinstance(contract, dict) else None
+            if not contract_code:
+                logger.warning(f"跳过无合约代码的合约: {contract}")
+                result['failed'] += 1
+                continue
+            contract_code = contract_code.upper()
+            if contract_code in seen:
+                result['skipped'] += 1
+                continue
+            seen.add(contract_code)
+
+            post = existing_posts.get(contract_code)
+            if post is not None and not update_existing:
+                result['skipped'] += 1
+                continue
+
+            current_price = contract.get('current_price')
+            row = {
+                'author_id': author_id,
+                'title': _post_title(contract_code, contract.get('contract_name', contract_code)),
+                'contract_code': contract_code,
+                # 没有价格时止损价先记 0，后续管理员可以修改
+                'stop_loss': current_price * 0.95 if current_price is not None else 0.0,
+                'content': _post_content(contract_code, contract, current_price),
+                'current_price': current_price,
+                'direction': 'buy',  # 默认做多
+                'suggestion': "待管理员编辑建议",
+                'status': 1,
+                'publish_time': now,
+                'updated_at': now,
+            }
+            rows.append(row)
+            if post is None:
+                inserts.append(row)
+            else:
+                updated_codes.add(contract_code)
+                updates.append({
+                    'post_id': post.post_id,
+                    'title': row['title'],
+                    'current_price': current_price if current_price is not None else post.current_price,
+                    'updated_at': now,
+                })
+
+        dialect = self.db.get_bind().dialect.name
+        if _has_active_contract_index(self.db, dialect):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            # 已存在的帖子也以完整行参与 INSERT，冲突时只更新标题、现价与更新时间
+            written = set()
+            for start in range(0, len(rows), _POST_UPSERT_CHUNK_SIZE):
+                stmt = dialect_insert(Post).values(rows[start:start + _POST_UPSERT_CHUNK_SIZE])
+                # 谓词写成字面量：绑定参数无法推断出部分唯一索引
+                conflict = {'index_elements': [Post.contract_code], 'index_where': text('status = 1')}
+                if update_existing:
+                    stmt = stmt.on_conflict_do_update(
+                        set_={
+                            'title': stmt.excluded.title,
+                            'current_price': func.coalesce(stmt.excluded.current_price, Post.current_price),
+                            'updated_at': stmt.excluded.updated_at,
+                        },
+                        **conflict,
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(**conflict)
+                written.update(self.db.execute(stmt.returning(Post.contract_code)).scalars())
+            # DO NOTHING 跳过的行（其他请求刚发布了同合约帖子）不返回
+            created_codes = written - updated_codes
+            updated_codes &= written
+            result['skipped'] += len(rows) - len(written)
+        else:
+            for start in range(0, len(inserts), _POST_UPSERT_CHUNK_SIZE):
+                self.db.execute(insert(Post), inserts[start:start + _POST_UPSERT_CHUNK_SIZE])
+            for start in range(0, len(updates), _POST_UPSERT_CHUNK_SIZE):
+                self.db.execute(update(Post), updates[start:start + _POST_UPSERT_CHUNK_SIZE])
+            created_codes = {row['contract_code'] for row in inserts}
+
+        result['created'] += len(created_codes)
+        result['updated'] += len(updated_codes)
+        logger.info(f"批量写入帖子: 新建 {len(created_codes)} 条，更新 {len(updated_codes)} 条")
+        return created_codes | updated_codes
+
+    def _sync_posts_one_by_one(
+        self,
+        contracts: List[Dict[str, any]],
+        author_id: int,
+        update_existing: bool,
+        existing_posts: Dict[str, Post],
+        result: Dict[str, int],
+    ) -> set:
+        """逐个合约创建或更新帖子（每个帖子单独提交），返回建了或更新了帖子的合约代码。"""
+        posted = set()
+        for contract in contracts:
+            # 确保contract是字典
+            if not isinstance(contract, dict):
+                logger.warning(f"跳过非字典类型的合约数据: {contract}")
+                result['failed'] += 1
+                continue
+
+            contract_code = contract.get('contract_code')
+            if not contract_code:
+                logger.warning(f"跳过无合约代码的合约: {contract}")
+                result['failed'] += 1
+                continue
+
+            try:
+                # 检查是否已存在
+                if contract_code in existing_posts:
+                    if update_existing:
+                        # 更新现有帖子
+                        post = existing_posts[contract_code]
+
+                        # 更新价格
+                        if contract.get('current_price') is not None:
+                            post.current_price = contract['current_price']
+
+                        # 更新标题和名称（使用新的合约名称）
+                        post.title = _post_title(contract_code, contract.get('contract_name', contract_code))
+                        post.updated_at = datetime.now(timezone.utc)
+                        self.db.commit()
+                        result['updated'] += 1
+                        posted.add(contract_code.upper())
+                        logger.debug(f"已更新帖子: {contract_code}, 新标题: {post.title}")
+                    else:
+                        # 跳过已存在的帖子
+                        result['skipped'] += 1
+                        logger.debug(f"跳过已存在的帖子: {contract_code}")
+                    continue
+
+                # 创建新帖子
+                current_price = contract.get('current_price')
+
+                # 如果没有价格，设置一个默认的止损价（价格的 95%）
+                stop_loss = None
+                if current_price is not None:
+                    stop_loss = current_price * 0.95
+                else:
+                    # 如果没有价格，使用一个默认值（后续管理员可以修改）
+                    stop_loss = 0.0
+
+                # 创建帖子
+                post = self.post_service.create_post(
+                    author_id=author_id,
+                    title=_post_title(contract_code, contract.get('contract_name', contract_code)),
+                    contract_code=contract_code,
+                    stop_loss=stop_loss,
+                    content=_post_content(contract_code, contract, current_price),
+                    current_price=current_price,
+                    direction='buy',  # 默认做多
+                    suggestion="待管理员编辑建议",
+                )
+
+                result['created'] += 1
+                posted.add(contract_code.upper())
+                logger.info(f"已创建新帖子: {contract_code} (post_id: {post.post_id})")
+
+            except Exception as e:
+                result['failed'] += 1
+                logger.error(f"处理合约 {contract_code} 时出错: {str(e)}", exc_info=True)
+                continue
+        return posted
+
     def get_post_by_contract_code(self, contract_code: str) -> Optional[Post]:
         """根据合约代码获取帖子。
 
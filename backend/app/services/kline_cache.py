@@ -0,0 +1,304 @@
+"""K 线接口响应缓存（进程内 LRU + TTL，可选 Redis 共享层）。
+
+设计原因：
+1. 详情页每次打开、KlineChart 每 5 分钟轮询都会请求 /api/v1/kline，完整链路是
+   查库拿交易所提示 → Tushare/JSON → pandas 规整，而日线一个交易日只变一次。
+2. 以 (合约, period, start, end) 为键缓存「已序列化的响应体 + 强 ETag」：命中时不再序列化，
+   客户端带 If-None-Match 时只需比较哈希即可返回 304。
+3. TTL 按交易日计算：收盘后结算数据发布窗口（15:00–20:00，北京时间）内短 TTL 以便尽快拿到当日 K 线，
+   其余时间缓存到下一个交易日 15:00；同时受 KLINE_CACHE_MAX_TTL_SECONDS 上限约束（JSON 文件可能随时更新）。
+4. 配置 KLINE_CACHE_REDIS_URL 且安装 redis 时，多个 worker 共享二级缓存；Redis 不可用时自动退化为仅进程内缓存。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - 可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_TZ = ZoneInfo("Asia/Shanghai")
+# 日线（含结算价）通常在日盘收盘后数小时内发布
+_PUBLISH_START = dtime(15, 0)
+_PUBLISH_END = dtime(20, 0)
+
+CacheKey = Tuple[str, int, Optional[str], Optional[str]]
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def kline_cache_ttl(now: Optional[datetime] = None) -> int:
+    """计算日线缓存的存活秒数。
+
+    Args:
+        now: 当前时间（带时区或按北京时间理解的 naive 时间），默认取当前时间。
+
+    Returns:
+        int: TTL 秒数，至少 1 秒。
+    """
+    if now is None:
+        now = datetime.now(_TZ)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo=_TZ)
+    else:
+        now = now.astimezone(_TZ)
+
+    max_ttl = _env_int("KLINE_CACHE_MAX_TTL_SECONDS", 3600)
+    if now.weekday() < 5 and _PUBLISH_START <= now.time() < _PUBLISH_END:
+        ttl = _env_int("KLINE_CACHE_PUBLISH_TTL_SECONDS", 600)
+    else:
+        boundary = datetime.combine(now.date(), _PUBLISH_START, tzinfo=_TZ)
+        if boundary <= now:
+            boundary += timedelta(days=1)
+        while boundary.weekday() >= 5:
+            boundary += timedelta(days=1)
+        ttl = int((boundary - now).total_seconds())
+    return max(1, min(ttl, max_ttl))
+
+
+def make_etag(body: bytes) -> str:
+    """根据响应体生成强 ETag。"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否命中当前 ETag（支持列表与 *；弱比较忽略 W/ 前缀）。"""
+    if not if_none_match:
+        return False
+    for token in if_none_match.split(","):
+        token = token.strip()
+        if token == "*":
+            return True
+        if token.startswith("W/"):
+            token = token[2:]
+        if token == etag:
+            return True
+    return False
+
+
+class KlineCacheEntry:
+    """一条缓存：序列化后的响应体、ETag 与过期时间（time.time()）。"""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, expires_at: float) -> None:
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class KlineResponseCache:
+    """线程安全的 K 线响应缓存。"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        redis_client: Any = None,
+        ttl_func: Callable[[], int] = kline_cache_ttl,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """初始化缓存。
+
+        Args:
+            max_entries: 进程内最多保留的条目数，超出按 LRU 淘汰。
+            redis_client: 可选的 Redis 客户端（共享二级缓存）。
+            ttl_func: 返回新条目 TTL 秒数的函数。
+            clock: 时间函数（测试可注入）。
+        """
+        self.max_entries = max(1, max_entries)
+        self._redis = redis_client
+        self._ttl_func = ttl_func
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, KlineCacheEntry]" = OrderedDict()
+        self._building: Dict[CacheKey, threading.Lock] = {}
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(
+        contract_code: str, period: int, start_date: Optional[str], end_date: Optional[str]
+    ) -> CacheKey:
+        """规范化缓存键。"""
+        return ((contract_code or "").strip().upper(), int(period), start_date or None, end_date or None)
+
+    @staticmethod
+    def _redis_key(key: CacheKey) -> str:
+        code, period, start, end = key
+        return f"kline:v1:{code}:{period}:{start or ''}:{end or ''}"
+
+    def get_local(self, key: CacheKey) -> Optional[KlineCacheEntry]:
+        """只查进程内缓存（不触网，可在事件循环中直接调用）。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def _put_local(self, key: CacheKey, entry: KlineCacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _get_shared(self, key: CacheKey) -> Optional[KlineCacheEntry]:
+        if self._redis is None:
+            return None
+        try:
+            pipe = self._redis.pipeline()
+            rkey = self._redis_key(key)
+            pipe.get(rkey)
+            pipe.ttl(rkey)
+            raw, ttl = pipe.execute()
+        except Exception as e:
+            logger.warning("[K线缓存] 读取共享缓存失败: %s", e)
+            return None
+        if not raw or ttl is None or ttl <= 0:
+            return None
+        try:
+            data = json.loads(raw)
+            entry = KlineCacheEntry(data["body"].encode("utf-8"), data["etag"], self._clock() + ttl)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        self._put_local(key, entry)
+        return entry
+
+    def _put_shared(self, key: CacheKey, entry: KlineCacheEntry, ttl: int) -> None:
+        if self._redis is None:
+            return
+        try:
+            payload = json.dumps({"etag": entry.etag, "body": entry.body.decode("utf-8")})
+            self._redis.setex(self._redis_key(key), ttl, payload)
+        except Exception as e:
+            logger.warning("[K线缓存] 写入共享缓存失败: %s", e)
+
+    def get(self, key: CacheKey) -> Optional[KlineCacheEntry]:
+        """读取缓存（进程内 → 共享层）。"""
+        return self.get_local(key) or self._get_shared(key)
+
+    def put(self, key: CacheKey, payload: Dict[str, Any]) -> KlineCacheEntry:
+        """序列化并写入缓存，返回新条目。"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        ttl = int(self._ttl_func())
+        entry = KlineCacheEntry(body, make_etag(body), self._clock() + ttl)
+        self._put_local(key, entry)
+        self._put_shared(key, entry, ttl)
+        return entry
+
+    def get_or_build(
+        self,
+        key: CacheKey,
+        builder: Callable[[], Dict[str, Any]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda payload: True,
+    ) -> Optional[KlineCacheEntry]:
+        """读取缓存，未命中时调用 builder 生成；同一键并发未命中只构建一次。
+
+        Args:
+            key: 缓存键。
+            builder: 生成响应字典的函数（阻塞调用）。
+            cacheable: 判断结果是否可用并写入缓存（如空结果不缓存）。
+
+        Returns:
+            Optional[KlineCacheEntry]: 缓存条目；builder 结果不可缓存时返回 None。
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            try:
+                entry = self.get(key)
+                if entry is not None:
+                    return entry
+                with self._lock:
+                    self._stats["misses"] += 1
+                payload = builder()
+                if not cacheable(payload):
+                    return None
+                return self.put(key, payload)
+            finally:
+                with self._lock:
+                    if self._building.get(key) is build_lock:
+                        del self._building[key]
+
+    def invalidate(self, contract_code: Optional[str] = None) -> int:
+        """失效缓存：指定合约时只清该合约，否则全部清空（仅进程内层；共享层按 TTL 自然过期）。
+
+        Returns:
+            int: 清除的条目数。
+        """
+        code = (contract_code or "").strip().upper() or None
+        with self._lock:
+            if code is None:
+                n = len(self._entries)
+                self._entries.clear()
+                return n
+            keys = [k for k in self._entries if k[0] == code]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计。"""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries,
+                    "shared": self._redis is not None}
+
+
+def _build_redis_client() -> Any:
+    """按 KLINE_CACHE_REDIS_URL 创建 Redis 客户端；未配置或不可用时返回 None。"""
+    url = os.getenv("KLINE_CACHE_REDIS_URL", "").strip()
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("[K线缓存] 配置了 KLINE_CACHE_REDIS_URL 但未安装 redis，仅使用进程内缓存")
+        return None
+    try:
+        return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    except Exception as e:
+        logger.warning("[K线缓存] 创建 Redis 客户端失败，仅使用进程内缓存: %s", e)
+        return None
+
+
+_cache: Optional[KlineResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_kline_cache() -> KlineResponseCache:
+    """返回进程级 K 线响应缓存。"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = KlineResponseCache(
+                    max_entries=_env_int("KLINE_CACHE_MAX_ENTRIES", 512),
+                    redis_client=_build_redis_client(),
+                )
+    return _cache
@@ -1,33 +1,227 @@
 """K 线数据服务。
 
 负责从行情后端（Tushare 或本地 JSON）组装期货历史 K 线（OHLCV）。
+
+设计原因：
+1. 行情后端返回的 DataFrame 需要规整为图表格式（日期、settle 补全、high/low 修正、去重排序）。
+   原先逐行 iterrows + float()，10 年日线时这部分是接口的主要 CPU 开销；
+   现改为按列运算（normalize_kline_frame），仅在最后组装输出字典时遍历一次。
+2. 非常规取值（对象列中的字符串价格、非八位日期等）仍按逐值规则处理，保证输出与原逐行实现一致。
+3. 合约 -> ts_code 的候选顺序与已验证可用的备选代码由进程内的 ContractIndex 提供（见 contract_resolver），
+   请求路径上不再单独开数据库会话查交易所。
+4. 确认为空的 ts_code 记入负结果缓存（见 negative_cache），TTL 内不再请求。
+5. 先读 market_data 表（见 daily_bar_store），只对缺失的交易日向行情后端补取；
+   远端取到的日线回写本表，之后同一合约的请求都是本地索引区间扫描。
 """
 
 import logging
-import re
+import math
 import time
-from typing import Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 
-from app.services.market_backend import get_market_backend
 from app.database.connection import SessionLocal
-from app.database.models import FuturesContract
+from app.services.contract_resolver import ContractIndex, ContractRow, get_contract_index
+from app.services.daily_bar_store import DailyBarStore, bars_from_frame, missing_trading_days, upsert_bars
+from app.services.market_backend import get_market_backend
+from app.services.negative_cache import KIND_KLINE, KIND_KLINE_GAP, get_negative_cache
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 
+def _format_kline_date(value: Any) -> Optional[str]:
+    """单个日期值转为 "YYYY-MM-DD"（逐值规则，供非常规取值使用）。
+
+    Args:
+        value: 原始日期值（字符串、整数、浮点或时间戳）。
+
+    Returns:
+        Optional[str]: 日期字符串；缺失或无法解析时返回 None（该行丢弃）。
+    """
+    if isinstance(value, str):
+        # 八位数字 YYYYMMDD
+        if len(value) == 8:
+            return f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+        try:
+            return pd.to_datetime(value).strftime("%Y-%m-%d")
+        except Exception:
+            return str(value)
+    try:
+        if not pd.notna(value):
+            return None
+        if isinstance(value, float):
+            value = int(value)
+        ds = str(value).strip()
+        if len(ds) >= 8 and ds[:8].isdigit():
+            ds = ds[:8]
+            return f"{ds[:4]}-{ds[4:6]}-{ds[6:8]}"
+        return pd.to_datetime(ds).strftime("%Y-%m-%d")
+    except Exception:
+        return None
+
+
+def _format_kline_dates(values: pd.Series) -> np.ndarray:
+    """日期列批量转为 "YYYY-MM-DD"，结果为 object 数组（None 表示该行丢弃）。
+
+    字符串列、整数列、浮点列走向量化路径；其余取值回退到 _format_kline_date。
+    """
+    values = values.reset_index(drop=True)
+    out = np.full(len(values), None, dtype=object)
+    present = values.notna().to_numpy()
+    if not present.any():
+        return out
+
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    idx = np.flatnonzero(present)
+    raw = values[present]
+    done = np.zeros(len(idx), dtype=bool)
+
+    if kind == "string":
+        s = raw.astype(str)
+        fast = (s.str.len() == 8).to_numpy()
+        # "YYYY-MM-DD" 经 to_datetime 再格式化后与原串相同（非法日期时原逻辑也回退为原串），直接沿用
+        done = s.str.fullmatch(r"\d{4}-\d{2}-\d{2}", na=False).to_numpy() & ~fast
+        if done.any():
+            out[idx[done]] = s[done].to_numpy(dtype=object)
+    elif kind in ("integer", "floating", "mixed-integer-float"):
+        nums = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64)
+        ok = np.isfinite(nums) & (np.abs(nums) < 2.0 ** 63)
+        s = pd.Series(np.where(ok, np.trunc(np.where(ok, nums, 0)), 0).astype(np.int64).astype(str))
+        fast = ok & (s.str.len() >= 8).to_numpy() & s.str.slice(0, 8).str.isdigit().to_numpy()
+    else:
+        s = None
+        fast = np.zeros(len(idx), dtype=bool)
+
+    if fast.any():
+        f = s[fast]
+        out[idx[fast]] = (
+            f.str.slice(0, 4) + "-" + f.str.slice(4, 6) + "-" + f.str.slice(6, 8)
+        ).to_numpy(dtype=object)
+    slow = ~(fast | done)
+    if slow.any():
+        out[idx[slow]] = [_format_kline_date(v) for v in raw.to_numpy(dtype=object)[slow]]
+    return out
+
+
+def _float_column(frame: pd.DataFrame, col: str) -> Tuple[np.ndarray, np.ndarray]:
+    """按 float() 语义把一列转为 float64。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (数值，缺失为 NaN；无法转换的标记掩码)。
+    """
+    s = frame[col].reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(s), dtype=bool)
+
+    coerced = pd.to_numeric(s, errors="coerce")
+    vals = coerced.to_numpy(dtype=np.float64, na_value=np.nan)
+    bad = np.zeros(len(s), dtype=bool)
+    # to_numeric 失败但原值非空的，逐值按 float() 再判一次（如 "nan"、带空格的数字串）
+    suspect = np.flatnonzero(s.notna().to_numpy() & np.isnan(vals))
+    raw = s.to_numpy(dtype=object)
+    for i in suspect:
+        try:
+            vals[i] = float(raw[i])
+        except (TypeError, ValueError):
+            bad[i] = True
+    return vals, bad
+
+
+def normalize_kline_frame(kline_data: pd.DataFrame) -> List[Dict]:
+    """把行情后端返回的日线 DataFrame 规整为图表使用的 K 线列表。
+
+    规则：日期统一为 "YYYY-MM-DD"；OHLC 缺失时用 settle 补全，补全后仍缺失的行丢弃；
+    价格无法转换为数值的行丢弃；high/low 修正为包住开收盘；同一日期保留最后一行，按日期升序。
+
+    Args:
+        kline_data: 含 trade_date、open、high、low、close 列的 DataFrame，可选 settle、vol。
+
+    Returns:
+        List[Dict]: [{"time", "open", "high", "low", "close", "volume"(可选)}, ...]。
+    """
+    n = len(kline_data)
+    if n == 0:
+        return []
+
+    times = _format_kline_dates(kline_data['trade_date'])
+    valid = ~pd.isna(times)
+
+    if 'settle' in kline_data.columns:
+        settle, _ = _float_column(kline_data, 'settle')
+    else:
+        settle = np.full(n, np.nan)
+
+    prices = []
+    for col in ('open', 'high', 'low', 'close'):
+        vals, bad = _float_column(kline_data, col)
+        valid &= ~bad
+        vals = np.where(np.isnan(vals), settle, vals)
+        valid &= ~np.isnan(vals)
+        prices.append(vals)
+    open_p, high_p, low_p, close_p = prices
+
+    # lightweight-charts 要求 high/low 包住实体与影线，源数据偶发错乱时做一次修正
+    high_p = np.maximum(np.maximum(high_p, open_p), close_p)
+    low_p = np.minimum(np.minimum(low_p, open_p), close_p)
+    crossed = high_p < low_p
+    if crossed.any():
+        high_p = np.where(crossed, close_p, high_p)
+        low_p = np.where(crossed, close_p, low_p)
+
+    has_volume = 'vol' in kline_data.columns
+    if has_volume:
+        volume, _ = _float_column(kline_data, 'vol')
+    else:
+        volume = np.full(n, np.nan)
+
+    table = pd.DataFrame({
+        "time": times,
+        "open": open_p,
+        "high": high_p,
+        "low": low_p,
+        "close": close_p,
+        "volume": volume,
+    })[valid]
+    # 同一日多行时保留最后一行（避免 lightweight-charts 报重复时间），再按日期升序
+    table = table.drop_duplicates(subset="time", keep="last").sort_values("time", kind="stable")
+
+    kline_list = []
+    for t, o, h, l, c, v in zip(
+        table["time"].tolist(),
+        table["open"].tolist(),
+        table["high"].tolist(),
+        table["low"].tolist(),
+        table["close"].tolist(),
+        table["volume"].tolist(),
+    ):
+        item = {"time": t, "open": o, "high": h, "low": l, "close": c}
+        if has_volume and math.isfinite(v):
+            item["volume"] = int(v)
+        kline_list.append(item)
+    return kline_list
+
+
+def _has_rows(df: Any) -> bool:
+    return df is not None and isinstance(df, pd.DataFrame) and not df.empty
+
+
 class KlineService:
     """K 线数据服务类。
 
     数据源由 MARKET_DATA_SOURCE 决定。
     """
     
-    def __init__(self):
-        """初始化 K 线服务。"""
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        """初始化 K 线服务。
+
+        Args:
+            session_factory: 同步会话工厂，默认 SessionLocal（读写 market_data 表）。
+        """
         self.market_data_service = get_market_backend()
+        self._session_factory = session_factory or SessionLocal
 
     def get_futures_daily_kline(
         self,
@@ -77,71 +271,29 @@ class KlineService:
 
             logger.info(f"获取日期范围: {start_date} 到 {end_date} (请求 {period} 天数据)")
 
-            # 若库里有该合约记录（futures_sync 写入），优先用语义正确的交易所推断 ts_code，避免 PT/PR 等默认误判为 SHF
-            exchange_hint = None
-            _db = SessionLocal()
-            try:
-                _fc = (
-                    _db.query(FuturesContract)
-                    .filter(FuturesContract.contract_code == code_clean)
-                    .first()
-                )
-                if _fc and getattr(_fc, "exchange_code", None):
-                    exchange_hint = str(_fc.exchange_code).strip().upper() or None
-            finally:
-                _db.close()
-
-            ts_code = self.market_data_service.convert_contract_code_to_ts_code(
-                code_clean, exchange_hint
-            )
+            # 候选 ts_code：已记住的可用代码 → 库交易所（futures_contracts，避免 PT/PR 等默认误判为 SHF）
+            # → 品种映射（库交易所与 Tushare 不一致时，如 PT 误存为 CZCE）→ PT 强制广期所
+            index = get_contract_index()
+            candidates = index.candidates(code_clean)
             logger.info(
-                "K线 ts_code=%s（合约=%s，exchange_hint=%s）",
-                ts_code,
+                "K线 候选 ts_code=%s（合约=%s，exchange_hint=%s）",
+                candidates,
                 code_clean,
-                exchange_hint or "无，走品种映射/默认",
-            )
-            
-            kline_data = self.market_data_service.get_futures_kline(
-                ts_code=ts_code,
-                start_date=start_date,
-                end_date=end_date,
-                period=period
+                index.exchange_hint(code_clean) or "无，走品种映射/默认",
             )
 
-            # 库中 futures_contracts.exchange 若与 Tushare 不一致（如 PT 误存为 CZCE），首次会空表；再按品种映射不重试 exchange_hint
-            if (
-                (kline_data is None or not isinstance(kline_data, pd.DataFrame) or kline_data.empty)
-                and exchange_hint
-            ):
-                ts_fb = self.market_data_service.convert_contract_code_to_ts_code(code_clean, None)
-                if ts_fb != ts_code:
-                    logger.warning(
-                        "K线首次无数据，忽略库交易所=%s，改用品种映射 ts_code=%s",
-                        exchange_hint,
-                        ts_fb,
-                    )
-                    ts_code = ts_fb
-                    kline_data = self.market_data_service.get_futures_kline(
-                        ts_code=ts_code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        period=period,
-                    )
-
-            # 广期所铂 PT 曾易被误判为郑商所/上期所；最后再强制试 GFE
-            if (kline_data is None or not isinstance(kline_data, pd.DataFrame) or kline_data.empty) and re.match(
-                r"^PT\d+", code_clean
-            ):
-                ts_pt = f"{code_clean}.GFE"
-                if ts_pt != ts_code:
-                    logger.warning("K线仍无数据，PT 合约强制尝试广期所 ts_code=%s", ts_pt)
-                    ts_code = ts_pt
-                    kline_data = self.market_data_service.get_futures_kline(
-                        ts_code=ts_code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        period=period,
-                    )
+            # 先读 market_data 表（只对缺失交易日向远端补取）；库中没有该合约的日线时整段走远端
+            contract = index.contract(code_clean)
+            ts_code = candidates[0]
+            kline_data = (
+                self._read_local_bars(contract, ts_code, start_date, end_date) if contract is not None else None
+            )
+            if kline_data is None:
+                ts_code, kline_data = self._fetch_remote_bars(
+                    code_clean, index, candidates, start_date, end_date, period
+                )
+                if contract is not None and _has_rows(kline_data):
+                    self._store_bars(contract.contract_id, ts_code, kline_data)
 
             if kline_data is None or not isinstance(kline_data, pd.DataFrame) or kline_data.empty:
                 logger.warning(f"无法获取合约 {code_clean} 的 K 线数据，最后 ts_code={ts_code}")
@@ -149,117 +301,14 @@ class KlineService:
 
             logger.info(f"成功获取 {len(kline_data)} 条 K 线数据")
 
-            # 处理数据：转换为标准格式
-            kline_list = []
-            
             # 与 fut_daily 风格一致的列名（JSON 转 DataFrame 后相同）
-            date_col = 'trade_date'
-            open_col = 'open'
-            high_col = 'high'
-            low_col = 'low'
-            close_col = 'close'
-            volume_col = 'vol'
-            
-            # 检查必需的列是否存在
-            required_cols = [date_col, open_col, high_col, low_col, close_col]
+            required_cols = ['trade_date', 'open', 'high', 'low', 'close']
             if not all(col in kline_data.columns for col in required_cols):
                 logger.error(f"无法找到必需的列，合约={code_clean}。可用列: {list(kline_data.columns)}")
                 return []
-            
-            # 转换数据
-            for _, row in kline_data.iterrows():
-                try:
-                    # 处理日期（YYYYMMDD 字符串）
-                    date_value = row[date_col]
-                    if isinstance(date_value, str):
-                        # 八位数字 YYYYMMDD
-                        if len(date_value) == 8:
-                            time_str = f"{date_value[:4]}-{date_value[4:6]}-{date_value[6:8]}"
-                        else:
-                            try:
-                                date_obj = pd.to_datetime(date_value)
-                                time_str = date_obj.strftime("%Y-%m-%d")
-                            except:
-                                time_str = str(date_value)
-                    elif pd.notna(date_value):
-                        if isinstance(date_value, float):
-                            date_value = int(date_value)
-                        ds = str(date_value).strip()
-                        if len(ds) >= 8 and ds[:8].isdigit():
-                            ds = ds[:8]
-                            time_str = f"{ds[:4]}-{ds[4:6]}-{ds[6:8]}"
-                        else:
-                            time_str = pd.to_datetime(ds).strftime("%Y-%m-%d")
-                    else:
-                        continue
-                    
-                    # 处理价格（转换为浮点数）；Tushare 部分行 OHLC 空缺时用 settle 补全
-                    settle_price = None
-                    if 'settle' in kline_data.columns and pd.notna(row.get('settle')):
-                        try:
-                            settle_price = float(row['settle'])
-                            if np.isnan(settle_price):
-                                settle_price = None
-                        except (TypeError, ValueError):
-                            settle_price = None
-
-                    open_price = float(row[open_col]) if pd.notna(row[open_col]) else None
-                    high_price = float(row[high_col]) if pd.notna(row[high_col]) else None
-                    low_price = float(row[low_col]) if pd.notna(row[low_col]) else None
-                    close_price = float(row[close_col]) if pd.notna(row[close_col]) else None
-
-                    if open_price is None or np.isnan(open_price):
-                        open_price = settle_price
-                    if high_price is None or np.isnan(high_price):
-                        high_price = settle_price
-                    if low_price is None or np.isnan(low_price):
-                        low_price = settle_price
-                    if close_price is None or np.isnan(close_price):
-                        close_price = settle_price
-
-                    if any(p is None or (isinstance(p, float) and np.isnan(p)) for p in [open_price, high_price, low_price, close_price]):
-                        continue
-
-                    # lightweight-charts 要求 high/low 包住实体与影线，源数据偶发错乱时做一次修正
-                    high_price = float(max(high_price, open_price, close_price))
-                    low_price = float(min(low_price, open_price, close_price))
-                    if high_price < low_price:
-                        high_price = low_price = float(close_price)
-                    
-                    # 处理成交量（可选）
-                    volume = None
-                    if volume_col in kline_data.columns:
-                        vol_value = row[volume_col]
-                        if pd.notna(vol_value):
-                            try:
-                                volume = int(float(vol_value))
-                            except:
-                                pass
-                    
-                    kline_item = {
-                        "time": time_str,
-                        "open": open_price,
-                        "high": high_price,
-                        "low": low_price,
-                        "close": close_price,
-                    }
-                    
-                    if volume is not None:
-                        kline_item["volume"] = volume
-                    
-                    kline_list.append(kline_item)
-                    
-                except Exception as e:
-                    logger.warning(f"处理 K 线数据行时出错: {str(e)}")
-                    continue
-            
-            # 按日期排序（从早到晚）；同一日多行时保留最后一行（避免 lightweight-charts 报重复时间）
-            kline_list.sort(key=lambda x: x["time"])
-            dedup: Dict[str, dict] = {}
-            for it in kline_list:
-                dedup[it["time"]] = it
-            kline_list = [dedup[k] for k in sorted(dedup.keys())]
-            
+
+            kline_list = normalize_kline_frame(kline_data)
+
             # 记录实际获取到的日期范围
             if kline_list:
                 first_date = kline_list[0]["time"]
@@ -294,16 +343,132 @@ class KlineService:
             )
             return []
 
+    def _fetch_remote_bars(
+        self,
+        code_clean: str,
+        index: ContractIndex,
+        candidates: List[str],
+        start_date: str,
+        end_date: str,
+        period: int,
+    ) -> Tuple[str, Optional[pd.DataFrame]]:
+        """按候选 ts_code 依次向行情后端取日线，返回 (最后尝试的 ts_code, 日线)。"""
+        # 截止到今天的请求才参与负缓存：记下「自 start_date 起无数据」，起始日不更早的请求直接跳过该候选
+        negatives = get_negative_cache()
+        since = start_date if end_date >= datetime.now().strftime("%Y%m%d") else None
+
+        kline_data = None
+        ts_code = candidates[0]
+        for attempt, ts_code in enumerate(candidates):
+            if since and negatives.is_negative(ts_code, KIND_KLINE, since):
+                logger.info("K线 ts_code=%s 近期确认无数据，跳过", ts_code)
+                continue
+            if attempt:
+                logger.warning("K线上一候选无数据，改用 ts_code=%s", ts_code)
+            kline_data = self.market_data_service.get_futures_kline(
+                ts_code=ts_code,
+                start_date=start_date,
+                end_date=end_date,
+                period=period
+            )
+            if _has_rows(kline_data):
+                negatives.record_found(ts_code, KIND_KLINE)
+                if attempt:
+                    # 记住可用的备选代码，后续请求不再重复前面的空查询
+                    index.remember(code_clean, ts_code)
+                break
+            # 空表才记为无数据；None 可能是接口异常，不记录
+            if since and isinstance(kline_data, pd.DataFrame):
+                negatives.record_empty(ts_code, KIND_KLINE, since)
+        return ts_code, kline_data
+
+    def _read_local_bars(
+        self, contract: ContractRow, ts_code: str, start_date: str, end_date: str
+    ) -> Optional[pd.DataFrame]:
+        """从 market_data 读取区间日线，缺失的交易日向远端补取并回写。
+
+        Returns:
+            Optional[pd.DataFrame]: 本地（含补取）日线；本地没有该合约的数据或读库失败时返回 None。
+        """
+        start = datetime.strptime(start_date, "%Y%m%d").date()
+        end = datetime.strptime(end_date, "%Y%m%d").date()
+        db = self._session_factory()
+        try:
+            store = DailyBarStore(db)
+            local = store.read_bars(contract.contract_id, start, end)
+            if local.empty:
+                return None
+            missing = missing_trading_days(
+                local["trade_date"], start, end,
+                exchange=contract.exchange_code or None,
+                listed_date=contract.listed_date,
+                expiry_date=contract.expiry_date,
+            )
+            if not missing:
+                logger.info("K线 本地命中 contract_id=%s 条数=%s", contract.contract_id, len(local))
+                return local
+
+            negatives = get_negative_cache()
+            gap_since = missing[0].strftime("%Y%m%d")
+            if negatives.is_negative(ts_code, KIND_KLINE_GAP, gap_since):
+                return local
+            remote = self.market_data_service.get_futures_kline(
+                ts_code=ts_code,
+                start_date=gap_since,
+                end_date=missing[-1].strftime("%Y%m%d"),
+                period=(missing[-1] - missing[0]).days + 1,
+            )
+            if not isinstance(remote, pd.DataFrame):
+                return local
+            fetched = set(remote["trade_date"].astype(str)) if _has_rows(remote) and "trade_date" in remote.columns else set()
+            logger.info(
+                "K线 本地缺 %s 个交易日（%s 起），远端补到 %s 条",
+                len(missing), gap_since, len(fetched),
+            )
+            if not fetched & {day.strftime("%Y%m%d") for day in missing}:
+                # 远端也没有这些交易日（停牌、数据源缺失等），退避期内不再补取
+                negatives.record_empty(ts_code, KIND_KLINE_GAP, gap_since)
+                return local
+            upsert_bars(db, bars_from_frame(remote.assign(ts_code=ts_code), {ts_code: contract.contract_id}))
+            db.commit()
+            merged = pd.concat([local, remote], ignore_index=True)
+            merged["trade_date"] = merged["trade_date"].astype(str)
+            return merged.drop_duplicates("trade_date", keep="last").sort_values("trade_date", ignore_index=True)
+        except Exception as e:
+            logger.warning("K线 读取 market_data 失败，改走行情后端: %s", e)
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _store_bars(self, contract_id: int, ts_code: str, kline_data: pd.DataFrame) -> None:
+        """把远端取到的整段日线回写 market_data，之后同一合约的请求走本地。"""
+        db = self._session_factory()
+        try:
+            rows = bars_from_frame(kline_data.assign(ts_code=ts_code), {ts_code: contract_id})
+            upsert_bars(db, rows)
+            db.commit()
+            logger.info("K线 回写 market_data contract_id=%s 条数=%s", contract_id, len(rows))
+        except Exception as e:
+            db.rollback()
+            logger.warning("K线 回写 market_data 失败: %s", e)
+        finally:
+            db.close()
+
     def get_futures_kline_for_chart(
         self,
         contract_code: str,
-        period: int = 365
+        period: int = 365,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
     ) -> Dict:
         """获取期货合约的 K 线数据，格式化为图表库需要的格式。
 
         Args:
             contract_code: 合约代码。
             period: 获取最近多少天的数据，默认 365 天。
+            start_date: 开始日期 YYYYMMDD，为 None 时按 period 推算。
+            end_date: 结束日期 YYYYMMDD，为 None 时为今天。
 
         Returns:
             Dict: 包含 K 线数据和元信息的字典：
@@ -314,7 +479,9 @@ class KlineService:
                     "period": 365   # 数据周期
                 }
         """
-        kline_data = self.get_futures_daily_kline(contract_code, period=period)
+        kline_data = self.get_futures_daily_kline(
+            contract_code, start_date=start_date, end_date=end_date, period=period
+        )
         
         return {
             "contract_code": contract_code,
@@ -0,0 +1,329 @@
+"""列式 K 线存储（内存映射）。
+
+设计原因：
+1. JSON 里的 K 线是「字典列表」，每次请求都要逐行转成 DataFrame，数据量大时解析成本远高于计算本身。
+2. 改为每个 ts_code 一个二进制文件：int32 日期列 + float64 的 OHLC/结算/成交量/持仓列，
+   用 numpy.memmap 打开，按日期 searchsorted 取区间切片，全程不产生 Python 行对象。
+3. 文件由转换器从现有 JSON 或 Tushare fut_daily DataFrame 生成，写入时先写临时文件再原子替换，
+   读方不会看到半写入的文件。
+
+文件布局（小端）：
+    [0:32)   头部：magic ``KLC1``、版本号 uint32、行数 uint64、保留 16 字节
+    日期列   int32 × n（YYYYMMDD，升序、无重复），按 8 字节对齐补零
+    数值列   float64 × n，依次为 open, high, low, close, settle, vol, oi（缺失为 NaN）
+
+目录由 KLINE_STORE_DIR 指定，默认 backend/data/kline_store。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "kline_store"
+
+MAGIC = b"KLC1"
+VERSION = 1
+HEADER_SIZE = 32
+FILE_SUFFIX = ".klc"
+
+# 数值列顺序即文件内顺序，改动需同时升级 VERSION
+VALUE_COLUMNS: Tuple[str, ...] = ("open", "high", "low", "close", "settle", "vol", "oi")
+
+_HEADER = struct.Struct("<4sIQ16x")
+_TS_CODE_RE = re.compile(r"^[A-Z0-9]+(\.[A-Z]+)?$")
+
+
+def _store_dir() -> Path:
+    """返回 KLINE_STORE_DIR 配置的目录。"""
+    raw = os.getenv("KLINE_STORE_DIR", "").strip()
+    if raw:
+        return Path(raw).expanduser()
+    return _DEFAULT_DIR
+
+
+def _dates_nbytes(n: int) -> int:
+    """日期列占用字节数（含 8 字节对齐补齐）。"""
+    raw = 4 * n
+    return raw + (-raw % 8)
+
+
+def _to_int_dates(values: pd.Series) -> pd.Series:
+    """把 YYYYMMDD / YYYY-MM-DD / 整数日期统一为 Int64（无法解析为 <NA>）。"""
+    s = values.astype("string").str.strip().str.replace("-", "", regex=False).str.slice(0, 8)
+    s = s.where(s.str.fullmatch(r"\d{8}", na=False))
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+
+def frame_to_columns(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """把 fut_daily / JSON 风格的 DataFrame 转成存储列。
+
+    接受列名 trade_date 或 time、vol 或 volume；缺失的数值列填 NaN。
+    同一日期多行时保留最后一行，结果按日期升序。
+
+    Args:
+        frame: 原始 K 线表。
+
+    Returns:
+        Dict[str, np.ndarray]: ``trade_date``（int32）与 VALUE_COLUMNS（float64）。
+    """
+    if frame is None or frame.empty:
+        return {"trade_date": np.empty(0, dtype=np.int32), **{c: np.empty(0) for c in VALUE_COLUMNS}}
+
+    date_col = "trade_date" if "trade_date" in frame.columns else "time"
+    if date_col not in frame.columns:
+        raise ValueError(f"K 线表缺少日期列，可用列: {list(frame.columns)}")
+
+    out = pd.DataFrame({"trade_date": _to_int_dates(frame[date_col])})
+    for col in VALUE_COLUMNS:
+        src = col
+        if col == "vol" and "vol" not in frame.columns and "volume" in frame.columns:
+            src = "volume"
+        if src in frame.columns:
+            out[col] = pd.to_numeric(frame[src], errors="coerce").astype("float64")
+        else:
+            out[col] = np.nan
+
+    out = out[out["trade_date"].notna()]
+    out = out.drop_duplicates(subset="trade_date", keep="last").sort_values("trade_date", kind="stable")
+    cols = {"trade_date": out["trade_date"].to_numpy(dtype=np.int32)}
+    for col in VALUE_COLUMNS:
+        cols[col] = out[col].to_numpy(dtype=np.float64)
+    return cols
+
+
+class _MappedFile:
+    """一个已打开的 .klc 文件（各列为只读 memmap 视图）。"""
+
+    __slots__ = ("signature", "dates", "values")
+
+    def __init__(self, path: Path, signature: Tuple[int, int, int]) -> None:
+        self.signature = signature
+        with open(path, "rb") as f:
+            magic, version, n = _HEADER.unpack(f.read(HEADER_SIZE))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的 K 线列式文件: {path}")
+        if n == 0:
+            self.dates = np.empty(0, dtype=np.int32)
+            self.values = {c: np.empty(0, dtype=np.float64) for c in VALUE_COLUMNS}
+            return
+        self.dates = np.memmap(path, dtype="<i4", mode="r", offset=HEADER_SIZE, shape=(n,))
+        offset = HEADER_SIZE + _dates_nbytes(n)
+        self.values = {}
+        for col in VALUE_COLUMNS:
+            self.values[col] = np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=(n,))
+            offset += 8 * n
+
+
+class KlineColumnStore:
+    """按 ts_code 存放的列式 K 线仓库。"""
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        """初始化仓库。
+
+        Args:
+            root: 存储目录；为 None 时每次按 KLINE_STORE_DIR 解析（便于运行期切换目录）。
+        """
+        self._root = Path(root) if root is not None else None
+        self._lock = threading.Lock()
+        self._open: Dict[Path, _MappedFile] = {}
+
+    @property
+    def root(self) -> Path:
+        """当前存储目录。"""
+        return self._root if self._root is not None else _store_dir()
+
+    def path_for(self, ts_code: str) -> Path:
+        """返回 ts_code 对应的文件路径。
+
+        Raises:
+            ValueError: ts_code 含非法字符（防止路径穿越）。
+        """
+        key = (ts_code or "").strip().upper()
+        if not _TS_CODE_RE.match(key):
+            raise ValueError(f"非法 ts_code: {ts_code!r}")
+        return self.root / f"{key}{FILE_SUFFIX}"
+
+    def has(self, ts_code: str) -> bool:
+        """是否存在该合约的列式文件。"""
+        try:
+            return self.path_for(ts_code).is_file()
+        except ValueError:
+            return False
+
+    def _mapped(self, ts_code: str) -> Optional[_MappedFile]:
+        """打开（或复用已打开的）文件映射；文件被替换后自动重新映射。"""
+        try:
+            path = self.path_for(ts_code)
+            st = path.stat()
+        except (ValueError, OSError):
+            return None
+        sig = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self._open.get(path)
+        if cached is not None and cached.signature == sig:
+            return cached
+        with self._lock:
+            cached = self._open.get(path)
+            if cached is not None and cached.signature == sig:
+                return cached
+            try:
+                mapped = _MappedFile(path, sig)
+            except (OSError, ValueError, struct.error) as e:
+                logger.error("[K线列存] 打开失败 %s: %s", path, e)
+                return None
+            self._open[path] = mapped
+            return mapped
+
+    def read_range(
+        self, ts_code: str, start_date: str, end_date: str
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """读取 [start_date, end_date] 区间（闭区间）的列切片。
+
+        返回的数组是 memmap 视图，调用方不应修改。
+
+        Args:
+            ts_code: 如 CU2601.SHF。
+            start_date: YYYYMMDD。
+            end_date: YYYYMMDD。
+
+        Returns:
+            Optional[Dict[str, np.ndarray]]: 无文件返回 None；区间内无数据返回长度为 0 的数组。
+        """
+        mapped = self._mapped(ts_code)
+        if mapped is None:
+            return None
+        lo = int(np.searchsorted(mapped.dates, int(start_date), side="left"))
+        hi = int(np.searchsorted(mapped.dates, int(end_date), side="right"))
+        out = {"trade_date": mapped.dates[lo:hi]}
+        for col in VALUE_COLUMNS:
+            out[col] = mapped.values[col][lo:hi]
+        return out
+
+    def read_frame(
+        self, ts_code: str, start_date: str, end_date: str
+    ) -> Optional[pd.DataFrame]:
+        """以 fut_daily 兼容的 DataFrame 返回区间数据（trade_date 为 YYYYMMDD 字符串）。"""
+        cols = self.read_range(ts_code, start_date, end_date)
+        if cols is None:
+            return None
+        data: Dict[str, Any] = {"trade_date": cols["trade_date"].astype("U8")}
+        for col in VALUE_COLUMNS:
+            data[col] = np.asarray(cols[col])
+        return pd.DataFrame(data)
+
+    def write(self, ts_code: str, frame: pd.DataFrame, merge: bool = True) -> int:
+        """写入（或合并写入）一个合约的 K 线。
+
+        Args:
+            ts_code: 合约 ts_code。
+            frame: fut_daily / JSON 风格的 DataFrame。
+            merge: True 时与已有文件合并，同日期以新数据为准。
+
+        Returns:
+            int: 写入后文件中的总行数。
+        """
+        path = self.path_for(ts_code)
+        cols = frame_to_columns(frame)
+        if merge:
+            mapped = self._mapped(ts_code)
+            if mapped is not None and len(mapped.dates):
+                old = pd.DataFrame({"trade_date": np.asarray(mapped.dates)})
+                for col in VALUE_COLUMNS:
+                    old[col] = np.asarray(mapped.values[col])
+                cols = frame_to_columns(pd.concat([old, pd.DataFrame(cols)], ignore_index=True))
+
+        n = len(cols["trade_date"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, n))
+                f.write(cols["trade_date"].astype("<i4").tobytes())
+                f.write(b"\0" * (_dates_nbytes(n) - 4 * n))
+                for col in VALUE_COLUMNS:
+                    f.write(cols[col].astype("<f8").tobytes())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return n
+
+    def write_from_fut_daily(self, df: pd.DataFrame, merge: bool = True) -> Dict[str, int]:
+        """把 Tushare fut_daily 结果（可含多个 ts_code）按合约写入。
+
+        Args:
+            df: 含 ts_code 列的 fut_daily DataFrame。
+            merge: 是否与已有文件合并。
+
+        Returns:
+            Dict[str, int]: ts_code -> 写入后总行数。
+        """
+        if df is None or df.empty:
+            return {}
+        if "ts_code" not in df.columns:
+            raise ValueError("fut_daily 结果缺少 ts_code 列；单合约数据请直接调用 write()")
+        written: Dict[str, int] = {}
+        for ts_code, part in df.groupby(df["ts_code"].astype(str).str.strip().str.upper(), sort=False):
+            try:
+                written[ts_code] = self.write(ts_code, part, merge=merge)
+            except ValueError as e:
+                logger.warning("[K线列存] 跳过 ts_code=%s: %s", ts_code, e)
+        return written
+
+    def write_from_json(self, raw: Dict[str, Any], merge: bool = False) -> Dict[str, int]:
+        """把行情 JSON 的 klines 字段全部转换为列式文件。
+
+        Args:
+            raw: 行情 JSON 根对象（结构见 data/market_data.json）。
+            merge: 是否与已有文件合并（默认整体覆盖，与 JSON 保持一致）。
+
+        Returns:
+            Dict[str, int]: ts_code -> 写入行数。
+        """
+        klines = raw.get("klines") if isinstance(raw, dict) else None
+        if not isinstance(klines, dict):
+            return {}
+        written: Dict[str, int] = {}
+        for key, rows in klines.items():
+            if not isinstance(rows, list) or not rows:
+                continue
+            frame = pd.DataFrame([r for r in rows if isinstance(r, dict)])
+            try:
+                written[str(key).strip().upper()] = self.write(str(key), frame, merge=merge)
+            except ValueError as e:
+                logger.warning("[K线列存] 跳过 JSON 键=%s: %s", key, e)
+        return written
+
+    def list_codes(self) -> List[str]:
+        """列出仓库中的全部 ts_code。"""
+        root = self.root
+        if not root.is_dir():
+            return []
+        return sorted(p.name[: -len(FILE_SUFFIX)] for p in root.glob(f"*{FILE_SUFFIX}"))
+
+
+_store: Optional[KlineColumnStore] = None
+_store_lock = threading.Lock()
+
+
+def get_kline_store() -> KlineColumnStore:
+    """返回进程级 KlineColumnStore 实例。"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KlineColumnStore()
+    return _store
+
@@ -4,45 +4,318 @@
 - 生产环境标配 TUSHARE_TOKEN 时，K 线/现价应走 Tushare；若仍默认 json，会出现「本机直连 fut_daily 有数据、线上 K 线 404」。
 - 仅当显式 ``MARKET_DATA_SOURCE=json`` 时强制本地 JSON（离线/合规场景）。
 - 显式 ``MARKET_DATA_SOURCE=tushare`` 或「未设 mode 但已配置 Token」时用 Tushare；初始化失败回退 JSON。
+- K 线路由每个请求都会新建 KlineService，定时任务每轮新建 PriceUpdateService；若每次都重新读环境变量、
+  构造后端并打日志，开销与请求数成正比。因此由进程级注册表（MarketBackendRegistry）只构造一次后端，
+  get_market_backend() 返回共享的代理对象。
+- 注册表记录各后端的健康状态与调用指标：主后端（Tushare）连续失败 MARKET_BACKEND_FAILURE_THRESHOLD 次后
+  热切换到 JSON；之后每 MARKET_BACKEND_PROBE_SECONDS 秒由一个线程探测主后端，恢复后自动切回。
+  Tushare 的每次网络调用都会上报成败（见 tushare_service._pro_call），因此方法内部吞掉的异常也计入健康状态。
+- 请求线程池与 APScheduler 的 ThreadPoolExecutor(5) 会并发访问注册表，状态变更都在锁内完成；
+  探测期间其他线程继续使用备用后端，不会被阻塞。
 """
 
 import logging
 import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+TUSHARE = "tushare"
+JSON = "json"
 
-def get_market_backend():
-    """返回行情后端（与 MarketDataService / TushareService 方法兼容）。
 
-    - ``MARKET_DATA_SOURCE=json``：始终本地 JSON。
-    - ``MARKET_DATA_SOURCE=tushare``：尝试 Tushare，失败回退 JSON。
-    - 未设置或为空：若存在非空 ``TUSHARE_TOKEN`` 则优先 Tushare，否则 JSON。
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
 
-    Returns:
-        MarketDataService | TushareService: 行情实现。
-    """
-    mode = (os.getenv("MARKET_DATA_SOURCE") or "").strip().lower()
-    token = (os.getenv("TUSHARE_TOKEN") or "").strip()
 
-    if mode == "json":
-        from app.services.market_data_service import MarketDataService
+def _build_tushare():
+    from app.services.tushare_service import TushareService
 
-        logger.info("[行情] 显式指定数据源=本地 JSON")
-        return MarketDataService()
+    return TushareService()
 
-    use_tushare = mode == "tushare" or (not mode and bool(token))
-    if use_tushare:
-        try:
-            from app.services.tushare_service import TushareService
 
-            backend = TushareService()
-            logger.info("[行情] 数据源=Tushare（MARKET_DATA_SOURCE=%r，Token已配置=%s）", mode or "(未设)", bool(token))
+def _build_json():
+    from app.services.market_data_service import MarketDataService
+
+    return MarketDataService()
+
+
+_FACTORIES: Dict[str, Callable[[], Any]] = {TUSHARE: _build_tushare, JSON: _build_json}
+
+
+class _BackendHealth:
+    """单个后端的健康状态与调用指标。"""
+
+    __slots__ = (
+        "healthy", "consecutive_failures", "calls", "failures",
+        "last_error", "last_success_at", "last_failure_at",
+    )
+
+    def __init__(self) -> None:
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MarketBackendRegistry:
+    """进程级行情后端注册表（线程安全）。"""
+
+    def __init__(
+        self,
+        primary: str,
+        fallback: Optional[str] = None,
+        factories: Optional[Dict[str, Callable[[], Any]]] = None,
+        failure_threshold: int = 5,
+        probe_seconds: int = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初始化注册表（后端在首次使用时才构造）。
+
+        Args:
+            primary: 主后端名称（tushare / json）。
+            fallback: 主后端不可用时的备用后端，None 表示不切换。
+            factories: 名称 -> 构造函数，默认 Tushare/JSON。
+            failure_threshold: 主后端连续失败多少次后切换到备用后端。
+            probe_seconds: 使用备用后端期间，探测主后端的间隔秒数。
+            clock: 时间函数（测试可注入）。
+        """
+        self.primary = primary
+        self.fallback = fallback if fallback != primary else None
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_seconds = probe_seconds
+        self._factories = factories or _FACTORIES
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._instances: Dict[str, Any] = {}
+        self._health: Dict[str, _BackendHealth] = {}
+        self._active = primary
+        self._switches = 0
+        self._next_probe_at = 0.0
+        self._probing = False
+
+    @classmethod
+    def from_env(cls) -> "MarketBackendRegistry":
+        """按 MARKET_DATA_SOURCE / TUSHARE_TOKEN 决定主备后端。
+
+        - ``MARKET_DATA_SOURCE=json``：始终本地 JSON。
+        - ``MARKET_DATA_SOURCE=tushare``：Tushare 为主，JSON 备用。
+        - 未设置或为空：若存在非空 ``TUSHARE_TOKEN`` 则 Tushare 为主、JSON 备用，否则 JSON。
+        """
+        mode = (os.getenv("MARKET_DATA_SOURCE") or "").strip().lower()
+        token = (os.getenv("TUSHARE_TOKEN") or "").strip()
+        use_tushare = mode == TUSHARE or (not mode and bool(token))
+        registry = cls(
+            primary=TUSHARE if use_tushare else JSON,
+            fallback=JSON if use_tushare else None,
+            failure_threshold=_env_int("MARKET_BACKEND_FAILURE_THRESHOLD", 5),
+            probe_seconds=_env_int("MARKET_BACKEND_PROBE_SECONDS", 60),
+        )
+        logger.info(
+            "[行情] 数据源=%s（备用=%s，MARKET_DATA_SOURCE=%r，Token已配置=%s）",
+            registry.primary, registry.fallback or "无", mode or "(未设)", bool(token),
+        )
+        return registry
+
+    def _health_of(self, name: str) -> _BackendHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = _BackendHealth()
+        return health
+
+    def _instance(self, name: str) -> Optional[Any]:
+        """返回（必要时构造）后端实例；构造失败记为一次失败并返回 None。"""
+        backend = self._instances.get(name)
+        if backend is not None:
+            return backend
+        with self._build_lock:
+            backend = self._instances.get(name)
+            if backend is not None:
+                return backend
+            try:
+                backend = self._factories[name]()
+            except Exception as e:
+                logger.warning("[行情] 后端 %s 初始化失败: %s", name, e)
+                self.record(name, False, e)
+                return None
+            self._instances[name] = backend
             return backend
+
+    def _switch(self, name: str, reason: str) -> None:
+        """切换当前后端（调用方持有 self._lock）。"""
+        if self._active == name:
+            return
+        logger.warning("[行情] 数据源切换 %s -> %s：%s", self._active, name, reason)
+        self._active = name
+        self._switches += 1
+        self._next_probe_at = self._clock() + self.probe_seconds
+
+    def record(self, name: str, ok: bool, error: Optional[BaseException] = None) -> None:
+        """上报一次调用结果，必要时切换主备后端。"""
+        with self._lock:
+            health = self._health_of(name)
+            now = self._clock()
+            if ok:
+                health.consecutive_failures = 0
+                health.healthy = True
+                health.last_success_at = now
+                if name == self.primary and self._active != name:
+                    self._switch(name, "主数据源已恢复")
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = f"{type(error).__name__}: {error}" if error is not None else None
+            health.last_failure_at = now
+            if health.consecutive_failures >= self.failure_threshold:
+                health.healthy = False
+                if name == self.primary and self.fallback and self._active == name:
+                    self._switch(self.fallback, f"连续失败 {health.consecutive_failures} 次（{health.last_error}）")
+
+    def _count_call(self, name: str) -> None:
+        with self._lock:
+            self._health_of(name).calls += 1
+
+    def _probe_primary(self) -> None:
+        """探测主后端：能构造且健康检查通过即上报成功（由 record 切回）。"""
+        try:
+            backend = self._instance(self.primary)
+            if backend is None:
+                return
+            check = getattr(backend, "health_check", None)
+            if check is None or check():
+                self.record(self.primary, True)
+            else:
+                self.record(self.primary, False, RuntimeError("健康检查未通过"))
         except Exception as e:
-            logger.warning("[行情] Tushare 不可用，回退 JSON: %s", e)
+            self.record(self.primary, False, e)
+        finally:
+            with self._lock:
+                self._probing = False
+                self._next_probe_at = self._clock() + self.probe_seconds
 
-    from app.services.market_data_service import MarketDataService
+    def acquire(self) -> Tuple[str, Any]:
+        """返回 (后端名称, 后端实例)，使用备用后端期间按间隔探测主后端。"""
+        probe = False
+        with self._lock:
+            if (
+                self._active != self.primary
+                and not self._probing
+                and self._clock() >= self._next_probe_at
+            ):
+                self._probing = probe = True
+        if probe:
+            self._probe_primary()
 
-    logger.info("[行情] 数据源=本地 JSON（无可用 Tushare）")
-    return MarketDataService()
+        name = self._active
+        backend = self._instance(name)
+        if backend is None and self.fallback and name == self.primary:
+            with self._lock:
+                self._switch(self.fallback, "主数据源初始化失败")
+            name = self.fallback
+            backend = self._instance(name)
+        if backend is None:
+            raise RuntimeError(f"行情后端 {name} 不可用")
+        return name, backend
+
+    def status(self) -> Dict[str, Any]:
+        """健康状态与调用指标（用于管理端状态接口）。"""
+        with self._lock:
+            return {
+                "active": self._active,
+                "primary": self.primary,
+                "fallback": self.fallback,
+                "switches": self._switches,
+                "failure_threshold": self.failure_threshold,
+                "probe_seconds": self.probe_seconds,
+                "backends": {name: h.as_dict() for name, h in self._health.items()},
+            }
+
+
+class MarketBackendProxy:
+    """转发到注册表当前后端的代理（与 MarketDataService / TushareService 方法兼容）。
+
+    每次方法调用都重新取当前后端，因此切换对持有代理的服务对象立即生效；
+    方法抛出的异常计入该后端的健康状态后原样抛出。
+    """
+
+    def __init__(self, registry: MarketBackendRegistry) -> None:
+        self._registry = registry
+
+    def __getattr__(self, attr: str) -> Any:
+        name, backend = self._registry.acquire()
+        value = getattr(backend, attr)
+        if not callable(value):
+            return value
+        registry = self._registry
+
+        def call(*args, **kwargs):
+            registry._count_call(name)
+            try:
+                return value(*args, **kwargs)
+            except Exception as e:
+                registry.record(name, False, e)
+                raise
+
+        return call
+
+    @property
+    def backend_name(self) -> str:
+        """当前后端名称。"""
+        return self._registry.acquire()[0]
+
+
+_registry: Optional[MarketBackendRegistry] = None
+_proxy: Optional[MarketBackendProxy] = None
+_registry_lock = threading.Lock()
+
+
+def get_backend_registry() -> MarketBackendRegistry:
+    """返回进程级后端注册表。"""
+    global _registry, _proxy
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = MarketBackendRegistry.from_env()
+                _proxy = MarketBackendProxy(registry)
+                _registry = registry
+    return _registry
+
+
+def get_market_backend() -> MarketBackendProxy:
+    """返回行情后端（与 MarketDataService / TushareService 方法兼容）。
+
+    主备选择规则见 MarketBackendRegistry.from_env；后端只构造一次，所有调用方共享。
+
+    Returns:
+        MarketBackendProxy: 转发到当前后端的代理。
+    """
+    get_backend_registry()
+    return _proxy
+
+
+def report_backend_result(name: str, ok: bool, error: Optional[BaseException] = None) -> None:
+    """后端内部（如 Tushare 的每次网络调用）上报成败；注册表尚未创建时忽略。"""
+    registry = _registry
+    if registry is not None:
+        registry.record(name, ok, error)
+
+
+def reset_market_backend() -> None:
+    """丢弃注册表，下次访问时按环境变量重建（测试用）。"""
+    global _registry, _proxy
+    with _registry_lock:
+        _registry = None
+        _proxy = None
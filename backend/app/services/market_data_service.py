@@ -2,23 +2,32 @@
 
 设计原因：
 1. 境外服务器常无法稳定访问 Tushare 等大陆网关，外部 SDK 增加排障难度。
-2. 用单一 JSON 文件作为「现价 + K 线」数据源，改文件即生效（每次请求重新读取），调试路径清晰。
+2. 用单一 JSON 文件作为「现价 + K 线」数据源，改文件即生效，调试路径清晰。
 3. 生产环境可将 MARKET_DATA_JSON 指向挂载卷中的文件，无需改代码发版。
+4. 解析结果按 (路径, mtime, size, inode) 做进程级快照缓存：文件未变时不再重复 json.load，
+   文件变化后整体替换快照（热更新仍然生效），并预建 prices / klines 的按合约索引。
+5. 若 KLINE_STORE_DIR 中存在该合约的列式文件（见 kline_store.py / build_kline_store.py），
+   K 线优先从内存映射文件按区间切片读取，JSON 仅作兜底。
 
 JSON 结构示例见 backend/data/market_data.json。
 """
 
 from __future__ import annotations
 
+import bisect
 import json
 import logging
 import os
-import re
+import stat
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
+from app.services.contract_resolver import to_ts_code
+from app.services.kline_store import get_kline_store
+
 logger = logging.getLogger(__name__)
 
 # 默认数据文件：backend/data/market_data.json（Docker 内为 /opt/app/backend/data/market_data.json）
@@ -33,12 +42,108 @@ def _env_path() -> Path:
     return _DEFAULT_REL
 
 
-def _load_raw() -> Dict[str, Any]:
+def _normalize_contract_key(code: str) -> str:
+    """统一合约主键：大写、去空格。"""
+    return (code or "").strip().upper()
+
+
+def _parse_kline_row(row: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """把 JSON 中的一根 K 线解析为 (YYYYMMDD, 记录)；格式不合法返回 None。"""
+    if not isinstance(row, dict):
+        return None
+    t = row.get("time") or row.get("trade_date")
+    if not t:
+        return None
+    if isinstance(t, str) and len(t) >= 10 and t[4] == "-":
+        td = t[:4] + t[5:7] + t[8:10]
+    elif isinstance(t, str) and len(t) == 8 and t.isdigit():
+        td = t
+    else:
+        return None
+    try:
+        o = float(row["open"])
+        h = float(row["high"])
+        l = float(row["low"])
+        cl = float(row["close"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    vol = row.get("volume") or row.get("vol")
+    try:
+        vol_i = int(float(vol)) if vol is not None else None
+    except (TypeError, ValueError):
+        vol_i = None
+    rec: Dict[str, Any] = {
+        "trade_date": td,
+        "open": o,
+        "high": h,
+        "low": l,
+        "close": cl,
+    }
+    if vol_i is not None:
+        rec["vol"] = vol_i
+    return td, rec
+
+
+class _MarketSnapshot:
+    """一次解析得到的行情快照（只读）。
+
+    Attributes:
+        signature: 文件签名 (path, mtime_ns, size, inode)，None 表示文件缺失/不可读。
+        prices: 规范化合约键 -> 现价。
+        klines: 规范化合约键 -> (按日期升序的 YYYYMMDD 列表, 对应记录列表)。
+    """
+
+    __slots__ = ("signature", "prices", "klines")
+
+    def __init__(self, signature: Optional[Tuple[str, int, int, int]], raw: Dict[str, Any]) -> None:
+        """从原始 JSON 根对象建立索引；根对象本身不保留。"""
+        self.signature = signature
+        self.prices: Dict[str, Optional[float]] = {}
+        self.klines: Dict[str, Tuple[List[str], List[Dict[str, Any]]]] = {}
+
+        prices = raw.get("prices")
+        if isinstance(prices, dict):
+            for k, v in prices.items():
+                try:
+                    self.prices[_normalize_contract_key(str(k))] = float(v) if v is not None else None
+                except (TypeError, ValueError):
+                    logger.warning("[行情JSON] 现价无法转换为数字，已忽略: %s=%r", k, v)
+
+        klines = raw.get("klines")
+        if isinstance(klines, dict):
+            for k, rows in klines.items():
+                if not isinstance(rows, list) or not rows:
+                    continue
+                parsed = [p for p in (_parse_kline_row(r) for r in rows) if p is not None]
+                # 稳定排序：同日多行保持文件中的先后顺序，与逐请求解析时一致
+                parsed.sort(key=lambda x: x[0])
+                self.klines[_normalize_contract_key(str(k))] = (
+                    [td for td, _ in parsed],
+                    [rec for _, rec in parsed],
+                )
+
+
+_EMPTY_SNAPSHOT = _MarketSnapshot(None, {})
+
+# 进程级快照：读多写少，替换时整体赋值（引用赋值是原子的），读方拿到引用后不受后续替换影响
+_snapshot: _MarketSnapshot = _EMPTY_SNAPSHOT
+_snapshot_lock = threading.Lock()
+_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def _file_signature(path: Path) -> Optional[Tuple[str, int, int, int]]:
+    """返回文件签名；文件不存在或不是普通文件时返回 None。"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _parse_file(path: Path) -> Dict[str, Any]:
     """从磁盘读取 JSON；失败则返回空字典并打日志。"""
-    path = _env_path()
-    if not path.is_file():
-        logger.warning("[行情JSON] 文件不存在: %s（可设置环境变量 MARKET_DATA_JSON）", path)
-        return {}
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -51,9 +156,62 @@ def _load_raw() -> Dict[str, Any]:
         return {}
 
 
-def _normalize_contract_key(code: str) -> str:
-    """统一合约主键：大写、去空格。"""
-    return (code or "").strip().upper()
+def _get_snapshot() -> _MarketSnapshot:
+    """返回与磁盘文件一致的快照；文件未变化时直接复用已解析结果。"""
+    global _snapshot
+    path = _env_path()
+    sig = _file_signature(path)
+    if sig is None:
+        logger.warning("[行情JSON] 文件不存在: %s（可设置环境变量 MARKET_DATA_JSON）", path)
+        return _EMPTY_SNAPSHOT
+
+    current = _snapshot
+    if current.signature == sig:
+        with _snapshot_lock:
+            _cache_stats["hits"] += 1
+        return current
+
+    with _snapshot_lock:
+        # 双重检查：并发请求只让第一个线程解析
+        current = _snapshot
+        if current.signature == sig:
+            _cache_stats["hits"] += 1
+            return current
+        _cache_stats["misses"] += 1
+        if current.signature is not None:
+            _cache_stats["reloads"] += 1
+        fresh = _MarketSnapshot(sig, _parse_file(path))
+        _snapshot = fresh
+        logger.info(
+            "[行情JSON] 已加载快照 path=%s 现价数=%s K线合约数=%s",
+            path,
+            len(fresh.prices),
+            len(fresh.klines),
+        )
+        return fresh
+
+
+def get_snapshot_cache_stats() -> Dict[str, Any]:
+    """返回快照缓存计数，便于确认缓存是否生效。
+
+    Returns:
+        dict: hits（直接复用）、misses（需要解析）、reloads（文件变化导致的重新解析）与当前文件签名。
+    """
+    with _snapshot_lock:
+        stats: Dict[str, Any] = dict(_cache_stats)
+    sig = _snapshot.signature
+    stats["path"] = sig[0] if sig else None
+    stats["mtime_ns"] = sig[1] if sig else None
+    return stats
+
+
+def _reset_snapshot_cache() -> None:
+    """清空快照与计数（测试用）。"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = _EMPTY_SNAPSHOT
+        for k in _cache_stats:
+            _cache_stats[k] = 0
 
 
 class MarketDataService:
@@ -75,108 +233,7 @@ class MarketDataService:
         Returns:
             str: 如 CU2601.SHF、TL2603.CFX。
         """
-        if "." in contract_code:
-            return contract_code
-
-        exchange_suffix_map = {
-            "SHFE": "SHF",
-            "DCE": "DCE",
-            "CZCE": "ZCE",
-            "CFFEX": "CFX",
-            "INE": "INE",
-            "GFEX": "GFE",
-        }
-        if exchange and exchange in exchange_suffix_map:
-            return f"{contract_code}.{exchange_suffix_map[exchange]}"
-
-        symbol_match = re.match(r"^([A-Za-z]+)", contract_code)
-        symbol = (
-            symbol_match.group(1).upper() if symbol_match else contract_code[:1].upper()
-        )
-
-        SYMBOL_EXCHANGE_SUFFIX = {
-            "IF": "CFX",
-            "IH": "CFX",
-            "IC": "CFX",
-            "IM": "CFX",
-            "T": "CFX",
-            "TF": "CFX",
-            "TS": "CFX",
-            "TL": "CFX",
-            "C": "DCE",
-            "A": "DCE",
-            "M": "DCE",
-            "Y": "DCE",
-            "P": "DCE",
-            "JD": "DCE",
-            "L": "DCE",
-            "V": "DCE",
-            "PP": "DCE",
-            "EB": "DCE",
-            "EG": "DCE",
-            "I": "DCE",
-            "J": "DCE",
-            "JM": "DCE",
-            "FB": "DCE",
-            "BB": "DCE",
-            "LG": "DCE",
-            "CF": "ZCE",
-            "SR": "ZCE",
-            "TA": "ZCE",
-            "OI": "ZCE",
-            "MA": "ZCE",
-            "FG": "ZCE",
-            "RM": "ZCE",
-            "ZC": "ZCE",
-            "SF": "ZCE",
-            "SM": "ZCE",
-            "AP": "ZCE",
-            "CJ": "ZCE",
-            "UR": "ZCE",
-            "SA": "ZCE",
-            "PF": "ZCE",
-            "PK": "ZCE",
-            "LH": "ZCE",
-            "RI": "ZCE",
-            "LR": "ZCE",
-            "JR": "ZCE",
-            "PM": "ZCE",
-            "WH": "ZCE",
-            "CY": "ZCE",
-            "PL": "ZCE",
-            "SH": "ZCE",
-            "PR": "ZCE",
-            "CU": "SHF",
-            "AL": "SHF",
-            "ZN": "SHF",
-            "PB": "SHF",
-            "NI": "SHF",
-            "SN": "SHF",
-            "AU": "SHF",
-            "AG": "SHF",
-            "RB": "SHF",
-            "HC": "SHF",
-            "SS": "SHF",
-            "BU": "SHF",
-            "RU": "SHF",
-            "FU": "SHF",
-            "WR": "SHF",
-            "SP": "SHF",
-            "AO": "SHF",
-            "BC": "SHF",
-            "BR": "SHF",
-            "SC": "INE",
-            "LU": "INE",
-            "NR": "INE",
-            "EC": "INE",
-            "SI": "GFE",
-            "LC": "GFE",
-            "PT": "GFE",
-            "PD": "GFE",
-        }
-        if symbol in SYMBOL_EXCHANGE_SUFFIX:
-            return f"{contract_code}.{SYMBOL_EXCHANGE_SUFFIX[symbol]}"
-        return f"{contract_code}.SHF"
+        return to_ts_code(contract_code, exchange)
 
     def convert_ts_code_to_contract_code(self, ts_code: str) -> str:
         """ts_code 转无后缀合约代码。"""
@@ -184,19 +241,14 @@ class MarketDataService:
             return ts_code.split(".")[0]
         return ts_code
 
-    def _pick_price(self, raw: Dict[str, Any], contract_code: str) -> Optional[float]:
-        """从已加载的 raw 中取现价。"""
-        prices = raw.get("prices")
-        if not isinstance(prices, dict):
-            return None
+    def _pick_price(self, snap: _MarketSnapshot, contract_code: str) -> Optional[float]:
+        """从快照的现价索引中取现价，键可为 ts_code 或无后缀代码。"""
         key = _normalize_contract_key(contract_code)
-        if key in prices:
-            v = prices[key]
-            return float(v) if v is not None else None
+        if key in snap.prices:
+            return snap.prices[key]
         base = self.convert_ts_code_to_contract_code(key)
-        if base != key and base in prices:
-            v = prices[base]
-            return float(v) if v is not None else None
+        if base != key and base in snap.prices:
+            return snap.prices[base]
         return None
 
     def get_futures_price(self, contract_code: str) -> Optional[float]:
@@ -208,56 +260,76 @@ class MarketDataService:
         Returns:
             Optional[float]: 无则 None。
         """
-        raw = _load_raw()
-        path = _env_path()
-        price = self._pick_price(raw, contract_code)
+        snap = _get_snapshot()
+        price = self._pick_price(snap, contract_code)
         logger.info(
             "[行情JSON] get_futures_price contract=%s path=%s ok=%s",
             contract_code,
-            path,
+            _env_path(),
             price is not None,
         )
         return price
 
     def batch_get_futures_prices(
-        self, contract_codes: List[str]
+        self, contract_codes: List[str], snapshot_only: bool = False
     ) -> Dict[str, Optional[float]]:
-        """批量读取现价（单次读文件，多次查键）。
+        """批量读取现价（同一快照，多次查键）。
 
         Args:
             contract_codes: 合约代码列表。
+            snapshot_only: 与 TushareService 接口一致；本地 JSON 本身只读快照，忽略该参数。
 
         Returns:
             Dict[str, Optional[float]]: 合约到价格。
         """
-        raw = _load_raw()
-        path = _env_path()
+        snap = _get_snapshot()
         out: Dict[str, Optional[float]] = {}
         for c in contract_codes:
             if not c:
                 continue
             key = _normalize_contract_key(c)
-            out[key] = self._pick_price(raw, key)
+            out[key] = self._pick_price(snap, key)
         logger.info(
             "[行情JSON] batch_get path=%s 请求数=%s 命中=%s",
-            path,
+            _env_path(),
             len(contract_codes),
             sum(1 for v in out.values() if v is not None),
         )
         return out
 
-    def _pick_kline_rows(self, raw: Dict[str, Any], ts_code: str) -> List[Dict[str, Any]]:
-        """从 raw['klines'] 取 K 线数组，键可为 ts_code 或无后缀代码。"""
-        klines = raw.get("klines")
-        if not isinstance(klines, dict):
-            return []
+    def _pick_kline_rows(
+        self, snap: _MarketSnapshot, ts_code: str
+    ) -> Optional[Tuple[List[str], List[Dict[str, Any]]]]:
+        """从快照的 K 线索引取 (日期列表, 记录列表)，键可为 ts_code 或无后缀代码。"""
         ts = _normalize_contract_key(ts_code)
-        if ts in klines and isinstance(klines[ts], list):
-            return klines[ts]
+        if ts in snap.klines:
+            return snap.klines[ts]
         base = self.convert_ts_code_to_contract_code(ts)
-        if base in klines and isinstance(klines[base], list):
-            return klines[base]
-        return []
+        if base in snap.klines:
+            return snap.klines[base]
+        return None
+
+    def _read_kline_store(
+        self, ts_code: str, start_date: str, end_date: str
+    ) -> Optional[pd.DataFrame]:
+        """若列式仓库中有该合约，按区间切片返回；没有文件时返回 None 交由 JSON 兜底。"""
+        store = get_kline_store()
+        ts = _normalize_contract_key(ts_code)
+        for key in (ts, self.convert_ts_code_to_contract_code(ts)):
+            if not store.has(key):
+                continue
+            df = store.read_frame(key, start_date, end_date)
+            if df is None:
+                continue
+            logger.info(
+                "[行情JSON] get_futures_kline 列存命中 ts_code=%s 条数=%s 区间=%s~%s",
+                key,
+                len(df),
+                start_date,
+                end_date,
+            )
+            return df
+        return None
 
     def get_futures_kline(
         self,
@@ -279,57 +351,28 @@ class MarketDataService:
         """
         from datetime import datetime, timedelta
 
-        raw = _load_raw()
-        path = _env_path()
-        rows_in = self._pick_kline_rows(raw, ts_code)
-        if not rows_in:
-            logger.warning("[行情JSON] 无 K 线数据 ts_code=%s path=%s", ts_code, path)
-            return None
-
         if end_date is None:
             end_date = datetime.now().strftime("%Y%m%d")
         if start_date is None:
             start_date = (datetime.now() - timedelta(days=period)).strftime("%Y%m%d")
 
-        rows_out: List[Dict[str, Any]] = []
-        for row in rows_in:
-            if not isinstance(row, dict):
-                continue
-            t = row.get("time") or row.get("trade_date")
-            if not t:
-                continue
-            if isinstance(t, str) and len(t) >= 10 and t[4] == "-":
-                td = t[:4] + t[5:7] + t[8:10]
-            elif isinstance(t, str) and len(t) == 8 and t.isdigit():
-                td = t
-            else:
-                continue
-            if td < start_date or td > end_date:
-                continue
-            try:
-                o = float(row["open"])
-                h = float(row["high"])
-                l = float(row["low"])
-                cl = float(row["close"])
-            except (KeyError, TypeError, ValueError):
-                continue
-            vol = row.get("volume") or row.get("vol")
-            try:
-                vol_i = int(float(vol)) if vol is not None else None
-            except (TypeError, ValueError):
-                vol_i = None
-            rec: Dict[str, Any] = {
-                "trade_date": td,
-                "open": o,
-                "high": h,
-                "low": l,
-                "close": cl,
-            }
-            if vol_i is not None:
-                rec["vol"] = vol_i
-            rows_out.append(rec)
-
-        rows_out.sort(key=lambda x: x["trade_date"])
+        stored = self._read_kline_store(ts_code, start_date, end_date)
+        if stored is not None:
+            return stored
+
+        snap = _get_snapshot()
+        path = _env_path()
+        indexed = self._pick_kline_rows(snap, ts_code)
+        if indexed is None:
+            logger.warning("[行情JSON] 无 K 线数据 ts_code=%s path=%s", ts_code, path)
+            return None
+
+        # 快照内已按日期排序，区间筛选用二分定位
+        dates, records = indexed
+        lo = bisect.bisect_left(dates, start_date)
+        hi = bisect.bisect_right(dates, end_date)
+        rows_out = records[lo:hi]
+
         logger.info(
             "[行情JSON] get_futures_kline ts_code=%s path=%s 条数=%s 区间=%s~%s",
             ts_code,
@@ -0,0 +1,175 @@
+"""全市场日线快照（按交易日，进程内共享）。
+
+设计原因：
+1. 一轮定时任务里，价格刷新、合约同步（逐合约取现价）和 K 线接口都会各自调用行情后端，
+   同一份 fut_daily(trade_date=当日) 全量数据会被重复下载多次。
+2. MarketSnapshot 持有某个交易日的全量日线，按 ts_code 建好索引与「收盘价优先、否则结算价」的价格列；
+   所有 get_market_backend() 的使用者都从这里取现价和最后一根日线。
+3. 快照进程内共享，最多每 MARKET_SNAPSHOT_TTL_SECONDS 秒刷新一次；刷新采用单飞（single-flight）：
+   并发请求只有一个线程去下载，其余线程等待并复用结果。下载失败也会缓存一个空快照直到下次刷新，
+   避免失败时每个合约都去重试全量接口。
+4. 本地 JSON 后端（MarketDataService）已有按文件 mtime 复用的快照，不需要这一层。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def daily_price_series(df: Optional[pd.DataFrame]) -> pd.Series:
+    """把日线行情整理为 ts_code -> 价格 的 Series（收盘价优先，为空或为 0 时用结算价）。
+
+    同一 ts_code 出现多行时取第一行，与逐合约 ``df[df['ts_code'] == ts_code].iloc[0]`` 一致；
+    两个价格都无效的合约值为 NaN。整列一次计算，匹配时只需 reindex。
+
+    Args:
+        df: 含 ts_code、close、settle 列的日线 DataFrame。
+
+    Returns:
+        pd.Series: 以 ts_code（字符串）为索引的 float 序列。
+    """
+    if df is None or df.empty or 'ts_code' not in df.columns:
+        return pd.Series(dtype=float)
+    codes = df['ts_code'].astype(str)
+    price = pd.Series(np.nan, index=df.index)
+    # 先填结算价，再用有效收盘价覆盖
+    for column in ('settle', 'close'):
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors='coerce')
+            price = values.where(values.notna() & (values != 0), price)
+    keep = ~codes.duplicated(keep='first')
+    return pd.Series(price[keep].to_numpy(dtype=float), index=pd.Index(codes[keep].to_numpy()))
+
+
+def match_daily_prices(df: Optional[pd.DataFrame], ts_codes: Dict[str, str]) -> Dict[str, float]:
+    """把请求的合约一次性对齐到日线行情上。
+
+    Args:
+        df: 当日全量日线。
+        ts_codes: 合约代码 -> Tushare ts_code。
+
+    Returns:
+        Dict[str, float]: 命中且价格有效的合约代码 -> 价格。
+    """
+    if not ts_codes:
+        return {}
+    return _match(daily_price_series(df), ts_codes)
+
+
+def _match(prices: pd.Series, ts_codes: Dict[str, str]) -> Dict[str, float]:
+    if not ts_codes or prices.empty:
+        return {}
+    matched = prices.reindex(list(ts_codes.values())).to_numpy()
+    return {code: float(p) for code, p in zip(ts_codes, matched) if not np.isnan(p)}
+
+
+class MarketSnapshot:
+    """某个交易日的全市场日线（只读）。"""
+
+    def __init__(self, trade_date: Optional[str], frame: Optional[pd.DataFrame], fetched_at: float = 0.0) -> None:
+        """构建快照。
+
+        Args:
+            trade_date: 交易日 YYYYMMDD，没有数据时为 None。
+            frame: fut_daily 全量日线（含 ts_code 列）。
+            fetched_at: 下载时间（time.monotonic()）。
+        """
+        self.trade_date = trade_date
+        self.fetched_at = fetched_at
+        if frame is None or frame.empty or 'ts_code' not in frame.columns:
+            self.frame = pd.DataFrame()
+        else:
+            codes = frame['ts_code'].astype(str)
+            keep = ~codes.duplicated(keep='first')
+            self.frame = frame[keep].set_index(pd.Index(codes[keep].to_numpy(), name='ts_code'))
+        self.prices = daily_price_series(frame)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def price(self, ts_code: str) -> Optional[float]:
+        """单个合约的现价，未命中或无有效价格时返回 None。"""
+        value = self.prices.get(ts_code)
+        return None if value is None or np.isnan(value) else float(value)
+
+    def match(self, ts_codes: Dict[str, str]) -> Dict[str, float]:
+        """批量匹配，见 match_daily_prices。"""
+        return _match(self.prices, ts_codes)
+
+    def last_bar(self, ts_code: str) -> Optional[Dict[str, Any]]:
+        """该合约在快照交易日的日线（含 trade_date），未命中返回 None。"""
+        if ts_code not in self.frame.index:
+            return None
+        bar = self.frame.loc[ts_code].to_dict()
+        bar.setdefault('trade_date', self.trade_date)
+        return bar
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class SnapshotHolder:
+    """持有当前快照，按 TTL 单飞刷新。"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        """初始化。
+
+        Args:
+            ttl_seconds: 刷新间隔秒数，默认读取 MARKET_SNAPSHOT_TTL_SECONDS（60）。
+            clock: 时间函数（测试可注入）。
+        """
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._refresh_lock = threading.Lock()
+        self.stats = {"hits": 0, "refreshes": 0}
+
+    def _ttl(self) -> int:
+        return self.ttl_seconds if self.ttl_seconds is not None else _env_int("MARKET_SNAPSHOT_TTL_SECONDS", 60)
+
+    def _fresh(self) -> Optional[MarketSnapshot]:
+        snap = self._snapshot
+        if snap is not None and self._clock() - snap.fetched_at < self._ttl():
+            return snap
+        return None
+
+    def get(self, loader: Callable[[], MarketSnapshot]) -> MarketSnapshot:
+        """返回未过期的快照，过期时用 loader 刷新（并发调用只刷新一次）。"""
+        snap = self._fresh()
+        if snap is not None:
+            self.stats["hits"] += 1
+            return snap
+        with self._refresh_lock:
+            snap = self._fresh()
+            if snap is not None:
+                self.stats["hits"] += 1
+                return snap
+            try:
+                snap = loader()
+            except Exception as e:
+                logger.error(f"[行情快照] 刷新失败: {e}")
+                snap = None
+            if snap is None:
+                snap = MarketSnapshot(None, None)
+            snap.fetched_at = self._clock()
+            self._snapshot = snap
+            self.stats["refreshes"] += 1
+            logger.info(f"[行情快照] 已刷新: trade_date={snap.trade_date}, 合约数={len(snap)}")
+            return snap
+
+    def reset(self) -> None:
+        """丢弃当前快照（测试用）。"""
+        with self._refresh_lock:
+            self._snapshot = None
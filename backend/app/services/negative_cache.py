@@ -0,0 +1,168 @@
+"""无行情合约的负结果缓存（进程内）。
+
+设计原因：
+1. K 线会依次尝试 2～3 个 ts_code，Tushare 取现价会走「当日单合约 → 日线区间」多条路径；
+   对本来就没有行情的合约（如 FuturesSyncService 生成的 {symbol}26{month} 代码），
+   每次查看或刷新价格都要把这些网络往返全部走一遍。
+2. 按 (ts_code, 数据类型) 记录「确认为空」的结果：TTL 内直接视为无数据，不再请求。
+   同一键连续为空时 TTL 按 NEGATIVE_CACHE_TTL_SECONDS × 2^(次数-1) 退避，
+   上限 NEGATIVE_CACHE_MAX_TTL_SECONDS；一旦取到数据即清除。
+3. 只有接口正常返回空表才记为空；接口异常（返回 None）不记录，避免 Tushare 故障期间把正常合约全部拉黑。
+4. K 线请求区间各不相同，条目记下「自哪天起无数据」（since）：只有起始日不早于它、且截止到今天的请求才会被拦截。
+5. report() 列出这些合约，供管理端清理。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 数据类型
+KIND_KLINE = "kline"
+KIND_PRICE = "price"
+KIND_KLINE_GAP = "kline_gap"  # market_data 中缺失、远端也补不到的交易日
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class _Entry:
+    __slots__ = ("misses", "first_empty_at", "last_empty_at", "expires_at", "since")
+
+    def __init__(self, now: float) -> None:
+        self.misses = 0
+        self.first_empty_at = now
+        self.last_empty_at = now
+        self.expires_at = now
+        self.since: Optional[str] = None
+
+
+class NegativeCache:
+    """(ts_code, 数据类型) -> 连续为空的记录（线程安全）。"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        max_ttl_seconds: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """初始化。
+
+        Args:
+            ttl_seconds: 首次为空的缓存秒数，默认读取 NEGATIVE_CACHE_TTL_SECONDS（900）。
+            max_ttl_seconds: 退避上限秒数，默认读取 NEGATIVE_CACHE_MAX_TTL_SECONDS（86400）。
+            clock: 时间函数（测试可注入）。
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_int("NEGATIVE_CACHE_TTL_SECONDS", 900)
+        self.max_ttl_seconds = (
+            max_ttl_seconds if max_ttl_seconds is not None else _env_int("NEGATIVE_CACHE_MAX_TTL_SECONDS", 86400)
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self.stats = {"hits": 0, "empties": 0, "cleared": 0}
+
+    def _ttl(self, misses: int) -> float:
+        return min(self.ttl_seconds * (2 ** min(misses - 1, 30)), self.max_ttl_seconds)
+
+    def is_negative(self, ts_code: str, kind: str, since: Optional[str] = None) -> bool:
+        """该键是否在 TTL 内确认为空。
+
+        Args:
+            ts_code: Tushare 合约代码。
+            kind: 数据类型（KIND_KLINE / KIND_PRICE）。
+            since: 请求区间起始日 YYYYMMDD；早于记录的 since 时不算命中。
+        """
+        entry = self._entries.get((ts_code, kind))
+        if entry is None or self._clock() >= entry.expires_at:
+            return False
+        if since is not None and entry.since is not None and since < entry.since:
+            return False
+        with self._lock:
+            self.stats["hits"] += 1
+        return True
+
+    def record_empty(self, ts_code: str, kind: str, since: Optional[str] = None) -> None:
+        """记录一次确认为空的结果，TTL 按连续次数退避。"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get((ts_code, kind))
+            if entry is None:
+                entry = self._entries[(ts_code, kind)] = _Entry(now)
+            entry.misses += 1
+            entry.last_empty_at = now
+            entry.expires_at = now + self._ttl(entry.misses)
+            if since is not None and (entry.since is None or since < entry.since):
+                entry.since = since
+            self.stats["empties"] += 1
+            misses = entry.misses
+        if misses > 1:
+            logger.info("[负缓存] %s/%s 连续 %s 次无数据，%s 秒内不再请求", ts_code, kind, misses, int(self._ttl(misses)))
+
+    def record_found(self, ts_code: str, kind: str) -> None:
+        """取到数据后清除记录。"""
+        if (ts_code, kind) not in self._entries:
+            return
+        with self._lock:
+            if self._entries.pop((ts_code, kind), None) is not None:
+                self.stats["cleared"] += 1
+
+    def report(self, min_misses: int = 1) -> List[Dict[str, Any]]:
+        """列出无数据的合约（按连续为空次数降序），供管理端清理。
+
+        Args:
+            min_misses: 只列出连续为空至少这么多次的记录。
+
+        Returns:
+            List[Dict[str, Any]]: 每项含 contract_code、ts_code、kind、misses、since 与时间字段（时间戳秒）。
+        """
+        now = self._clock()
+        with self._lock:
+            items = [(key, entry) for key, entry in self._entries.items() if entry.misses >= min_misses]
+        rows = [
+            {
+                "contract_code": ts_code.split(".")[0],
+                "ts_code": ts_code,
+                "kind": kind,
+                "misses": entry.misses,
+                "since": entry.since,
+                "first_empty_at": entry.first_empty_at,
+                "last_empty_at": entry.last_empty_at,
+                "retry_in_seconds": max(0, int(entry.expires_at - now)),
+            }
+            for (ts_code, kind), entry in items
+        ]
+        rows.sort(key=lambda row: (-row["misses"], row["ts_code"], row["kind"]))
+        return rows
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[NegativeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_negative_cache() -> NegativeCache:
+    """返回进程级负结果缓存。"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = NegativeCache()
+    return _cache
+
+
+def reset_negative_cache() -> None:
+    """丢弃所有记录（测试、基准用）。"""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -1,14 +1,205 @@
 """帖子服务。
 
 负责帖子的创建、查询、更新等业务逻辑。
+
+PostService 使用同步 Session（定时任务、脚本、线程池）；AsyncPostService 使用 AsyncSession，
+供 async 路由在查询期间让出事件循环。两者共用下面的查询构造函数（筛选、排序、分页、计数、
+单帖查询与收藏数更新）和总数缓存（CountCache.get_or_compute / get_or_compute_async），保证结果一致。
 """
 
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_, func, case
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc, or_, func, select, update, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from app.database.models import ACTIVE_CONTRACT_POST_INDEX, Post, User, Sector
+from app.services.count_cache import (
+    POSTS_NAMESPACE,
+    estimate_row_count,
+    estimate_row_count_async,
+    get_count_cache,
+    invalidate_post_counts,
+)
+from app.utils.futures_naming import resolve_search_aliases
+from app.utils.pagination import decode_cursor, encode_cursor
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# 允许通过 update_post 修改的字段
+_EDITABLE_FIELDS = (
+    "title",
+    "contract_code",
+    "stop_loss",
+    "take_profit",
+    "strike_price",
+    "current_price",
+    "direction",
+    "suggestion",
+    "content",
+    "k_line_image",
+    "sector_id",
+)
+
+
+# 帖子列表接口只需要这些列：投影为轻量行（Row），作者昵称随 LEFT JOIN 一并取回，
+# 避免逐条懒加载 Post.author 造成 N+1 查询
+_POST_LIST_COLUMNS = (
+    Post.post_id,
+    Post.title,
+    Post.contract_code,
+    Post.strike_price,
+    Post.stop_loss,
+    Post.take_profit,
+    Post.current_price,
+    Post.direction,
+    Post.suggestion,
+    Post.author_id,
+    Post.collect_count,
+    Post.publish_time,
+    User.nickname.label("author_nickname"),
+    # 排序键，用于生成下一页游标
+    Post.feed_rank,
+)
+
+_FEED_CURSOR_KIND = "feed"
+
+
+def _post_list_select(conditions: List[Any]):
+    """帖子列表投影查询（已带作者 JOIN、筛选与排序，未分页）。"""
+    return (
+        select(*_POST_LIST_COLUMNS)
+        .outerjoin(User, User.user_id == Post.author_id)
+        .where(*conditions)
+        .order_by(*_feed_ordering())
+    )
+
+
+def _post_page_select(conditions: List[Any], page: int, page_size: int, cursor: Optional[str]):
+    """帖子列表的一页查询（多取一行用于判断是否还有下一页）。
+
+    有 cursor 时按 (feed_rank, post_id) 行比较定位（keyset，走 idx_posts_feed_rank /
+    idx_posts_sector_feed_rank 的范围扫描），忽略 page；否则退回 OFFSET 分页。
+
+    Raises:
+        ValueError: 游标无效。
+    """
+    stmt = _post_list_select(conditions)
+    if cursor:
+        feed_rank, post_id = decode_cursor(_FEED_CURSOR_KIND, cursor, (int, int))
+        stmt = stmt.where(tuple_(Post.feed_rank, Post.post_id) < tuple_(feed_rank, post_id))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    return stmt.limit(page_size + 1)
+
+
+def _post_count_key(sector_id: Optional[int], author_id: Optional[int], search: Optional[str]):
+    """帖子总数缓存键（与 _post_list_filters 的筛选一一对应）。"""
+    return get_count_cache().make_key(POSTS_NAMESPACE, sector_id=sector_id, author_id=author_id, search=search)
+
+
+def _post_count_select(conditions: List[Any]):
+    """帖子总数的精确 COUNT 查询。"""
+    return select(func.count()).select_from(Post).where(*conditions)
+
+
+def _published_post_select(post_id: int):
+    """按 ID 查询已发布帖子。"""
+    return select(Post).where(Post.post_id == post_id, Post.status == 1)
+
+
+def _collect_count_update(post_id: int, delta: int):
+    """收藏数加减一的单条 UPDATE（避免读改写竞争，减少时不小于 0）。"""
+    stmt = update(Post).where(Post.post_id == post_id)
+    if delta > 0:
+        return stmt.values(collect_count=func.coalesce(Post.collect_count, 0) + delta)
+    return stmt.where(Post.collect_count > 0).values(collect_count=Post.collect_count + delta)
+
+
+def _post_page_result(
+    rows: List[Any], page: int, page_size: int, total: Optional[int], total_estimated: bool = False
+) -> Dict:
+    """组装分页结果；total 为 None 表示调用方未要求总数。"""
+    posts = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size and posts:
+        last = posts[-1]
+        next_cursor = encode_cursor(_FEED_CURSOR_KIND, (last.feed_rank, last.post_id))
+    return {
+        "posts": posts,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "total_estimated": total_estimated,
+        "next_cursor": next_cursor,
+    }
+
+
+def _post_list_filters(
+    sector_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    search: Optional[str] = None,
+) -> List[Any]:
+    """帖子列表的筛选条件（仅已发布）。"""
+    conditions = [Post.status == 1]
+    if sector_id:
+        conditions.append(Post.sector_id == sector_id)
+    if author_id:
+        conditions.append(Post.author_id == author_id)
+    # 搜索功能：按合约代码或标题搜索；拼音/品种代码别名（如 tong、dp）扩展为中文品类名一并匹配
+    if search:
+        terms = [search, *resolve_search_aliases(search)]
+        conditions.append(
+            or_(*(
+                column.ilike(f"%{term}%")
+                for term in terms
+                for column in (Post.contract_code, Post.title)
+            ))
+        )
+    return conditions
+
+
+def _feed_ordering() -> tuple:
+    """帖子列表排序。
+
+    1. 优先显示有建议（suggestion不为空且不是"待管理员编辑建议"）的帖子
+    2. 按更新时间（updated_at）倒序排列，如果updated_at为空则按publish_time倒序
+    3. post_id 倒序兜底，保证顺序全序（游标分页依赖这一点）
+
+    前两条已合并进生成列 Post.feed_rank（见 models._feed_rank_expression），可直接由索引提供顺序。
+    """
+    return (
+        desc(Post.feed_rank),
+        desc(Post.post_id),
+    )
+
+
+def _new_post(author_id: int, direction: Optional[str], **fields: Any) -> Post:
+    """构造待插入的已发布帖子对象。"""
+    return Post(
+        author_id=author_id,
+        direction=direction or 'buy',
+        status=1,  # 已发布
+        publish_time=datetime.now(timezone.utc),
+        **fields,
+    )
+
+
+def _is_active_contract_conflict(error: IntegrityError) -> bool:
+    """IntegrityError 是否来自「同一合约只有一条已发布帖子」的部分唯一索引（PostgreSQL 报索引名，SQLite 报列名）。"""
+    message = str(getattr(error, 'orig', error))
+    return ACTIVE_CONTRACT_POST_INDEX in message or 'UNIQUE constraint failed: posts.contract_code' in message
+
 
-from app.database.models import Post, User, Sector
+def _apply_post_updates(post: Post, changes: Dict[str, Any]) -> None:
+    """把非 None 的字段写入帖子并刷新 updated_at。"""
+    for field in _EDITABLE_FIELDS:
+        value = changes.get(field)
+        if value is not None:
+            setattr(post, field, value)
+    post.updated_at = datetime.now(timezone.utc)
 
 
 class PostService:
@@ -57,9 +248,13 @@ class PostService:
 
         Returns:
             Post: 创建的帖子对象。
+
+        Raises:
+            ValueError: 该合约已有已发布的帖子。
         """
-        post = Post(
-            author_id=author_id,
+        post = _new_post(
+            author_id,
+            direction,
             title=title,
             contract_code=contract_code,
             stop_loss=stop_loss,
@@ -67,20 +262,28 @@ class PostService:
             take_profit=take_profit,
             strike_price=strike_price,
             current_price=current_price,
-            direction=direction or 'buy',
             suggestion=suggestion,
             k_line_image=k_line_image,
             sector_id=sector_id,
-            status=1,  # 已发布
-            publish_time=datetime.now(timezone.utc),
         )
 
         self.db.add(post)
-        self.db.commit()
+        self._commit_post()
+        invalidate_post_counts()
         self.db.refresh(post)
 
         return post
 
+    def _commit_post(self) -> None:
+        """提交帖子写入；违反「同一合约只有一条已发布帖子」时回滚并抛出 ValueError。"""
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if _is_active_contract_conflict(e):
+                raise ValueError("该合约已有已发布的帖子")
+            raise
+
     def get_post_by_id(self, post_id: int) -> Optional[Post]:
         """根据ID获取帖子。
 
@@ -88,11 +291,11 @@ class PostService:
             post_id: 帖子ID。
 
         Returns:
-            Optional[Post]: 帖子对象，如果不存在则返回None。
+            Optional[Post]: 帖子对象（作者已通过 JOIN 加载），如果不存在则返回None。
         """
-        return self.db.query(Post).filter(
-            and_(Post.post_id == post_id, Post.status == 1)
-        ).first()
+        return self.db.execute(
+            _published_post_select(post_id).options(joinedload(Post.author))
+        ).scalars().first()
 
     def get_posts(
         self,
@@ -101,71 +304,44 @@ class PostService:
         sector_id: Optional[int] = None,
         author_id: Optional[int] = None,
         search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        approximate_total: bool = False,
     ) -> Dict:
         """获取帖子列表。
 
         Args:
-            page: 页码，从1开始。
+            page: 页码，从1开始（传 cursor 时忽略）。
             page_size: 每页数量。
             sector_id: 板块ID筛选（可选）。
             author_id: 作者ID筛选（可选）。
             search: 搜索关键词，用于搜索合约代码或标题（可选）。
+            cursor: 上一页返回的 next_cursor（可选），传入时使用游标分页。
+            include_total: 是否统计总数；为 False 时省去 COUNT 查询，total/total_pages 为 None。
+            approximate_total: 为 True 时优先返回 PostgreSQL 规划器估算值（total_estimated=True），
+                不可用时退回精确计数。精确计数按筛选条件缓存，写操作后失效。
 
         Returns:
-            dict: 包含帖子列表和分页信息的字典。
-        """
-        from sqlalchemy import or_, func
-        
-        query = self.db.query(Post).filter(Post.status == 1)
-
-        if sector_id:
-            query = query.filter(Post.sector_id == sector_id)
-        if author_id:
-            query = query.filter(Post.author_id == author_id)
-        
-        # 搜索功能：按合约代码或标题搜索
-        if search:
-            search_pattern = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Post.contract_code.ilike(search_pattern),
-                    Post.title.ilike(search_pattern),
-                )
-            )
+            dict: 包含帖子列表和分页信息的字典；posts 为投影行（字段见 _POST_LIST_COLUMNS，
+            含 author_nickname），不是 Post 实体；next_cursor 为 None 表示没有下一页。
 
-        # 排序逻辑：
-        # 1. 优先显示有建议（suggestion不为空且不是"待管理员编辑建议"）的帖子
-        # 2. 按更新时间（updated_at）倒序排列，如果updated_at为空则按publish_time倒序
-        query = query.order_by(
-            # 有suggestion的优先（suggestion不为空且不是"待管理员编辑建议"）
-            desc(
-                case(
-                    (
-                        and_(
-                            Post.suggestion.isnot(None),
-                            Post.suggestion != '',
-                            Post.suggestion != '待管理员编辑建议'
-                        ),
-                        1
-                    ),
-                    else_=0
-                )
-            ),
-            # 按更新时间倒序，如果updated_at为空则按publish_time倒序
-            desc(func.coalesce(Post.updated_at, Post.publish_time))
-        )
+        Raises:
+            ValueError: 游标无效。
+        """
+        conditions = _post_list_filters(sector_id, author_id, search)
 
         # 分页
-        total = query.count()
-        posts = query.offset((page - 1) * page_size).limit(page_size).all()
-
-        return {
-            "posts": posts,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size,
-        }
+        total, estimated = None, False
+        if approximate_total and include_total:
+            total = estimate_row_count(self.db, select(Post.post_id).where(*conditions))
+            estimated = total is not None
+        if include_total and total is None:
+            total = get_count_cache().get_or_compute(
+                _post_count_key(sector_id, author_id, search),
+                lambda: self.db.execute(_post_count_select(conditions)).scalar_one(),
+            )
+        rows = self.db.execute(_post_page_select(conditions, page, page_size, cursor)).all()
+        return _post_page_result(rows, page, page_size, total, estimated)
 
     def increment_collect_count(self, post_id: int) -> None:
         """增加帖子收藏数。
@@ -173,10 +349,8 @@ class PostService:
         Args:
             post_id: 帖子ID。
         """
-        post = self.db.query(Post).filter(Post.post_id == post_id).first()
-        if post:
-            post.collect_count += 1
-            self.db.commit()
+        self.db.execute(_collect_count_update(post_id, 1))
+        self.db.commit()
 
     def decrement_collect_count(self, post_id: int) -> None:
         """减少帖子收藏数。
@@ -184,10 +358,8 @@ class PostService:
         Args:
             post_id: 帖子ID。
         """
-        post = self.db.query(Post).filter(Post.post_id == post_id).first()
-        if post and post.collect_count > 0:
-            post.collect_count -= 1
-            self.db.commit()
+        self.db.execute(_collect_count_update(post_id, -1))
+        self.db.commit()
 
     def delete_post(self, post_id: int, user_id: int) -> bool:
         """删除帖子（软删除）。
@@ -199,19 +371,20 @@ class PostService:
         Returns:
             bool: 如果成功删除返回True。
         """
-        post = self.db.query(Post).filter(Post.post_id == post_id).first()
+        post = self.db.get(Post, post_id)
         if not post:
             return False
 
         # 只有作者或管理员可以删除
         if post.author_id != user_id:
             # 检查是否为管理员（role >= 3）
-            user = self.db.query(User).filter(User.user_id == user_id).first()
+            user = self.db.get(User, user_id)
             if not user or user.user_role < 3:
                 return False
 
         post.status = 0  # 软删除
         self.db.commit()
+        invalidate_post_counts()
         return True
 
     def update_post(
@@ -241,13 +414,16 @@ class PostService:
 
         Returns:
             Optional[Post]: 更新后的帖子对象。
+
+        Raises:
+            ValueError: 改成的合约已有已发布的帖子。
         """
-        post = self.db.query(Post).filter(Post.post_id == post_id, Post.status == 1).first()
+        post = self.db.execute(_published_post_select(post_id)).scalars().first()
         if not post:
             return None
 
         # 权限：管理员（user_role >= 3）可编辑任意帖子；非管理员仅能编辑本人帖子
-        author = self.db.query(User).filter(User.user_id == user_id).first()
+        author = self.db.get(User, user_id)
         if not author:
             return None
         if author.user_role >= 3:
@@ -255,31 +431,168 @@ class PostService:
         elif post.author_id != user_id:
             return None  # 非管理员只能编辑自己的帖子
 
-        if title is not None:
-            post.title = title
-        if contract_code is not None:
-            post.contract_code = contract_code
-        if stop_loss is not None:
-            post.stop_loss = stop_loss
-        if take_profit is not None:
-            post.take_profit = take_profit
-        if strike_price is not None:
-            post.strike_price = strike_price
-        if current_price is not None:
-            post.current_price = current_price
-        if direction is not None:
-            post.direction = direction
-        if suggestion is not None:
-            post.suggestion = suggestion
-        if content is not None:
-            post.content = content
-        if k_line_image is not None:
-            post.k_line_image = k_line_image
-        if sector_id is not None:
-            post.sector_id = sector_id
-
-        post.updated_at = datetime.now(timezone.utc)
-        self.db.commit()
+        _apply_post_updates(post, {
+            "title": title,
+            "contract_code": contract_code,
+            "stop_loss": stop_loss,
+            "take_profit": take_profit,
+            "strike_price": strike_price,
+            "current_price": current_price,
+            "direction": direction,
+            "suggestion": suggestion,
+            "content": content,
+            "k_line_image": k_line_image,
+            "sector_id": sector_id,
+        })
+        self._commit_post()
+        invalidate_post_counts()
         self.db.refresh(post)
         return post
 
+
+class AsyncPostService:
+    """帖子服务（异步版本）。
+
+    与 PostService 行为一致，用于 async 路由。
+    """
+
+    def __init__(self, db: "AsyncSession"):
+        """初始化帖子服务。
+
+        Args:
+            db: 异步数据库会话。
+        """
+        self.db = db
+
+    async def create_post(
+        self,
+        author_id: int,
+        title: str,
+        contract_code: str,
+        stop_loss: float,
+        content: str,
+        take_profit: Optional[float] = None,
+        strike_price: Optional[float] = None,
+        current_price: Optional[float] = None,
+        direction: Optional[str] = 'buy',
+        suggestion: Optional[str] = None,
+        k_line_image: Optional[str] = None,
+        sector_id: Optional[int] = None,
+    ) -> Post:
+        """创建新帖子，参数同 PostService.create_post。"""
+        post = _new_post(
+            author_id,
+            direction,
+            title=title,
+            contract_code=contract_code,
+            stop_loss=stop_loss,
+            content=content,
+            take_profit=take_profit,
+            strike_price=strike_price,
+            current_price=current_price,
+            suggestion=suggestion,
+            k_line_image=k_line_image,
+            sector_id=sector_id,
+        )
+        self.db.add(post)
+        await self._commit_post()
+        invalidate_post_counts()
+        await self.db.refresh(post)
+        return post
+
+    async def _commit_post(self) -> None:
+        """提交帖子写入；违反「同一合约只有一条已发布帖子」时回滚并抛出 ValueError。"""
+        try:
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            if _is_active_contract_conflict(e):
+                raise ValueError("该合约已有已发布的帖子")
+            raise
+
+    async def get_post_by_id(self, post_id: int) -> Optional[Post]:
+        """根据ID获取已发布帖子（作者通过 JOIN 一并加载）。"""
+        result = await self.db.execute(_published_post_select(post_id).options(joinedload(Post.author)))
+        return result.scalars().first()
+
+    async def get_posts(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        sector_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        approximate_total: bool = False,
+    ) -> Dict:
+        """获取帖子列表，参数与返回同 PostService.get_posts。"""
+        conditions = _post_list_filters(sector_id, author_id, search)
+        total, estimated = None, False
+        if approximate_total and include_total:
+            total = await estimate_row_count_async(self.db, select(Post.post_id).where(*conditions))
+            estimated = total is not None
+        if include_total and total is None:
+            async def count() -> int:
+                return (await self.db.execute(_post_count_select(conditions))).scalar_one()
+
+            total = await get_count_cache().get_or_compute_async(
+                _post_count_key(sector_id, author_id, search), count
+            )
+        result = await self.db.execute(_post_page_select(conditions, page, page_size, cursor))
+        return _post_page_result(list(result.all()), page, page_size, total, estimated)
+
+    async def increment_collect_count(self, post_id: int) -> None:
+        """增加帖子收藏数（单条 UPDATE，避免读改写竞争）。"""
+        await self.db.execute(_collect_count_update(post_id, 1))
+        await self.db.commit()
+
+    async def decrement_collect_count(self, post_id: int) -> None:
+        """减少帖子收藏数（不小于 0）。"""
+        await self.db.execute(_collect_count_update(post_id, -1))
+        await self.db.commit()
+
+    async def delete_post(self, post_id: int, user_id: int) -> bool:
+        """删除帖子（软删除），规则同 PostService.delete_post。"""
+        post = await self.db.get(Post, post_id)
+        if not post:
+            return False
+
+        # 只有作者或管理员可以删除
+        if post.author_id != user_id:
+            user = await self.db.get(User, user_id)
+            if not user or user.user_role < 3:
+                return False
+
+        post.status = 0  # 软删除
+        await self.db.commit()
+        invalidate_post_counts()
+        return True
+
+    async def update_post(self, post_id: int, user_id: int, **changes: Any) -> Optional[Post]:
+        """更新帖子，规则同 PostService.update_post。
+
+        Args:
+            post_id: 帖子ID。
+            user_id: 当前用户ID。
+            **changes: 可编辑字段（见 _EDITABLE_FIELDS），值为 None 的字段不修改。
+
+        Returns:
+            Optional[Post]: 更新后的帖子对象。
+        """
+        post = (await self.db.execute(_published_post_select(post_id))).scalars().first()
+        if not post:
+            return None
+
+        # 权限：管理员（user_role >= 3）可编辑任意帖子；非管理员仅能编辑本人帖子
+        author = await self.db.get(User, user_id)
+        if not author:
+            return None
+        if author.user_role < 3 and post.author_id != user_id:
+            return None
+
+        _apply_post_updates(post, changes)
+        await self._commit_post()
+        invalidate_post_counts()
+        await self.db.refresh(post)
+        return post
@@ -0,0 +1,74 @@
+"""「价格已变化」事件（进程内发布/订阅）。
+
+PriceUpdateService 每轮只写入价格真正变化的合约，写入后发布 PricesChangedEvent，
+下游（缓存、推送等）订阅后按合约做增量处理，而不必每轮都全量刷新。
+订阅回调在发布线程中同步执行，应尽量轻量；单个回调抛错只记日志，不影响其他订阅者和写库结果。
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PricesChangedEvent:
+    """一轮价格刷新中发生变化的合约。
+
+    Attributes:
+        changes: 合约代码（大写）-> 新价格。
+        updated_posts: 本轮实际写入的帖子数。
+        occurred_at: 写入时间（UTC）。
+    """
+
+    changes: Dict[str, float]
+    updated_posts: int
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+
+
+PricesChangedHandler = Callable[[PricesChangedEvent], None]
+
+_handlers: List[PricesChangedHandler] = []
+_handlers_lock = threading.Lock()
+_last_event: Optional[PricesChangedEvent] = None
+
+
+def subscribe_prices_changed(handler: PricesChangedHandler) -> Callable[[], None]:
+    """订阅价格变化事件。
+
+    Args:
+        handler: 回调，参数为 PricesChangedEvent。
+
+    Returns:
+        Callable[[], None]: 调用即取消订阅。
+    """
+    with _handlers_lock:
+        _handlers.append(handler)
+
+    def unsubscribe() -> None:
+        with _handlers_lock:
+            if handler in _handlers:
+                _handlers.remove(handler)
+
+    return unsubscribe
+
+
+def publish_prices_changed(event: PricesChangedEvent) -> None:
+    """发布价格变化事件（没有变化的轮次不应调用）。"""
+    global _last_event
+    _last_event = event
+    with _handlers_lock:
+        handlers = list(_handlers)
+    for handler in handlers:
+        try:
+            handler(event)
+        except Exception as e:
+            logger.error(f"价格变化事件处理失败: {handler!r}, 错误: {e}", exc_info=True)
+
+
+def get_last_prices_changed() -> Optional[PricesChangedEvent]:
+    """最近一次发布的事件（用于状态查询），尚未发布过时返回 None。"""
+    return _last_event
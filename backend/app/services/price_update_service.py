@@ -1,23 +1,146 @@
 """价格更新服务。
 
 负责从行情后端（Tushare 或本地 JSON）读取现价并更新到数据库。
+
+设计原因（批量写回）：
+1. 定时任务每 5 分钟刷新全部已发布帖子的现价。逐个加载 Post 实体（含 content 大字段）再逐条 flush，
+   语句数与 WAL 量都随帖子数线性增长。
+2. 现在只查询 (post_id, contract_code, current_price) 三列，按规范化合约代码分组取价，
+   与库中现价相同的行直接跳过；其余行在 PostgreSQL 上用 UPDATE ... FROM (VALUES ...) 分块一次写入，
+   其他数据库退回按主键的 executemany。
+3. 进程内记录每个合约最近一次写入的价格（启动后首轮从库中播种），每轮只对价格变化的合约查询帖子并写回；
+   非交易时段价格不动时，整轮不产生任何写入，也不刷新 updated_at（帖子流排序不被打乱）。
+   帖子被其他路径增删改时（invalidate_post_counts 会推进「posts」代际号）重新播种；本轮取价期间
+   发生的代际推进不会被本轮写入「吸收」。进程外的写入（同步脚本、造数脚本等）不推进代际号，
+   因此播种超过 PRICE_LEDGER_RESEED_SECONDS 秒后也重新播种（一条按合约 GROUP BY 的聚合查询）。
+4. 写入后发布 PricesChangedEvent（见 price_events），列出本轮价格变化的合约，供下游增量处理。
 """
 
 import logging
-from typing import Optional, Dict, List
+import os
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Optional, Dict, List, Tuple
 from datetime import datetime
 import pandas as pd
 import numpy as np
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, cast, column, func, update, values, BigInteger, Numeric
 
 from app.database.models import Post, FuturesContract
+from app.services.count_cache import POSTS_NAMESPACE, get_count_cache, invalidate_post_counts
+from app.services.price_events import PricesChangedEvent, publish_prices_changed
 from app.services.market_backend import get_market_backend
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# UPDATE ... FROM (VALUES ...) 每块的行数（每行 2 个绑定参数，远低于驱动参数上限）
+_WRITE_CHUNK_SIZE = 1000
+_PRICE_QUANTUM = Decimal("0.01")  # posts.current_price 为 NUMERIC(12, 2)
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _normalize_code(contract_code: Optional[str]) -> str:
+    """统一大写键，兼容 Tushare/JSON 返回键与库中合约写法。"""
+    return (contract_code or "").strip().upper()
+
+
+def _to_price(value) -> Optional[Decimal]:
+    """把行情价格转换为与 posts.current_price 同精度的 Decimal；无效值返回 None。"""
+    if value is None:
+        return None
+    try:
+        price = Decimal(str(value)).quantize(_PRICE_QUANTUM)
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price.is_finite() else None
+
+
+class _PriceLedger:
+    """每个合约最近一次写入的价格（进程内，线程安全）。
+
+    prices 中值为 None 表示该合约下帖子现价不一致或有空值，下一轮无论价格是否变化都要写。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._prices: Dict[str, Optional[Decimal]] = {}
+        self._post_counts: Dict[str, int] = {}
+        self._uncoded_posts = 0
+        self._generation: Optional[int] = None
+        self._seeded_at = 0.0
+
+    def is_current(self) -> bool:
+        """播种后帖子集合未被其他路径修改过，且播种未超过 PRICE_LEDGER_RESEED_SECONDS 秒。"""
+        max_age = _env_int("PRICE_LEDGER_RESEED_SECONDS", 1800)
+        with self._lock:
+            if self._generation != get_count_cache().generation(POSTS_NAMESPACE):
+                return False
+            # 为 0 时每轮都重新播种
+            return self._clock() - self._seeded_at < max_age
+
+    def load(self, rows: List[Tuple[str, int, int, Optional[Decimal], Optional[Decimal]]], generation: int) -> None:
+        """从按合约聚合的 (code, 帖子数, 有现价的帖子数, 最低现价, 最高现价) 播种。
+
+        generation 为聚合查询之前取得的代际号，查询期间发生的修改会在下一轮触发重新播种。
+        """
+        prices, counts, uncoded = {}, {}, 0
+        for code, n_posts, n_priced, low, high in rows:
+            code = _normalize_code(code)
+            if not code:
+                uncoded += n_posts
+                continue
+            counts[code] = n_posts
+            prices[code] = low if n_priced == n_posts and low == high else None
+        with self._lock:
+            self._prices, self._post_counts, self._uncoded_posts = prices, counts, uncoded
+            self._generation = generation
+            self._seeded_at = self._clock()
+
+    def snapshot(self) -> Tuple[Dict[str, Optional[Decimal]], Dict[str, int], int, Optional[int]]:
+        """(各合约已写入价格, 各合约帖子数, 无合约代码的帖子数, 快照对应的代际号) 的副本。"""
+        with self._lock:
+            return dict(self._prices), dict(self._post_counts), self._uncoded_posts, self._generation
+
+    def apply(self, applied: Dict[str, Decimal], expected_generation: Optional[int]) -> None:
+        """记录本轮已写入的价格。
+
+        Args:
+            applied: 本轮写入的合约价格。
+            expected_generation: 快照代际号加上本轮自身的推进次数。当前代际号与之不同，说明取价期间
+                有其他路径增删改了帖子，置空代际号，下一轮重新播种。
+        """
+        generation = get_count_cache().generation(POSTS_NAMESPACE)
+        with self._lock:
+            self._prices.update(applied)
+            self._generation = generation if generation == expected_generation else None
+
+    def reset(self) -> None:
+        """清空，下一轮重新播种。"""
+        with self._lock:
+            self._prices, self._post_counts, self._uncoded_posts = {}, {}, 0
+            self._generation = None
+            self._seeded_at = 0.0
+
+
+_ledger = _PriceLedger()
+
+
+def reset_price_ledger() -> None:
+    """丢弃进程内的已写入价格记录（测试或手工修库后使用）。"""
+    _ledger.reset()
+
 
 class PriceUpdateService:
     """价格更新服务类。
@@ -90,6 +213,7 @@ class PriceUpdateService:
             post.current_price = current_price
             post.updated_at = datetime.utcnow()
             self.db.commit()
+            invalidate_post_counts()
 
             logger.info(f"成功更新帖子价格，post_id: {post_id}, contract_code: {post.contract_code}, price: {current_price}")
             return True
@@ -125,21 +249,26 @@ class PriceUpdateService:
     def update_all_posts_price(self) -> Dict[str, int]:
         """批量更新所有已发布帖子的现价。
 
-        优化版本：先批量获取所有价格，然后批量更新数据库，提高效率。
+        与进程内记录的上次写入价格比较，只对价格变化的合约读取 (post_id, current_price) 并集合式写回；
+        没有变化的帖子不写（也不刷新 updated_at）。有写入时发布 PricesChangedEvent。
 
         Returns:
             dict: 包含更新统计信息的字典，格式为：
                 {
                     "total": 总帖子数,
-                    "success": 成功更新数,
-                    "failed": 失败数
+                    "success": 取到价格的帖子数,
+                    "failed": 失败数（无合约代码或取不到价格）,
+                    "updated": 实际写入的帖子数,
+                    "unchanged": 价格未变化而跳过的帖子数,
+                    "changed_contracts": 价格变化的合约数
                 }
         """
         try:
-            # 获取所有已发布的帖子
-            posts = self.db.query(Post).filter(Post.status == 1).all()
+            if not _ledger.is_current():
+                self._seed_price_ledger()
+            known_prices, post_counts, failed_count, generation = _ledger.snapshot()
 
-            total = len(posts)
+            total = sum(post_counts.values()) + failed_count
             if total == 0:
                 logger.info("没有需要更新价格的帖子")
                 return {
@@ -150,59 +279,60 @@ class PriceUpdateService:
 
             logger.info(f"开始批量更新价格，总帖子数: {total}")
 
-            # 收集所有需要更新的合约代码
-            contract_codes = []
-            post_contract_map = {}  # {contract_code: [post1, post2, ...]}
-            
-            for post in posts:
-                if not post.contract_code:
-                    continue
-                
-                contract_code = post.contract_code
-                contract_codes.append(contract_code)
-                
-                if contract_code not in post_contract_map:
-                    post_contract_map[contract_code] = []
-                post_contract_map[contract_code].append(post)
-
             # 批量获取所有价格
-            price_map = self._batch_get_prices(contract_codes)
-            # 统一大写键，兼容 Tushare/JSON 返回键与库中合约写法
-            norm_prices = {
-                (k or "").strip().upper(): v for k, v in price_map.items()
-            }
-            
-            # 批量更新数据库
+            price_map = self._batch_get_prices(list(post_counts))
+            norm_prices = {_normalize_code(k): _to_price(v) for k, v in price_map.items()}
+
             success_count = 0
-            failed_count = 0
-            updated_at = datetime.utcnow()
-            
-            for contract_code, posts_list in post_contract_map.items():
-                nk = (contract_code or "").strip().upper()
-                if nk in norm_prices and norm_prices[nk] is not None:
-                    price = norm_prices[nk]
-                    # 更新所有使用该合约的帖子
-                    for post in posts_list:
-                        try:
-                            post.current_price = price
-                            post.updated_at = updated_at
-                            success_count += 1
-                        except Exception as e:
-                            logger.error(f"更新帖子价格失败，post_id: {post.post_id}, 错误: {str(e)}")
-                            failed_count += 1
-                else:
-                    logger.warning(f"无法获取合约价格，contract_code: {contract_code}, 影响 {len(posts_list)} 个帖子")
-                    failed_count += len(posts_list)
-
-            # 提交所有更改
+            dirty: Dict[str, Decimal] = {}
+            for contract_code, n_posts in post_counts.items():
+                price = norm_prices.get(contract_code)
+                if price is None:
+                    logger.warning(f"无法获取合约价格，contract_code: {contract_code}, 影响 {n_posts} 个帖子")
+                    failed_count += n_posts
+                    continue
+                success_count += n_posts
+                if known_prices.get(contract_code) != price:
+                    dirty[contract_code] = price
+
+            # 只读取价格变化的合约下的帖子，现价已相同的行不写
+            changes: List[Tuple[int, Decimal]] = []
+            changed_codes = set()
+            if dirty:
+                code_expr = func.upper(func.trim(Post.contract_code))
+                rows = self.db.query(Post.post_id, code_expr, Post.current_price).filter(
+                    Post.status == 1, code_expr.in_(list(dirty))
+                ).all()
+                for post_id, contract_code, current_price in rows:
+                    price = dirty[contract_code]
+                    if current_price != price:
+                        changes.append((post_id, price))
+                        changed_codes.add(contract_code)
+
+            updated_count = self._write_prices(changes, datetime.utcnow())
             self.db.commit()
-
-            logger.info(f"批量更新完成，总数: {total}, 成功: {success_count}, 失败: {failed_count}")
+            if updated_count:
+                invalidate_post_counts()
+            _ledger.apply(dirty, None if generation is None else generation + int(bool(updated_count)))
+            if changed_codes:
+                publish_prices_changed(PricesChangedEvent(
+                    changes={code: float(dirty[code]) for code in sorted(changed_codes)},
+                    updated_posts=updated_count,
+                ))
+
+            logger.info(
+                f"批量更新完成，总数: {total}, 成功: {success_count}, 失败: {failed_count}, "
+                f"实际写入: {updated_count}, 未变化: {success_count - updated_count}, "
+                f"价格变化合约: {len(changed_codes)}"
+            )
 
             return {
                 "total": total,
                 "success": success_count,
                 "failed": failed_count,
+                "updated": updated_count,
+                "unchanged": success_count - updated_count,
+                "changed_contracts": len(changed_codes),
             }
 
         except Exception as e:
@@ -215,6 +345,53 @@ class PriceUpdateService:
                 "error": str(e),
             }
 
+    def _seed_price_ledger(self) -> None:
+        """从库中按合约聚合现价，播种进程内的已写入价格记录。"""
+        generation = get_count_cache().generation(POSTS_NAMESPACE)
+        code_expr = func.upper(func.trim(Post.contract_code))
+        rows = self.db.query(
+            code_expr,
+            func.count(Post.post_id),
+            func.count(Post.current_price),
+            func.min(Post.current_price),
+            func.max(Post.current_price),
+        ).filter(Post.status == 1).group_by(code_expr).all()
+        _ledger.load(rows, generation)
+        logger.info(f"已从数据库播种合约现价记录，合约数: {len(rows)}")
+
+    def _write_prices(self, changes: List[Tuple[int, Decimal]], updated_at: datetime) -> int:
+        """把 (post_id, 新价格) 写回 posts（不提交事务）。
+
+        PostgreSQL 上每块一条 UPDATE ... FROM (VALUES ...)；其他数据库按主键 executemany。
+
+        Args:
+            changes: 需要写入的 (post_id, price)。
+            updated_at: 写入的更新时间。
+
+        Returns:
+            int: 写入的行数。
+        """
+        if not changes:
+            return 0
+        posts = Post.__table__
+        if self.db.get_bind().dialect.name == "postgresql":
+            for start in range(0, len(changes), _WRITE_CHUNK_SIZE):
+                chunk = changes[start:start + _WRITE_CHUNK_SIZE]
+                new_prices = values(
+                    column("post_id", BigInteger), column("price", Numeric(12, 2)), name="new_prices"
+                ).data(chunk)
+                self.db.execute(
+                    update(posts)
+                    .where(posts.c.post_id == new_prices.c.post_id)
+                    .values(current_price=cast(new_prices.c.price, Numeric(12, 2)), updated_at=updated_at)
+                )
+        else:
+            self.db.execute(
+                update(Post),
+                [{"post_id": post_id, "current_price": price, "updated_at": updated_at} for post_id, price in changes],
+            )
+        return len(changes)
+
     def update_posts_by_contract_code(self, contract_code: str) -> Dict[str, int]:
         """更新指定合约代码的所有帖子的现价。
 
@@ -261,6 +438,7 @@ class PriceUpdateService:
                     failed_count += 1
 
             self.db.commit()
+            invalidate_post_counts()
 
             logger.info(f"更新指定合约价格完成，contract_code: {contract_code}, 总数: {total}, 成功: {success_count}, 失败: {failed_count}")
 
@@ -1,17 +1,91 @@
 """定时任务服务。
 
 负责管理定时任务，如定期更新价格等。
+
+价格更新支持两种调度模式（PRICE_UPDATE_SCHEDULE_MODE）：
+- session（默认）：按交易日历调度，交易时段内每 PRICE_UPDATE_SESSION_INTERVAL_MINUTES 分钟刷新，
+  开盘、收盘各补一次，时段之间暂停，每个交易日 PRICE_UPDATE_SETTLEMENT_TIME 做一次结算刷新；
+- interval：旧行为，全天每 PRICE_UPDATE_INTERVAL_MINUTES 分钟刷新一次。
 """
 
 import logging
+import os
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.executors.pool import ThreadPoolExecutor
 
+from app.services.trading_calendar import TZ, get_trading_calendar
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+PRICE_UPDATE_JOB_ID = "price_update_job"
+
+
+def _parse_time(value: str, default: dtime) -> dtime:
+    """解析 HH:MM，非法值回退为默认值。"""
+    try:
+        hour, minute = value.split(":")
+        return dtime(int(hour), int(minute))
+    except (AttributeError, ValueError):
+        return default
+
+
+class TradingSessionTrigger(BaseTrigger):
+    """按交易时段调度的触发器（规则见 TradingCalendar.next_update）。"""
+
+    def __init__(
+        self,
+        interval_minutes: int = 2,
+        settlement_time: Optional[dtime] = dtime(17, 0),
+        symbols: Optional[Iterable[str]] = None,
+    ):
+        """初始化触发器。
+
+        Args:
+            interval_minutes: 交易时段内的刷新间隔（分钟）。
+            settlement_time: 每个交易日的结算刷新时刻（北京时间），None 表示不做结算刷新。
+            symbols: 只按这些品种的交易时段调度，None 表示全部已知品种。
+        """
+        self.interval = timedelta(minutes=max(1, interval_minutes))
+        self.settlement_time = settlement_time
+        self.symbols = list(symbols) if symbols is not None else None
+
+    @classmethod
+    def from_env(cls) -> "TradingSessionTrigger":
+        """按环境变量创建触发器。"""
+        try:
+            interval = int(os.getenv("PRICE_UPDATE_SESSION_INTERVAL_MINUTES", "2"))
+        except ValueError:
+            interval = 2
+        settlement = os.getenv("PRICE_UPDATE_SETTLEMENT_TIME", "17:00")
+        return cls(
+            interval_minutes=interval,
+            settlement_time=None if settlement.lower() in ("", "off", "none") else _parse_time(settlement, dtime(17, 0)),
+        )
+
+    def next_event(self, previous_fire_time: Optional[datetime], now: datetime):
+        """返回 (下次刷新时间, 类型)，见 TradingCalendar.next_update。"""
+        return get_trading_calendar().next_update(
+            previous_fire_time, now, self.interval, self.settlement_time, self.symbols
+        )
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        event = self.next_event(previous_fire_time, now)
+        return event[0] if event else None
+
+    def __str__(self):
+        settlement = self.settlement_time.strftime("%H:%M") if self.settlement_time else "off"
+        return f"trading_session[interval={int(self.interval.total_seconds() // 60)}m, settlement={settlement}]"
+
+    def __repr__(self):
+        return f"<TradingSessionTrigger ({self})>"
+
 
 class SchedulerService:
     """定时任务服务类。
@@ -48,14 +122,16 @@ class SchedulerService:
         self,
         update_func,
         interval_minutes: int = 10,
-        job_id: str = "price_update_job"
+        job_id: str = PRICE_UPDATE_JOB_ID,
+        trigger: Optional[BaseTrigger] = None,
     ):
         """添加价格更新定时任务。
 
         Args:
             update_func: 更新价格的函数，应该接受 db 参数。
-            interval_minutes: 更新间隔（分钟），默认 10 分钟。
+            interval_minutes: 更新间隔（分钟），默认 10 分钟；传入 trigger 时忽略。
             job_id: 任务ID，默认 "price_update_job"。
+            trigger: 自定义触发器（如 TradingSessionTrigger），默认按固定间隔。
         """
         try:
             # 如果任务已存在，先移除
@@ -63,9 +139,9 @@ class SchedulerService:
                 self.scheduler.remove_job(job_id)
                 logger.info(f"已移除现有任务: {job_id}")
 
-            # 添加新的定时任务
-            # 使用间隔触发器，每 interval_minutes 分钟执行一次
-            trigger = IntervalTrigger(minutes=interval_minutes)
+            # 未指定触发器时使用间隔触发器，每 interval_minutes 分钟执行一次
+            if trigger is None:
+                trigger = IntervalTrigger(minutes=interval_minutes)
             
             self.scheduler.add_job(
                 func=update_func,
@@ -77,7 +153,7 @@ class SchedulerService:
                 coalesce=True,  # 如果任务被延迟，只执行最后一次
             )
             
-            logger.info(f"已添加价格更新任务，间隔: {interval_minutes} 分钟")
+            logger.info(f"已添加价格更新任务，触发器: {trigger}")
             
         except Exception as e:
             logger.error(f"添加价格更新任务失败: {str(e)}", exc_info=True)
@@ -106,6 +182,42 @@ class SchedulerService:
         """
         return self.scheduler.get_jobs()
 
+    def get_price_update_schedule(self, job_id: str = PRICE_UPDATE_JOB_ID, count: int = 10) -> Optional[Dict[str, Any]]:
+        """推算价格更新任务接下来的执行计划。
+
+        Args:
+            job_id: 任务ID。
+            count: 推算的执行次数。
+
+        Returns:
+            Optional[Dict[str, Any]]: 调度模式、当前交易阶段与接下来的执行时间；任务不存在时返回 None。
+        """
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            return None
+        trigger = job.trigger
+        now = datetime.now(TZ)
+        runs: List[Dict[str, Any]] = []
+        if isinstance(trigger, TradingSessionTrigger):
+            calendar = get_trading_calendar()
+            events = calendar.upcoming_updates(now, count, trigger.interval, trigger.settlement_time, trigger.symbols)
+            runs = [{"time": t.isoformat(), "kind": kind} for t, kind in events]
+            return {
+                "mode": "session",
+                "phase": calendar.phase(now, trigger.symbols),
+                "next_runs": runs,
+                "calendar": {
+                    "source": calendar.source,
+                    "start": calendar.start.isoformat() if calendar.start else None,
+                    "end": calendar.end.isoformat() if calendar.end else None,
+                },
+            }
+        fire_time = job.next_run_time
+        while fire_time is not None and len(runs) < count:
+            runs.append({"time": fire_time.isoformat(), "kind": "interval"})
+            fire_time = trigger.get_next_fire_time(fire_time, fire_time)
+        return {"mode": "interval", "next_runs": runs}
+
     def pause_job(self, job_id: str):
         """暂停指定的定时任务。
 
@@ -0,0 +1,135 @@
+"""合约代码输入联想索引（进程内）。
+
+设计原因：
+1. 搜索页每次按键都会请求联想，若每次都对 posts 做 ILIKE 查询，数据库压力与按键频率成正比。
+2. 已发布帖子的合约代码只有几百到几千个，全部放进内存里一张按键排序的表即可：
+   前缀查询 = 二分定位 + 顺序扫描，O(log n + k)，不触库。
+3. 每个合约登记多个键：代码（cu2601）、品种（cu）、品类中文名（铜）、品类拼音全拼与首字母（tong、t），
+   因此输入中文、拼音或代码都能联想到同一批合约。
+4. 索引不可变，重建时整体替换；帖子写路径都会调用 invalidate_post_counts，这里复用总数缓存的
+   「posts」代际号判断是否过期，另有 SYMBOL_INDEX_TTL_SECONDS 兜底（脚本等直接改库的情况）。
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.models import Post
+from app.services.count_cache import POSTS_NAMESPACE, get_count_cache
+from app.utils.futures_naming import (
+    SYMBOL_CATEGORY_NAMES,
+    SYMBOL_PINYIN,
+    extract_symbol,
+    pinyin_keys,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolIndex:
+    """不可变的合约代码前缀索引。"""
+
+    def __init__(self, contract_codes: Iterable[str]) -> None:
+        """由合约代码构建索引。
+
+        Args:
+            contract_codes: 合约代码（大小写、空白不限，重复会合并）。
+        """
+        pairs = set()
+        codes = set()
+        for raw in contract_codes:
+            code = (raw or "").strip().upper()
+            if not code:
+                continue
+            codes.add(code)
+            symbol = extract_symbol(code)
+            keys = {code.lower(), symbol.lower(), *pinyin_keys(SYMBOL_PINYIN.get(symbol, ""))}
+            name = SYMBOL_CATEGORY_NAMES.get(symbol)
+            if name:
+                keys.add(name.lower())
+            pairs.update((key, code) for key in keys)
+
+        ordered = sorted(pairs)
+        self._keys: List[str] = [key for key, _ in ordered]
+        self._codes: List[str] = [code for _, code in ordered]
+        self.contract_count = len(codes)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """返回键以 prefix 开头的合约代码（去重，按键顺序，最多 limit 个）。"""
+        prefix = (prefix or "").strip().lower()
+        if not prefix or limit <= 0:
+            return []
+        result = {}
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix) and len(result) < limit:
+            result.setdefault(self._codes[i])
+            i += 1
+        return list(result)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退为默认值。"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+_ACTIVE_CODES = select(Post.contract_code).where(Post.status == 1, Post.contract_code.isnot(None)).distinct()
+
+# (索引, 构建时的 posts 代际号, 构建时间)
+_state: Optional[Tuple[SymbolIndex, int, float]] = None
+_state_lock = threading.Lock()
+
+
+def _current(now: float) -> Tuple[Optional[SymbolIndex], int]:
+    generation = get_count_cache().generation(POSTS_NAMESPACE)
+    state = _state
+    if state is None:
+        return None, generation
+    index, built_generation, built_at = state
+    if built_generation != generation or now - built_at > _env_int("SYMBOL_INDEX_TTL_SECONDS", 300):
+        return None, generation
+    return index, generation
+
+
+def _install(codes: Iterable[str], generation: int, now: float) -> SymbolIndex:
+    global _state
+    index = SymbolIndex(codes)
+    with _state_lock:
+        _state = (index, generation, now)
+    logger.debug("[联想索引] 已重建: %s 个合约, %s 个键", index.contract_count, len(index))
+    return index
+
+
+def get_symbol_index(db: Any) -> SymbolIndex:
+    """返回当前联想索引，过期时用同步会话重建。"""
+    now = time.monotonic()
+    index, generation = _current(now)
+    if index is None:
+        index = _install(db.execute(_ACTIVE_CODES).scalars().all(), generation, now)
+    return index
+
+
+async def get_symbol_index_async(db: Any) -> SymbolIndex:
+    """get_symbol_index 的 AsyncSession 版本。"""
+    now = time.monotonic()
+    index, generation = _current(now)
+    if index is None:
+        index = _install((await db.execute(_ACTIVE_CODES)).scalars().all(), generation, now)
+    return index
+
+
+def reset_symbol_index() -> None:
+    """丢弃当前索引（测试用）。"""
+    global _state
+    with _state_lock:
+        _state = None
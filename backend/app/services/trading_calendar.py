@@ -0,0 +1,416 @@
+"""期货交易日历与交易时段。
+
+设计原因：
+1. 价格刷新原先按固定间隔全天运行，夜间、周末、节假日也照常调用 Tushare 并写库，而这些时段行情根本不变。
+2. 日历按交易所记录休市日（周末固定休市，只需列出工作日休市）：优先读取 Tushare trade_cal 的本地缓存
+   （TRADING_CALENDAR_CACHE_PATH），没有缓存时使用随代码发布的 data/trading_calendar.json；
+   超出覆盖范围的日期按「工作日即交易日」处理。
+3. 交易时段按品种组划分：商品日盘 9:00–15:00（含 10:15–10:30 小节休息），股指 9:30–15:00，
+   国债 9:30–15:15；夜盘 21:00 开始，按品种分别在 23:00、次日 1:00 或 2:30 结束，部分品种没有夜盘。
+   长假前最后一个交易日不开夜盘（下一交易日不是紧接着的工作日即视为长假）。
+4. next_update 只依赖日历本身，不依赖调度器，便于单测；调度器触发器与状态接口都调用它。
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from app.utils.futures_naming import SYMBOL_CATEGORY_NAMES, extract_symbol, infer_exchange_code
+
+logger = logging.getLogger(__name__)
+
+TZ = ZoneInfo("Asia/Shanghai")
+
+_DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+_BUNDLED_PATH = _DATA_DIR / "trading_calendar.json"
+_DEFAULT_CACHE_PATH = _DATA_DIR / "trading_calendar_cache.json"
+
+# 休市表中适用于所有交易所的键
+ALL_EXCHANGES = "*"
+# 向后查找交易时段的最大自然日数（春节长假约 9 天）
+_MAX_LOOKAHEAD_DAYS = 20
+
+SessionTimes = Tuple[Tuple[dtime, dtime], ...]
+
+_COMMODITY_DAY: SessionTimes = ((dtime(9, 0), dtime(10, 15)), (dtime(10, 30), dtime(11, 30)), (dtime(13, 30), dtime(15, 0)))
+_INDEX_DAY: SessionTimes = ((dtime(9, 30), dtime(11, 30)), (dtime(13, 0), dtime(15, 0)))
+_BOND_DAY: SessionTimes = ((dtime(9, 30), dtime(11, 30)), (dtime(13, 0), dtime(15, 15)))
+_NIGHT_START = dtime(21, 0)
+
+
+@dataclass(frozen=True)
+class ProductGroup:
+    """交易时段相同的一组品种。
+
+    Attributes:
+        name: 组名（用于日志与状态展示）。
+        symbols: 品种代码（大写）。
+        day_sessions: 日盘时段。
+        night_end: 夜盘结束时间，早于 21:00 表示跨到次日；None 表示没有夜盘。
+    """
+
+    name: str
+    symbols: FrozenSet[str]
+    day_sessions: SessionTimes = _COMMODITY_DAY
+    night_end: Optional[dtime] = None
+
+
+PRODUCT_GROUPS: Tuple[ProductGroup, ...] = (
+    ProductGroup("stock_index", frozenset({"IF", "IH", "IC", "IM"}), _INDEX_DAY),
+    ProductGroup("treasury", frozenset({"TS", "TF", "T", "TL"}), _BOND_DAY),
+    ProductGroup("night_0230", frozenset({"AU", "AG", "SC"}), night_end=dtime(2, 30)),
+    ProductGroup("night_0100", frozenset({"CU", "AL", "ZN", "PB", "NI", "SN", "SS", "AO", "BC"}), night_end=dtime(1, 0)),
+    ProductGroup(
+        "night_2300",
+        frozenset({
+            "RB", "HC", "BU", "RU", "FU", "SP", "BR", "NR", "LU",
+            "A", "B", "M", "Y", "P", "C", "CS", "L", "V", "PP", "J", "JM", "I", "EG", "EB", "PG", "RR",
+            "SR", "CF", "TA", "MA", "RM", "OI", "FG", "SA", "CY", "PF", "PX", "SH", "PR", "PL", "ZC",
+        }),
+        night_end=dtime(23, 0),
+    ),
+)
+# 未列出的品种（鸡蛋、生猪、苹果、工业硅等）只有商品日盘
+_DAY_ONLY = ProductGroup("day_only", frozenset())
+
+# (交易所, 日盘时段, 夜盘结束)
+_Profile = Tuple[str, SessionTimes, Optional[dtime]]
+
+
+def product_group(symbol: str) -> ProductGroup:
+    """返回品种所属的交易时段组。"""
+    symbol = (symbol or "").upper()
+    for group in PRODUCT_GROUPS:
+        if symbol in group.symbols:
+            return group
+    return _DAY_ONLY
+
+
+def _profiles(symbols: Optional[Iterable[str]]) -> Set[_Profile]:
+    if symbols is None:
+        symbols = set(SYMBOL_CATEGORY_NAMES).union(*(g.symbols for g in PRODUCT_GROUPS))
+    profiles = set()
+    for raw in symbols:
+        symbol = extract_symbol(raw)
+        group = product_group(symbol)
+        profiles.add((infer_exchange_code(symbol) or "SHFE", group.day_sessions, group.night_end))
+    return profiles
+
+
+def _at(day: date, at: dtime) -> datetime:
+    return datetime.combine(day, at, tzinfo=TZ)
+
+
+def _merge(windows: List[Tuple[datetime, datetime, str]]) -> List[Tuple[datetime, datetime, str]]:
+    merged: List[Tuple[datetime, datetime, str]] = []
+    for start, end, kind in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            last = merged[-1]
+            merged[-1] = (last[0], max(last[1], end), last[2])
+        else:
+            merged.append((start, end, kind))
+    return merged
+
+
+class TradingCalendar:
+    """按交易所区分的交易日历。"""
+
+    def __init__(
+        self,
+        closed: Dict[str, Iterable[date]],
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        source: str = "bundled",
+    ) -> None:
+        """初始化日历。
+
+        Args:
+            closed: 交易所代码 -> 工作日休市日期；键 "*" 适用于未单独列出的交易所。
+            start: 休市表覆盖的起始日期（含），None 表示不限。
+            end: 休市表覆盖的结束日期（含），None 表示不限。
+            source: 数据来源（bundled / tushare），仅用于展示。
+        """
+        self._closed: Dict[str, FrozenSet[date]] = {k.upper(): frozenset(v) for k, v in closed.items()}
+        self.start = start
+        self.end = end
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "TradingCalendar":
+        """由 JSON 结构构建（格式见 data/trading_calendar.json）。"""
+        closed = {
+            exchange: [date.fromisoformat(d) for d in days]
+            for exchange, days in (raw.get("closed") or {}).items()
+        }
+        start = date.fromisoformat(raw["start"]) if raw.get("start") else None
+        end = date.fromisoformat(raw["end"]) if raw.get("end") else None
+        return cls(closed, start=start, end=end, source=raw.get("source", "bundled"))
+
+    def to_dict(self) -> dict:
+        """序列化为 JSON 结构。"""
+        return {
+            "source": self.source,
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+            "closed": {k: sorted(d.isoformat() for d in v) for k, v in self._closed.items()},
+        }
+
+    def covers(self, day: date) -> bool:
+        """day 是否在休市表覆盖范围内。"""
+        return (self.start is None or day >= self.start) and (self.end is None or day <= self.end)
+
+    def is_trading_day(self, day: date, exchange: Optional[str] = None) -> bool:
+        """判断某交易所在 day 是否开市（未指定交易所时用通用休市表）。"""
+        if day.weekday() >= 5:
+            return False
+        closed = self._closed.get((exchange or ALL_EXCHANGES).upper())
+        if closed is None:
+            closed = self._closed.get(ALL_EXCHANGES, frozenset())
+        return day not in closed
+
+    def next_trading_day(self, day: date, exchange: Optional[str] = None) -> date:
+        """day 之后（不含）的下一个交易日。"""
+        nxt = day + timedelta(days=1)
+        for _ in range(_MAX_LOOKAHEAD_DAYS * 2):
+            if self.is_trading_day(nxt, exchange):
+                return nxt
+            nxt += timedelta(days=1)
+        return nxt
+
+    def has_night_session(self, day: date, exchange: Optional[str] = None) -> bool:
+        """day 晚上是否开夜盘：当天开市，且下一交易日紧接着（只隔周末不隔假期）。"""
+        if not self.is_trading_day(day, exchange):
+            return False
+        next_weekday = day + timedelta(days=1)
+        while next_weekday.weekday() >= 5:
+            next_weekday += timedelta(days=1)
+        return self.next_trading_day(day, exchange) == next_weekday
+
+    def sessions(self, day: date, symbols: Optional[Iterable[str]] = None) -> List[Tuple[datetime, datetime, str]]:
+        """day 当天开始的交易时段（按时间排序并合并重叠部分）。
+
+        Args:
+            day: 自然日。
+            symbols: 只考虑这些品种/合约代码，None 表示全部已知品种。
+
+        Returns:
+            List[Tuple[datetime, datetime, str]]: (开始, 结束, "day"/"night")，带北京时区；
+            夜盘结束时间可能落在次日。
+        """
+        windows = []
+        for exchange, day_sessions, night_end in _profiles(symbols):
+            if not self.is_trading_day(day, exchange):
+                continue
+            windows.extend((_at(day, s), _at(day, e), "day") for s, e in day_sessions)
+            if night_end is not None and self.has_night_session(day, exchange):
+                end_day = day + timedelta(days=1) if night_end < _NIGHT_START else day
+                windows.append((_at(day, _NIGHT_START), _at(end_day, night_end), "night"))
+        return _merge(windows)
+
+    def phase(self, now: datetime, symbols: Optional[Iterable[str]] = None) -> str:
+        """当前所处阶段：day / night（交易中）或 closed。"""
+        now = now.astimezone(TZ)
+        for day in (now.date() - timedelta(days=1), now.date()):
+            for start, end, kind in self.sessions(day, symbols):
+                if start <= now < end:
+                    return kind
+        return "closed"
+
+    def next_update(
+        self,
+        previous: Optional[datetime],
+        now: datetime,
+        interval: timedelta,
+        settlement: Optional[dtime] = None,
+        symbols: Optional[Iterable[str]] = None,
+    ) -> Optional[Tuple[datetime, str]]:
+        """计算下一次价格刷新的时间。
+
+        规则：交易时段内每 interval 刷新一次；时段开始（open）与结束（close）各补一次；
+        时段之间不刷新；每个交易日 settlement 时刻（收盘后结算价发布）额外刷新一次。
+
+        Args:
+            previous: 上一次计划的刷新时间，首次调度传 None。
+            now: 当前时间。
+            interval: 交易时段内的刷新间隔。
+            settlement: 结算刷新时刻，None 表示不做结算刷新。
+            symbols: 只考虑这些品种/合约代码，None 表示全部已知品种。
+
+        Returns:
+            Optional[Tuple[datetime, str]]: (刷新时间, 类型)，类型为 open / day / night / close / settlement；
+            向后 _MAX_LOOKAHEAD_DAYS 天内都没有交易时返回 None。
+        """
+        floor = (previous or now).astimezone(TZ)
+        candidate = floor + interval
+        symbols = list(symbols) if symbols is not None else None
+
+        first_day = floor.date() - timedelta(days=1)
+        for offset in range(_MAX_LOOKAHEAD_DAYS + 1):
+            day = first_day + timedelta(days=offset)
+            events: List[Tuple[datetime, int, datetime, str]] = [
+                (start, 1, end, kind) for start, end, kind in self.sessions(day, symbols)
+            ]
+            if settlement is not None and self.is_trading_day(day):
+                at = _at(day, settlement)
+                events.append((at, 0, at, "settlement"))
+            for start, is_session, end, kind in sorted(events):
+                if not is_session:
+                    if start > floor:
+                        return start, kind
+                    continue
+                if end <= floor:
+                    continue
+                if start > floor:
+                    return start, "open"
+                if candidate < end:
+                    return candidate, kind
+                return end, "close"
+        return None
+
+    def upcoming_updates(
+        self,
+        now: datetime,
+        count: int,
+        interval: timedelta,
+        settlement: Optional[dtime] = None,
+        symbols: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[datetime, str]]:
+        """从 now 起依次推算之后 count 次刷新（用于状态展示）。"""
+        result: List[Tuple[datetime, str]] = []
+        previous = None
+        for _ in range(max(0, count)):
+            event = self.next_update(previous, now, interval, settlement, symbols)
+            if event is None:
+                break
+            result.append(event)
+            previous = event[0]
+        return result
+
+
+def _load_file(path: Path) -> Optional[TradingCalendar]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return TradingCalendar.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"[交易日历] 读取失败，忽略: {path}, 错误: {e}")
+        return None
+
+
+def _cache_path() -> Path:
+    return Path(os.getenv("TRADING_CALENDAR_CACHE_PATH") or _DEFAULT_CACHE_PATH)
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """返回进程级交易日历：优先 Tushare 缓存，其次随代码发布的休市表。"""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                calendar = _load_file(_cache_path())
+                if calendar is None or not calendar.covers(datetime.now(TZ).date()):
+                    calendar = _load_file(_BUNDLED_PATH) or calendar or TradingCalendar({})
+                logger.info(
+                    f"[交易日历] 已加载: 来源={calendar.source}, 覆盖 {calendar.start} ~ {calendar.end}"
+                )
+                _calendar = calendar
+    return _calendar
+
+
+def set_trading_calendar(calendar: Optional[TradingCalendar]) -> None:
+    """替换进程级日历；传 None 则下次访问时重新加载（测试用）。"""
+    global _calendar
+    with _calendar_lock:
+        _calendar = calendar
+
+
+def refresh_trading_calendar(pro=None, max_age_days: int = 7) -> bool:
+    """从 Tushare trade_cal 拉取今年与明年的交易日历并写入本地缓存。
+
+    缓存文件未过期（max_age_days 天内写过）且覆盖今天时不重复拉取。
+
+    Args:
+        pro: Tushare Pro API 对象，默认使用 tushare_service 中已初始化的实例。
+        max_age_days: 缓存有效天数。
+
+    Returns:
+        bool: 是否使用了新的（或仍然有效的）Tushare 日历。
+    """
+    path = _cache_path()
+    today = datetime.now(TZ).date()
+    try:
+        age = datetime.now().timestamp() - path.stat().st_mtime
+    except OSError:
+        age = None
+    if age is not None and age < max_age_days * 86400:
+        cached = _load_file(path)
+        if cached is not None and cached.covers(today):
+            set_trading_calendar(cached)
+            return True
+
+    if pro is None:
+        from app.services import tushare_service
+
+        pro = tushare_service.pro
+    if pro is None:
+        logger.info("[交易日历] Tushare 不可用，使用内置休市表")
+        return False
+
+    from app.services.fetch_engine import get_tushare_limiter
+    from app.services.tushare_service import TushareService
+
+    start, end = date(today.year, 1, 1), date(today.year + 1, 12, 31)
+    closed: Dict[str, List[date]] = {}
+    covered: List[Tuple[date, date]] = []
+    for exchange in TushareService.FUT_EXCHANGES:
+        try:
+            get_tushare_limiter().acquire()
+            df = pro.trade_cal(
+                exchange=exchange,
+                start_date=start.strftime("%Y%m%d"),
+                end_date=end.strftime("%Y%m%d"),
+                fields="cal_date,is_open",
+            )
+        except Exception as e:
+            logger.warning(f"[交易日历] trade_cal 交易所={exchange} 失败: {e}")
+            continue
+        if df is None or df.empty:
+            continue
+        days = [datetime.strptime(str(d), "%Y%m%d").date() for d in df["cal_date"]]
+        is_open = [int(v) == 1 for v in df["is_open"]]
+        closed[exchange] = [d for d, o in zip(days, is_open) if not o and d.weekday() < 5]
+        covered.append((min(days), max(days)))
+    if not closed:
+        logger.warning("[交易日历] Tushare 未返回任何交易日历，继续使用现有日历")
+        return False
+
+    # 未取到的交易所沿用上期所（或任意已取到的交易所）的休市日
+    closed[ALL_EXCHANGES] = closed.get("SHFE") or next(iter(closed.values()))
+    calendar = TradingCalendar(
+        closed,
+        start=max(c[0] for c in covered),
+        end=min(c[1] for c in covered),
+        source="tushare",
+    )
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(calendar.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"[交易日历] 写入缓存失败（仅本进程生效）: {e}")
+    set_trading_calendar(calendar)
+    logger.info(f"[交易日历] 已从 Tushare 刷新: {len(closed) - 1} 个交易所, 覆盖 {calendar.start} ~ {calendar.end}")
+    return True
@@ -10,13 +10,18 @@
 """
 
 import os
-import re
 import logging
 from typing import Optional, Dict, List
 from datetime import datetime, date, timedelta
 import pandas as pd
 import numpy as np
 
+from app.services.contract_resolver import to_ts_code
+from app.services.fetch_engine import fan_out, get_tushare_limiter, tushare_max_in_flight
+from app.services.market_backend import TUSHARE, report_backend_result
+from app.services.market_snapshot import MarketSnapshot, SnapshotHolder, daily_price_series, match_daily_prices
+from app.services.negative_cache import KIND_PRICE, get_negative_cache
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -44,6 +49,29 @@ else:
         logger.warning("未设置 TUSHARE_TOKEN 环境变量")
     pro = None
 
+# 进程级全市场日线快照，价格刷新、合约同步与 K 线共用
+_snapshot_holder = SnapshotHolder()
+
+
+def _pro_call(api_name: str, **params):
+    """经进程级令牌桶限流后调用 Tushare Pro 接口（所有 pro.* 调用都应经过这里）。
+
+    每次调用的成败上报给行情后端注册表，用于主备切换。
+    """
+    get_tushare_limiter().acquire()
+    try:
+        result = getattr(pro, api_name)(**params)
+    except Exception as e:
+        report_backend_result(TUSHARE, False, e)
+        raise
+    report_backend_result(TUSHARE, True)
+    return result
+
+
+def reset_market_snapshot() -> None:
+    """丢弃进程级全市场日线快照（测试、基准用）。"""
+    _snapshot_holder.reset()
+
 
 class TushareService:
     """Tushare 数据服务类。
@@ -58,6 +86,16 @@ class TushareService:
         if pro is None:
             raise ValueError("Tushare Pro API 未初始化，请检查 TUSHARE_TOKEN 环境变量")
 
+    def health_check(self) -> bool:
+        """探测接口是否可用（查询上期所当日交易日历，开销最小）。
+
+        Returns:
+            bool: 接口返回了 DataFrame 即视为可用；异常向上抛出。
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        df = _pro_call('trade_cal', exchange='SHFE', start_date=today, end_date=today)
+        return isinstance(df, pd.DataFrame)
+
     # Tushare fut_basic 要求按交易所查询；官方交易所枚举见文档 doc_id=135
     FUT_EXCHANGES = ('CFFEX', 'DCE', 'CZCE', 'SHFE', 'INE', 'GFEX')
 
@@ -84,7 +122,8 @@ class TushareService:
         )
         try:
             if exchange:
-                df = pro.fut_basic(
+                df = _pro_call(
+                    'fut_basic',
                     exchange=exchange,
                     fut_type=fut_type,
                     fields=fields,
@@ -94,7 +133,7 @@ class TushareService:
             frames: List[pd.DataFrame] = []
             for ex in self.FUT_EXCHANGES:
                 try:
-                    part = pro.fut_basic(exchange=ex, fut_type=fut_type, fields=fields)
+                    part = _pro_call('fut_basic', exchange=ex, fut_type=fut_type, fields=fields)
                     if part is not None and isinstance(part, pd.DataFrame) and not part.empty:
                         frames.append(part)
                 except Exception as ex_err:
@@ -126,7 +165,7 @@ class TushareService:
             for delta in range(0, max_calendar_lookback):
                 d = (today0 - timedelta(days=delta)).strftime('%Y%m%d')
                 try:
-                    df = pro.fut_mapping(trade_date=d)
+                    df = _pro_call('fut_mapping', trade_date=d)
                     if df is not None and isinstance(df, pd.DataFrame) and not df.empty:
                         if 'mapping_ts_code' not in df.columns:
                             logger.warning('fut_mapping 返回无 mapping_ts_code: %s', list(df.columns))
@@ -163,16 +202,53 @@ class TushareService:
             if ts_code:
                 params['ts_code'] = ts_code
             
-            df = pro.fut_daily(**params)
+            df = _pro_call('fut_daily', **params)
             return df
         except Exception as e:
             logger.error(f"获取期货日线行情失败: {e}")
             return None
 
+    @staticmethod
+    def _row_price(row: pd.Series) -> Optional[float]:
+        """取一行日线的价格：收盘价优先，为空或为 0 时用结算价。"""
+        for column in ('close', 'settle'):
+            if column in row.index:
+                value = row[column]
+                if pd.notna(value) and value != 0:
+                    return float(value)
+        return None
+
+    def _snapshot_trade_dates(self) -> List[str]:
+        """快照候选交易日：今天（若为交易日）与上一个交易日（当日日线收盘后才发布）。"""
+        from app.services.trading_calendar import TZ, get_trading_calendar
+
+        calendar = get_trading_calendar()
+        today = datetime.now(TZ).date()
+        dates = [today] if calendar.is_trading_day(today) else []
+        previous = today - timedelta(days=1)
+        for _ in range(20):
+            if calendar.is_trading_day(previous):
+                break
+            previous -= timedelta(days=1)
+        dates.append(previous)
+        return [d.strftime('%Y%m%d') for d in dates]
+
+    def _load_market_snapshot(self) -> MarketSnapshot:
+        """下载最近一个有数据的交易日的全量日线。"""
+        for trade_date in self._snapshot_trade_dates():
+            df = self.get_futures_daily(trade_date=trade_date)
+            if df is not None and not df.empty:
+                return MarketSnapshot(trade_date, df)
+        return MarketSnapshot(None, None)
+
+    def get_market_snapshot(self) -> MarketSnapshot:
+        """返回进程级全市场日线快照（最多每 MARKET_SNAPSHOT_TTL_SECONDS 秒下载一次）。"""
+        return _snapshot_holder.get(self._load_market_snapshot)
+
     def get_futures_price(self, contract_code: str) -> Optional[float]:
         """获取指定合约的现价（与 K 线图“最后一根收盘”同源，保证列表与详情一致）。
 
-        优先用当日行情；若无则用近期日线区间取最近一根收盘价，与 K 线 API 逻辑一致。
+        优先用全市场日线快照；若无则按合约查当日行情，再用近期日线区间取最近一根收盘价，与 K 线 API 逻辑一致。
 
         Args:
             contract_code: 合约代码，如 "CU2601.SHF" 或 "CU2601"。
@@ -180,35 +256,44 @@ class TushareService:
         Returns:
             Optional[float]: 现价（最近收盘），失败返回 None。
         """
+        return self._lookup_price(contract_code, datetime.now().strftime('%Y%m%d'), use_snapshot=True)
+
+    def _lookup_price(self, contract_code: str, today: str, use_snapshot: bool) -> Optional[float]:
+        """按合约逐级查询现价。
+
+        Args:
+            contract_code: 合约代码。
+            today: 当日 YYYYMMDD。
+            use_snapshot: 是否先查快照；批量路径已整体匹配过快照，传 False。
+
+        Returns:
+            Optional[float]: 现价，失败返回 None。
+        """
         try:
             ts_code = self.convert_contract_code_to_ts_code(contract_code)
-            today = datetime.now().strftime('%Y%m%d')
+            snapshot = self.get_market_snapshot()
 
-            # 1) 先查当日该合约
-            df = self.get_futures_daily(trade_date=today, ts_code=ts_code)
-            if df is not None and not df.empty and 'close' in df.columns:
-                close_price = df.iloc[0]['close']
-                if pd.notna(close_price) and close_price != 0:
-                    return float(close_price)
-            if df is not None and not df.empty and 'settle' in df.columns:
-                settle_price = df.iloc[0]['settle']
-                if pd.notna(settle_price) and settle_price != 0:
-                    return float(settle_price)
-
-            # 2) 当日无数据时，用全量当日按 ts_code 精确匹配
-            df = self.get_futures_daily(trade_date=today)
-            if df is not None and not df.empty:
-                exact = df[df['ts_code'].astype(str) == ts_code]
-                if not exact.empty:
-                    row = exact.iloc[0]
-                    if 'close' in row.index:
-                        close_price = row['close']
-                        if pd.notna(close_price) and close_price != 0:
-                            return float(close_price)
-                    if 'settle' in row.index:
-                        settle_price = row['settle']
-                        if pd.notna(settle_price) and settle_price != 0:
-                            return float(settle_price)
+            # 1) 全市场快照
+            if use_snapshot:
+                price = snapshot.price(ts_code)
+                if price is not None:
+                    return price
+
+            # 近期确认无行情的合约不再走下面的网络查询
+            negatives = get_negative_cache()
+            if negatives.is_negative(ts_code, KIND_PRICE):
+                return None
+            errored = False
+
+            # 2) 快照可能被接口条数截断：单独查当日该合约（快照已是更早交易日说明当日尚无数据，跳过）
+            if snapshot.trade_date in (None, today):
+                df = self.get_futures_daily(trade_date=today, ts_code=ts_code)
+                errored = df is None
+                if df is not None and not df.empty:
+                    price = self._row_price(df.iloc[0])
+                    if price is not None:
+                        negatives.record_found(ts_code, KIND_PRICE)
+                        return price
 
             # 3) 与 K 线同源：按日期区间取最近一根收盘（保证列表现价 = 详情 K 线最后一根）
             df = self.get_futures_kline(
@@ -217,16 +302,17 @@ class TushareService:
                 end_date=today,
                 period=60
             )
+            errored = errored or df is None
             if df is not None and isinstance(df, pd.DataFrame) and not df.empty and 'trade_date' in df.columns and 'close' in df.columns:
                 df = df.sort_values('trade_date', ascending=True)
-                last_row = df.iloc[-1]
-                close_price = last_row.get('close')
-                if pd.notna(close_price) and close_price != 0:
-                    return float(close_price)
-                settle_price = last_row.get('settle')
-                if pd.notna(settle_price) and settle_price != 0:
-                    return float(settle_price)
-
+                price = self._row_price(df.iloc[-1])
+                if price is not None:
+                    negatives.record_found(ts_code, KIND_PRICE)
+                    return price
+
+            # 接口都正常返回但没有数据才记为空；有接口报错时下次照常重试
+            if not errored:
+                negatives.record_empty(ts_code, KIND_PRICE)
             logger.warning(f"无法获取合约价格，contract_code: {contract_code}，ts_code: {ts_code}")
             return None
             
@@ -234,14 +320,20 @@ class TushareService:
             logger.error(f"获取期货价格失败，contract_code: {contract_code}, 错误: {e}")
             return None
 
-    def batch_get_futures_prices(self, contract_codes: List[str]) -> Dict[str, Optional[float]]:
+    def batch_get_futures_prices(
+        self, contract_codes: List[str], snapshot_only: bool = False
+    ) -> Dict[str, Optional[float]]:
         """批量获取多个合约的价格。
         
-        先尝试一次性拉取当日全量日线，再对未命中的合约按 ts_code 单独查询
+        先用全市场日线快照整体匹配，再对未命中的合约按 ts_code 并发单独查询
         （避免因 Tushare 返回条数限制导致铁矿石等合约漏掉）。
+        并发数由 TUSHARE_MAX_IN_FLIGHT 控制，所有调用共享 Tushare 令牌桶限流；
+        快照在刷新间隔内与其他使用者共享，不会重复下载。
         
         Args:
             contract_codes: 合约代码列表。
+            snapshot_only: 只用快照匹配、不对未命中合约单独查询（合约同步给大量候选合约取价时使用，
+                上游请求数与合约数无关；未命中的合约由价格更新任务补齐）。
         
         Returns:
             Dict[str, Optional[float]]: 合约代码到价格的映射。
@@ -249,41 +341,27 @@ class TushareService:
         price_map = {}
         
         try:
-            # 1. 一次性获取当日全量日线（可能被接口条数截断）
-            df = self.get_futures_daily()
-            
-            if df is not None and not df.empty:
-                for contract_code in contract_codes:
-                    if contract_code in price_map:
-                        continue
-                    code_clean = (contract_code or '').strip().upper()
-                    if not code_clean:
-                        continue
-                    
-                    # 只按「代码.交易所」精确匹配，避免 I2603 匹配到 NI2603 等
-                    ts_code_exact = self.convert_contract_code_to_ts_code(code_clean)
-                    exact = df[df['ts_code'].astype(str) == ts_code_exact]
-                    
-                    if not exact.empty:
-                        row = exact.iloc[0]
-                        if 'close' in row.index:
-                            close_price = row['close']
-                            if pd.notna(close_price) and close_price != 0:
-                                price_map[contract_code] = float(close_price)
-                                continue
-                        if 'settle' in row.index:
-                            settle_price = row['settle']
-                            if pd.notna(settle_price) and settle_price != 0:
-                                price_map[contract_code] = float(settle_price)
+            # 1. 全市场日线快照（可能被接口条数截断）
+            # 只按「代码.交易所」精确匹配，避免 I2603 匹配到 NI2603 等；所有合约通过一次 reindex 对齐
+            today = datetime.now().strftime('%Y%m%d')
+            ts_codes = {}
+            for contract_code in contract_codes:
+                code_clean = (contract_code or '').strip().upper()
+                if code_clean and contract_code not in ts_codes:
+                    ts_codes[contract_code] = self.convert_contract_code_to_ts_code(code_clean)
+            price_map.update(self.get_market_snapshot().match(ts_codes))
             
-            # 2. 对未命中的合约按 ts_code 单独查询（解决全量被截断或非交易日无全量数据）
+            # 2. 对未命中的合约按 ts_code 并发单独查询（解决全量被截断或非交易日无全量数据）
             missing = [c for c in contract_codes if c not in price_map or price_map[c] is None]
-            if missing:
-                logger.info(f"批量结果中未命中 {len(missing)} 个合约，改为按合约单独查询")
-                for contract_code in missing:
-                    if contract_code in price_map and price_map[contract_code] is not None:
-                        continue
-                    p = self.get_futures_price(contract_code)
+            if missing and not snapshot_only:
+                logger.info(f"批量结果中未命中 {len(missing)} 个合约，改为按合约并发查询")
+                results = fan_out(
+                    lambda code: self._lookup_price(code, today, use_snapshot=False),
+                    missing,
+                    max_in_flight=tushare_max_in_flight(),
+                    label="tushare",
+                )
+                for contract_code, p in results.items():
                     if p is not None:
                         price_map[contract_code] = p
             
@@ -321,7 +399,8 @@ class TushareService:
                 start_date = start_date_obj.strftime('%Y%m%d')
             
             # 使用 fut_daily 按合约 + 日期区间拉取历史日线（供帖子内 K 线图使用）
-            df = pro.fut_daily(
+            df = _pro_call(
+                'fut_daily',
                 ts_code=ts_code,
                 start_date=start_date,
                 end_date=end_date,
@@ -329,12 +408,24 @@ class TushareService:
             )
             if df is None or not isinstance(df, pd.DataFrame):
                 return None
-            return df
+            return self._with_snapshot_bar(df, ts_code, end_date)
             
         except Exception as e:
             logger.error(f"获取期货 K 线数据失败，ts_code: {ts_code}, 错误: {e}")
             return None
 
+    def _with_snapshot_bar(self, df: pd.DataFrame, ts_code: str, end_date: str) -> pd.DataFrame:
+        """区间日线截止到今天时，若快照交易日比最后一根更新，把快照中的那根补到末尾，
+        使 K 线最后一根与列表现价同源。"""
+        if df.empty or 'trade_date' not in df.columns or end_date < datetime.now().strftime('%Y%m%d'):
+            return df
+        snapshot = self.get_market_snapshot()
+        bar = snapshot.last_bar(ts_code)
+        if bar is None or snapshot.trade_date > end_date or snapshot.trade_date <= str(df['trade_date'].astype(str).max()):
+            return df
+        row = pd.DataFrame([{column: bar.get(column) for column in df.columns}])
+        return pd.concat([df, row], ignore_index=True)
+
     def convert_ts_code_to_contract_code(self, ts_code: str) -> str:
         """将 Tushare 合约代码转换为标准合约代码。
         
@@ -352,66 +443,15 @@ class TushareService:
 
     def convert_contract_code_to_ts_code(self, contract_code: str, exchange: Optional[str] = None) -> str:
         """将标准合约代码转换为 Tushare 合约代码。
-        
+
         例如：I2603 -> I2603.DCE（铁矿石），CU2601 -> CU2601.SHF
-        单字母品种（如 I 铁矿石、C 玉米）必须用完整品种-交易所映射，否则会误判为 SHF。
-        
+        品种-交易所映射统一在 contract_resolver 中维护。
+
         Args:
             contract_code: 标准合约代码。
             exchange: 交易所代码（可选），如果不提供则尝试推断。
-        
+
         Returns:
             str: Tushare 合约代码。
         """
-        if '.' in contract_code:
-            return contract_code
-        
-        # 交易所后缀映射
-        exchange_suffix_map = {
-            'SHFE': 'SHF',
-            'DCE': 'DCE',
-            'CZCE': 'ZCE',
-            'CFFEX': 'CFX',
-            'INE': 'INE',
-            'GFEX': 'GFE',
-        }
-        
-        if exchange and exchange in exchange_suffix_map:
-            return f"{contract_code}.{exchange_suffix_map[exchange]}"
-        
-        # 从合约代码中提取品种部分（仅字母）：I2603->I, CU2601->CU, SS2606->SS
-        symbol_match = re.match(r'^([A-Za-z]+)', contract_code)
-        symbol = symbol_match.group(1).upper() if symbol_match else contract_code[:1].upper()
-        
-        # 品种 -> Tushare 交易所后缀（SHF/DCE/ZCE/CFX/INE/GFE）
-        # 单字母品种：C/A/M/Y/P/L/V/I/J/T 等易被 contract_code[:2] 误判，必须显式映射
-        SYMBOL_EXCHANGE_SUFFIX = {
-            # 中金所 CFFEX -> CFX
-            'IF': 'CFX', 'IH': 'CFX', 'IC': 'CFX', 'IM': 'CFX',
-            'T': 'CFX', 'TF': 'CFX', 'TS': 'CFX', 'TL': 'CFX',
-            # 大商所 DCE -> DCE
-            'C': 'DCE', 'A': 'DCE', 'M': 'DCE', 'Y': 'DCE', 'P': 'DCE', 'JD': 'DCE',
-            'L': 'DCE', 'V': 'DCE', 'PP': 'DCE', 'EB': 'DCE', 'EG': 'DCE',
-            'I': 'DCE', 'J': 'DCE', 'JM': 'DCE', 'FB': 'DCE', 'BB': 'DCE', 'LG': 'DCE',
-            # 郑商所 CZCE -> ZCE
-            'CF': 'ZCE', 'SR': 'ZCE', 'TA': 'ZCE', 'OI': 'ZCE', 'MA': 'ZCE', 'FG': 'ZCE',
-            'RM': 'ZCE', 'ZC': 'ZCE', 'SF': 'ZCE', 'SM': 'ZCE', 'AP': 'ZCE', 'CJ': 'ZCE',
-            'UR': 'ZCE', 'SA': 'ZCE', 'PF': 'ZCE', 'PK': 'ZCE', 'LH': 'ZCE', 'RI': 'ZCE',
-            'LR': 'ZCE', 'JR': 'ZCE', 'PM': 'ZCE', 'WH': 'ZCE', 'CY': 'ZCE', 'PL': 'ZCE',
-            'SH': 'ZCE',
-            'PR': 'ZCE',  # 郑商所瓶级切片（勿与广期所铂 PT 混淆）
-            # 上期所 SHFE -> SHF
-            'CU': 'SHF', 'AL': 'SHF', 'ZN': 'SHF', 'PB': 'SHF', 'NI': 'SHF', 'SN': 'SHF',
-            'AU': 'SHF', 'AG': 'SHF', 'RB': 'SHF', 'HC': 'SHF', 'SS': 'SHF', 'BU': 'SHF',
-            'RU': 'SHF', 'FU': 'SHF', 'WR': 'SHF', 'SP': 'SHF', 'AO': 'SHF', 'BC': 'SHF', 'BR': 'SHF',
-            # 上期能源 INE -> INE
-            'SC': 'INE', 'LU': 'INE', 'NR': 'INE', 'EC': 'INE',
-            # 广期所 GFEX -> GFE（铂 PT、钯 PD 等）
-            'SI': 'GFE', 'LC': 'GFE', 'PT': 'GFE', 'PD': 'GFE',
-        }
-        
-        if symbol in SYMBOL_EXCHANGE_SUFFIX:
-            return f"{contract_code}.{SYMBOL_EXCHANGE_SUFFIX[symbol]}"
-        
-        # 未匹配时默认 SHFE（历史兼容）
-        return f"{contract_code}.SHF"
+        return to_ts_code(contract_code, exchange)
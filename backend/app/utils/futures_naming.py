@@ -1,10 +1,11 @@
 """期货命名工具。
 
 统一帖子标题格式为三段式：「交易所」「品类」「代码」。
+同时提供品类/交易所的拼音别名，供帖子搜索与输入联想把「tong」「dp」之类的输入解析为中文名称。
 """
 
 import re
-from typing import Optional
+from typing import List, Optional, Tuple
 
 # 交易所代码 -> 中文名称（简短，用于标题）
 EXCHANGE_NAMES = {
@@ -46,6 +47,42 @@ SYMBOL_CATEGORY_NAMES = {
     'LG': '碳酸锂',  # 广期所碳酸锂
 }
 
+# 交易所代码 -> 简称拼音（音节以空格分隔，用于生成全拼与首字母别名）
+EXCHANGE_PINYIN = {
+    'SHFE': 'shang qi suo',
+    'DCE': 'da shang suo',
+    'CZCE': 'zheng shang suo',
+    'CFFEX': 'zhong jin suo',
+    'INE': 'shang neng yuan',
+    'GFEX': 'guang qi suo',
+}
+
+# 品种代码 -> 品类名称拼音（只含汉字部分；PVC、PTA 等本身是字母的品类不需要）
+SYMBOL_PINYIN = {
+    'C': 'yu mi', 'A': 'dou yi', 'M': 'dou po', 'Y': 'dou you', 'P': 'zong lv you',
+    'JD': 'ji dan', 'CF': 'mian hua', 'SR': 'bai tang', 'WH': 'qiang mai', 'PM': 'pu mai',
+    'RI': 'zao xian dao', 'LR': 'wan xian dao', 'JR': 'jing dao', 'FB': 'xian wei ban', 'BB': 'jiao he ban',
+    'LH': 'sheng zhu', 'PK': 'hua sheng', 'UR': 'niao su', 'SA': 'chun jian', 'PF': 'duan xian',
+    'PR': 'ping ji qie pian',
+    'PT': 'bo', 'PD': 'ba',
+    'L': 'su liao', 'PP': 'ju bing xi', 'EB': 'ben yi xi', 'EG': 'yi er chun',
+    'MA': 'jia chun', 'FU': 'ran liao you', 'BU': 'li qing', 'RU': 'xiang jiao',
+    'NR': 'hao jiao', 'LU': 'di liu ran liao you', 'PG': 'ye hua shi you qi', 'BR': 'ding er xi xiang jiao',
+    'I': 'tie kuang shi', 'J': 'jiao tan', 'JM': 'jiao mei', 'RB': 'luo wen gang', 'HC': 're zha juan ban',
+    'SS': 'bu xiu gang', 'SF': 'gui tie', 'SM': 'meng gui', 'SI': 'gong ye gui', 'LC': 'tan suan li',
+    'CU': 'tong', 'AL': 'lv', 'ZN': 'xin', 'PB': 'qian', 'NI': 'nie', 'SN': 'xi',
+    'AU': 'huang jin', 'AG': 'bai yin',
+    'IF': 'hu shen', 'IH': 'shang zheng', 'IC': 'zhong zheng', 'IM': 'zhong zheng',
+    'TS': 'nian qi guo zhai', 'TF': 'nian qi guo zhai', 'T': 'nian qi guo zhai', 'TL': 'nian qi guo zhai',
+    'SP': 'zhi jiang', 'WR': 'xian cai', 'BC': 'guo ji tong', 'AO': 'yang hua lv',
+    'OI': 'cai you', 'RM': 'cai po', 'ZC': 'dong li mei', 'AP': 'ping guo', 'CJ': 'hong zao',
+    'FG': 'bo li', 'CY': 'mian sha', 'PL': 'bing xi', 'SH': 'shao jian', 'EC': 'ji yun zhi shu',
+    'LG': 'tan suan li',
+}
+
+# 别名扩展最多返回的中文名称数，避免短输入把搜索条件扩展得过宽
+_MAX_ALIASES = 8
+
 
 def extract_symbol(contract_code: str) -> str:
     """从合约代码中提取品种部分（仅字母）。
@@ -123,3 +160,67 @@ def _infer_exchange_name(symbol: str) -> str:
         'SI': '广期所', 'LC': '广期所',
     }
     return exchange_by_symbol.get(symbol.upper(), '未知')
+
+
+def infer_exchange_code(symbol: str) -> Optional[str]:
+    """根据品种代码推断交易所代码（如 CU -> SHFE），未知品种返回 None。"""
+    name = _infer_exchange_name(symbol or '')
+    for code, exchange_name in EXCHANGE_NAMES.items():
+        if exchange_name == name:
+            return code
+    return None
+
+
+def pinyin_keys(pinyin: str) -> Tuple[str, ...]:
+    """由空格分隔的拼音生成搜索别名：全拼、首字母，以及 ü 写作 u 的变体。
+
+    例如 'zong lv you' -> ('zonglvyou', 'zly', 'zongluyou')。
+    """
+    syllables = pinyin.split()
+    if not syllables:
+        return ()
+    full = ''.join(syllables)
+    keys = [full, ''.join(s[0] for s in syllables)]
+    if 'v' in full:
+        keys.append(full.replace('v', 'u'))
+    return tuple(dict.fromkeys(keys))
+
+
+def _alias_table() -> List[Tuple[str, str]]:
+    """(别名, 中文名称) 列表：品种代码、品类拼音、交易所代码与拼音。"""
+    table = []
+    for symbol, name in SYMBOL_CATEGORY_NAMES.items():
+        table.append((symbol.lower(), name))
+        for key in pinyin_keys(SYMBOL_PINYIN.get(symbol, '')):
+            table.append((key, name))
+    for code, name in EXCHANGE_NAMES.items():
+        table.append((code.lower(), name))
+        for key in pinyin_keys(EXCHANGE_PINYIN.get(code, '')):
+            table.append((key, name))
+    return table
+
+
+_ALIASES = _alias_table()
+
+
+def resolve_search_aliases(keyword: str) -> List[str]:
+    """把搜索词解析为可能指代的中文品类/交易所名称。
+
+    - 与品种代码或交易所代码完全相同（不区分大小写）：如 cu -> 铜、dce -> 大商所
+    - 两个字母以上时按拼音前缀匹配：如 tong -> 铜、dp -> 豆粕、dous -> 无
+    - 含非字母字符（中文、数字）时不扩展，原词直接参与搜索
+
+    Args:
+        keyword: 用户输入的搜索词。
+
+    Returns:
+        List[str]: 去重后的中文名称（最多 _MAX_ALIASES 个），无匹配返回空列表。
+    """
+    kw = (keyword or '').strip().lower()
+    if not kw or not kw.isascii() or not kw.isalpha():
+        return []
+    names = []
+    for alias, name in _ALIASES:
+        if alias == kw or (len(kw) >= 2 and alias.startswith(kw)):
+            names.append(name)
+    return list(dict.fromkeys(names))[:_MAX_ALIASES]
@@ -0,0 +1,76 @@
+"""游标分页工具。
+
+游标是对「上一页最后一行排序键」的不透明编码（URL 安全的 base64 JSON），
+客户端原样回传即可；服务端用行比较 (k1, k2, ...) < (v1, v2, ...) 直接定位，
+深翻页与第一页代价相同，不受 OFFSET 影响。
+
+游标来自客户端，解码时按调用方声明的类型逐个校验（整数限定在 BIGINT 范围内），
+任何不符都抛出 ValueError，由路由转换为 400，而不是在拼 SQL 或执行时变成 500。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+_VERSION = 1
+
+# PostgreSQL BIGINT 取值范围
+_BIGINT_MIN, _BIGINT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """编码游标。
+
+    Args:
+        kind: 游标所属列表（如 "feed"、"collections"），防止混用。
+        values: 排序键取值，datetime 会转为 ISO 字符串。
+
+    Returns:
+        str: 不透明游标字符串。
+    """
+    payload = {
+        "v": _VERSION,
+        "k": kind,
+        "d": [{"t": v.isoformat()} if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=True).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _valid_value(value: Any, expected: type) -> bool:
+    if expected is int:
+        return isinstance(value, int) and not isinstance(value, bool) and _BIGINT_MIN <= value <= _BIGINT_MAX
+    return isinstance(value, expected)
+
+
+def decode_cursor(kind: str, token: str, types: Sequence[type]) -> List[Any]:
+    """解码游标。
+
+    Args:
+        kind: 期望的列表类型。
+        token: encode_cursor 生成的字符串。
+        types: 各排序键的期望类型（int 或 datetime），个数即排序键个数。
+
+    Returns:
+        List[Any]: 排序键取值（datetime 已还原）。
+
+    Raises:
+        ValueError: 游标格式错误、版本或类型不匹配、排序键个数或取值类型不符、整数超出 BIGINT 范围。
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("v") != _VERSION or payload.get("k") != kind:
+            raise ValueError("游标类型不匹配")
+        values = [
+            datetime.fromisoformat(v["t"]) if isinstance(v, dict) else v
+            for v in payload["d"]
+        ]
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {e}") from e
+    if len(values) != len(types) or not all(map(_valid_value, values, types)):
+        raise ValueError("无效的分页游标")
+    return values
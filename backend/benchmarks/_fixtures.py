@@ -0,0 +1,312 @@
+"""基准与测试共用的参考实现、随机数据生成器与接口桩。
+
+设计原因：
+1. 各基准要把业务实现与原实现在同一份随机数据（或同一个接口桩）上对比；这些代码若放在测试模块里，
+   基准就得 import tests.*，测试模块成了基准的运行时依赖。
+2. 统一放在这里，tests/ 与 benchmarks/ 都从本模块导入；原实现仅供对比，勿在业务代码中使用。
+"""
+
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+# K 线规整：bench_kline_normalize、tests/test_kline_service.py
+def legacy_normalize(kline_data: pd.DataFrame):
+    """原 KlineService 中基于 iterrows 的逐行实现（参考用，勿在业务代码中使用）。"""
+    kline_list = []
+    date_col, open_col, high_col, low_col, close_col, volume_col = (
+        'trade_date', 'open', 'high', 'low', 'close', 'vol'
+    )
+    for _, row in kline_data.iterrows():
+        try:
+            date_value = row[date_col]
+            if isinstance(date_value, str):
+                if len(date_value) == 8:
+                    time_str = f"{date_value[:4]}-{date_value[4:6]}-{date_value[6:8]}"
+                else:
+                    try:
+                        time_str = pd.to_datetime(date_value).strftime("%Y-%m-%d")
+                    except Exception:
+                        time_str = str(date_value)
+            elif pd.notna(date_value):
+                if isinstance(date_value, float):
+                    date_value = int(date_value)
+                ds = str(date_value).strip()
+                if len(ds) >= 8 and ds[:8].isdigit():
+                    ds = ds[:8]
+                    time_str = f"{ds[:4]}-{ds[4:6]}-{ds[6:8]}"
+                else:
+                    time_str = pd.to_datetime(ds).strftime("%Y-%m-%d")
+            else:
+                continue
+
+            settle_price = None
+            if 'settle' in kline_data.columns and pd.notna(row.get('settle')):
+                try:
+                    settle_price = float(row['settle'])
+                    if np.isnan(settle_price):
+                        settle_price = None
+                except (TypeError, ValueError):
+                    settle_price = None
+
+            open_price = float(row[open_col]) if pd.notna(row[open_col]) else None
+            high_price = float(row[high_col]) if pd.notna(row[high_col]) else None
+            low_price = float(row[low_col]) if pd.notna(row[low_col]) else None
+            close_price = float(row[close_col]) if pd.notna(row[close_col]) else None
+
+            if open_price is None or np.isnan(open_price):
+                open_price = settle_price
+            if high_price is None or np.isnan(high_price):
+                high_price = settle_price
+            if low_price is None or np.isnan(low_price):
+                low_price = settle_price
+            if close_price is None or np.isnan(close_price):
+                close_price = settle_price
+
+            if any(p is None or (isinstance(p, float) and np.isnan(p))
+                   for p in [open_price, high_price, low_price, close_price]):
+                continue
+
+            high_price = float(max(high_price, open_price, close_price))
+            low_price = float(min(low_price, open_price, close_price))
+            if high_price < low_price:
+                high_price = low_price = float(close_price)
+
+            volume = None
+            if volume_col in kline_data.columns:
+                vol_value = row[volume_col]
+                if pd.notna(vol_value):
+                    try:
+                        volume = int(float(vol_value))
+                    except Exception:
+                        pass
+
+            kline_item = {
+                "time": time_str,
+                "open": open_price,
+                "high": high_price,
+                "low": low_price,
+                "close": close_price,
+            }
+            if volume is not None:
+                kline_item["volume"] = volume
+            kline_list.append(kline_item)
+        except Exception:
+            continue
+
+    kline_list.sort(key=lambda x: x["time"])
+    dedup = {}
+    for it in kline_list:
+        dedup[it["time"]] = it
+    return [dedup[k] for k in sorted(dedup.keys())]
+
+
+def random_kline_frame(rng: np.random.Generator, n: int, date_style: str = "str") -> pd.DataFrame:
+    """生成带缺失、重复日期、错乱 high/low 的随机日线表。"""
+    days = pd.Timestamp("2016-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D")
+    base = rng.uniform(100, 5000, n)
+
+    def noisy(arr, p=0.08):
+        arr = arr.copy()
+        arr[rng.random(n) < p] = np.nan
+        return arr
+
+    df = pd.DataFrame({
+        "open": noisy(base + rng.normal(0, 20, n)),
+        "high": noisy(base + rng.normal(10, 20, n)),
+        "low": noisy(base + rng.normal(-10, 20, n)),
+        "close": noisy(base + rng.normal(0, 20, n)),
+        "settle": noisy(base, 0.3),
+        "vol": noisy(rng.integers(0, 10 ** 6, n).astype(float), 0.2),
+    })
+    if date_style == "int":
+        df.insert(0, "trade_date", days.strftime("%Y%m%d").astype(int))
+    else:
+        dates = np.array(days.strftime("%Y%m%d"), dtype=object)
+        dashed = rng.random(n) < 0.1
+        dates[dashed] = np.array(days[dashed].strftime("%Y-%m-%d"), dtype=object)
+        dates[rng.random(n) < 0.03] = None
+        df.insert(0, "trade_date", dates)
+    return df
+
+
+# 合约-价格匹配：bench_price_matching、tests/test_price_matching.py
+SUFFIXES = ("SHF", "DCE", "ZCE", "CFX", "INE", "GFE")
+
+
+def legacy_match(df, ts_codes):
+    """原实现：每个合约对整张表 astype(str) 后过滤，再按行取收盘/结算价。"""
+    price_map = {}
+    for contract_code, ts_code in ts_codes.items():
+        exact = df[df['ts_code'].astype(str) == ts_code]
+        if not exact.empty:
+            row = exact.iloc[0]
+            close_price = row['close']
+            if pd.notna(close_price) and close_price != 0:
+                price_map[contract_code] = float(close_price)
+                continue
+            settle_price = row['settle']
+            if pd.notna(settle_price) and settle_price != 0:
+                price_map[contract_code] = float(settle_price)
+    return price_map
+
+
+def random_snapshot(rng, rows):
+    """生成 rows 行全量日线：含重复 ts_code、缺失价与 0 价。"""
+    codes = [f"X{i:05d}.{SUFFIXES[i % len(SUFFIXES)]}" for i in range(rows)]
+    close = rng.uniform(100, 9000, rows).round(1)
+    settle = rng.uniform(100, 9000, rows).round(1)
+    close[rng.random(rows) < 0.1] = np.nan
+    close[rng.random(rows) < 0.05] = 0
+    settle[rng.random(rows) < 0.1] = np.nan
+    df = pd.DataFrame({"ts_code": codes, "close": close, "settle": settle})
+    dup = df.sample(n=max(1, rows // 50), random_state=1).assign(close=1.0)
+    return pd.concat([df, dup], ignore_index=True)
+
+
+def random_request(rng, rows, n):
+    """从快照范围内外随机抽取 n 个请求合约。"""
+    picks = rng.integers(0, rows * 2, n)
+    return {f"C{i}": f"X{p:05d}.{SUFFIXES[p % len(SUFFIXES)]}" for i, p in enumerate(picks)}
+
+
+# Tushare 批量取价：bench_tushare_fanout、tests/test_tushare_fanout.py
+class StubPro:
+    """模拟 pro.fut_daily：全量日线只含部分合约，其余合约只能按 ts_code 或日线区间查到。"""
+
+    def __init__(self, full_day_codes, single_codes, kline_codes, latency=0.0, fail_full_day=False):
+        self.full_day = pd.DataFrame({
+            "ts_code": list(full_day_codes),
+            "close": [100.0 + i for i in range(len(full_day_codes))],
+            "settle": [0.0] * len(full_day_codes),
+        })
+        self.single_codes = set(single_codes)
+        self.kline_codes = set(kline_codes)
+        self.latency = latency
+        self.fail_full_day = fail_full_day
+        self.calls = {"full_day": 0, "single": 0, "kline": 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def fut_daily(self, **params):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            ts_code = params.get("ts_code")
+            with self._lock:
+                kind = "kline" if "start_date" in params else "single" if ts_code else "full_day"
+                self.calls[kind] += 1
+            if kind == "full_day":
+                if self.fail_full_day:
+                    raise RuntimeError("每分钟最多访问该接口")
+                return self.full_day
+            if kind == "single":
+                if ts_code in self.single_codes:
+                    return pd.DataFrame({"ts_code": [ts_code], "close": [0.0], "settle": [50.0]})
+                return pd.DataFrame(columns=["ts_code", "close", "settle"])
+            if ts_code in self.kline_codes:
+                return pd.DataFrame({"trade_date": ["20260102", "20260105"], "close": [7.0, 8.0], "settle": [7.0, 8.0]})
+            return pd.DataFrame(columns=["trade_date", "close", "settle"])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def contract_codes(n):
+    """生成 n 个上期所合约代码（ts_code 后缀为 .SHF）。"""
+    return [f"CU{2600 + i}" for i in range(n)]
+
+
+# 合约同步候选提取：bench_sync_candidates、tests/test_futures_sync_service.py
+def legacy_realtime_contracts(service, realtime_data):
+    """原 get_all_futures_contracts 中基于 iterrows 的实时行情解析（参考用，勿在业务代码中使用）。"""
+    import re
+
+    from app.services.futures_sync_service import FUTURES_SYMBOL_NAMES
+
+    contracts = []
+    for _, row in realtime_data.iterrows():
+        try:
+            contract_code = str(row.get('symbol', '')).strip().upper()
+            if not contract_code or len(contract_code) < 4:
+                continue
+            is_active, _ = service.is_contract_active(contract_code)
+            if not is_active:
+                continue
+            current_price = None
+            for price_col in ['trade', 'close', 'settlement', 'current_price', '最新价', '现价']:
+                if price_col in row.index:
+                    price_value = row.get(price_col)
+                    if pd.notna(price_value) and price_value != 0:
+                        try:
+                            current_price = float(price_value)
+                            break
+                        except (ValueError, TypeError):
+                            continue
+            if current_price is None:
+                continue
+            symbol = contract_code[:2] if len(contract_code) >= 2 and contract_code[1].isdigit() else contract_code[:1]
+            contract_name = None
+            if 'name' in row.index:
+                name_value = row.get('name')
+                if pd.notna(name_value) and name_value:
+                    name_str = str(name_value).strip()
+                    if '连续' in name_str:
+                        variety_name = name_str.replace('连续', '').strip()
+                        year_month_match = re.search(r'(\d{4})$', contract_code)
+                        if year_month_match:
+                            contract_name = f"{variety_name}{year_month_match.group(1)}"
+                        else:
+                            contract_name = f"{variety_name}{contract_code}"
+                    else:
+                        contract_name = name_str
+            if not contract_name:
+                variety_name = FUTURES_SYMBOL_NAMES.get(symbol, symbol)
+                year_month_match = re.search(r'(\d{4})$', contract_code)
+                if year_month_match:
+                    contract_name = f"{variety_name}{year_month_match.group(1)}"
+                else:
+                    contract_name = f"{variety_name}{contract_code}"
+            contracts.append({
+                'symbol': symbol,
+                'contract_code': contract_code,
+                'contract_name': contract_name,
+                'current_price': current_price,
+                'spot_price': None,
+                'is_continuous': False,
+            })
+        except Exception:
+            continue
+    return contracts
+
+
+def random_realtime_frame(rng, n):
+    """生成带过期合约、连续合约代码、缺失/为 0 价格、「XX连续」名称的随机实时行情表。"""
+    year = date.today().year % 100
+    letters = np.array(["c", "CU", "TA", "i", "SC", "AP"])
+    prefix = letters[rng.integers(0, len(letters), n)]
+    codes = np.char.add(prefix, np.char.add(
+        np.char.zfill(rng.integers(year - 1, year + 3, n).astype(str), 2),
+        np.char.zfill(rng.integers(1, 13, n).astype(str), 2),
+    )).astype(object)
+    codes[rng.random(n) < 0.05] = "V0"
+
+    def prices(p_nan, p_zero):
+        values = rng.uniform(100, 90000, n).round(1)
+        values[rng.random(n) < p_zero] = 0
+        values[rng.random(n) < p_nan] = np.nan
+        return values
+
+    names = np.where(rng.random(n) < 0.3, "品种连续", np.char.add("合约", np.arange(n).astype(str))).astype(object)
+    return pd.DataFrame({
+        "symbol": codes, "name": names,
+        "trade": prices(0.3, 0.2), "settlement": prices(0.3, 0.1), "close": prices(0.5, 0.0),
+    })
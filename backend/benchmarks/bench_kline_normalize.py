@@ -0,0 +1,49 @@
+"""K 线规整微基准：逐行实现 vs normalize_kline_frame。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_kline_normalize [--rows 3650] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.kline_service import normalize_kline_frame
+from benchmarks._fixtures import legacy_normalize, random_kline_frame
+
+
+def _best_of(func, df, repeat: int) -> float:
+    """返回 repeat 次中最快一次的耗时（毫秒）。"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(df)
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def main():
+    """主函数。"""
+    parser = argparse.ArgumentParser(description="K 线规整微基准")
+    parser.add_argument("--rows", type=int, default=3650, help="行数（默认约 10 年日线）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    df = random_kline_frame(np.random.default_rng(0), args.rows)
+    assert normalize_kline_frame(df) == legacy_normalize(df)
+
+    legacy_ms = _best_of(legacy_normalize, df, args.repeat)
+    new_ms = _best_of(normalize_kline_frame, df, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"iterrows      {legacy_ms:9.2f} ms")
+    print(f"vectorized    {new_ms:9.2f} ms")
+    print(f"speedup       {legacy_ms / new_ms:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""合约-价格匹配微基准：逐合约过滤全量日线 vs 一次性 reindex。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_price_matching [--codes 1000] [--rows 3000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+
+from app.services.tushare_service import match_daily_prices
+from benchmarks._fixtures import legacy_match, random_request, random_snapshot
+
+
+def _best_of(func, repeat: int) -> float:
+    """返回 repeat 次中最快一次的耗时（毫秒）。"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def main():
+    """主函数。"""
+    parser = argparse.ArgumentParser(description="合约-价格匹配微基准")
+    parser.add_argument("--codes", type=int, default=1000, help="请求的合约数")
+    parser.add_argument("--rows", type=int, default=3000, help="全量日线行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = random_snapshot(rng, args.rows)
+    request = random_request(rng, args.rows, args.codes)
+    assert match_daily_prices(df, request) == legacy_match(df, request)
+
+    legacy_ms = _best_of(lambda: legacy_match(df, request), args.repeat)
+    new_ms = _best_of(lambda: match_daily_prices(df, request), args.repeat)
+    print(f"codes={args.codes} rows={len(df)}")
+    print(f"per-contract  {legacy_ms:9.2f} ms")
+    print(f"reindex       {new_ms:9.2f} ms")
+    print(f"speedup       {legacy_ms / new_ms:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
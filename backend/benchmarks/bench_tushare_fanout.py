@@ -0,0 +1,103 @@
+"""Tushare 批量取价基准：全量日线未命中的合约，顺序查询 vs 有界并发查询（本地桩，不访问网络）。
+
+桩接口每次调用固定延迟 --latency-ms，模拟 Tushare 网络往返；全量日线只包含一半合约，
+其余合约需要按 ts_code 单独查询，其中一部分还要再查 60 日线区间。
+
+- sequential (old)：原实现，逐个合约依次调用 当日单合约 → 当日全量 → 日线区间
+- fan-out xN：batch_get_futures_prices，TUSHARE_MAX_IN_FLIGHT=N，全量日线每轮只拉一次
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_tushare_fanout [--contracts 200] [--latency-ms 50] [--calls-per-minute 0]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services import tushare_service
+from app.services.fetch_engine import TokenBucket, set_tushare_limiter
+from app.services.negative_cache import reset_negative_cache
+from benchmarks._fixtures import StubPro, contract_codes
+
+
+def _make_stub(codes, latency):
+    half = len(codes) // 2
+    return StubPro(
+        full_day_codes=[f"{c}.SHF" for c in codes[:half]],
+        single_codes=[f"{c}.SHF" for c in codes[half:half + half // 2]],
+        kline_codes=[f"{c}.SHF" for c in codes[half + half // 2:]],
+        latency=latency,
+    )
+
+
+def _sequential_old(service, codes):
+    """原实现：全量匹配后，对未命中的合约逐个走完整的三步查询（每步都可能重新拉全量）。"""
+    today = time.strftime("%Y%m%d")
+    df = service.get_futures_daily(trade_date=today)
+    have = set(df["ts_code"]) if df is not None else set()
+    prices = {}
+    for code in codes:
+        ts_code = service.convert_contract_code_to_ts_code(code)
+        if ts_code in have:
+            prices[code] = 1.0
+            continue
+        single = service.get_futures_daily(trade_date=today, ts_code=ts_code)
+        if single is not None and not single.empty:
+            prices[code] = service._row_price(single.iloc[0])
+            continue
+        service.get_futures_daily(trade_date=today)
+        kline = service.get_futures_kline(ts_code=ts_code, end_date=today, period=60)
+        if kline is not None and not kline.empty:
+            prices[code] = service._row_price(kline.iloc[-1])
+    return prices
+
+
+def _run(label, codes, latency, fn):
+    stub = _make_stub(codes, latency)
+    tushare_service.pro = stub
+    tushare_service.reset_market_snapshot()
+    reset_negative_cache()
+    service = tushare_service.TushareService()
+    t0 = time.perf_counter()
+    prices = fn(service)
+    elapsed = time.perf_counter() - t0
+    calls = stub.calls
+    print(
+        f"{label:<18} {elapsed:9.2f} s   priced={len(prices):4d}   "
+        f"full_day={calls['full_day']:3d} single={calls['single']:3d} kline={calls['kline']:3d} "
+        f"peak_in_flight={stub.max_in_flight}"
+    )
+
+
+def main():
+    """主函数。"""
+    parser = argparse.ArgumentParser(description="Tushare 批量取价并发基准（本地桩）")
+    parser.add_argument("--contracts", type=int, default=200, help="请求的合约数")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="桩接口每次调用的延迟（毫秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16], help="要测试的并发上限")
+    parser.add_argument("--calls-per-minute", type=int, default=0, help="令牌桶速率，0 表示不限流")
+    args = parser.parse_args()
+
+    tushare_service.TUSHARE_AVAILABLE = True
+    # 桩数据视为当日行情，不受交易日历影响
+    today = time.strftime("%Y%m%d")
+    tushare_service.TushareService._snapshot_trade_dates = lambda self: [today]
+    codes = contract_codes(args.contracts)
+    latency = args.latency_ms / 1000
+    print(f"contracts={args.contracts} latency={args.latency_ms:.0f}ms calls_per_minute={args.calls_per_minute or 'unlimited'}")
+
+    set_tushare_limiter(TokenBucket(args.calls_per_minute, burst=10))
+    _run("sequential (old)", codes, latency, lambda s: _sequential_old(s, codes))
+    for workers in args.workers:
+        os.environ["TUSHARE_MAX_IN_FLIGHT"] = str(workers)
+        set_tushare_limiter(TokenBucket(args.calls_per_minute, burst=10))
+        _run(f"fan-out x{workers}", codes, latency, lambda s: s.batch_get_futures_prices(codes))
+
+
+if __name__ == "__main__":
+    main()
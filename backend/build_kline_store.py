@@ -0,0 +1,78 @@
+"""把行情数据转换为列式 K 线文件（供 MarketDataService 内存映射读取）。
+
+用法：
+    # 把 MARKET_DATA_JSON（默认 data/market_data.json）中的 klines 全部转换
+    python build_kline_store.py --from-json
+
+    # 从 Tushare fut_daily 拉取指定合约的历史日线并合并写入
+    python build_kline_store.py --from-tushare CU2601.SHF TL2603.CFX --start 20200101
+
+输出目录由 KLINE_STORE_DIR 决定（默认 backend/data/kline_store）。
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.kline_store import get_kline_store
+from app.services.market_data_service import _env_path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+def convert_json(path: str) -> None:
+    """转换行情 JSON 的 klines 字段。"""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    written = get_kline_store().write_from_json(raw)
+    for ts_code, n in written.items():
+        logger.info("已写入 %s：%s 行", ts_code, n)
+    logger.info("JSON 转换完成，共 %s 个合约，目录=%s", len(written), get_kline_store().root)
+
+
+def convert_tushare(ts_codes, start_date: str, end_date: str) -> None:
+    """按合约从 Tushare 拉取日线并合并写入。"""
+    from app.services.tushare_service import TushareService
+
+    service = TushareService()
+    store = get_kline_store()
+    for ts_code in ts_codes:
+        df = service.get_futures_kline(ts_code=ts_code, start_date=start_date, end_date=end_date)
+        if df is None or df.empty:
+            logger.warning("Tushare 无数据: %s", ts_code)
+            continue
+        n = store.write(ts_code, df, merge=True)
+        logger.info("已写入 %s：合并后 %s 行", ts_code, n)
+
+
+def main():
+    """主函数。"""
+    parser = argparse.ArgumentParser(description="生成列式 K 线文件")
+    parser.add_argument("--from-json", nargs="?", const=str(_env_path()), default=None,
+                        help="行情 JSON 路径（缺省为 MARKET_DATA_JSON）")
+    parser.add_argument("--from-tushare", nargs="+", default=None, metavar="TS_CODE",
+                        help="需要从 Tushare 拉取的 ts_code 列表")
+    parser.add_argument("--start", default="20100101", help="Tushare 拉取开始日期 YYYYMMDD")
+    parser.add_argument("--end", default=datetime.now().strftime("%Y%m%d"), help="Tushare 拉取结束日期 YYYYMMDD")
+    args = parser.parse_args()
+
+    if not args.from_json and not args.from_tushare:
+        parser.error("请至少指定 --from-json 或 --from-tushare")
+    if args.from_json:
+        convert_json(args.from_json)
+    if args.from_tushare:
+        convert_tushare(args.from_tushare, args.start, args.end)
+
+
+if __name__ == "__main__":
+    main()
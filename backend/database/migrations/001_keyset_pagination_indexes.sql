@@ -0,0 +1,17 @@
+-- 游标（keyset）分页所需索引
+-- 新库由 Base.metadata.create_all 自动创建；已有库执行本文件补建。
+-- 帖子流索引 idx_posts_feed_keyset 已被 003_post_feed_rank.sql 删除，改用 feed_rank 生成列上的 idx_posts_feed_rank
+-- （表达式见 app/database/models.py 中 _feed_rank_expression）；按顺序执行迁移时，这里先建的索引会在 003 中删掉。
+
+CREATE INDEX IF NOT EXISTS idx_posts_feed_keyset ON posts (
+    status,
+    (CASE WHEN (suggestion IS NOT NULL AND suggestion != '' AND suggestion != '待管理员编辑建议') THEN 1 ELSE 0 END) DESC,
+    (coalesce(updated_at, publish_time)) DESC,
+    post_id DESC
+);
+
+CREATE INDEX IF NOT EXISTS idx_collections_user_keyset
+    ON collections (user_id, created_at DESC, collection_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_browse_histories_user_keyset
+    ON browse_histories (user_id, browse_time DESC, history_id DESC);
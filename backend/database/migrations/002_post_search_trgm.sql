@@ -0,0 +1,11 @@
+-- 帖子搜索三元组索引（pg_trgm）
+-- 使 posts.title / posts.contract_code 上的 ILIKE '%关键词%' 可以走 GIN 索引。
+-- 新库由 Base.metadata.create_all 自动创建（建表前会执行 CREATE EXTENSION）；已有库执行本文件补建。
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_posts_title_trgm
+    ON posts USING gin (title gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_posts_contract_code_trgm
+    ON posts USING gin (contract_code gin_trgm_ops);
@@ -0,0 +1,22 @@
+-- 帖子流排序键生成列
+-- 把「有效建议优先 + coalesce(updated_at, publish_time) 倒序」合并为一个持久化的 BIGINT，
+-- 列表查询按 (feed_rank DESC, post_id DESC) 排序即可走索引范围扫描，不再逐行计算 CASE 后全量排序。
+-- 表达式必须与 app/database/models.py 中 _feed_rank_expression 保持一致。
+-- 注意：添加 STORED 生成列会重写 posts 表，请在低峰期执行。
+
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS feed_rank BIGINT GENERATED ALWAYS AS (
+    CAST(
+        CASE WHEN (suggestion IS NOT NULL AND suggestion != '' AND suggestion != '待管理员编辑建议') THEN 1 ELSE 0 END
+            * 10000000000000
+        + CAST(EXTRACT(epoch FROM coalesce(updated_at, publish_time)) * 1000 AS BIGINT)
+    AS BIGINT)
+) STORED;
+
+-- 由 001 创建的表达式索引已被下面两个索引取代
+DROP INDEX IF EXISTS idx_posts_feed_keyset;
+
+CREATE INDEX IF NOT EXISTS idx_posts_feed_rank
+    ON posts (status, feed_rank DESC, post_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_posts_sector_feed_rank
+    ON posts (status, sector_id, feed_rank DESC, post_id DESC);
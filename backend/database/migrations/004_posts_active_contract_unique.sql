@@ -0,0 +1,13 @@
+-- 已发布帖子按合约代码唯一（部分唯一索引）
+-- 期货合约同步用 INSERT ... ON CONFLICT (contract_code) WHERE status = 1 批量写入帖子，依赖本索引；
+-- 未建索引时同步自动退回「按已加载帖子区分新增/更新 + executemany」。
+-- 新库由 Base.metadata.create_all 自动创建；已有库执行本文件补建。
+--
+-- 执行前先清理重复的已发布帖子，否则建索引会失败：
+--     python normalize_posts_naming.py            # 预览重复数量
+--     python normalize_posts_naming.py --execute  # 同一合约保留最早发布的一条，其余软删除
+-- 下面的查询应返回 0 行：
+--     SELECT contract_code, count(*) FROM posts WHERE status = 1 GROUP BY contract_code HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_posts_active_contract_code
+    ON posts (contract_code) WHERE status = 1;
@@ -0,0 +1,13 @@
+-- 合约到期日索引
+-- 每日到期清理用一条集合 UPDATE 下架帖子：
+--     UPDATE posts SET status = 0 FROM futures_contracts
+--     WHERE upper(posts.contract_code) = futures_contracts.contract_code
+--       AND futures_contracts.expiry_date < CURRENT_DATE AND posts.status = 1;
+-- 本索引让 expiry_date < 今天 只扫描已到期的合约。
+-- 新库由 Base.metadata.create_all 自动创建；已有库执行本文件补建。
+--
+-- 已有的 expiry_date 为空的合约、以及帖子有但 futures_contracts 没有的合约，
+-- 会在下一次到期清理（或 POST /api/v1/futures-sync/expiry-cleanup?dry_run=true）时按合约代码补齐，无需手工回填。
+
+CREATE INDEX IF NOT EXISTS ix_futures_contracts_expiry_date
+    ON futures_contracts (expiry_date);
@@ -0,0 +1,12 @@
+-- 增量入库游标
+-- 日线入库原先以 MAX(market_data.trade_date) 为游标，而 K 线接口会按需回写单个合约的日线：
+-- 17:00 之后、入库任务之前有人看了某合约 K 线，当日全市场日线就会被跳过；首次入库前有任何 K 线回写，
+-- --backfill-days / MARKET_DATA_BACKFILL_DAYS 也会被忽略。游标改存本表，只由入库任务推进。
+-- 新库由 Base.metadata.create_all 自动创建；已有库执行本文件补建。
+-- 建表后首次入库会按 MARKET_DATA_BACKFILL_DAYS 重新回补（按 (contract_id, trade_date) 覆盖写入，不会产生重复行）。
+
+CREATE TABLE IF NOT EXISTS ingest_cursors (
+    name VARCHAR(50) PRIMARY KEY,
+    trade_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,42 @@
+"""把 Tushare 全市场日线增量写入 market_data 表（K 线优先读本表）。
+
+用法：
+    # 从入库游标（ingest_cursors）之后补到最近一个已结算交易日；尚未入库过时回补最近 30 天
+    python ingest_market_data.py
+
+    # 首次部署时回补一年
+    python ingest_market_data.py --backfill-days 365
+
+服务进程内由「日线入库任务」在交易日 17:40 自动执行同样的增量逻辑。
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.daily_bar_store import ingest_daily_bars
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数。"""
+    parser = argparse.ArgumentParser(description="日线增量入库（market_data）")
+    parser.add_argument("--backfill-days", type=int, default=None,
+                        help="尚未入库过时回补的自然日数（缺省为 MARKET_DATA_BACKFILL_DAYS，默认 30）")
+    args = parser.parse_args()
+
+    result = ingest_daily_bars(backfill_days=args.backfill_days)
+    logger.info("入库结果: %s", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.database.connection import SessionLocal
 from app.database.models import FuturesContract, Post, User
+from app.services.contract_resolver import invalidate_contract_index
+from app.services.futures_sync_service import contract_expiry_dates
 from app.services.tushare_service import TushareService
 from app.services.post_service import PostService
 from app.utils.futures_naming import format_post_title
@@ -156,7 +158,7 @@ def sync_futures_to_database(db: Session, tushare_service: TushareService, autho
         daily_df = tushare_service.get_futures_daily()
 
         today = date.today()
-        for _col in ('list_date', 'delist_date'):
+        for _col in ('list_date', 'delist_date', 'last_ddate'):
             if _col in basic_df.columns:
                 _s = basic_df[_col]
                 _bad = _s.isna() | _s.astype(str).str.strip().str.lower().isin(
@@ -166,8 +168,9 @@ def sync_futures_to_database(db: Session, tushare_service: TushareService, autho
 
         if 'list_date' in basic_df.columns:
             basic_df['list_date'] = pd.to_datetime(basic_df['list_date'], format='%Y%m%d', errors='coerce')
-        if 'delist_date' in basic_df.columns:
-            basic_df['delist_date'] = pd.to_datetime(basic_df['delist_date'], format='%Y%m%d', errors='coerce')
+        for _col in ('delist_date', 'last_ddate'):
+            if _col in basic_df.columns:
+                basic_df[_col] = pd.to_datetime(basic_df[_col], format='%Y%m%d', errors='coerce')
 
         active_mask = True
         if 'list_date' in basic_df.columns:
@@ -197,6 +200,13 @@ def sync_futures_to_database(db: Session, tushare_service: TushareService, autho
         main_rows['_vk'] = main_rows.apply(row_variety_key, axis=1)
         main_contracts = main_rows.drop_duplicates(subset=['_vk'], keep='first')
         result['contracts_total'] = len(main_contracts)
+
+        # 到期日：退市日，其次最后交割日，都没有时按合约代码推算（合约月份最后一天）
+        expiry = contract_expiry_dates(main_contracts['_ts'].str.split('.').str[0].str.upper(), today)
+        for _col in ('last_ddate', 'delist_date'):
+            if _col in main_contracts.columns:
+                expiry = main_contracts[_col].where(main_contracts[_col].notna(), expiry)
+        main_contracts['_expiry'] = expiry
         logger.info(
             '主力合约品种数=%s（fut_mapping ∩ 上市未退市池且按交易所+品种去重）',
             len(main_contracts),
@@ -220,9 +230,7 @@ def sync_futures_to_database(db: Session, tushare_service: TushareService, autho
                 list_date = None
                 if pd.notna(row.get('list_date')):
                     list_date = row['list_date'].date() if isinstance(row['list_date'], pd.Timestamp) else None
-                expiry_date = None
-                if pd.notna(row.get('delist_date')):
-                    expiry_date = row['delist_date'].date() if isinstance(row['delist_date'], pd.Timestamp) else None
+                expiry_date = row['_expiry'].date() if pd.notna(row['_expiry']) else None
 
                 multiplier = None
                 if pd.notna(row.get('multiplier')):
@@ -316,6 +324,8 @@ def sync_futures_to_database(db: Session, tushare_service: TushareService, autho
                 logger.info('已提交中间进度 %s/%s 条', row_idx, len(main_contracts))
 
         db.commit()
+        # 同进程内调用时合约解析索引立即重载；独立运行本脚本时服务进程由 CONTRACT_INDEX_TTL_SECONDS 兜底
+        invalidate_contract_index()
         logger.info(
             '同步完成: 主力品种=%s, 合约创建=%s, 合约更新=%s, 帖子创建=%s, 帖子更新=%s, 错误=%s',
             result['contracts_total'],
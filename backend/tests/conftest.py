@@ -0,0 +1,76 @@
+"""测试公共夹具。
+
+数据库相关测试使用内存 SQLite（异步驱动 aiosqlite），只创建被测功能涉及的表。
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.database.models import BrowseHistory, Collection, Post, Sector, User
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    """SQLite 只有 INTEGER PRIMARY KEY 才自增，测试库中把 BIGINT 映射为 INTEGER。"""
+    return "INTEGER"
+
+
+TEST_TABLES = [m.__table__ for m in (User, Sector, Post, Collection, BrowseHistory)]
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_caches():
+    """每个测试使用独立的库，进程级缓存（总数、联想索引、已写入价格、行情快照、行情后端注册表、合约解析索引、负结果缓存）与到期清理统计不能跨测试残留。"""
+    from app.services.contract_expiry_service import reset_expiry_stats
+    from app.services.contract_resolver import invalidate_contract_index
+    from app.services.count_cache import get_count_cache
+    from app.services.market_backend import reset_market_backend
+    from app.services.negative_cache import reset_negative_cache
+    from app.services.price_update_service import reset_price_ledger
+    from app.services.search_index import reset_symbol_index
+    from app.services.tushare_service import reset_market_snapshot
+
+    get_count_cache().invalidate()
+    reset_symbol_index()
+    reset_price_ledger()
+    reset_market_snapshot()
+    reset_market_backend()
+    invalidate_contract_index()
+    reset_negative_cache()
+    reset_expiry_stats()
+    yield
+
+
+@pytest_asyncio.fixture
+async def async_engine():
+    """内存 SQLite 异步引擎（已建表）。"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=TEST_TABLES))
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def async_session_factory(async_engine):
+    """绑定到测试引擎的异步会话工厂。"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def make_token():
+    """生成指定用户的访问令牌。"""
+    from app.utils.jwt import create_access_token
+
+    def _make(user_id: int, role: int = 1) -> str:
+        return create_access_token({"user_id": user_id, "user_role": role})
+
+    return _make
@@ -0,0 +1,178 @@
+"""请求路径测试。
+
+通过 ASGI 直接调用帖子、收藏、浏览历史路由，验证异步服务与原同步服务行为一致；
+同步路由（草稿）的认证与处理共用同一个 get_db 会话，不再另开异步会话。
+"""
+
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base, get_async_db, get_db
+from app.database.models import Draft, Post, User
+from app.routers import auth, browse_history, collections, drafts, posts
+from app.services.auth_service import AsyncAuthService
+from tests.conftest import TEST_TABLES
+
+
+@pytest_asyncio.fixture
+async def seeded(async_session_factory):
+    """一个管理员、一个普通用户和 5 篇帖子（第 5 篇已删除）。"""
+    base = datetime(2026, 1, 1)
+    async with async_session_factory() as s:
+        s.add_all([
+            User(user_id=1, phone_number="13800000001", password_hash="x", nickname="admin", user_role=3, is_active=True),
+            User(user_id=2, phone_number="13800000002", password_hash="x", nickname="alice", user_role=1, is_active=True),
+        ])
+        for i in range(1, 6):
+            s.add(Post(
+                post_id=i, author_id=1, title=f"铜{i}", contract_code=f"CU260{i}", stop_loss=1,
+                content="c", status=0 if i == 5 else 1, collect_count=0,
+                suggestion="看多" if i == 2 else None,
+                publish_time=base + timedelta(days=i), updated_at=base + timedelta(days=i),
+            ))
+        await s.commit()
+    return async_session_factory
+
+
+@pytest_asyncio.fixture
+async def client(seeded):
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/v1/auth")
+    app.include_router(posts.router, prefix="/api/v1/posts")
+    app.include_router(collections.router, prefix="/api/v1/collections")
+    app.include_router(browse_history.router, prefix="/api/v1/browse-history")
+
+    async def override():
+        async with seeded() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_post_list_order_and_author(client):
+    resp = await client.get("/api/v1/posts", params={"page_size": 10})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == 4
+    # 有建议的帖子优先，其余按更新时间倒序
+    assert [p["post_id"] for p in body["posts"]] == [2, 4, 3, 1]
+    assert {p["author_nickname"] for p in body["posts"]} == {"admin"}
+
+    resp = await client.get("/api/v1/posts", params={"search": "CU2603"})
+    assert [p["post_id"] for p in resp.json()["posts"]] == [3]
+
+
+@pytest.mark.asyncio
+async def test_detail_collect_and_history(client, make_token):
+    headers = _auth(make_token(2))
+    detail = await client.get("/api/v1/posts/3", headers=headers)
+    assert detail.status_code == 200
+    assert detail.json()["author_nickname"] == "admin"
+    assert detail.json()["is_collected"] is False
+    await client.get("/api/v1/posts/1", headers=headers)
+
+    history = await client.get("/api/v1/browse-history", headers=headers)
+    assert {p["post_id"] for p in history.json()["posts"]} == {1, 3}
+
+    first = await client.post("/api/v1/posts/3/collect", headers=headers)
+    assert first.json()["collected"] is True
+    assert (await client.get("/api/v1/posts/3", headers=headers)).json()["collect_count"] == 1
+    listed = await client.get("/api/v1/collections", headers=headers)
+    assert [p["post_id"] for p in listed.json()["posts"]] == [3]
+
+    second = await client.post("/api/v1/posts/3/collect", headers=headers)
+    assert second.json()["collected"] is False
+    assert (await client.get("/api/v1/posts/3", headers=headers)).json()["collect_count"] == 0
+
+    assert (await client.get("/api/v1/posts/5", headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_update_delete_permissions(client, make_token):
+    admin, user = _auth(make_token(1, 3)), _auth(make_token(2))
+    payload = {"title": "螺纹", "contract_code": "RB2605", "stop_loss": 3000, "content": "正文"}
+
+    assert (await client.post("/api/v1/posts", json=payload, headers=user)).status_code == 403
+    created = await client.post("/api/v1/posts", json=payload, headers=admin)
+    assert created.status_code == 201
+    post_id = created.json()["post_id"]
+
+    updated = await client.put(f"/api/v1/posts/{post_id}", json={"suggestion": "观望"}, headers=admin)
+    assert updated.status_code == 200
+    assert updated.json()["suggestion"] == "观望"
+    assert updated.json()["title"] == "螺纹"
+
+    assert (await client.delete(f"/api/v1/posts/{post_id}", headers=user)).status_code == 404
+    assert (await client.delete(f"/api/v1/posts/{post_id}", headers=admin)).status_code == 200
+    assert (await client.get(f"/api/v1/posts/{post_id}", headers=admin)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_rejected(client):
+    resp = await client.get("/api/v1/collections", headers=_auth("bad"))
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_async_auth_register_and_authenticate(seeded):
+    async with seeded() as s:
+        service = AsyncAuthService(s)
+        user = await service.register_user("13900000009", "secret1", nickname="bob")
+        assert user.user_id and user.nickname == "bob"
+        with pytest.raises(ValueError, match="手机号已被注册"):
+            await service.register_user("13900000009", "secret1")
+        assert (await service.authenticate_user(phone_number="13900000009", password="secret1")).user_id == user.user_id
+        assert await service.authenticate_user(phone_number="13900000009", password="wrong") is None
+        limit = await service.check_prediction_limit(user.user_id)
+        assert limit == {"allowed": True, "remaining": 5, "limit": 5, "is_member": False}
+
+
+@pytest.mark.asyncio
+async def test_sync_route_authenticates_on_request_session(make_token):
+    # 依赖与路由在线程池的不同线程中执行
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=TEST_TABLES + [Draft.__table__])
+    factory = sessionmaker(bind=engine)
+    with factory() as s:
+        s.add(User(user_id=2, phone_number="13800000002", password_hash="x", nickname="alice", user_role=1, is_active=True))
+        s.commit()
+
+    opened = []
+
+    def override_db():
+        session = factory()
+        opened.append(session)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def no_async_db():
+        raise AssertionError("同步路由不应打开异步会话")
+        yield  # pragma: no cover
+
+    app = FastAPI()
+    app.include_router(drafts.router, prefix="/api/v1/drafts")
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = no_async_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        created = await c.post("/api/v1/drafts", json={"title": "草稿"}, headers=_auth(make_token(2)))
+        assert created.status_code == 201
+        assert (await c.get("/api/v1/drafts", headers=_auth("bad"))).status_code == 401
+
+    assert len(opened) == 2  # 每个请求一个会话，认证与处理共用
+    engine.dispose()
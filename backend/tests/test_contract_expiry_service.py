@@ -0,0 +1,79 @@
+"""合约到期清理：按 futures_contracts.expiry_date 集合下架帖子（内存 SQLite）。"""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.database.models import FuturesContract, Post, User
+from app.services.contract_expiry_service import ContractExpiryService, get_expiry_stats
+from tests.conftest import TEST_TABLES
+from tests.test_post_query_count import count_statements
+
+TODAY = date(2026, 10, 18)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=TEST_TABLES + [FuturesContract.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="a", user_role=3, is_active=True))
+    session.add_all([
+        FuturesContract(contract_code="CU2609", contract_name="铜", exchange_code="SHFE", expiry_date=date(2026, 9, 15)),
+        FuturesContract(contract_code="CU2701", contract_name="铜", exchange_code="SHFE", expiry_date=date(2027, 1, 15)),
+        # 到期日为空：按代码补算为 2025-10-31
+        FuturesContract(contract_code="RB2510", contract_name="螺纹钢", exchange_code="SHFE"),
+        FuturesContract(contract_code="V0", contract_name="PVC连续", exchange_code="DCE"),
+    ])
+    codes = {1: "CU2609", 2: "CU2701", 3: "rb2510", 4: "CU2609", 5: "I2605", 6: "V0"}
+    session.add_all([
+        Post(post_id=post_id, author_id=1, title=code, contract_code=code, stop_loss=1, content="x",
+             status=0 if post_id == 4 else 1, publish_time=datetime(2026, 1, 1))
+        for post_id, code in codes.items()
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _active_posts(db):
+    return sorted(db.execute(select(Post.post_id).where(Post.status == 1)).scalars())
+
+
+def test_dry_run_reports_without_changes(db):
+    result = ContractExpiryService(db).cleanup_expired_contracts(dry_run=True, today=TODAY)
+
+    # I2605 只有帖子没有合约：登记后按代码算出 2026-05-31
+    assert [(r["post_id"], r["expiry_date"]) for r in result["expired"]] == [
+        (3, "2025-10-31"), (5, "2026-05-31"), (1, "2026-09-15"),
+    ]
+    assert (result["total_checked"], result["expired_count"], result["deleted_count"]) == (5, 3, 0)
+    assert (result["contracts_created"], result["expiry_backfilled"]) == (1, 1)
+    assert _active_posts(db) == [1, 2, 3, 5, 6]
+    assert db.execute(select(FuturesContract.expiry_date).where(FuturesContract.contract_code == "RB2510")).scalar() is None
+    assert get_expiry_stats()["dry_runs"] == 1 and get_expiry_stats()["runs"] == 0
+
+
+def test_cleanup_is_one_update(db):
+    with count_statements(db.get_bind()) as statements:
+        result = ContractExpiryService(db).cleanup_expired_contracts(today=TODAY)
+
+    assert (result["expired_count"], result["deleted_count"], result["error_count"]) == (3, 3, 0)
+    assert [s for s in statements if s.lstrip().upper().startswith("UPDATE POSTS")] == [statements[-1]]
+    assert _active_posts(db) == [2, 6]
+    # 只有帖子引用的代码登记为未确认，不进入日线入库
+    orphan = db.get(FuturesContract, 5)
+    assert orphan.contract_code == "I2605" and orphan.is_active is False
+
+    # 补齐后再次运行没有缺口，也没有可下架的帖子
+    again = ContractExpiryService(db).cleanup_expired_contracts(today=TODAY)
+    assert (again["contracts_created"], again["expiry_backfilled"], again["deleted_count"]) == (0, 0, 0)
+
+    stats = get_expiry_stats()
+    assert stats["runs"] == 2 and stats["deleted_total"] == 3
+    assert stats["last_run"]["deleted_count"] == 0 and "expired" not in stats["last_run"]
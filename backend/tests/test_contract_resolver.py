@@ -0,0 +1,76 @@
+"""合约解析索引测试：ts_code 规则、从库载入、K 线备选代码的记忆。"""
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.database.models import FuturesContract, Sector
+from app.services.contract_resolver import (
+    ContractIndex,
+    get_contract_index,
+    load_contract_index,
+    set_contract_index,
+    to_ts_code,
+)
+from app.services.kline_service import KlineService
+
+
+def test_to_ts_code_rules():
+    assert to_ts_code("I2603") == "I2603.DCE"
+    assert to_ts_code("CU2601") == "CU2601.SHF"
+    assert to_ts_code("PR2605") == "PR2605.ZCE"
+    assert to_ts_code("PT2606") == "PT2606.GFE"
+    assert to_ts_code("XX2601") == "XX2601.SHF"
+    assert to_ts_code("PT2606", "CZCE") == "PT2606.ZCE"
+    assert to_ts_code("CU2601.SHF", "DCE") == "CU2601.SHF"
+
+
+def test_load_contract_index_from_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Sector.__table__, FuturesContract.__table__])
+    db = sessionmaker(engine)()
+    db.add_all([
+        FuturesContract(contract_code="PT2606", contract_name="铂", exchange_code="czce"),
+        FuturesContract(contract_code="CU2601", contract_name="铜", exchange_code="SHFE"),
+    ])
+    db.commit()
+
+    index = load_contract_index(db)
+
+    assert len(index) == 2
+    assert index.exchange_hint("PT2606") == "CZCE"
+    assert index.candidates("PT2606") == ["PT2606.ZCE", "PT2606.GFE"]
+    assert index.candidates("CU2601") == ["CU2601.SHF"]
+    assert index.candidates("I2603") == ["I2603.DCE"]
+
+
+class FakeBackend:
+    """只有 ts_codes 中的代码有 K 线。"""
+
+    def __init__(self, ts_codes):
+        self.ts_codes = set(ts_codes)
+        self.requested = []
+
+    def get_futures_kline(self, ts_code, start_date=None, end_date=None, period=None):
+        self.requested.append(ts_code)
+        if ts_code not in self.ts_codes:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "trade_date": ["20260105"], "open": [1.0], "high": [2.0], "low": [0.5], "close": [1.5],
+        })
+
+
+def test_kline_remembers_working_fallback():
+    set_contract_index(ContractIndex({"PT2606": "CZCE"}))
+    backend = FakeBackend(["PT2606.GFE"])
+    service = KlineService()
+    service.market_data_service = backend
+
+    assert len(service.get_futures_daily_kline("PT2606", "20260101", "20260110")) == 1
+    assert backend.requested == ["PT2606.ZCE", "PT2606.GFE"]
+
+    backend.requested.clear()
+    assert len(service.get_futures_daily_kline("pt2606", "20260101", "20260110")) == 1
+    assert backend.requested == ["PT2606.GFE"]
+    assert get_contract_index().learned == {"PT2606": "PT2606.GFE"}
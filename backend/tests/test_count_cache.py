@@ -0,0 +1,141 @@
+"""分页总数缓存测试。"""
+
+from datetime import datetime
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from app.database.connection import get_async_db
+from app.database.models import Post, User
+from app.routers import posts
+from app.services.count_cache import POSTS_NAMESPACE, CountCache, _explain, _plan_rows
+from app.services.post_service import _post_list_filters
+from tests.test_post_query_count import count_statements
+
+
+def test_key_normalizes_filters():
+    a = CountCache.make_key(POSTS_NAMESPACE, sector_id=None, author_id=3, search="  CU2601 ")
+    b = CountCache.make_key(POSTS_NAMESPACE, search="cu2601", author_id=3, sector_id=None)
+    assert a == b
+    assert CountCache.make_key(POSTS_NAMESPACE, search="") == CountCache.make_key(POSTS_NAMESPACE)
+
+
+def test_ttl_and_invalidation():
+    now = [0.0]
+    cache = CountCache(ttl_seconds=10, clock=lambda: now[0])
+    key = cache.make_key("posts", sector_id=1)
+    calls = []
+    assert cache.get_or_compute(key, lambda: calls.append(1) or 5) == 5
+    assert cache.get_or_compute(key, lambda: calls.append(1) or 6) == 5
+    assert len(calls) == 1
+
+    cache.invalidate("users")
+    assert cache.get(key) == 5
+    cache.invalidate("posts")
+    assert cache.get(key) is None
+
+    cache.get_or_compute(key, lambda: 7)
+    now[0] = 11
+    assert cache.get(key) is None
+
+
+def test_invalidation_during_compute_is_not_cached():
+    cache = CountCache()
+    key = cache.make_key("posts")
+
+    def compute():
+        cache.invalidate("posts")  # 计算期间有写入
+        return 1
+
+    assert cache.get_or_compute(key, compute) == 1
+    assert cache.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_async_compute_shares_invalidation_rules():
+    cache = CountCache()
+    key = cache.make_key("posts")
+
+    async def compute():
+        cache.invalidate("posts")  # 计算期间有写入
+        return 1
+
+    assert await cache.get_or_compute_async(key, compute) == 1
+    assert cache.get(key) is None
+
+    async def stable():
+        return 2
+
+    assert await cache.get_or_compute_async(key, stable) == 2
+    assert cache.get_or_compute(key, lambda: 3) == 2
+
+
+def test_explain_keeps_search_term_as_bind_parameter():
+    term = "a :word 50%"
+    stmt = select(Post.post_id).where(*_post_list_filters(search=term))
+    assert _explain(stmt, create_engine("sqlite://").dialect) is None
+
+    dialect = postgresql.psycopg2.dialect()
+    compiled = _explain(stmt, dialect).compile(dialect=dialect)
+    sql = str(compiled)
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT posts.post_id")
+    assert ":word" not in sql and "50%" not in sql
+    assert f"%{term}%" in compiled.params.values()
+
+
+def test_plan_rows_parsing():
+    assert _plan_rows('[{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}]') == 1234
+    assert _plan_rows([{"Plan": {"Plan Rows": 7}}]) == 7
+    assert _plan_rows("garbage") is None
+
+
+@pytest_asyncio.fixture
+async def client(async_engine, async_session_factory):
+    async with async_session_factory() as s:
+        s.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="a", user_role=3, is_active=True))
+        s.add_all([
+            Post(post_id=i, author_id=1, title=f"t{i}", contract_code=f"CU{2600 + i}", stop_loss=1,
+                 content="c", status=1, collect_count=0, publish_time=datetime(2026, 1, i))
+            for i in range(1, 6)
+        ])
+        await s.commit()
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/api/v1/posts")
+
+    async def override():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.asyncio
+async def test_list_count_cached_and_invalidated_on_write(client, async_engine, make_token):
+    with count_statements(async_engine.sync_engine) as first:
+        body = (await client.get("/api/v1/posts")).json()
+    assert body["total"] == 5 and body["total_estimated"] is False
+    with count_statements(async_engine.sync_engine) as second:
+        assert (await client.get("/api/v1/posts")).json()["total"] == 5
+    assert len(second) == len(first) - 1
+    assert not any("count(" in s.lower() for s in second)
+
+    # 不同筛选条件各自计数
+    assert (await client.get("/api/v1/posts", params={"search": "cu2601"})).json()["total"] == 1
+
+    headers = {"Authorization": f"Bearer {make_token(1, role=3)}"}
+    assert (await client.delete("/api/v1/posts/3", headers=headers)).status_code == 200
+    assert (await client.get("/api/v1/posts")).json()["total"] == 4
+
+
+@pytest.mark.asyncio
+async def test_approximate_total_falls_back_to_exact_off_postgres(client):
+    body = (await client.get("/api/v1/posts", params={"approximate_total": "true"})).json()
+    assert body["total"] == 5
+    assert body["total_estimated"] is False
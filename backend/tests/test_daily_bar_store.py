@@ -0,0 +1,134 @@
+"""日线入库（market_data）与 K 线本地读取测试（内存 SQLite）。"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.database.models import FuturesContract, IngestCursor, MarketData, Sector
+from app.services.contract_resolver import load_contract_index, set_contract_index
+from app.services.daily_bar_store import DailyBarStore, upsert_bars
+from app.services.kline_service import KlineService
+from app.services.trading_calendar import TradingCalendar, set_trading_calendar
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(
+        engine, tables=[Sector.__table__, FuturesContract.__table__, MarketData.__table__, IngestCursor.__table__]
+    )
+    factory = sessionmaker(engine)
+    with factory() as db:
+        db.add_all([
+            FuturesContract(contract_code="CU2601", contract_name="铜", exchange_code="SHFE", is_active=True),
+            FuturesContract(contract_code="I2601", contract_name="铁矿石", exchange_code="DCE", is_active=True),
+            FuturesContract(contract_code="RB2601", contract_name="螺纹钢", exchange_code="SHFE", is_active=False),
+        ])
+        db.commit()
+    # 2026-01-01 休市，其余工作日开市
+    set_trading_calendar(TradingCalendar({"*": [date(2026, 1, 1)]}, source="test"))
+    yield factory
+    set_trading_calendar(None)
+
+
+class DailySource:
+    """按交易日返回全市场日线。"""
+
+    def __init__(self):
+        self.requested = []
+
+    def get_futures_daily(self, trade_date=None, ts_code=None):
+        self.requested.append(trade_date)
+        return pd.DataFrame({
+            "ts_code": ["CU2601.SHF", "I2601.DCE", "RB2601.SHF", "ZZ2601.SHF"],
+            "open": [1.0, 2.0, 3.0, 4.0], "high": [1.5, 2.5, 3.5, 4.5], "low": [0.5, 1.5, 2.5, 3.5],
+            "close": [1.2, 2.2, 3.2, 4.2], "settle": [1.1, None, 3.1, 4.1],
+            "vol": [10.0, 20.0, 30.0, 40.0], "oi": [100.0, 200.0, 300.0, 400.0], "amount": [9.0, 8.0, 7.0, 6.0],
+        })
+
+
+def test_ingest_is_incremental_and_keeps_active_contracts(session_factory):
+    source = DailySource()
+    with session_factory() as db:
+        result = DailyBarStore(db).ingest(source, until=date(2026, 1, 6), backfill_days=6)
+        assert source.requested == ["20251231", "20260102", "20260105", "20260106"]
+        assert result["rows"] == 8 and result["latest"] == date(2026, 1, 6)
+
+        source.requested.clear()
+        result = DailyBarStore(db).ingest(source, until=date(2026, 1, 7))
+        assert source.requested == ["20260107"] and result["rows"] == 2
+        assert db.execute(select(func.count()).select_from(MarketData)).scalar() == 10
+
+
+def test_upsert_overwrites_same_contract_and_day(session_factory):
+    with session_factory() as db:
+        row = {
+            "contract_id": 1, "trade_date": date(2026, 1, 5), "open_price": 1, "high_price": 2, "low_price": 1,
+            "close_price": 1.5, "settlement_price": None, "volume": 5, "open_interest": 6, "turnover": 7,
+        }
+        upsert_bars(db, [row])
+        upsert_bars(db, [dict(row, close_price=1.8)])
+        db.commit()
+        assert [float(v) for v in db.execute(select(MarketData.close_price)).scalars()] == [pytest.approx(1.8)]
+
+
+class KlineBackend:
+    """远端 K 线：按请求区间返回工作日日线。"""
+
+    def __init__(self):
+        self.requested = []
+
+    def get_futures_kline(self, ts_code, start_date=None, end_date=None, period=None):
+        self.requested.append((ts_code, start_date, end_date))
+        days = [d.strftime("%Y%m%d") for d in pd.bdate_range(start_date, end_date) if d.date() != date(2026, 1, 1)]
+        return pd.DataFrame({"trade_date": days, "open": 5.0, "high": 6.0, "low": 4.0, "close": 5.5, "vol": 1.0})
+
+
+def _service(session_factory):
+    with session_factory() as db:
+        set_contract_index(load_contract_index(db))
+    service = KlineService(session_factory=session_factory)
+    service.market_data_service = KlineBackend()
+    return service
+
+
+def test_kline_reads_table_and_fetches_only_gaps(session_factory):
+    with session_factory() as db:
+        DailyBarStore(db).ingest(DailySource(), until=date(2026, 1, 6), backfill_days=4)
+    service = _service(session_factory)
+
+    bars = service.get_futures_daily_kline("CU2601", "20260102", "20260108")
+    assert [b["time"] for b in bars] == ["2026-01-02", "2026-01-05", "2026-01-06", "2026-01-07", "2026-01-08"]
+    assert bars[0]["close"] == pytest.approx(1.2)
+    assert service.market_data_service.requested == [("CU2601.SHF", "20260107", "20260108")]
+
+    # 补到的交易日已回写，再次请求不访问远端
+    service.market_data_service.requested.clear()
+    assert len(service.get_futures_daily_kline("CU2601", "20260102", "20260108")) == 5
+    assert service.market_data_service.requested == []
+
+
+def test_kline_without_local_bars_writes_through(session_factory):
+    service = _service(session_factory)
+
+    assert len(service.get_futures_daily_kline("I2601", "20260105", "20260107")) == 3
+    assert service.get_futures_daily_kline("I2601", "20260105", "20260107")[-1]["close"] == pytest.approx(5.5)
+    assert service.market_data_service.requested == [("I2601.DCE", "20260105", "20260107")]
+
+
+def test_kline_write_back_does_not_move_ingest_cursor(session_factory):
+    # 入库前有人看了 CU2601 的 K 线，单个合约的日线已回写到 market_data
+    service = _service(session_factory)
+    service.get_futures_daily_kline("CU2601", "20260105", "20260107")
+
+    source = DailySource()
+    with session_factory() as db:
+        result = DailyBarStore(db).ingest(source, until=date(2026, 1, 7), backfill_days=6)
+    # 回补窗口照常生效，当日全市场日线不被跳过
+    assert source.requested == ["20260102", "20260105", "20260106", "20260107"]
+    assert result["rows"] == 8 and result["latest"] == date(2026, 1, 7)
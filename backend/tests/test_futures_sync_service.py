@@ -0,0 +1,255 @@
+"""期货合约同步：来源并发拉取与合并去重测试（akshare 打桩）。"""
+
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.database.models import ACTIVE_CONTRACT_POST_INDEX, FuturesContract, Post, User
+from app.services import futures_sync_service as fss
+from app.services.futures_sync_service import FuturesSyncService, contract_expiry_dates
+from app.services.post_service import PostService
+from benchmarks._fixtures import legacy_realtime_contracts, random_realtime_frame
+from tests.conftest import TEST_TABLES
+from tests.test_post_query_count import count_statements
+
+
+class StubBackend:
+    """按合约代码返回固定价格，并记录每次批量取价。"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.batches = []
+
+    def batch_get_futures_prices(self, contract_codes, snapshot_only=False):
+        self.batches.append((list(contract_codes), snapshot_only))
+        return {code: self.prices.get(code) for code in contract_codes}
+
+    def get_futures_spot_price(self, contract_code):
+        raise AssertionError("同步取价不应逐个合约查询")
+
+
+class StubPrices:
+    def __init__(self, prices):
+        self.market_data_service = StubBackend(prices)
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    calls = {}
+    release = threading.Event()
+
+    def source(name, frame):
+        def fetch():
+            calls[name] = calls.get(name, 0) + 1
+            return frame
+        return fetch
+
+    def stuck():
+        calls["czce"] = calls.get("czce", 0) + 1
+        release.wait(10)
+        return pd.DataFrame({"合约代码": ["SR2611"]})
+
+    empty = pd.DataFrame()
+    monkeypatch.setattr(fss.ak, "futures_zh_realtime", source("realtime", pd.DataFrame(
+        {"symbol": ["cu2612", "V0"], "name": ["沪铜2612", "PVC连续"], "trade": [80000.0, 5000.0]})), raising=False)
+    monkeypatch.setattr(fss.ak, "futures_contract_info_shfe", source("shfe", pd.DataFrame(
+        {"合约代码": ["CU2612", "CU2611", "CU2611-C-80000"]})), raising=False)
+    monkeypatch.setattr(fss.ak, "futures_contract_info_czce", stuck, raising=False)
+    monkeypatch.setattr(fss.ak, "futures_contract_info_cffex", source("cffex", empty), raising=False)
+    monkeypatch.setattr(fss.ak, "futures_contract_info_ine", source("ine", empty), raising=False)
+    monkeypatch.setattr(fss.ak, "futures_spot_price", source("spot", pd.DataFrame({
+        "symbol": ["CU"], "dominant_contract": ["cu2612"], "dominant_contract_price": [79000.0], "spot_price": [78000.0],
+    })), raising=False)
+    monkeypatch.setenv("FUTURES_SYNC_SOURCE_TIMEOUT_SECONDS", "1")
+    # 与当前日期无关：所有合约视为未到期
+    monkeypatch.setattr(fss, "_active", lambda parts: pd.Series(True, index=parts.index))
+    yield calls
+    release.set()
+
+
+def _service(prices):
+    service = FuturesSyncService(None)
+    service.price_service = StubPrices(prices)
+    return service
+
+
+def test_sources_are_merged_once_and_slow_source_times_out(sources):
+    service = _service({"CU2611": 80100.0})
+
+    contracts = service.get_all_futures_contracts()
+
+    codes = [c["contract_code"] for c in contracts]
+    assert codes == ["CU2612", "CU2611", "CU2601", "CU2603", "CU2605", "CU2607", "CU2609"]
+    assert contracts[0]["current_price"] == 80000.0 and contracts[0]["source"] == "realtime"
+    assert contracts[1]["current_price"] == 80100.0 and contracts[1]["source"] == "exchange_shfe"
+    # 现货表只下载一次；实时行情自带价格的合约不再取价，其余候选合约一次批量取价
+    assert sources["spot"] == 1
+    assert service.price_service.market_data_service.batches == [
+        (["CU2611", "CU2601", "CU2603", "CU2605", "CU2607", "CU2609"], True)
+    ]
+
+    report = service.last_source_report
+    assert report["exchange_czce"]["status"] == "timeout"
+    assert report["exchange_cffex"]["status"] == "empty"
+    assert report["realtime"] == {"status": "ok", "seconds": report["realtime"]["seconds"], "rows": 2}
+
+
+def test_sync_result_reports_source_timings():
+    service = _service({})
+    service.get_all_futures_contracts = lambda include_continuous=False: []
+    service.last_source_report = {"realtime": {"status": "ok", "seconds": 0.1, "rows": 0}}
+
+    result = service.sync_futures_to_posts(author_id=1)
+
+    assert result["total"] == 0 and result["sources"] == service.last_source_report
+
+
+@pytest.fixture(params=["on_conflict", "executemany"])
+def db(request):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=TEST_TABLES + [FuturesContract.__table__])
+    if request.param == "on_conflict":
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX {ACTIVE_CONTRACT_POST_INDEX} ON posts (contract_code) WHERE status = 1"
+            ))
+    session = sessionmaker(bind=engine)()
+    session.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="a", user_role=3, is_active=True))
+    session.add(Post(post_id=1, author_id=1, title="旧标题", contract_code="CU2612", stop_loss=1, content="管理员编辑过",
+                     status=1, current_price=70000, publish_time=datetime(2026, 1, 1)))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _contracts(n):
+    contracts = [{"symbol": "CU", "contract_code": "CU2612", "contract_name": "铜2612", "current_price": None}]
+    contracts += [
+        {"symbol": "ZZ", "contract_code": f"ZZ{i:04d}", "contract_name": f"测试{i:04d}", "current_price": 10.0 + i}
+        for i in range(n)
+    ]
+    return contracts + [{"symbol": "ZZ", "contract_code": "zz0000", "contract_name": "重复", "current_price": 1.0}, {}]
+
+
+@pytest.mark.parametrize("update_existing", [False, True])
+def test_bulk_sync_matches_row_by_row_counters(db, update_existing):
+    service = FuturesSyncService(db)
+    service.get_all_futures_contracts = lambda include_continuous=False: _contracts(1200)
+
+    with count_statements(db.get_bind()) as statements:
+        result = service.sync_futures_to_posts(author_id=1, update_existing=update_existing)
+
+    assert result["total"] == 1203 and result["created"] == 1200 and result["failed"] == 1
+    assert result["updated"] == int(update_existing) and result["skipped"] == 2 - int(update_existing)
+    # 分块写入，语句数与帖子数无关；同一次同步把新合约登记到 futures_contracts
+    writes = [s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+    assert len([s for s in writes if "posts" in s]) <= 4 and len(writes) <= 7
+    # 只登记建了或更新了帖子的合约
+    assert result["contracts_created"] == 1200 + int(update_existing)
+
+    posts = {p.contract_code: p for p in db.execute(select(Post).where(Post.status == 1)).scalars()}
+    assert len(posts) == 1201
+    assert posts["ZZ0005"].title == "测试0005 (ZZ0005)" and float(posts["ZZ0005"].stop_loss) == pytest.approx(14.25)
+    cu = posts["CU2612"]
+    # 更新只改标题与更新时间；没有新价格时保留原价，正文不覆盖
+    assert cu.title == ("铜2612 (CU2612)" if update_existing else "旧标题")
+    assert float(cu.current_price) == 70000 and cu.content == "管理员编辑过"
+
+
+def test_only_posted_or_listed_contracts_are_registered(db):
+    service = FuturesSyncService(db)
+    service.get_all_futures_contracts = lambda include_continuous=False: [
+        {"symbol": "CU", "contract_code": "CU2612", "contract_name": "铜2612", "current_price": 80000.0, "source": "realtime"},
+        {"symbol": "AL", "contract_code": "AL2611", "contract_name": "铝2611", "current_price": None, "source": "generated"},
+        {"symbol": "ZN", "contract_code": "ZN2611", "contract_name": "锌2611", "current_price": 20000.0, "source": "generated"},
+        {"symbol": "NI", "contract_code": "NI2611", "contract_name": "镍2611", "current_price": None, "source": "exchange_shfe"},
+        {"symbol": "SN", "contract_code": "SN2611", "contract_name": "锡2611", "current_price": None, "source": "spot"},
+    ]
+
+    result = service.sync_futures_to_posts(author_id=1)
+
+    # 已有帖子的 CU2612 跳过但来自实时行情；没取到价格的生成合约 AL2611 建了帖子也不登记
+    assert result["created"] == 4 and result["contracts_created"] == 4
+    exchanges = dict(db.execute(select(FuturesContract.contract_code, FuturesContract.exchange_code)).all())
+    assert exchanges == {"CU2612": "SHFE", "ZN2611": "SHFE", "NI2611": "SHFE", "SN2611": "SHFE"}
+
+
+def _require_index(db):
+    if not fss._has_active_contract_index(db, "sqlite"):
+        pytest.skip("需要 uq_posts_active_contract_code 部分唯一索引")
+
+
+def test_bulk_sync_counts_rows_dropped_by_concurrent_insert_as_skipped(db):
+    _require_index(db)
+    service = FuturesSyncService(db)
+    service.get_all_futures_contracts = lambda include_continuous=False: _contracts(3)[:-2]
+    bulk_sync = service._bulk_sync_posts
+
+    def racing(*args):
+        # 同步读取已有帖子之后，管理员手动发布了 ZZ0001
+        db.add(Post(post_id=99, author_id=1, title="手动", contract_code="ZZ0001", stop_loss=1, content="c", status=1))
+        db.flush()
+        return bulk_sync(*args)
+
+    service._bulk_sync_posts = racing
+    result = service.sync_futures_to_posts(author_id=1)
+
+    assert (result["created"], result["skipped"], result["contracts_created"]) == (2, 2, 2)
+    assert db.execute(select(Post.title).where(Post.contract_code == "ZZ0001")).scalar_one() == "手动"
+
+
+def test_sync_post_service_maps_active_contract_conflict(db):
+    _require_index(db)
+    service = PostService(db)
+
+    with pytest.raises(ValueError, match="已有已发布的帖子"):
+        service.create_post(author_id=1, title="t", contract_code="CU2612", stop_loss=1, content="c")
+    # 已回滚，会话可以继续使用
+    post = service.create_post(author_id=1, title="t", contract_code="AU2612", stop_loss=1, content="c")
+    with pytest.raises(ValueError):
+        service.update_post(post.post_id, user_id=1, contract_code="CU2612")
+    assert db.get(Post, post.post_id).contract_code == "AU2612"
+
+
+def test_row_by_row_mode_is_kept(db):
+    service = FuturesSyncService(db)
+    service.get_all_futures_contracts = lambda include_continuous=False: _contracts(3)[:-2]
+
+    result = service.sync_futures_to_posts(author_id=1, update_existing=True, bulk=False)
+
+    assert (result["created"], result["updated"], result["skipped"], result["failed"]) == (3, 1, 0, 0)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_vectorized_realtime_matches_legacy(seed):
+    service = FuturesSyncService(None)
+    frame = random_realtime_frame(np.random.default_rng(seed), 800)
+
+    new = service._contracts_from_realtime(frame)
+    legacy = legacy_realtime_contracts(service, frame)
+
+    # 原实现把 C2607 的品种代码截成 C2，向量化版本取开头字母；其余字段一致
+    columns = ["contract_code", "contract_name", "current_price", "spot_price", "is_continuous"]
+    records = new.astype(object).where(new.notna(), None)[columns].to_dict("records")
+    assert records == [{k: row[k] for k in columns} for row in legacy]
+    assert set(new["symbol"]) <= {"C", "CU", "TA", "I", "SC", "AP"}
+
+
+def test_expiry_dates_match_scalar_rule():
+    service = FuturesSyncService(None)
+    codes = pd.Series([f"CU{yy:02d}{mm:02d}" for yy in range(100) for mm in range(1, 13)] + ["CU26", "X2613"])
+
+    expiry = contract_expiry_dates(codes, date.today())
+
+    assert [d.date() for d in expiry[:-2]] == [service.is_contract_active(code)[1] for code in codes[:-2]]
+    assert expiry[-2:].isna().all()
+    # 明年的合约不能被推断成上个世纪而判为过期
+    assert service.is_contract_active(f"CU{(date.today().year + 1) % 100:02d}01")[0]
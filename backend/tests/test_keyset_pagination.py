@@ -0,0 +1,163 @@
+"""游标分页测试：游标逐页遍历的结果应与一次性按 OFFSET 取出的顺序完全一致。"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from app.database.connection import get_async_db
+from app.database.models import BrowseHistory, Collection, Post, User
+from app.routers import browse_history, collections, posts
+from app.utils.pagination import decode_cursor, encode_cursor
+
+N_POSTS = 23
+
+
+@pytest_asyncio.fixture
+async def client(async_session_factory):
+    """23 篇帖子：部分有建议、部分更新时间相同（测试 post_id 兜底）、部分 updated_at 为空。"""
+    base = datetime(2026, 1, 1)
+    async with async_session_factory() as s:
+        s.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="u", user_role=1, is_active=True))
+        for i in range(1, N_POSTS + 1):
+            s.add(Post(
+                post_id=i, author_id=1, title=f"p{i}", contract_code=f"CU{2600 + i}", stop_loss=1,
+                content="c", status=1, collect_count=0,
+                suggestion="看多" if i % 4 == 0 else None,
+                publish_time=base + timedelta(hours=i),
+                updated_at=None if i % 5 == 0 else base + timedelta(days=i // 3),
+            ))
+            # 同一时刻收藏/浏览多篇，依赖主键兜底
+            s.add(Collection(user_id=1, post_id=i, created_at=base + timedelta(minutes=i // 2)))
+            s.add(BrowseHistory(user_id=1, post_id=i, browse_time=base + timedelta(minutes=i // 3)))
+        await s.commit()
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/api/v1/posts")
+    app.include_router(collections.router, prefix="/api/v1/collections")
+    app.include_router(browse_history.router, prefix="/api/v1/browse-history")
+
+    async def override():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def _walk(client, path, headers=None, **params):
+    """沿 next_cursor 翻到底，返回所有 post_id。"""
+    ids, cursor = [], None
+    while True:
+        query = dict(params, page_size=5)
+        if cursor:
+            query["cursor"] = cursor
+        body = (await client.get(path, params=query, headers=headers)).json()
+        ids.extend(p["post_id"] for p in body["posts"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.asyncio
+async def test_feed_cursor_matches_offset_order(client):
+    full = (await client.get("/api/v1/posts", params={"page_size": 100})).json()
+    assert full["total"] == N_POSTS
+    assert full["next_cursor"] is None
+    expected = [p["post_id"] for p in full["posts"]]
+
+    assert await _walk(client, "/api/v1/posts", include_total="false") == expected
+
+    # OFFSET 分页也返回游标，可从任意页切换到游标模式
+    page2 = (await client.get("/api/v1/posts", params={"page": 2, "page_size": 5})).json()
+    page3 = (await client.get("/api/v1/posts", params={"cursor": page2["next_cursor"], "page_size": 5})).json()
+    assert [p["post_id"] for p in page3["posts"]] == expected[10:15]
+
+
+@pytest.mark.asyncio
+async def test_feed_include_total_false_skips_count(client):
+    body = (await client.get("/api/v1/posts", params={"include_total": "false", "page_size": 5})).json()
+    assert body["total"] is None and body["total_pages"] is None
+    assert len(body["posts"]) == 5 and body["next_cursor"]
+
+
+@pytest.mark.asyncio
+async def test_collections_and_history_cursor(client, make_token):
+    headers = {"Authorization": f"Bearer {make_token(1)}"}
+    for path in ("/api/v1/collections", "/api/v1/browse-history"):
+        full = (await client.get(path, params={"page_size": 100}, headers=headers)).json()
+        assert full["next_cursor"] is None
+        expected = [p["post_id"] for p in full["posts"]]
+        assert len(expected) == N_POSTS
+        assert await _walk(client, path, headers=headers) == expected
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_rejected(client, make_token):
+    assert (await client.get("/api/v1/posts", params={"cursor": "not-a-cursor"})).status_code == 400
+    # 其他列表的游标不能混用
+    foreign = encode_cursor("collections", (datetime(2026, 1, 1), 3))
+    assert (await client.get("/api/v1/posts", params={"cursor": foreign})).status_code == 400
+    headers = {"Authorization": f"Bearer {make_token(1)}"}
+    resp = await client.get("/api/v1/collections", params={"cursor": "xx"}, headers=headers)
+    assert resp.status_code == 400
+
+
+def _raw_cursor(kind, values):
+    """绕过 encode_cursor 构造任意载荷的游标。"""
+    raw = json.dumps({"v": 1, "k": kind, "d": values}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.asyncio
+async def test_malformed_cursor_payload_rejected(client, make_token):
+    headers = {"Authorization": f"Bearer {make_token(1)}"}
+    for path, kind in (("/api/v1/posts", "feed"), ("/api/v1/collections", "collections"),
+                       ("/api/v1/browse-history", "browse_history")):
+        for values in ([[1], 2], [1, 2 ** 63], [True, 2], ["2026-01-01", 2], [{"t": 5}, 2], {"a": 1}):
+            resp = await client.get(path, params={"cursor": _raw_cursor(kind, values)}, headers=headers)
+            assert resp.status_code == 400, (path, values)
+
+
+def test_cursor_roundtrip():
+    when = datetime(2026, 3, 4, 5, 6, 7, 890000)
+    token = encode_cursor("feed", (1, when, 42))
+    assert decode_cursor("feed", token, (int, datetime, int)) == [1, when, 42]
+    with pytest.raises(ValueError):
+        decode_cursor("feed", token, (int, datetime))
+    with pytest.raises(ValueError):
+        decode_cursor("feed", token, (int, int, int))
+
+
+@pytest.mark.asyncio
+async def test_feed_rank_matches_suggestion_then_time_order(client, async_session_factory):
+    async with async_session_factory() as s:
+        posts_ = (await s.execute(select(Post))).scalars().all()
+    expected = [
+        p.post_id
+        for p in sorted(
+            posts_,
+            key=lambda p: (
+                p.suggestion not in (None, "", "待管理员编辑建议"),
+                p.updated_at or p.publish_time,
+                p.post_id,
+            ),
+            reverse=True,
+        )
+    ]
+    body = (await client.get("/api/v1/posts", params={"page_size": 100})).json()
+    assert [p["post_id"] for p in body["posts"]] == expected
+
+    # 编辑建议后生成列随之更新，帖子升到有建议的一组
+    async with async_session_factory() as s:
+        post = await s.get(Post, expected[-1])
+        post.suggestion = "看空"
+        await s.commit()
+        await s.refresh(post)
+        assert post.feed_rank > 10 ** 13
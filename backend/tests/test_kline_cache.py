@@ -0,0 +1,150 @@
+"""K 线响应缓存测试。
+
+覆盖 LRU/TTL、交易日 TTL 计算、并发构建合并，以及 /api/v1/kline 的 ETag/304。
+"""
+
+import threading
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import kline
+from app.services import kline_cache
+from app.services.kline_cache import KlineResponseCache, etag_matches, kline_cache_ttl
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _payload(n=2):
+    return {"contract_code": "CU2601", "data": [{"time": f"2026-01-0{i + 1}"} for i in range(n)], "count": n, "period": 365}
+
+
+class TestKlineResponseCache:
+    """测试 KlineResponseCache。"""
+
+    def test_lru_eviction(self):
+        cache = KlineResponseCache(max_entries=2, ttl_func=lambda: 60)
+        for code in ("A", "B"):
+            cache.put(cache.make_key(code, 365, None, None), _payload())
+        assert cache.get(cache.make_key("A", 365, None, None)) is not None  # A 变为最近使用
+        cache.put(cache.make_key("C", 365, None, None), _payload())
+        assert cache.get(cache.make_key("B", 365, None, None)) is None
+        assert cache.get(cache.make_key("A", 365, None, None)) is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = KlineResponseCache(ttl_func=lambda: 60, clock=clock)
+        key = cache.make_key("cu2601", 365, None, None)
+        cache.put(key, _payload())
+        clock.now += 59
+        assert cache.get(key) is not None
+        clock.now += 2
+        assert cache.get(key) is None
+
+    def test_etag_stable_for_same_payload(self):
+        cache = KlineResponseCache(ttl_func=lambda: 60)
+        a = cache.put(cache.make_key("A", 1, None, None), _payload())
+        b = cache.put(cache.make_key("B", 1, None, None), _payload())
+        c = cache.put(cache.make_key("C", 1, None, None), _payload(3))
+        assert a.etag == b.etag != c.etag
+        assert a.etag.startswith('"') and a.etag.endswith('"')
+
+    def test_get_or_build_single_flight_and_uncacheable(self):
+        cache = KlineResponseCache(ttl_func=lambda: 60)
+        calls = []
+        gate = threading.Event()
+
+        def build():
+            calls.append(1)
+            gate.wait(1)
+            return _payload()
+
+        key = cache.make_key("A", 365, None, None)
+        threads = [threading.Thread(target=cache.get_or_build, args=(key, build)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        gate.set()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+
+        empty_key = cache.make_key("EMPTY", 365, None, None)
+        assert cache.get_or_build(empty_key, lambda: _payload(0), lambda p: p["count"] > 0) is None
+        assert cache.get(empty_key) is None
+
+
+class TestTradingDayTtl:
+    """测试交易日感知的 TTL。"""
+
+    @pytest.mark.parametrize(
+        "now, expected",
+        [
+            (datetime(2026, 1, 5, 14, 0), 3600),         # 周一盘中：到 15:00 还剩 1 小时
+            (datetime(2026, 1, 5, 14, 59, 30), 30),
+            (datetime(2026, 1, 5, 16, 0), 600),          # 发布窗口内短 TTL
+            (datetime(2026, 1, 9, 21, 0), 3600),         # 周五晚：受上限约束
+        ],
+    )
+    def test_ttl(self, now, expected):
+        assert kline_cache_ttl(now) == expected
+
+    def test_weekend_skips_to_monday(self, monkeypatch):
+        monkeypatch.setenv("KLINE_CACHE_MAX_TTL_SECONDS", str(10 ** 6))
+        # 周六 10:00 → 周一 15:00
+        assert kline_cache_ttl(datetime(2026, 1, 10, 10, 0)) == (2 * 24 + 5) * 3600
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "x"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+
+
+class TestKlineEndpoint:
+    """测试 K 线接口的缓存与 304。"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(kline_cache, "_cache", KlineResponseCache(ttl_func=lambda: 60))
+        app = FastAPI()
+        app.include_router(kline.router, prefix="/api/v1/kline")
+        return TestClient(app)
+
+    def test_etag_and_304(self, client):
+        with patch.object(kline.KlineService, "__init__", return_value=None), patch.object(
+            kline.KlineService, "get_futures_kline_for_chart", return_value=_payload()
+        ) as build:
+            first = client.get("/api/v1/kline/CU2601")
+            assert first.status_code == 200
+            assert first.json()["count"] == 2
+            etag = first.headers["etag"]
+
+            second = client.get("/api/v1/kline/CU2601", headers={"If-None-Match": etag})
+            assert second.status_code == 304
+            assert second.headers["etag"] == etag
+            assert second.content == b""
+
+            third = client.get("/api/v1/kline/CU2601")
+            assert third.status_code == 200
+            assert third.content == first.content
+            assert build.call_count == 1
+
+    def test_empty_result_404_not_cached(self, client):
+        with patch.object(kline.KlineService, "__init__", return_value=None), patch.object(
+            kline.KlineService, "get_futures_kline_for_chart", return_value=_payload(0)
+        ) as build:
+            assert client.get("/api/v1/kline/XX9999").status_code == 404
+            assert client.get("/api/v1/kline/XX9999").status_code == 404
+            assert build.call_count == 2
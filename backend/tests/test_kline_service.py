@@ -0,0 +1,55 @@
+"""K 线规整测试。
+
+对比向量化的 normalize_kline_frame 与原逐行实现（参考实现见 benchmarks/_fixtures.py）在随机数据上的输出。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.kline_service import normalize_kline_frame
+from benchmarks._fixtures import legacy_normalize, random_kline_frame
+
+
+class TestNormalizeKlineFrame:
+    """测试 normalize_kline_frame 与原逐行实现一致。"""
+
+    @pytest.mark.parametrize("seed", range(8))
+    @pytest.mark.parametrize("date_style", ["str", "int"])
+    def test_matches_legacy_on_random_frames(self, seed, date_style):
+        """随机数据上输出与原实现完全一致。"""
+        rng = np.random.default_rng(seed)
+        df = random_kline_frame(rng, int(rng.integers(1, 600)), date_style)
+        assert normalize_kline_frame(df) == legacy_normalize(df)
+
+    def test_matches_legacy_without_optional_columns(self):
+        """无 settle、vol 列时一致。"""
+        df = random_kline_frame(np.random.default_rng(42), 200).drop(columns=["settle", "vol"])
+        assert normalize_kline_frame(df) == legacy_normalize(df)
+
+    def test_object_columns_and_odd_values(self):
+        """对象列中的字符串价格、无法转换的值、非常规日期与原实现一致。"""
+        df = pd.DataFrame({
+            "trade_date": ["20260105", "2026-01-02", 20260103, 20260104.0, None, "bad-date", "20260105"],
+            "open": ["1.5", 2, "x", 4.0, 5, 6, " 7 "],
+            "high": [2, 3, 4, 3.5, 6, 7, 8],
+            "low": [1, 1, 1, 5.0, 1, 1, 1],
+            "close": [1.8, None, 3, 4.2, 5, 6, 7.5],
+            "settle": [None, 2.5, None, "oops", None, None, None],
+            "vol": ["10", None, 3, "n/a", float("inf"), 5, 7.9],
+        }).astype({"open": object, "vol": object, "settle": object})
+        assert normalize_kline_frame(df) == legacy_normalize(df)
+
+    def test_dedup_keeps_last_and_sorts(self):
+        """同一日期保留最后一行并按日期升序。"""
+        df = pd.DataFrame({
+            "trade_date": ["20260103", "20260102", "20260103"],
+            "open": [1.0, 2.0, 3.0],
+            "high": [1.0, 2.0, 3.0],
+            "low": [1.0, 2.0, 3.0],
+            "close": [1.0, 2.0, 3.0],
+        })
+        out = normalize_kline_frame(df)
+        assert [it["time"] for it in out] == ["2026-01-02", "2026-01-03"]
+        assert out[1]["close"] == 3.0
+        assert "volume" not in out[0]
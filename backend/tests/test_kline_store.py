@@ -0,0 +1,98 @@
+"""
+列式 K 线存储测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import market_data_service as mds
+from app.services.kline_store import KlineColumnStore
+
+
+def _frame(dates, base=100.0):
+    return pd.DataFrame(
+        {
+            "trade_date": dates,
+            "open": [base + i for i in range(len(dates))],
+            "high": [base + i + 1 for i in range(len(dates))],
+            "low": [base + i - 1 for i in range(len(dates))],
+            "close": [base + i + 0.5 for i in range(len(dates))],
+            "vol": [1000 + i for i in range(len(dates))],
+        }
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineColumnStore(root=tmp_path)
+
+
+class TestKlineColumnStore:
+    """读写与区间切片"""
+
+    def test_round_trip_sorted_and_deduped(self, store):
+        df = _frame(["20260105", "20260102", "20260103", "20260105"])
+        assert store.write("CU2601.SHF", df) == 3
+
+        cols = store.read_range("CU2601.SHF", "20260101", "20260131")
+        assert cols["trade_date"].tolist() == [20260102, 20260103, 20260105]
+        # 同日期保留最后一行
+        assert cols["close"][-1] == pytest.approx(103.5)
+        assert np.isnan(cols["settle"]).all()
+
+    def test_read_range_bounds(self, store):
+        store.write("CU2601.SHF", _frame(["20260102", "20260105", "20260106", "20260107"]))
+        df = store.read_frame("CU2601.SHF", "20260105", "20260106")
+        assert df["trade_date"].tolist() == ["20260105", "20260106"]
+        assert store.read_frame("CU2601.SHF", "20270101", "20270131").empty
+        assert store.read_range("AU2601.SHF", "20260101", "20260131") is None
+
+    def test_merge_overrides_same_date(self, store):
+        store.write("CU2601.SHF", _frame(["20260102", "20260103"]))
+        store.write("CU2601.SHF", _frame(["20260103", "20260104"], base=200.0))
+        df = store.read_frame("CU2601.SHF", "20260101", "20260131")
+        assert df["trade_date"].tolist() == ["20260102", "20260103", "20260104"]
+        assert df["open"].tolist() == [100.0, 200.0, 201.0]
+
+    def test_write_from_fut_daily_groups_by_code(self, store):
+        a = _frame(["20260102", "20260103"]).assign(ts_code="CU2601.SHF")
+        b = _frame(["20260102"]).assign(ts_code="al2601.shf")
+        written = store.write_from_fut_daily(pd.concat([a, b], ignore_index=True))
+        assert written == {"CU2601.SHF": 2, "AL2601.SHF": 1}
+        assert store.list_codes() == ["AL2601.SHF", "CU2601.SHF"]
+
+    def test_write_from_json(self, store):
+        raw = {
+            "klines": {
+                "TL2603.CFX": [
+                    {"time": "2026-01-05", "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10},
+                    {"time": "2026-01-02", "open": 1, "high": 2, "low": 0.5, "close": 1.2, "volume": 9},
+                ],
+                "EMPTY.CFX": [],
+            }
+        }
+        assert store.write_from_json(raw) == {"TL2603.CFX": 2}
+        cols = store.read_range("TL2603.CFX", "20260101", "20260131")
+        assert cols["trade_date"].tolist() == [20260102, 20260105]
+        assert cols["vol"].tolist() == [9.0, 10.0]
+
+    def test_rejects_path_like_codes(self, store):
+        with pytest.raises(ValueError):
+            store.path_for("../etc/passwd")
+        assert store.has("../x") is False
+
+
+class TestMarketDataServiceUsesStore:
+    """JSON 后端优先读列存"""
+
+    def test_store_hit_skips_json(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("KLINE_STORE_DIR", str(tmp_path / "klc"))
+        monkeypatch.setenv("MARKET_DATA_JSON", str(tmp_path / "missing.json"))
+        mds._reset_snapshot_cache()
+        KlineColumnStore(root=tmp_path / "klc").write("CU2601.SHF", _frame(["20260102", "20260105"]))
+
+        df = mds.MarketDataService().get_futures_kline("CU2601.SHF", "20260101", "20260131")
+        assert df["trade_date"].tolist() == ["20260102", "20260105"]
+        assert mds.get_snapshot_cache_stats()["misses"] == 0
+        mds._reset_snapshot_cache()
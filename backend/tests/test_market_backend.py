@@ -0,0 +1,104 @@
+"""行情后端注册表测试：只构造一次、主备热切换、并发访问。"""
+
+import threading
+
+import pytest
+
+from app.services import market_backend
+from app.services.market_backend import MarketBackendRegistry, get_market_backend
+
+
+class FakeBackend:
+    """可控制成败的假后端。"""
+
+    def __init__(self, name):
+        self.name = name
+        self.fail = False
+        self.healthy = True
+
+    def get_futures_price(self, code):
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}:{code}"
+
+    def health_check(self):
+        return self.healthy
+
+
+def make_registry(now, threshold=3, probe=60):
+    backends = {"tushare": FakeBackend("tushare"), "json": FakeBackend("json")}
+    built = {"tushare": 0, "json": 0}
+
+    def factory(name):
+        def build():
+            built[name] += 1
+            return backends[name]
+        return build
+
+    registry = MarketBackendRegistry(
+        "tushare", "json",
+        factories={name: factory(name) for name in backends},
+        failure_threshold=threshold, probe_seconds=probe, clock=lambda: now[0],
+    )
+    return registry, backends, built
+
+
+def test_get_market_backend_is_shared(monkeypatch):
+    monkeypatch.setenv("MARKET_DATA_SOURCE", "json")
+    assert get_market_backend() is get_market_backend()
+    assert market_backend.get_backend_registry().status()["primary"] == "json"
+
+
+def test_switches_to_fallback_and_back_after_probe():
+    now = [0.0]
+    registry, backends, _ = make_registry(now)
+    proxy = market_backend.MarketBackendProxy(registry)
+
+    backends["tushare"].fail = True
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            proxy.get_futures_price("CU2601")
+    assert registry.status()["active"] == "json"
+    assert proxy.get_futures_price("CU2601") == "json:CU2601"
+
+    # 探测间隔内不会回到主后端；恢复后下一次取用时探测并切回
+    backends["tushare"].fail = False
+    now[0] = 30.0
+    assert proxy.get_futures_price("CU2601") == "json:CU2601"
+    now[0] = 61.0
+    assert proxy.get_futures_price("CU2601") == "tushare:CU2601"
+    status = registry.status()
+    assert status["switches"] == 2
+    assert status["backends"]["tushare"]["failures"] == 3
+    assert status["backends"]["tushare"]["healthy"] is True
+
+
+def test_failed_probe_stays_on_fallback():
+    now = [0.0]
+    registry, backends, _ = make_registry(now, threshold=1, probe=10)
+    registry.record("tushare", False, RuntimeError("timeout"))
+    backends["tushare"].healthy = False
+    now[0] = 11.0
+    assert registry.acquire()[0] == "json"
+    assert registry.status()["backends"]["tushare"]["consecutive_failures"] == 2
+
+
+def test_concurrent_access_builds_once_and_counts_every_call():
+    now = [0.0]
+    registry, _, built = make_registry(now)
+    proxy = market_backend.MarketBackendProxy(registry)
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for i in range(200):
+            proxy.get_futures_price(str(i))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert built == {"tushare": 1, "json": 0}
+    assert registry.status()["backends"]["tushare"]["calls"] == 1600
@@ -0,0 +1,97 @@
+"""本地 JSON 行情服务测试。
+
+覆盖快照缓存：命中、文件变化后的热更新，以及预建索引的查询结果。
+"""
+
+import json
+import os
+
+import pytest
+
+from app.services import market_data_service as mds
+from app.services.market_data_service import MarketDataService, get_snapshot_cache_stats
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def market_json(tmp_path, monkeypatch):
+    """指向临时行情文件，并清空进程级快照。"""
+    path = tmp_path / "market_data.json"
+    _write(path, {
+        "prices": {"CU2601": 71234.5, "if2603": "3850"},
+        "klines": {
+            "TL2603.CFX": [
+                {"time": "2026-02-01", "open": 105, "high": 106, "low": 104, "close": 105.2, "volume": 13000},
+                {"time": "2026-01-02", "open": 104, "high": 105.5, "low": 103.5, "close": 105},
+                {"time": "bad", "open": 1, "high": 1, "low": 1, "close": 1},
+            ],
+        },
+    })
+    monkeypatch.setenv("MARKET_DATA_JSON", str(path))
+    mds._reset_snapshot_cache()
+    yield path
+    mds._reset_snapshot_cache()
+
+
+class TestSnapshotCache:
+    """测试快照缓存。"""
+
+    def test_parses_once_and_hits_afterwards(self, market_json):
+        """文件未变化时只解析一次。"""
+        service = MarketDataService()
+
+        assert service.get_futures_price("CU2601") == 71234.5
+        assert service.get_futures_price("CU2601.SHF") == 71234.5
+        assert service.batch_get_futures_prices(["IF2603", "RB2605"]) == {"IF2603": 3850.0, "RB2605": None}
+
+        stats = get_snapshot_cache_stats()
+        assert stats["misses"] == 1
+        assert stats["reloads"] == 0
+        assert stats["hits"] == 2
+
+    def test_reloads_when_file_changes(self, market_json):
+        """文件内容变化后自动替换快照。"""
+        service = MarketDataService()
+        assert service.get_futures_price("CU2601") == 71234.5
+
+        _write(market_json, {"prices": {"CU2601": 70000.0}})
+        st = os.stat(market_json)
+        os.utime(market_json, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert service.get_futures_price("CU2601") == 70000.0
+        stats = get_snapshot_cache_stats()
+        assert stats["misses"] == 2
+        assert stats["reloads"] == 1
+
+    def test_missing_file_returns_none(self, market_json):
+        """文件不存在时不抛错。"""
+        market_json.unlink()
+        service = MarketDataService()
+
+        assert service.get_futures_price("CU2601") is None
+        assert service.get_futures_kline("TL2603.CFX") is None
+
+
+class TestKlineIndex:
+    """测试预建 K 线索引。"""
+
+    def test_kline_sorted_and_filtered_by_range(self, market_json):
+        """按日期排序，区间两端包含，非法行被丢弃。"""
+        service = MarketDataService()
+
+        df = service.get_futures_kline("TL2603.CFX", start_date="20260101", end_date="20260201")
+
+        assert df["trade_date"].tolist() == ["20260102", "20260201"]
+        assert df["close"].tolist() == [105.0, 105.2]
+        assert df["vol"].iloc[1] == 13000
+
+    def test_kline_empty_range_returns_empty_frame(self, market_json):
+        """区间内无数据时返回空表而不是 None。"""
+        service = MarketDataService()
+
+        df = service.get_futures_kline("TL2603.CFX", start_date="20250101", end_date="20250131")
+
+        assert df is not None and df.empty
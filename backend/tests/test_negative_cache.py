@@ -0,0 +1,81 @@
+"""无行情合约负结果缓存测试：TTL 退避、区间覆盖、取价与 K 线路径接入。"""
+
+import pandas as pd
+
+from app.services.contract_resolver import ContractIndex, set_contract_index
+from app.services.kline_service import KlineService
+from app.services.negative_cache import KIND_KLINE, KIND_PRICE, NegativeCache, get_negative_cache
+from benchmarks._fixtures import StubPro, contract_codes
+from tests.test_tushare_fanout import install_stub  # noqa: F401
+
+
+def test_ttl_backs_off_and_clears_on_data():
+    now = [0.0]
+    cache = NegativeCache(ttl_seconds=10, max_ttl_seconds=25, clock=lambda: now[0])
+
+    cache.record_empty("CU2601.SHF", KIND_PRICE)
+    assert cache.is_negative("CU2601.SHF", KIND_PRICE)
+    assert not cache.is_negative("CU2601.SHF", KIND_KLINE)
+    now[0] = 10.0
+    assert not cache.is_negative("CU2601.SHF", KIND_PRICE)
+
+    cache.record_empty("CU2601.SHF", KIND_PRICE)
+    now[0] = 29.0
+    assert cache.is_negative("CU2601.SHF", KIND_PRICE)  # 第二次为空：20 秒
+    cache.record_empty("CU2601.SHF", KIND_PRICE)
+    assert cache.report()[0]["retry_in_seconds"] == 25  # 第三次封顶
+
+    cache.record_found("CU2601.SHF", KIND_PRICE)
+    assert not cache.is_negative("CU2601.SHF", KIND_PRICE) and len(cache) == 0
+
+
+def test_kline_entry_only_covers_later_start_dates():
+    cache = NegativeCache(ttl_seconds=60)
+    cache.record_empty("CU2601.SHF", KIND_KLINE, since="20260301")
+    assert cache.is_negative("CU2601.SHF", KIND_KLINE, since="20260401")
+    assert not cache.is_negative("CU2601.SHF", KIND_KLINE, since="20250101")
+
+
+def test_price_lookup_skips_contracts_confirmed_empty(install_stub):  # noqa: F811
+    codes = contract_codes(6)
+    stub = StubPro([f"{c}.SHF" for c in codes[:2]], single_codes=[], kline_codes=[])
+    service = install_stub(stub, max_in_flight=2)
+
+    assert len(service.batch_get_futures_prices(codes)) == 2
+    assert stub.calls["single"] == 4 and stub.calls["kline"] == 4
+    assert len(service.batch_get_futures_prices(codes)) == 2
+    assert stub.calls["single"] == 4 and stub.calls["kline"] == 4
+
+    report = get_negative_cache().report()
+    assert [row["contract_code"] for row in report] == codes[2:]
+    assert {row["kind"] for row in report} == {KIND_PRICE}
+
+
+class EmptyBackend:
+    """K 线总是为空表（或 None，模拟接口异常）。"""
+
+    def __init__(self, result):
+        self.result = result
+        self.requested = []
+
+    def get_futures_kline(self, ts_code, start_date=None, end_date=None, period=None):
+        self.requested.append(ts_code)
+        return self.result
+
+
+def test_kline_skips_empty_candidates_but_not_errors():
+    set_contract_index(ContractIndex({"PT2606": "CZCE"}))
+    service = KlineService()
+
+    service.market_data_service = EmptyBackend(None)
+    assert service.get_futures_daily_kline("PT2606", period=30) == []
+    assert service.get_futures_daily_kline("PT2606", period=30) == []
+    assert len(service.market_data_service.requested) == 4
+
+    service.market_data_service = EmptyBackend(pd.DataFrame())
+    assert service.get_futures_daily_kline("PT2606", period=30) == []
+    assert service.get_futures_daily_kline("PT2606", period=30) == []
+    assert service.market_data_service.requested == ["PT2606.ZCE", "PT2606.GFE"]
+    # 更长的区间不在记录覆盖范围内，照常请求
+    assert service.get_futures_daily_kline("PT2606", period=365) == []
+    assert len(service.market_data_service.requested) == 4
@@ -0,0 +1,117 @@
+"""帖子列表/详情查询次数测试。
+
+作者信息必须随主查询一起取回：查询条数不随每页帖子数或作者数增长（防止 N+1 回归）。
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base, get_async_db
+from app.database.models import Post, User
+from app.routers import posts
+from app.services.post_service import PostService
+from tests.conftest import TEST_TABLES
+
+
+def _rows(n_posts=30, n_authors=10):
+    base = datetime(2026, 1, 1)
+    users = [
+        User(user_id=i, phone_number=f"1380000{i:04d}", password_hash="x", nickname=f"u{i}",
+             avatar_url=f"a{i}.png", user_role=3, is_active=True)
+        for i in range(1, n_authors + 1)
+    ]
+    items = [
+        Post(post_id=i, author_id=1 + i % n_authors, title=f"t{i}", contract_code=f"CU{i:04d}",
+             stop_loss=1, content="c", status=1, collect_count=0,
+             publish_time=base + timedelta(hours=i), updated_at=base + timedelta(hours=i))
+        for i in range(1, n_posts + 1)
+    ]
+    return users + items
+
+
+@contextmanager
+def count_statements(sync_engine):
+    """统计期间执行的 SQL 语句。"""
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _before)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _before)
+
+
+@pytest_asyncio.fixture
+async def client(async_engine, async_session_factory):
+    async with async_session_factory() as s:
+        s.add_all(_rows())
+        await s.commit()
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/api/v1/posts")
+
+    async def override():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("page_size", [5, 30])
+async def test_post_list_query_count_is_constant(client, async_engine, page_size):
+    with count_statements(async_engine.sync_engine) as statements:
+        resp = await client.get("/api/v1/posts", params={"page_size": page_size})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["posts"]) == page_size
+    assert all(p["author_nickname"] for p in body["posts"])
+    # 1 条 count + 1 条带作者 JOIN 的列表查询
+    assert len(statements) == 2, statements
+
+
+@pytest.mark.asyncio
+async def test_post_detail_loads_author_in_same_query(client, async_engine, make_token):
+    headers = {"Authorization": f"Bearer {make_token(2)}"}
+    with count_statements(async_engine.sync_engine) as statements:
+        resp = await client.get("/api/v1/posts/7", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["author_nickname"] == "u8"
+    assert resp.json()["author_avatar"] == "a8.png"
+
+    post_queries = [s for s in statements if "FROM posts" in s]
+    assert len(post_queries) == 1 and "JOIN users" in post_queries[0]
+    # users 表只在认证时单独查询一次，作者不再懒加载
+    user_only = [s for s in statements if "FROM users" in s and "FROM posts" not in s]
+    assert len(user_only) == 1, statements
+
+
+def test_sync_post_service_list_query_count():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=TEST_TABLES)
+    session = sessionmaker(bind=engine)()
+    session.add_all(_rows())
+    session.commit()
+    session.expunge_all()
+
+    with count_statements(engine) as statements:
+        result = PostService(session).get_posts(page_size=30)
+        nicknames = [p.author_nickname for p in result["posts"]]
+        detail = PostService(session).get_post_by_id(3)
+        assert detail.author.nickname == "u4"
+    assert result["total"] == 30 and len(nicknames) == 30 and all(nicknames)
+    assert len(statements) == 3, statements
+    session.close()
@@ -0,0 +1,95 @@
+"""帖子搜索与输入联想测试。"""
+
+from datetime import datetime
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from app.database.connection import get_async_db
+from app.database.models import Post, User
+from app.routers import posts
+from app.services.search_index import SymbolIndex
+from app.utils.futures_naming import pinyin_keys, resolve_search_aliases
+
+
+def test_pinyin_keys():
+    assert pinyin_keys("zong lv you") == ("zonglvyou", "zly", "zongluyou")
+    assert pinyin_keys("") == ()
+
+
+def test_resolve_search_aliases():
+    assert resolve_search_aliases("CU") == ["铜"]
+    assert resolve_search_aliases("tong") == ["铜"]
+    assert resolve_search_aliases("dp") == ["豆粕"]
+    assert resolve_search_aliases("dce") == ["大商所"]
+    # 中文、含数字的输入不扩展
+    assert resolve_search_aliases("铜") == []
+    assert resolve_search_aliases("cu2601") == []
+
+
+def test_symbol_index_prefix():
+    index = SymbolIndex(["cu2601", "CU2602", "I2605", "M2609", " ", "CU2601"])
+    assert index.contract_count == 4
+    assert index.suggest("cu") == ["CU2601", "CU2602"]
+    assert index.suggest("CU2602") == ["CU2602"]
+    assert index.suggest("铜") == ["CU2601", "CU2602"]
+    assert index.suggest("tie") == ["I2605"]
+    assert index.suggest("dp") == ["M2609"]
+    assert index.suggest("cu", limit=1) == ["CU2601"]
+    assert index.suggest("zz") == []
+    assert index.suggest("") == []
+
+
+@pytest_asyncio.fixture
+async def client(async_session_factory):
+    titles = {1: "上期所 铜 CU2601", 2: "大商所 豆粕 M2609", 3: "大商所 铁矿石 I2605", 4: "上期所 铜 CU2602"}
+    async with async_session_factory() as s:
+        s.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="a", user_role=3, is_active=True))
+        s.add_all([
+            Post(post_id=i, author_id=1, title=title, contract_code=title.split()[-1], stop_loss=1,
+                 content="c", status=1, collect_count=0, publish_time=datetime(2026, 1, i))
+            for i, title in titles.items()
+        ])
+        await s.commit()
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/api/v1/posts")
+
+    async def override():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def _search(client, keyword):
+    body = (await client.get("/api/v1/posts", params={"search": keyword})).json()
+    return sorted(p["post_id"] for p in body["posts"])
+
+
+@pytest.mark.asyncio
+async def test_search_resolves_pinyin_aliases(client):
+    assert await _search(client, "tong") == [1, 4]
+    assert await _search(client, "dp") == [2]
+    assert await _search(client, "铁矿") == [3]
+    assert await _search(client, "cu2602") == [4]
+
+
+@pytest.mark.asyncio
+async def test_suggest_endpoint_and_refresh(client, make_token):
+    resp = await client.get("/api/v1/posts/suggest", params={"q": "tong"})
+    assert resp.status_code == 200
+    assert resp.json()["suggestions"] == [
+        {"contract_code": "CU2601", "label": "上期所 铜 CU2601"},
+        {"contract_code": "CU2602", "label": "上期所 铜 CU2602"},
+    ]
+
+    # 删除帖子后索引随之重建
+    headers = {"Authorization": f"Bearer {make_token(1, role=3)}"}
+    assert (await client.delete("/api/v1/posts/1", headers=headers)).status_code == 200
+    codes = [s["contract_code"] for s in (await client.get("/api/v1/posts/suggest", params={"q": "cu"})).json()["suggestions"]]
+    assert codes == ["CU2602"]
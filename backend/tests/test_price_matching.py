@@ -0,0 +1,27 @@
+"""合约与全量日线的向量化匹配测试：结果须与原先逐合约过滤完全一致。"""
+
+import numpy as np
+import pandas as pd
+
+from app.services.tushare_service import daily_price_series, match_daily_prices
+from benchmarks._fixtures import legacy_match, random_request, random_snapshot
+
+
+def test_vectorized_matches_legacy():
+    rng = np.random.default_rng(0)
+    df = random_snapshot(rng, 3000)
+    request = random_request(rng, 3000, 1000)
+    assert match_daily_prices(df, request) == legacy_match(df, request)
+
+
+def test_close_then_settle_and_first_duplicate_wins():
+    df = pd.DataFrame({
+        "ts_code": ["A.SHF", "B.DCE", "C.ZCE", "A.SHF", "D.INE"],
+        "close": [10.0, 0.0, np.nan, 99.0, np.nan],
+        "settle": [11.0, 20.0, 30.0, 99.0, 0.0],
+    })
+    series = daily_price_series(df)
+    assert series["A.SHF"] == 10.0 and series["B.DCE"] == 20.0 and series["C.ZCE"] == 30.0
+    assert np.isnan(series["D.INE"])
+    assert match_daily_prices(df, {"a": "A.SHF", "d": "D.INE", "z": "Z.GFE"}) == {"a": 10.0}
+    assert match_daily_prices(None, {"a": "A.SHF"}) == {}
@@ -0,0 +1,137 @@
+"""批量价格写回测试：集合式写入、只写变化的合约、价格变化事件。"""
+
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.database.models import Post, User
+from app.services.count_cache import invalidate_post_counts
+from app.services.price_events import subscribe_prices_changed
+from app.services.price_update_service import PriceUpdateService
+from tests.conftest import TEST_TABLES
+from tests.test_post_query_count import count_statements
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=TEST_TABLES)
+    session = sessionmaker(bind=engine)()
+    session.add(User(user_id=1, phone_number="13800000001", password_hash="x", nickname="a", user_role=3, is_active=True))
+    specs = [("CU2601", 100), ("cu2601 ", 90), ("RB2605", 50), ("RB2605", None), ("IF2603", 3000), (None, None)]
+    for i, (code, price) in enumerate(specs, start=1):
+        session.add(Post(post_id=i, author_id=1, title=f"t{i}", contract_code=code or "", stop_loss=1,
+                         content="x" * 1000, status=1, current_price=price,
+                         publish_time=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 1)))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _service(db, prices):
+    service = PriceUpdateService(db)
+    service.market_data_service = Mock()
+    service.market_data_service.batch_get_futures_prices.return_value = prices
+    return service
+
+
+def test_only_changed_rows_are_written(db):
+    service = _service(db, {"CU2601": 100.0, "RB2605": 55.004, "IF2603": None})
+    events = []
+    unsubscribe = subscribe_prices_changed(events.append)
+    try:
+        with count_statements(db.get_bind()) as statements:
+            result = service.update_all_posts_price()
+    finally:
+        unsubscribe()
+
+    assert result == {"total": 6, "success": 4, "failed": 2, "updated": 3, "unchanged": 1, "changed_contracts": 2}
+    assert len(events) == 1
+    assert events[0].changes == {"CU2601": 100.0, "RB2605": 55.0} and events[0].updated_posts == 3
+    # 合约按规范化代码去重后只取一次价
+    codes = service.market_data_service.batch_get_futures_prices.call_args[0][0]
+    assert sorted(codes) == ["CU2601", "IF2603", "RB2605"]
+    # 读取只有按合约聚合与变化合约的投影，不取 content
+    assert not any("content" in s for s in statements if s.lstrip().upper().startswith("SELECT"))
+    assert sum(s.lstrip().upper().startswith("UPDATE") for s in statements) == 1
+
+    rows = dict(db.execute(select(Post.post_id, Post.current_price)).all())
+    assert rows[1] == Decimal("100.00") and rows[2] == Decimal("100.00")
+    assert rows[3] == rows[4] == Decimal("55.00")
+    assert rows[5] == Decimal("3000.00")
+    untouched = db.execute(select(Post.updated_at).where(Post.post_id == 1)).scalar_one()
+    assert untouched == datetime(2026, 1, 1)
+
+    # 第二轮价格不变：只比较内存中的上次写入价格，不查帖子也不写库
+    with count_statements(db.get_bind()) as statements:
+        result = service.update_all_posts_price()
+    assert result["updated"] == 0 and result["unchanged"] == 4 and result["changed_contracts"] == 0
+    assert statements == []
+
+
+def test_ledger_seeded_from_db_and_reseeded_after_other_writes(db):
+    # 库中现价已是最新：首轮只播种，不写
+    service = _service(db, {"CU2601": 100.0, "RB2605": 50.0, "IF2603": 3000.0})
+    db.execute(Post.__table__.update().where(Post.post_id.in_([2, 4])).values(current_price=None))
+    db.commit()
+    result = service.update_all_posts_price()
+    assert result["updated"] == 2  # 只补写现价为空的两篇
+
+    # 其他路径新增帖子（会推进 posts 代际号）后重新播种，新帖子得到价格
+    db.add(Post(post_id=7, author_id=1, title="t7", contract_code="IF2603", stop_loss=1, content="c", status=1))
+    db.commit()
+    invalidate_post_counts()
+    result = service.update_all_posts_price()
+    assert result["total"] == 7 and result["updated"] == 1
+    assert db.get(Post, 7).current_price == Decimal("3000.00")
+
+
+def test_post_added_during_fetch_triggers_reseed(db):
+    service = _service(db, {})
+
+    def fetch(codes):
+        # 取价期间其他请求新增帖子
+        if not db.get(Post, 7):
+            db.add(Post(post_id=7, author_id=1, title="t7", contract_code="AU2612", stop_loss=1, content="c", status=1))
+            db.commit()
+            invalidate_post_counts()
+        return {"CU2601": 101.0, "RB2605": 50.0, "IF2603": 3000.0, "AU2612": 600.0}
+
+    service.market_data_service.batch_get_futures_prices.side_effect = fetch
+    service.update_all_posts_price()
+    # 本轮自身的写入不能吸收新帖子引起的代际推进
+    result = service.update_all_posts_price()
+    assert result["total"] == 7 and db.get(Post, 7).current_price == Decimal("600.00")
+
+
+def test_writes_outside_process_are_picked_up_by_periodic_reseed(db, monkeypatch):
+    service = _service(db, {"CU2601": 100.0, "RB2605": 50.0, "IF2603": 3000.0})
+    service.update_all_posts_price()
+
+    # 脚本直接写库，不推进进程内代际号
+    db.add(Post(post_id=7, author_id=1, title="t7", contract_code="IF2603", stop_loss=1, content="c", status=1))
+    db.commit()
+    assert service.update_all_posts_price()["total"] == 6
+
+    monkeypatch.setenv("PRICE_LEDGER_RESEED_SECONDS", "0")
+    result = service.update_all_posts_price()
+    assert result["total"] == 7 and db.get(Post, 7).current_price == Decimal("3000.00")
+
+
+def test_postgres_uses_update_from_values(db):
+    service = _service(db, {})
+    captured = []
+    db.get_bind = Mock(return_value=Mock(dialect=postgresql.dialect()))
+    db.execute = captured.append
+    service._write_prices([(1, Decimal("1.00")), (2, Decimal("2.00"))], datetime(2026, 1, 1))
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "FROM (VALUES" in sql
+    assert "posts.post_id = new_prices.post_id" in sql
@@ -0,0 +1,90 @@
+"""交易日历与按交易时段调度测试。"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.services.scheduler_service import SchedulerService, TradingSessionTrigger
+from app.services.trading_calendar import TZ, TradingCalendar, get_trading_calendar, set_trading_calendar
+
+INTERVAL = timedelta(minutes=5)
+
+
+@pytest.fixture
+def calendar():
+    """2026 年国庆：10-01 ~ 10-07 的工作日休市；上期所额外休 10-09 用于验证分交易所。"""
+    cal = TradingCalendar(
+        {"*": [date(2026, 10, d) for d in (1, 2, 5, 6, 7)], "SHFE": [date(2026, 10, d) for d in (1, 2, 5, 6, 7, 9)]},
+        start=date(2026, 1, 1),
+        end=date(2026, 12, 31),
+    )
+    set_trading_calendar(cal)
+    yield cal
+    set_trading_calendar(None)
+
+
+def _at(month, day, hour, minute=0):
+    return datetime(2026, month, day, hour, minute, tzinfo=TZ)
+
+
+def test_bundled_calendar_loads():
+    set_trading_calendar(None)
+    cal = get_trading_calendar()
+    assert not cal.is_trading_day(date(2026, 10, 1))
+    assert cal.is_trading_day(date(2026, 10, 8))
+    set_trading_calendar(None)
+
+
+def test_trading_days_and_night_sessions(calendar):
+    assert not calendar.is_trading_day(date(2026, 10, 3))  # 周六
+    assert calendar.is_trading_day(date(2026, 10, 9))
+    assert not calendar.is_trading_day(date(2026, 10, 9), "SHFE")
+    # 周五夜盘照常（下一交易日是周一），长假前一天没有夜盘
+    assert calendar.has_night_session(date(2026, 10, 16))
+    assert not calendar.has_night_session(date(2026, 9, 30))
+
+    night = [s for s in calendar.sessions(date(2026, 10, 14), ["CU2612"]) if s[2] == "night"]
+    assert night == [(_at(10, 14, 21), _at(10, 15, 1), "night")]
+    assert [s for s in calendar.sessions(date(2026, 10, 14), ["JD2611"]) if s[2] == "night"] == []
+    assert calendar.phase(_at(10, 15, 0, 30), ["CU2612"]) == "night"
+    assert calendar.phase(_at(10, 15, 0, 30), ["RB2601"]) == "closed"
+
+
+def test_next_update_tightens_in_session_and_pauses_between(calendar):
+    runs = calendar.upcoming_updates(_at(9, 30, 14, 48), 5, INTERVAL, time(17, 0), ["RB2601"])
+    assert runs == [
+        (_at(9, 30, 14, 53), "day"),
+        (_at(9, 30, 14, 58), "day"),
+        (_at(9, 30, 15), "close"),
+        (_at(9, 30, 17), "settlement"),
+        # 国庆长假且节前无夜盘，下一次是节后开盘
+        (_at(10, 8, 9), "open"),
+    ]
+
+
+def test_next_update_uses_symbol_night_session(calendar):
+    runs = calendar.upcoming_updates(_at(10, 14, 22, 57), 3, INTERVAL, None, ["AU2612"])
+    assert runs == [(_at(10, 14, 23, 2), "night"), (_at(10, 14, 23, 7), "night"), (_at(10, 14, 23, 12), "night")]
+    previous = _at(10, 15, 2, 28)
+    assert calendar.next_update(previous, previous, INTERVAL, None, ["AU2612"]) == (_at(10, 15, 2, 30), "close")
+
+
+def test_trigger_and_schedule_preview(calendar):
+    trigger = TradingSessionTrigger(interval_minutes=5, settlement_time=time(17, 0), symbols=["RB2601"])
+    assert trigger.get_next_fire_time(_at(10, 17, 12), _at(10, 17, 12)) == _at(10, 19, 9)
+
+    service = SchedulerService()
+    service.scheduler.start(paused=True)
+    try:
+        service.add_price_update_job(lambda: None, trigger=trigger)
+        schedule = service.get_price_update_schedule(count=3)
+        assert schedule["mode"] == "session"
+        assert schedule["phase"] in ("day", "night", "closed")
+        assert len(schedule["next_runs"]) == 3
+        assert {run["kind"] for run in schedule["next_runs"]} <= {"open", "day", "night", "close", "settlement"}
+
+        service.add_price_update_job(lambda: None, interval_minutes=5)
+        schedule = service.get_price_update_schedule(count=3)
+        assert schedule["mode"] == "interval" and len(schedule["next_runs"]) == 3
+    finally:
+        service.scheduler.shutdown(wait=False)
@@ -0,0 +1,103 @@
+"""Tushare 批量取价的并发查询与限流测试（使用本地桩，不访问网络）。"""
+
+import pytest
+
+from app.services import tushare_service
+from app.services.fetch_engine import TokenBucket, fan_out, set_tushare_limiter
+from benchmarks._fixtures import StubPro, contract_codes
+
+
+@pytest.fixture
+def install_stub(monkeypatch):
+    """把 StubPro 装到 tushare_service.pro，关闭限流，快照固定取当天（与交易日历无关）。"""
+    today = tushare_service.datetime.now().strftime("%Y%m%d")
+
+    def install(stub, max_in_flight=8):
+        monkeypatch.setattr(tushare_service, "pro", stub)
+        monkeypatch.setattr(tushare_service.TushareService, "_snapshot_trade_dates", lambda self: [today])
+        monkeypatch.setattr(tushare_service, "TUSHARE_AVAILABLE", True)
+        monkeypatch.setenv("TUSHARE_MAX_IN_FLIGHT", str(max_in_flight))
+        set_tushare_limiter(TokenBucket(0))
+        return tushare_service.TushareService()
+
+    yield install
+    set_tushare_limiter(None)
+
+
+def test_token_bucket_waits_after_burst():
+    now = [0.0]
+    waits = []
+    bucket = TokenBucket(60, burst=2, clock=lambda: now[0], sleep=waits.append)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(2.0)  # 预支的令牌按顺序排队
+    now[0] = 10.0
+    assert bucket.acquire() == 0
+    assert waits == [pytest.approx(1.0), pytest.approx(2.0)]
+
+
+def test_fan_out_isolates_failures():
+    def work(x):
+        if x == 3:
+            raise ValueError("boom")
+        return x * 2
+
+    assert fan_out(work, [1, 2, 3, 2], max_in_flight=4) == {1: 2, 2: 4, 3: None}
+
+
+def test_batch_fans_out_missing_contracts_without_refetching_full_day(install_stub):
+    codes = contract_codes(40)
+    stub = StubPro(
+        full_day_codes=[f"{c}.SHF" for c in codes[:10]],
+        single_codes=[f"{c}.SHF" for c in codes[10:30]],
+        kline_codes=[f"{c}.SHF" for c in codes[30:35]],
+        latency=0.01,
+    )
+    service = install_stub(stub, max_in_flight=8)
+
+    prices = service.batch_get_futures_prices(codes)
+
+    assert prices[codes[0]] == 100.0
+    assert prices[codes[10]] == 50.0  # 收盘为 0 时取结算价
+    assert prices[codes[30]] == 8.0  # 日线区间最后一根
+    assert codes[39] not in prices
+    assert len(prices) == 35
+    assert stub.calls["full_day"] == 1
+    assert stub.calls["single"] == 30 and stub.calls["kline"] == 10
+    assert 1 < stub.max_in_flight <= 8
+
+
+
+def test_snapshot_only_batch_makes_one_upstream_call(install_stub):
+    codes = contract_codes(40)
+    stub = StubPro(full_day_codes=[f"{c}.SHF" for c in codes[:10]], single_codes=[], kline_codes=[])
+    service = install_stub(stub)
+
+    prices = service.batch_get_futures_prices(codes, snapshot_only=True)
+
+    assert len(prices) == 10
+    assert stub.calls == {"full_day": 1, "single": 0, "kline": 0}
+
+def test_failed_snapshot_is_not_refetched_within_interval(install_stub):
+    codes = contract_codes(12)
+    stub = StubPro([], single_codes=[f"{c}.SHF" for c in codes[:6]], kline_codes=[], fail_full_day=True)
+    service = install_stub(stub, max_in_flight=4)
+
+    assert len(service.batch_get_futures_prices(codes)) == 6
+    assert len(service.batch_get_futures_prices(codes)) == 6
+    # 失败的全量下载缓存为空快照，刷新间隔内各合约与下一轮都不再重试
+    assert stub.calls["full_day"] == 1
+
+
+def test_snapshot_shared_by_price_lookups_and_kline(install_stub):
+    today = tushare_service.datetime.now().strftime("%Y%m%d")
+    codes = contract_codes(5)
+    stub = StubPro([f"{c}.SHF" for c in codes], single_codes=[], kline_codes=[f"{codes[0]}.SHF"])
+    stub.full_day["trade_date"] = today
+    service = install_stub(stub)
+
+    assert service.batch_get_futures_prices(codes)[codes[1]] == 101.0
+    assert tushare_service.TushareService().get_futures_price(codes[2]) == 102.0
+    kline = service.get_futures_kline(f"{codes[0]}.SHF", start_date="20260101", end_date=today)
+    assert list(kline["trade_date"])[-1] == today and kline["close"].iloc[-1] == 100.0
+    assert stub.calls["full_day"] == 1 and stub.calls["single"] == 0